@@ -131,10 +131,12 @@ class DiagnosticReportAction(base.Action):
 
     def __openGLReport(self):
         """Creates and returns a dictionary containing information about the
-        OpenGL platform.
+        OpenGL platform, and about the memory used by shared OpenGL resources
+        (see :func:`.resources.report`).
         """
 
-        import fsleyes.gl as fslgl
+        import fsleyes.gl           as fslgl
+        import fsleyes.gl.resources as glresources
 
         texsize = str(fslgl.GL.glGetInteger(fslgl.GL.GL_MAX_TEXTURE_SIZE))
 
@@ -150,6 +152,7 @@ class DiagnosticReportAction(base.Action):
         report['Renderer']      = fslgl.GL_RENDERER
         report['Texture size']  = texsize
         report['Extensions']    = extensions.split(' ')
+        report['Resources']     = glresources.report()
 
         return report
 
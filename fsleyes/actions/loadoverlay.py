@@ -146,7 +146,8 @@ def loadOverlays(paths,
                  saveDir=True,
                  onLoad=None,
                  inmem=False,
-                 blocking=False):
+                 blocking=False,
+                 cache=None):
     """Loads all of the overlays specified in the sequence of files
     contained in ``paths``.
 
@@ -190,15 +191,21 @@ def loadOverlays(paths,
                     directly. Otherwise, overlays and the ``onLoad`` are loaded
                     and called on the :func:`.idle.idle` loop.
 
+    :arg cache:     Optional cache of previously loaded overlays, e.g. an
+                    :class:`.OverlayCache`. Must provide ``get(path)`` and
+                    ``put(path, overlays)`` methods. If an overlay for a path
+                    is present in the cache, it is re-used instead of being
+                    loaded again. Newly loaded overlays are added to the
+                    cache.
+
     :returns:       If ``blocking is False`` (the default), returns ``None``.
                     Otherwise returns a list containing the loaded overlay
                     objects.
     """
 
-    import fsl.data.image   as fslimage
-    import fsl.data.mesh    as fslmesh
-    import fsl.data.bitmap  as fslbmp
-    import fsleyes.data.mif as mif
+    import fsl.data.image  as fslimage
+    import fsl.data.mesh   as fslmesh
+    import fsl.data.bitmap as fslbmp
 
     # The default load function updates
     # the dialog window created above
@@ -219,6 +226,16 @@ def loadOverlays(paths,
 
         loadFunc(path)
 
+        origPath = path
+
+        if cache is not None:
+            loaded = cache.get(path)
+            if loaded is not None:
+                log.debug('Using cached overlay(s) for %s', path)
+                overlays.extend(loaded)
+                pathIdxs.extend([idx] * len(loaded))
+                return
+
         try:
 
             dtype, _, path = dutils.guessType(path)
@@ -241,8 +258,6 @@ def loadOverlays(paths,
 
             if pluginLoader is not None:
                 loaded = [pluginLoader[1](path, check=False)]
-            elif issubclass(dtype, mif.MIFImage):
-                loaded = [mif.MIFImage(path)]
             elif issubclass(dtype, fslimage.Image):
                 loaded = loadImage(dtype, path, inmem=inmem)
             elif issubclass(dtype, fslmesh.Mesh):
@@ -255,6 +270,9 @@ def loadOverlays(paths,
             overlays.extend(loaded)
             pathIdxs.extend([idx] * len(loaded))
 
+            if cache is not None:
+                cache.put(origPath, loaded)
+
             # If a loader function from a third-party
             # package was used, load any other entry
             # points provided by that package.
@@ -325,6 +343,7 @@ def loadImage(dtype, path, inmem=False):
     """
 
     import fsleyes.data.imagewrapper as imagewrapper
+    import fsleyes.data.mif          as mif
 
     # We're going to load the file twice - first to
     # get its dimensions/data type, and then for real.
@@ -337,10 +356,22 @@ def loadImage(dtype, path, inmem=False):
     #      (e.g. ./filtered_func.ica/ turned into
     #      ./filtered_func.ica/melodic_IC) so that you can
     #      just create a fsl.data.Image, or a nib.Nifti1Image.
-    image  = dtype(path)
-    shape  = image.shape
-    nbytes = np.prod(shape) * image.niftiDataTypeSize / 8
-    image  = None
+    #
+    # MIF images are an exception - a MIFImage reads
+    # all of its data on creation, which would be
+    # expensive for .mif.gz files, so we get the
+    # dimensions/data type from the header instead.
+    if issubclass(dtype, mif.MIFImage):
+        header = mif.loadMIFHeader(path)
+        shape  = list(header['dim'])
+        while len(shape) > 3 and shape[-1] == 1:
+            shape.pop()
+        nbytes = np.prod(shape) * header['datatype'].itemsize
+    else:
+        image  = dtype(path)
+        shape  = image.shape
+        nbytes = np.prod(shape) * image.niftiDataTypeSize / 8
+        image  = None
 
     # If the file is a large 4D image, we will use an
     # ImageWrapper to manage acccess to the data. The
@@ -361,13 +392,22 @@ def loadImage(dtype, path, inmem=False):
     if inmem:
         image.data
 
-    # If using an image wrapper, read a
-    # sample of data to force the wrapper
-    # to initialise its known data range
+    # If using an image wrapper, restore the
+    # data range from a previous session if
+    # we have one cached. Otherwise read a
+    # sample of data to force the wrapper to
+    # initialise its known data range. The
+    # rest of the image is only scanned in
+    # the background if the user has opted
+    # in via the scandatarange setting, as
+    # the scan reads the entire file.
     if wrapper is not None:
         wrapper.setImage(image.nibImage)
-        with wrapper.unthreaded():
-            wrapper[..., 0]
+        if not wrapper.loadCachedDataRange(image.dataSource):
+            with wrapper.unthreaded():
+                wrapper[..., 0]
+            if fslsettings.read('fsleyes.overlay.scandatarange', False):
+                wrapper.scanDataRange(path=image.dataSource)
 
     return [image]
 
@@ -10,17 +10,11 @@ programmatically generate animated gifs.
 """
 
 
-import os.path as op
 import            os
-import            shutil
-import            tempfile
 
-import            PIL
 import            wx
-import numpy   as np
 
 import fsl.utils.idle                 as idle
-import fsl.transform.affine           as affine
 import fsl.utils.settings             as fslsettings
 import fsleyes_widgets.utils.progress as progress
 from   fsleyes_widgets import            isalive
@@ -28,10 +22,15 @@ from   fsleyes_widgets import            isalive
 from . import base
 
 import fsleyes.strings            as strings
+import fsleyes.movie              as movie
 import fsleyes.actions.screenshot as screenshot
 import fsleyes.views.scene3dpanel as scene3dpanel
 
 
+MovieContext = movie.MovieContext
+"""Alias for :class:`.movie.MovieContext`. """
+
+
 class MovieGifAction(base.Action):
     """The ``MovieGifAction`` allows the user to save an animated gif of the
     currently selected overlay in a :class:`.CanvasPanel`, according to the
@@ -169,11 +168,15 @@ def makeGif(overlayList,
 
     overlay = displayCtx.getSelectedOverlay()
     opts    = displayCtx.getOpts(overlay)
-    tempdir = tempfile.mkdtemp()
     is3d    = isinstance(panel, scene3dpanel.Scene3DPanel) and \
               panel.movieAxis != 3
     ctx     = MovieContext(is3d)
 
+    # Frames are written to the file
+    # as they are captured, rather
+    # than being kept in memory.
+    writer = movie.GifWriter(open(filename, 'wb'), delay=50, closefile=True)
+
     class Finished(Exception):
         pass
 
@@ -181,14 +184,9 @@ def makeGif(overlayList,
         pass
 
     def finalise(ctx):
-        if not ctx.cancelled and len(ctx.images) > 0:
-            ctx.images[0].save(filename,
-                               format='gif',
-                               save_all=True,
-                               append_images=ctx.images[1:],
-                               duration=50,
-                               loop=0)
-        shutil.rmtree(tempdir)
+        writer.close()
+        if ctx.cancelled or writer.nframes == 0:
+            os.remove(filename)
 
         if onfinish is not None:
             onfinish()
@@ -222,10 +220,7 @@ def makeGif(overlayList,
         or Finished() when the movie capture is complete.
         """
 
-        # individual frames don't
-        # need to be saved as gif
         idx   = len(ctx.frames)
-        fname = op.join(tempdir, '{}.png'.format(idx))
         frame = panel.getMovieFrame(overlay, opts)
 
         if not progfunc(idx):
@@ -236,98 +231,7 @@ def makeGif(overlayList,
         if finished:
             raise Finished()
 
-        screenshot.screenshot(panel, fname)
-        ctx.addFrame(frame, PIL.Image.open(fname))
+        writer.write(screenshot.canvasPanelBitmap(panel))
+        ctx.addFrame(frame)
 
     idle.idleWhen(captureFrame, ready, ctx, after=0.1)
-
-
-class MovieContext:
-    """Used by :func:`makeGif`. Stores references to captured frames,
-    and contains logic to detect when enough frames have been captured.
-    """
-
-    def __init__(self, is3d):
-        """Create a ``MovieContext``.
-
-        If ``is3d is True``, it is assumed that we are capturing a movie
-        from a :class:`.Scene3DPanel` along the X/Y/Z axes (i.e. the scene
-        is rotating around).
-
-        Otherwise is is assumed that we are capturing a movie through time,
-        or along the X/Y/Z axes in 2D (i.e. scrolling through slices in
-        an :class:`.OrthoView`).
-        """
-        self.is3d       = is3d
-        self.looped     = False
-        self.cancelled  = False
-        self.startFrame = None
-        self.images     = []
-        self.frames     = []
-
-    def addFrame(self, frame, image):
-        """Save refs to a movie frame and associated screenshot. """
-        self.images.append(image)
-        self.frames.append(frame)
-
-    def processFrame(self, frame):
-        """Return true if the movie has completed. The provided ``frame``
-        is the value of the next frame that would be captured.
-        """
-        # The 3D X/Y/Z movie mode performs rotations,
-        # rather than moving the display location
-        # through the X/Y/Z axes. The "frame" returned
-        # by getMovieFrame is a rotation matrix.  We
-        # convert these rotation matrices into
-        # rms-deviations (average deviation of the
-        # current frame from the starting frame), which
-        # has an inverted "V"-shaped wave form as the
-        # scene is rotated 360 degrees. So we continue
-        # capturing frames until the rmsdev of the
-        # current frame is:
-        #
-        #   - close to 0 (i.e. very similar to
-        #     the rotation matrix of the starting
-        #     frame), and
-        #
-        #   - less than the most recent frame (i.e.
-        #     has rotated past 180 degrees, and is
-        #     rotating back twoards the starting
-        #     point)
-
-        if self.is3d:
-
-            # save a ref to the starting rotation matrix
-            if len(self.frames) == 0:
-                self.startFrame = frame
-
-            # normalise the rotmat for this
-            # frame to the rms difference
-            # from the starting rotmat
-            frame = affine.rmsdev(self.startFrame, frame)
-
-            # Keep capturing frames until we
-            # have performed a full 360 degree
-            # rotation (rmsdev of current
-            # frame is decreasing towards 0)
-            if len(self.frames) > 1    and \
-               frame < self.frames[-1] and \
-               abs(frame) < 0.1:
-                return frame, True
-
-        # All other movie frames have a range
-        # (fmin, fmax) and start at some arbitrary
-        # point within this range. We capture frames
-        # until a full loop through this range has
-        # been completed.
-        else:
-            # detect when frame has wrapped around
-            # back to the beginning of the range
-            if not self.looped:
-                self.looped = (len(self.frames) > 1) and \
-                              (frame <= self.frames[-1])
-
-            if self.looped and frame >= self.frames[0]:
-                return frame, True
-
-        return frame, False
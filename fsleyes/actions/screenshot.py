@@ -17,6 +17,7 @@ A few stand-alone functions are defined in this module:
    screenshot
    plotPanelScreenshot
    canvasPanelScreenshot
+   canvasPanelBitmap
 """
 
 
@@ -159,6 +160,19 @@ def canvasPanelScreenshot(panel, filename):
     or :class:`.PlotPanel`, saving it to the given ``filename``.
     """
 
+    data = canvasPanelBitmap(panel)
+
+    try:              fmt = op.splitext(filename)[1][1:]
+    except Exception: fmt = None
+
+    mplimg.imsave(filename, data, format=fmt)
+
+
+def canvasPanelBitmap(panel):
+    """Capture a screenshot of the contents of the given :class:`.CanvasPanel`,
+    returning it as a ``uint8`` array of shape ``(height, width, 4)``.
+    """
+
     # The canvas panel container is the
     # direct parent of the colour bar
     # canvas, and an ancestor of the
@@ -224,10 +238,7 @@ def canvasPanelScreenshot(panel, filename):
     data = _patchInCanvases(cpanel, panel, data, bgColour)
     data[:, :,  3] = 255
 
-    try:              fmt = op.splitext(filename)[1][1:]
-    except Exception: fmt = None
-
-    mplimg.imsave(filename, data, format=fmt)
+    return data
 
 
 def _patchInCanvases(canvasPanel, containerPanel, data, bgColour):
@@ -104,6 +104,25 @@ uniform int  clipMode;
 uniform vec3 rayStep;
 
 
+/*
+ * Empty space skipping. If useBricks is true, the brickTexture
+ * contains the minimum and maximum image texture values within
+ * each brickSize^3 brick of the image (in its first and second
+ * channels - see the BrickRangeTexture class). Bricks which are
+ * entirely clipped by the current clipping range are skipped by
+ * the ray-casting loop.
+ *
+ * brickXform is a scale and offset which transforms values from
+ * the brickTexture into the image texture data range, and
+ * brickShape is the number of bricks along each dimension.
+ */
+uniform bool      useBricks;
+uniform sampler3D brickTexture;
+uniform vec2      brickXform;
+uniform vec3      brickShape;
+uniform float     brickSize;
+
+
 /*
  * Length of the rayStep vector.
  */
@@ -218,6 +237,45 @@ bool is_clipped(vec3 texCoord,
   return false;
 }
 
+/*
+ * Returns true if every voxel within the brick at the given
+ * brick texture coordinates would be clipped by the current
+ * clipping range, false otherwise. This must be kept
+ * consistent with the clipping logic in sample_volume.
+ */
+bool brick_empty(vec3 brickCoord) {
+
+  vec2  range = texture3D(brickTexture, brickCoord).xy;
+  float bmin  = range.x * brickXform.x + brickXform.y;
+  float bmax  = range.y * brickXform.x + brickXform.y;
+  float tmp;
+
+  /* Brick only contains nans */
+  if (bmin > bmax) {
+    return true;
+  }
+
+  /*
+   * If using a negative colour map, clipping
+   * is applied to the absolute value, so we
+   * mirror the range about clipZero.
+   */
+  if (useNegCmap && bmin <= clipZero) {
+    if (bmax <= clipZero) {
+      tmp  = bmin;
+      bmin = clipZero + (clipZero - bmax);
+      bmax = clipZero + (clipZero - tmp);
+    }
+    else {
+      bmax = max(bmax, clipZero + (clipZero - bmin));
+      bmin = clipZero;
+    }
+  }
+
+  if (invertClip) return bmin >= clipLow && bmax <= clipHigh;
+  else            return bmax <= clipLow || bmin >= clipHigh;
+}
+
 /*
  * Estimate the intensity gradient at a specific location within a volume.
  * Surface normals for volume lighting are based on intensity gradients.
@@ -382,6 +440,28 @@ void main(void) {
         break;
       }
 
+      /*
+       * If every voxel in the current brick
+       * is clipped, skip ahead to the last
+       * step before the ray exits the brick.
+       */
+      if (useBricks) {
+        vec3 brickPos = (texCoord * texShape - 0.5) / brickSize;
+        vec3 brickIdx = floor(brickPos);
+
+        if (brick_empty((brickIdx + 0.5) / brickShape)) {
+
+          vec3  brickDir = rayStep * texShape / brickSize;
+          vec3  exitPos  = brickIdx + step(vec3(0), brickDir);
+          vec3  dist     = abs(exitPos - brickPos) /
+                           max(abs(brickDir), vec3(1e-6));
+          float nsteps   = ceil(min(dist.x, min(dist.y, dist.z))) - 1;
+
+          texCoord += rayStep * max(nsteps, 0.0);
+          continue;
+        }
+      }
+
       /* check if we're in a clipped region */
       if (is_clipped(texCoord, numClipPlanes, clipPlanes, clipMode)) {
         continue;
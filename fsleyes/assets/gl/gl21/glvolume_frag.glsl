@@ -67,6 +67,16 @@ uniform vec3 texShape;
  */
 uniform vec3 clipImageShape;
 
+/*
+ * If true, the image is stored in a BrickedImageTexture,
+ * and is drawn one brick at a time. Fragments outside of
+ * the current brick, with voxel coordinates in the range
+ * [brickLow, brickHigh), are discarded.
+ */
+uniform bool useBricks;
+uniform vec3 brickLow;
+uniform vec3 brickHigh;
+
 /*
  * Shape of the modulate image.
  */
@@ -183,6 +193,11 @@ void main(void) {
         discard;
     }
 
+    if (useBricks && (any(lessThan(        fragVoxCoord, brickLow)) ||
+                      any(greaterThanEqual(fragVoxCoord, brickHigh)))) {
+        discard;
+    }
+
     if (!sample_volume(fragTexCoord,
                        fragClipTexCoord,
                        fragModTexCoord,
@@ -35,12 +35,20 @@ where:
    site-specific colourmaps and lookup tables.
 
 
-When :func:`init` is called, it searches in the above locations, and attempts
-to load all files within which have the suffix ``.cmap`` or ``.lut``
+When :func:`init` is called, it searches in the above locations, and
+registers all files within which have the suffix ``.cmap`` or ``.lut``
 respectively. If a user-added map file has the same name as a built-in map
 file, the user-added one will override the built-in.
 
 
+Colour map and lookup table files are registered by key and file path, but
+are not parsed until they are first used (see the :class:`LazyColormap` and
+:class:`LookupTable` classes). Parsed files are also cached in a binary form
+within the FSLeyes settings directory (see :data:`CACHE_MAPS`), so that the
+cost of starting FSLeyes does not grow with the number of installed colour
+maps and lookup tables.
+
+
 .. [*] Only the :func:`scanColourMaps` and :func:`scanLookupTables` functions
        may be called before :func:`init` is called.
 
@@ -222,6 +230,7 @@ import operator  as ops
 import os.path   as op
 import              os
 import              bisect
+import              hashlib
 import              logging
 import              colorsys
 
@@ -236,6 +245,7 @@ import fsleyes_props          as props
 import                           fsleyes
 import fsleyes.displaycontext as fsldisplay
 import fsleyes.utils          as utils
+import fsleyes.utils.filecache as filecache
 
 
 log = logging.getLogger(__name__)
@@ -344,6 +354,31 @@ mappings.
 """
 
 
+MAX_LUT_VALUE = 2 ** 31 - 1
+"""Maximum label value that may be added to a :class:`LookupTable`. """
+
+
+CACHE_MAPS = True
+"""If ``True``, parsed colour map and lookup table files are cached in a
+binary format in the FSLeyes cache directory (see the
+:mod:`fsleyes.utils.filecache` module). A cached file is ignored if its
+source file is modified.
+"""
+
+
+_cmapSizes = filecache.FileCache('colourmap_sizes.json', maxEntries=1024)
+"""Stores the number of colours in each colour map file, so that a
+:class:`LazyColormap` can be created without having to parse the file.
+"""
+
+
+_cmapData = {}
+"""Colour map data which has been loaded from file, stored as
+``{fileIdentity : array}`` mappings (see :func:`.filecache.fileIdentity`
+and :func:`_loadColourMapData`).
+"""
+
+
 def init(force=False):
     """This function must be called before any of the other functions in this
     module can be used.
@@ -411,64 +446,69 @@ def init(force=False):
     allMapDirs = [getCmapDirs(),    getLutDirs()]
     allMaps    = [scanColourMaps(), scanLookupTables()]
 
-    for mapType, mapDirs, maps, register in zip(
-            mapTypes, allMapDirs, allMaps, registers):
-
-        # Read order/display names from order.txt -
-        # an order.txt file may exist in any of the
-        # map directories - the first that is found
-        # takes precedence (see _getMapDirs).
-        names = None
-        for mapDir in mapDirs:
-            ot = op.join(mapDir, 'order.txt')
-            if op.exists(ot):
-                names = readOrderTxt(ot)
-                break
-
-        # This should never happen, unless the built-
-        # in order.txt is deleted for some reason
-        if names is None:
-            names = {}
-
-        names.update(readDisplayNames(mapType))
-
-        # any maps which did not have a name
-        # specified in order.txt (or, for
-        # user-added maps, in fslsettings)
-        # are added to the end of the list,
-        # and their name is just set to the
-        # ID (which is equal to the file name
-        # prefix).
-        for mid in maps.keys():
-            if mid not in names:
-                names[mid] = mid
-
-        # Now register all of those maps,
-        # in the order defined by order.txt
-        for mapID, mapName in names.items():
-
-            # The user-added {id:name} dict
-            # might contain obsolete/invalid
-            # names, so we ignore keyerrors
-            try:
-                mapFile = maps[mapID]
-            except KeyError:
-                continue
+    # The colour map sizes cache
+    # is saved once, after all
+    # maps have been registered
+    with _cmapSizes.batch():
+        for mapType, mapDirs, maps, register in zip(
+                mapTypes, allMapDirs, allMaps, registers):
+
+            # Read order/display names from order.txt -
+            # an order.txt file may exist in any of the
+            # map directories - the first that is found
+            # takes precedence (see _getMapDirs).
+            names = None
+            for mapDir in mapDirs:
+                ot = op.join(mapDir, 'order.txt')
+                if op.exists(ot):
+                    names = readOrderTxt(ot)
+                    break
+
+            # This should never happen, unless the built-
+            # in order.txt is deleted for some reason
+            if names is None:
+                names = {}
+
+            names.update(readDisplayNames(mapType))
+
+            # any maps which did not have a name
+            # specified in order.txt (or, for
+            # user-added maps, in fslsettings)
+            # are added to the end of the list,
+            # and their name is just set to the
+            # ID (which is equal to the file name
+            # prefix).
+            for mid in maps.keys():
+                if mid not in names:
+                    names[mid] = mid
+
+            # Now register all of those maps,
+            # in the order defined by order.txt
+            for mapID, mapName in names.items():
+
+                # The user-added {id:name} dict
+                # might contain obsolete/invalid
+                # names, so we ignore keyerrors
+                try:
+                    mapFile = maps[mapID]
+                except KeyError:
+                    continue
 
-            try:
-                kwargs = {'key' : mapID, 'name' : mapName}
+                try:
+                    kwargs = {'key' : mapID, 'name' : mapName}
 
-                if   mapType == 'cmap':
-                    mapID = registerColourMap(mapFile, **kwargs)
-                elif mapType == 'lut':
-                    registerLookupTable(mapFile, **kwargs)
+                    if   mapType == 'cmap':
+                        mapID = registerColourMap(mapFile, **kwargs)
+                    elif mapType == 'lut':
+                        registerLookupTable(mapFile, **kwargs)
 
-                register[mapID].installed    = True
-                register[mapID].mapObj.saved = True
+                    register[mapID].installed    = True
+                    register[mapID].mapObj.saved = True
 
-            except Exception as e:
-                log.warning('Error processing custom %s file {mapFile}: %s',
-                            mapType, e, exc_info=True)
+                except Exception as e:
+                    log.warning('Error processing custom %s '
+                                'file {mapFile}: %s',
+                                mapType, e, exc_info=True)
 
 
 def registerColourMap(cmapFile,
@@ -518,11 +558,9 @@ def registerColourMap(cmapFile,
     if key in mpl.colormaps:
         key = f'fsleyes_{key}'
 
-    data = loadColourMapFile(cmapFile)
-    cmap = colors.ListedColormap(data, name=key)
+    log.debug('Registering custom colour map: %s', cmapFile)
 
-    log.debug('Loading and registering custom '
-              'colour map: %s', cmapFile)
+    cmap = LazyColormap(cmapFile, key)
 
     mpl.colormaps.register(cmap, name=key, force=True)
     _cmaps[key] = _Map(key, name, cmap, cmapFile, False)
@@ -660,6 +698,93 @@ def registerLookupTable(lut,
     return lut
 
 
+def _mapCachePath(fname, mapType):
+    """Returns a path to a binary cache file for the given colour map or
+    lookup table file, or ``None`` if caching is disabled or not possible.
+
+    :arg fname:   Colour map / lookup table file
+    :arg mapType: ``'cmap'`` or ``'lut'``
+    """
+
+    if not CACHE_MAPS:
+        return None
+
+    ident = filecache.fileIdentity(fname)
+    if ident is None:
+        return None
+
+    digest = hashlib.sha1(ident.encode('utf-8')).hexdigest()
+    return filecache.cachePath('maps', f'{mapType}_{digest}.npz')
+
+
+def _loadMapFile(fname, mapType):
+    """Loads a colour map or lookup table file, via the binary cache (see
+    :data:`CACHE_MAPS`). If the file has not been cached, it is loaded with
+    :func:`loadColourMapFile` or :func:`loadLookupTableFile`, and saved to
+    the cache.
+
+    :arg fname:   Colour map / lookup table file
+    :arg mapType: ``'cmap'`` or ``'lut'``
+    :returns:     The value returned by :func:`loadColourMapFile` or
+                  :func:`loadLookupTableFile`.
+    """
+
+    cacheFile = _mapCachePath(fname, mapType)
+
+    if cacheFile is not None and op.exists(cacheFile):
+        try:
+            with np.load(cacheFile) as f:
+                if mapType == 'cmap':
+                    return f['data']
+                else:
+                    return f['lut'], [str(n) for n in f['names']]
+        except Exception as e:
+            log.debug('Could not load cached map file %s (%s): %s',
+                      cacheFile, fname, e)
+
+    if mapType == 'cmap':
+        result = loadColourMapFile(fname)
+        arrays = {'data' : result}
+    else:
+        result = loadLookupTableFile(fname)
+        arrays = {'lut' : result[0], 'names' : np.array(result[1], dtype=str)}
+
+    if cacheFile is not None:
+        try:
+            os.makedirs(op.dirname(cacheFile), exist_ok=True)
+            with open(cacheFile, 'wb') as f:
+                np.savez(f, **arrays)
+        except Exception as e:
+            log.debug('Could not save cached map file %s (%s): %s',
+                      cacheFile, fname, e)
+
+    return result
+
+
+def _loadColourMapData(cmapFile):
+    """Loads and returns the colour data from the given colour map file.
+    The data is only loaded once, unless the file is modified.
+    """
+    ident = filecache.fileIdentity(cmapFile) or cmapFile
+    data  = _cmapData.get(ident, None)
+    if data is None:
+        data = _loadMapFile(cmapFile, 'cmap')
+        _cmapData[ident] = data
+    return data
+
+
+def _colourMapSize(cmapFile):
+    """Returns the number of colours in the given colour map file. The size of
+    every colour map is cached, so the file only needs to be parsed the first
+    time that it is seen.
+    """
+    size = _cmapSizes.get(cmapFile)
+    if size is None:
+        size = len(_loadColourMapData(cmapFile))
+        _cmapSizes.put(cmapFile, size)
+    return size
+
+
 def getLookupTables():
     """Returns a list containing all available lookup tables."""
     return [_luts[lutName].mapObj for lutName in _luts.keys()]
@@ -1323,6 +1448,48 @@ class _Map:
         return self.__str__()
 
 
+class LazyColormap(colors.ListedColormap):
+    """A ``matplotlib.colors.ListedColormap`` which is created from a colour
+    map file, but which does not load the colour data until it is needed.
+    Colour maps registered by the :func:`registerColourMap` function are
+    created as ``LazyColormap`` instances.
+
+    The number of colours in the file must be known when the colour map is
+    created - it is retrieved via the :func:`_colourMapSize` function, which
+    will parse the file if it has not been seen before.
+    """
+
+
+    def __init__(self, cmapFile, name):
+        """Create a ``LazyColormap``.
+
+        :arg cmapFile: Colour map file
+        :arg name:     Colour map name
+        """
+        self.__cmapFile = cmapFile
+        colors.Colormap.__init__(self, name, _colourMapSize(cmapFile))
+
+        # Older versions of matplotlib use a
+        # monochrome attribute rather than a
+        # property, which is set by the
+        # ListedColormap constructor.
+        if not isinstance(getattr(type(self), 'monochrome', None), property):
+            self.monochrome = False
+
+
+    @property
+    def cmapFile(self):
+        """Returns the file that this ``LazyColormap`` was loaded from. """
+        return self.__cmapFile
+
+
+    @property
+    def colors(self):
+        """Returns the colour map data, loading it from file if necessary.
+        """
+        return _loadColourMapData(self.__cmapFile)
+
+
 class LutLabel(props.HasProperties):
     """This class represents a mapping from a value to a colour and name.
     ``LutLabel`` instances are created and managed by :class:`LookupTable`
@@ -1448,6 +1615,16 @@ class LookupTable(notifier.Notifier):
     the meth:`delete` method.
 
 
+    A ``{value : index}`` dictionary is maintained alongside the labels, so
+    that look-ups by value (via :meth:`index` and :meth:`get`) do not need to
+    search through the list of labels. The :meth:`arrays` method returns the
+    label values, colours, and enabled states as ``numpy`` arrays, and the
+    :meth:`remap` method can be used to convert label values into a dense
+    ``[0, len(lut)]`` range of indices - these are used by the
+    :class:`.LookupTableTexture` to build lookup table textures for tables
+    with large/sparse label values.
+
+
     *Notifications*
 
 
@@ -1477,26 +1654,42 @@ class LookupTable(notifier.Notifier):
         :arg lutFile: A file to load lookup table label values, names, and
                       colours from. If ``None``, this ``LookupTable`` will
                       be empty - labels can be added with the :meth:`new` or
-                      :meth:`insert` methods.
+                      :meth:`insert` methods. If the file has previously been
+                      cached (see :data:`CACHE_MAPS`), it is not loaded until
+                      the ``LookupTable`` is first used.
         """
 
         if not utils.isValidMapKey(key):
             raise ValueError(f'{key} is not a valid lut identifier')
 
-        self.key      = key
-        self.name     = name
-        self.__labels = []
-        self.__name   = f'LookupTable({self.name})_{id(self)}'
-
-        # The LUT is loaded now, but parsed
-        # lazily on first access
+        self.key       = key
+        self.name      = name
+        self.__labels  = []
+        self.__name    = f'LookupTable({self.name})_{id(self)}'
+
+        # {value : index} mappings, and
+        # (values, colours, enabled) arrays,
+        # both created on demand, and cleared
+        # whenever the LUT is modified.
+        self.__indices = None
+        self.__arrays  = None
+
+        # The LUT is parsed lazily on first
+        # access. If the file has been loaded
+        # before, it is also loaded lazily.
+        # Otherwise it is loaded now, so that
+        # any errors are raised immediately.
         self.__saved   = False
         self.__parsed  = False
         self.__toParse = None
 
         if lutFile is not None:
-            self.__toParse = loadLookupTableFile(lutFile)
-            self.__saved   = True
+            cacheFile = _mapCachePath(lutFile, 'lut')
+            if cacheFile is not None and op.exists(cacheFile):
+                self.__toParse = lutFile
+            else:
+                self.__toParse = _loadMapFile(lutFile, 'lut')
+            self.__saved = True
 
 
     def lazyparse(func):
@@ -1506,6 +1699,8 @@ class LookupTable(notifier.Notifier):
 
         def wrapper(self, *args, **kwargs):
             if not self.__parsed and self.__toParse is not None:
+                if isinstance(self.__toParse, str):
+                    self.__toParse = _loadMapFile(self.__toParse, 'lut')
                 self.__parse(*self.__toParse)
                 self.__toParse = None
                 self.__parsed  = True
@@ -1571,10 +1766,69 @@ class LookupTable(notifier.Notifier):
         .. note:: The ``value`` which is passed in can be either an integer
                   specifying the label value, or a ``LutLabel`` instance.
         """
-        if not isinstance(value, LutLabel):
-            value = LutLabel(value)
+        if isinstance(value, LutLabel):
+            value = value.value
+
+        if self.__indices is None:
+            self.__indices = {lbl.value : i
+                              for i, lbl in enumerate(self.__labels)}
+
+        try:
+            return self.__indices[value]
+        except (KeyError, TypeError):
+            raise ValueError(f'{value} is not in lookup table')
+
+
+    @lazyparse
+    def arrays(self):
+        """Returns a tuple containing three ``numpy`` arrays, each of length
+        ``len(self)``, containing the label values, RGB colours (shape
+        ``(N, 3)``), and enabled states of all labels in this
+        ``LookupTable``. The arrays are cached, and must not be modified.
+        """
+
+        if self.__arrays is None:
+            nlabels = len(self.__labels)
+            values  = np.zeros( nlabels,     dtype=np.int64)
+            colours = np.zeros((nlabels, 3), dtype=np.float64)
+            enabled = np.zeros( nlabels,     dtype=bool)
+
+            for i, lbl in enumerate(self.__labels):
+                values[ i] = lbl.value
+                colours[i] = lbl.colour[:3]
+                enabled[i] = lbl.enabled
+
+            self.__arrays = (values, colours, enabled)
 
-        return self.__labels.index(value)
+        return self.__arrays
+
+
+    @lazyparse
+    def remap(self, data):
+        """Converts the label values in ``data`` into indices into this
+        ``LookupTable``. Values which are not in this ``LookupTable`` are
+        converted to ``len(self)``. This can be used to convert label image
+        data into a dense range, regardless of the magnitude of the label
+        values.
+
+        :arg data: ``numpy`` array containing label values
+        :returns:  ``numpy`` array of the same shape as ``data``, containing
+                   indices in the range ``[0, len(self)]``.
+        """
+
+        values  = self.arrays()[0]
+        nlabels = len(values)
+        data    = np.asarray(data)
+        dtype   = np.promote_types(data.dtype, np.min_scalar_type(nlabels))
+
+        if nlabels == 0:
+            return np.zeros(data.shape, dtype=dtype)
+
+        idxs  = np.searchsorted(values, data)
+        valid = values[np.clip(idxs, 0, nlabels - 1)] == data
+        idxs  = np.where(valid, idxs, nlabels)
+
+        return idxs.astype(dtype, copy=False)
 
 
     @lazyparse
@@ -1626,9 +1880,10 @@ class LookupTable(notifier.Notifier):
         :returns: The newly created ``LutLabel`` instance.
         """
         if not isinstance(value, (int, np.integer)) or \
-           value < 0 or value > 65535:
-            raise ValueError('Lookup table values must be 16 bit unsigned '
-                             f'integers ({type(value)}: {value}).')
+           value < 0 or value > MAX_LUT_VALUE:
+            raise ValueError('Lookup table values must be integers in the '
+                             f'range [0, {MAX_LUT_VALUE}] '
+                             f'({type(value)}: {value}).')
 
         if self.get(value) is not None:
             raise ValueError(f'Value {value} is already in lookup table')
@@ -1638,6 +1893,8 @@ class LookupTable(notifier.Notifier):
 
         idx = bisect.bisect(self.__labels, label)
         self.__labels.insert(idx, label)
+        self.__indices = None
+        self.__arrays  = None
 
         self.saved = False
         self.notify(topic='added', value=(label, idx))
@@ -1656,6 +1913,9 @@ class LookupTable(notifier.Notifier):
         idx   = self.index(value)
         label = self.__labels.pop(idx)
 
+        self.__indices = None
+        self.__arrays  = None
+
         label.removeGlobalListener(self.__name)
 
         self.notify(topic='removed', value=(label, idx))
@@ -1686,7 +1946,9 @@ class LookupTable(notifier.Notifier):
         labels = [LutLabel(int(l), name, (r, g, b), l > 0)
                   for ((l, r, g, b), name) in zip(lut, names)]
 
-        self.__labels = labels
+        self.__labels  = labels
+        self.__indices = None
+        self.__arrays  = None
 
         for label in labels:
             label.addGlobalListener(self.__name, self.__labelChanged)
@@ -1697,6 +1959,9 @@ class LookupTable(notifier.Notifier):
         notification on the ``label`` topic.
         """
 
+        if propName in ('colour', 'enabled'):
+            self.__arrays = None
+
         if propName in ('name', 'colour'):
             self.saved = False
 
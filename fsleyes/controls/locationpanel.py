@@ -6,10 +6,15 @@
 #
 """This module provides the :class:`LocationPanel` class, a *FSLeyes control*
 panel which shows information about the current display location.
+
+The :class:`VoxelLookup` class is also defined here - it is used by the
+:class:`LocationInfoPanel` to retrieve voxel values from :class:`.Image`
+overlays which are not loaded into memory.
 """
 
 
 import logging
+import threading
 import itertools as it
 
 import wx
@@ -18,6 +23,8 @@ import wx.html as wxhtml
 import numpy as np
 
 import fsl.transform.affine           as affine
+import fsl.utils.idle                 as idle
+import fsl.utils.cache                as cache
 import fsl.utils.settings             as fslsettings
 import fsl.data.image                 as fslimage
 import fsl.data.mesh                  as fslmesh
@@ -252,6 +259,12 @@ class LocationInfoPanel(fslpanel.FSLeyesPanel):
         self.__registeredDisplay = None
         self.__registeredOpts    = None
 
+        # Voxel values for images which are
+        # not in memory are retrieved on a
+        # separate thread, as accessing data
+        # from compressed files can be slow.
+        self.__lookup = VoxelLookup()
+
         self.__column1 = wx.Panel(self)
         self.__column2 = wx.Panel(self)
         self.__info    = wxhtml.HtmlWindow(self)
@@ -398,6 +411,7 @@ class LocationInfoPanel(fslpanel.FSLeyesPanel):
         self.displayCtx .removeListener('location',        self.name)
 
         self.__deregisterOverlay()
+        self.__lookup.destroy()
 
         fslpanel.FSLeyesPanel.destroy(self)
 
@@ -491,6 +505,7 @@ class LocationInfoPanel(fslpanel.FSLeyesPanel):
         """
 
         self.__deregisterOverlay()
+        self.__lookup.prune(self.overlayList)
 
         if len(self.overlayList) == 0:
             self.__updateWidgets()
@@ -903,6 +918,7 @@ class LocationInfoPanel(fslpanel.FSLeyesPanel):
         overlays   = reversed(displayCtx.getOrderedOverlays())
         selOvl     = displayCtx.getSelectedOverlay()
         lines      = []
+        queries    = []
 
         dswarn = self.__genDisplaySpaceWarning()
         if dswarn is not None:
@@ -926,7 +942,7 @@ class LocationInfoPanel(fslpanel.FSLeyesPanel):
             if isinstance(overlay, fslmesh.Mesh):
                 info = self.__genMeshInfo(overlay, opts)
             elif isinstance(overlay, fslimage.Image):
-                info = self.__genImageInfo(overlay, opts)
+                info = self.__genImageInfo(overlay, opts, queries)
             else:
                 info = '{}'.format(strings.labels[self, 'noData'])
 
@@ -947,6 +963,14 @@ class LocationInfoPanel(fslpanel.FSLeyesPanel):
         self.__info.SetPage('<br>'.join(lines))
         self.__info.Refresh()
 
+        # Look up any voxel values that we
+        # don't yet have, and then refresh
+        if len(queries) > 0:
+            def onFinish():
+                if not self.destroyed:
+                    self.__updateLocationInfo()
+            self.__lookup.request(queries, onFinish)
+
 
     def __genDisplaySpaceWarning(self):
         """Generate a warning if images with different orientations and/or
@@ -1009,15 +1033,32 @@ class LocationInfoPanel(fslpanel.FSLeyesPanel):
         return info
 
 
-    def __genImageInfo(self, ovl, opts):
-        """Generate an info line for the given :class:`.Image` overlay. """
+    def __genImageInfo(self, ovl, opts, queries):
+        """Generate an info line for the given :class:`.Image` overlay.
+
+        If the image is not loaded into memory, and the value at the current
+        voxel has not been retrieved by the :class:`VoxelLookup`, a
+        placeholder is shown, and the voxel location is appended to
+        ``queries``.
+        """
 
         vloc = opts.getVoxel()
 
         if vloc is not None:
             vloc = tuple(int(v) for v in vloc)
             vloc = opts.index(vloc)
-            vval = ovl[vloc]
+
+            if ovl.inMemory:
+                vval = ovl[vloc]
+            else:
+                vval = self.__lookup.get(ovl, vloc)
+
+            if vval is None:
+                queries.append((ovl, vloc))
+                vloc = ' '.join(map(str, vloc))
+                return '[{}]: {}'.format(
+                    vloc, strings.labels[self, 'pendingValue'])
+
             vloc = ' '.join(map(str, vloc))
 
             if not np.isscalar(vval):
@@ -1363,3 +1404,162 @@ def saveLocationHistory(history, filename):
 
     with open(filename, 'wt') as f:
         f.write('\n'.join(lines))
+
+
+class VoxelLookup:
+    """The ``VoxelLookup`` class retrieves voxel values from :class:`.Image`
+    overlays on a separate thread, so that the GUI is not blocked while data
+    is read from (e.g. compressed) image files.
+
+    The :meth:`request` method is used to request the values at a set of
+    voxels. Only the most recent request is retained - if a new request is
+    made before a previous request has been processed, the previous request
+    is dropped. Once a request has been processed, the values are available
+    via the :meth:`get` method.
+
+    A small least-recently-used cache of retrieved values is maintained for
+    each overlay. The cache for an overlay is cleared whenever its data
+    changes.
+    """
+
+
+    def __init__(self, cacheSize=64):
+        """Create a ``VoxelLookup``. A thread is started, which will run until
+        :meth:`destroy` is called.
+
+        :arg cacheSize: Maximum number of values to cache for each overlay.
+        """
+
+        self.__name      = '{}_{}'.format(type(self).__name__, id(self))
+        self.__cacheSize = cacheSize
+        self.__caches    = {}
+        self.__request   = None
+        self.__running   = True
+        self.__lock      = threading.Lock()
+        self.__cond      = threading.Condition(self.__lock)
+        self.__thread    = threading.Thread(target=self.__worker,
+                                            name=self.__name,
+                                            daemon=True)
+        self.__thread.start()
+
+
+    def destroy(self):
+        """Stops the thread, and clears all cached values. """
+        with self.__cond:
+            self.__running = False
+            self.__request = None
+            self.__cond.notify_all()
+        self.prune([])
+
+
+    def get(self, overlay, vloc):
+        """Returns the cached value of the given overlay at the given voxel,
+        or ``None`` if the value has not been retrieved.
+        """
+        with self.__lock:
+            entry = self.__caches.get(id(overlay), None)
+            if entry is None:
+                return None
+            return entry[1].get(vloc, None)
+
+
+    def request(self, queries, onFinish=None):
+        """Request values for the given voxels. Any previous request which
+        has not yet been started is dropped.
+
+        :arg queries:  Sequence of ``(overlay, voxel)`` tuples, where
+                       ``voxel`` is an index into the overlay.
+        :arg onFinish: Function to call (on the idle loop) when all of the
+                       values have been retrieved. Not called if the request
+                       is superseded by a newer request, or if no new values
+                       were retrieved (e.g. due to errors).
+        """
+        with self.__cond:
+            # Caches are created here, rather than
+            # on the worker thread, so that overlay
+            # listeners are registered on the
+            # calling (main) thread.
+            for overlay, _ in queries:
+                self.__cache(overlay)
+            self.__request = (list(queries), onFinish)
+            self.__cond.notify_all()
+
+
+    def prune(self, overlays):
+        """Clears the caches for any overlays which are not in ``overlays``.
+        """
+        keep = [id(o) for o in overlays]
+        with self.__lock:
+            for key in list(self.__caches.keys()):
+                if key not in keep:
+                    overlay, _ = self.__caches.pop(key)
+                    overlay.deregister(self.__name, topic='data')
+
+
+    def __dataChanged(self, overlay, *a):
+        """Called when the data of an overlay changes. Clears its cache. """
+        with self.__lock:
+            entry = self.__caches.get(id(overlay), None)
+            if entry is not None:
+                entry[1].clear()
+
+
+    def __cache(self, overlay):
+        """Returns the value cache for the given overlay, creating one if
+        necessary. Must be called on the main thread, with the lock held.
+        """
+        entry = self.__caches.get(id(overlay), None)
+        if entry is None:
+            entry = (overlay, cache.Cache(maxsize=self.__cacheSize, lru=True))
+            self.__caches[id(overlay)] = entry
+            overlay.register(self.__name, self.__dataChanged, topic='data')
+        return entry[1]
+
+
+    def __worker(self):
+        """Run on a separate thread. Processes requests until
+        :meth:`destroy` is called.
+        """
+
+        while True:
+            with self.__cond:
+                while self.__running and self.__request is None:
+                    self.__cond.wait()
+                if not self.__running:
+                    return
+                request        = self.__request
+                self.__request = None
+
+            queries, onFinish = request
+            nvals             = 0
+
+            for overlay, vloc in queries:
+
+                # Abandon this request if a
+                # newer one has come in
+                if self.__request is not None:
+                    break
+
+                if self.get(overlay, vloc) is not None:
+                    continue
+
+                try:
+                    value = overlay[vloc]
+                except Exception as e:
+                    log.warning('Error retrieving value from %s at %s: %s',
+                                overlay.name, vloc, e)
+                    continue
+
+                # The cache will not exist if the
+                # overlay has been pruned since
+                # the request was made
+                with self.__lock:
+                    entry = self.__caches.get(id(overlay), None)
+                    if entry is None:
+                        continue
+                    entry[1].put(vloc, value)
+                nvals += 1
+
+            else:
+                if onFinish is not None and nvals > 0:
+                    idle.idle(onFinish)
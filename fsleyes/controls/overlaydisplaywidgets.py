@@ -195,6 +195,7 @@ def _initPropertyList_VolumeOpts(threedee):
             'blendByIntensity',
             'numSteps',
             'resolution',
+            'progressive',
             'custom_clipPlanes']
 
     return plist
@@ -554,6 +555,7 @@ def _initWidgetSpec_VolumeOpts(displayCtx):
         'blendByIntensity'  : props.Widget('blendByIntensity'),
         'resolution'        : props.Widget('resolution',
                                            showLimits=False),
+        'progressive'       : props.Widget('progressive'),
         'numClipPlanes'     : props.Widget('numClipPlanes',
                                            slider=False,
                                            showLimits=False),
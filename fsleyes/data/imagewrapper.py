@@ -40,6 +40,7 @@ get their definitions straight:
 
 
 import                    logging
+import                    weakref
 import                    collections
 import collections.abc as abc
 import itertools       as it
@@ -54,11 +55,19 @@ import fsl.data.image        as fslimage
 import fsl.utils.notifier    as notifier
 import fsl.utils.naninfrange as nir
 import fsl.utils.idle        as idle
+import fsleyes.utils.filecache as filecache
 
 
 log = logging.getLogger(__name__)
 
 
+DATA_RANGE_CACHE = filecache.FileCache('datarange.json')
+"""A :class:`.FileCache` used by :class:`ImageWrapper` instances to store
+the data ranges of image files that have been fully scanned. See
+:meth:`ImageWrapper.scanDataRange`.
+"""
+
+
 class ImageWrapper(fslimage.DataManager, notifier.Notifier):
     """The ``ImageWrapper`` class is a convenience class which manages data
     access to ``nibabel`` NIFTI images. The ``ImageWrapper`` class can be
@@ -106,6 +115,14 @@ class ImageWrapper(fslimage.DataManager, notifier.Notifier):
     image, separate coverages and data ranges are stored for each 2D slice.
 
 
+    The :meth:`scanDataRange` method can be used to calculate the full data
+    range in the background, one block of volumes at a time, with listeners
+    being notified as the known data range grows. Once the full data range
+    has been calculated, it is saved to a cache (see :data:`DATA_RANGE_CACHE`)
+    so that, the next time the same file is loaded, its data range can be
+    restored via :meth:`loadCachedDataRange`, without reading any data.
+
+
     The ``ImageWrapper`` implements the :class:`.Notifier` interface.
     Listeners can register to be notified whenever the known image data range
     is updated. The data range can be accessed via the :attr:`dataRange`
@@ -147,10 +164,11 @@ class ImageWrapper(fslimage.DataManager, notifier.Notifier):
         # The internal state is stored in these
         # attributes - they're initialised in the
         # reset method.
-        self.__range     = None
-        self.__coverage  = None
-        self.__volRanges = None
-        self.__covered   = False
+        self.__range       = None
+        self.__coverage    = None
+        self.__volRanges   = None
+        self.__covered     = False
+        self.__percentiles = None
 
         # The data is kept on disk and accessed
         # through nibimg.dataobj , unless/untill
@@ -312,6 +330,10 @@ class ImageWrapper(fslimage.DataManager, notifier.Notifier):
         # (i.e. when all data has been loaded in).
         self.__covered = False
 
+        # Robust percentile range, optionally
+        # calculated by scanDataRange
+        self.__percentiles = None
+
 
     @property
     def dataRange(self):
@@ -331,6 +353,16 @@ class ImageWrapper(fslimage.DataManager, notifier.Notifier):
         return low, high
 
 
+    @property
+    def percentileRange(self):
+        """Returns the ``(low, high)`` percentile range that was calculated by
+        :meth:`scanDataRange`, or ``None`` if it has not been calculated.
+        """
+        if self.__percentiles is None:
+            return None
+        return tuple(self.__percentiles[1])
+
+
     @property
     def covered(self):
         """Returns ``True`` if this ``ImageWrapper`` has read the entire
@@ -386,6 +418,171 @@ class ImageWrapper(fslimage.DataManager, notifier.Notifier):
         else:                       return self.__image.dataobj[sliceobj]
 
 
+    def scanDataRange(self, blockSize=1, percentiles=None, path=None):
+        """Calculates the full data range of the image, in blocks of
+        ``blockSize`` volumes (or slices, for a 3D image). If this
+        ``ImageWrapper`` is threaded, each block is processed in a separate
+        task on the :class:`.TaskThread`, so that other data range updates
+        are not blocked. Listeners are notified whenever the known data
+        range changes.
+
+        :arg blockSize:   Number of volumes to process at a time.
+
+        :arg percentiles: Optional ``(low, high)`` percentiles to calculate
+                          from a sample of the image data. The result is
+                          available via :meth:`percentileRange` once the scan
+                          has finished.
+
+        :arg path:        Path to the image file. If provided, the data
+                          range is saved to the :data:`DATA_RANGE_CACHE`
+                          when the scan has finished, as long as the data
+                          has not been modified.
+        """
+
+        nrdims  = self.__numRealDims
+        nvols   = self.__image.shape[nrdims - 1]
+        blocks  = [(lo, min(lo + blockSize, nvols))
+                   for lo in range(0, nvols, blockSize)]
+        samples = []
+
+        # Up to this many values are sampled
+        # (in total) for the percentile range
+        sampleSize = 1048576 // len(blocks)
+        selfref    = weakref.ref(self)
+
+        def scanBlock(bi):
+
+            # The wrapper has been GC'd
+            self = selfref()
+            if self is None or self.__image is None:
+                return
+
+            vlo, vhi = blocks[bi]
+
+            if percentiles is not None or \
+               not sliceCovered(self.__blockSlices(vlo, vhi), self.__coverage):
+                data = self.__coverBlock(vlo, vhi)
+                if percentiles is not None:
+                    data = data[np.isfinite(data)]
+                    step = max(1, data.size // sampleSize)
+                    samples.append(data[::step])
+
+            if bi < len(blocks) - 1:
+                self.__enqueueTask(f'{id(self)}_scan', scanBlock, bi + 1)
+            else:
+                self.__finishScan(percentiles, samples, path)
+
+        self.__enqueueTask(f'{id(self)}_scan', scanBlock, 0)
+
+
+    def loadCachedDataRange(self, path):
+        """Restores the per-volume data ranges for the image from the
+        :data:`DATA_RANGE_CACHE`, if they have previously been calculated by
+        :meth:`scanDataRange`.
+
+        :arg path: Path to the image file.
+        :returns:  ``True`` if the data range was restored, ``False``
+                   otherwise.
+        """
+
+        entry = DATA_RANGE_CACHE.get(path)
+
+        if entry is None:
+            return False
+
+        volRanges = np.array(entry['volRanges'], dtype=self.__volRanges.dtype)
+
+        if volRanges.shape != self.__volRanges.shape:
+            return False
+
+        log.debug('Restoring data range for %s from cache', path)
+
+        self.__volRanges[:] = volRanges
+        self.__coverage[:]  = self.__fullCoverage()[..., np.newaxis]
+
+        if entry.get('percentiles') is not None:
+            self.__percentiles = entry['percentiles']
+
+        self.__updateDataRange()
+        return True
+
+
+    def __enqueueTask(self, name, func, *args):
+        """Runs ``func`` on the :class:`.TaskThread` if this ``ImageWrapper``
+        is threaded, or directly otherwise.
+        """
+        if self.__taskThread is None: func(*args)
+        else: self.__taskThread.enqueue(func, *args, taskName=name)
+
+
+    def __fullCoverage(self):
+        """Returns a ``(2, ndims)`` coverage array which covers an entire
+        volume/slice of the image.
+        """
+        ndims = self.__numRealDims - 1
+        shape = self.__image.shape[:ndims]
+        return np.array([[0] * ndims, shape], dtype=np.float32)
+
+
+    def __blockSlices(self, vlo, vhi):
+        """Returns a tuple of ``(low, high)`` index pairs covering the
+        volumes/slices from ``vlo`` to ``vhi``.
+        """
+        shape  = self.__image.shape
+        nrdims = self.__numRealDims
+        slices = [(0, s) for s in shape[:nrdims - 1]]
+        slices = slices + [(vlo, vhi)] + [(0, 1)] * self.__numPadDims
+        return tuple(slices)
+
+
+    def __coverBlock(self, vlo, vhi):
+        """Used by :meth:`scanDataRange`. Reads the volumes/slices from
+        ``vlo`` to ``vhi``, calculates their data ranges, and marks them
+        as covered.
+
+        :returns: The data that was read.
+        """
+
+        squeezeDims = tuple(range(self.__numRealDims,
+                                  self.__numRealDims + self.__numPadDims))
+
+        data = self.__getData(self.__blockSlices(vlo, vhi), isTuple=True)
+        data = np.asanyarray(data).squeeze(squeezeDims)
+
+        for vi, vol in enumerate(range(vlo, vhi)):
+            self.__volRanges[vol, :]  = nir.naninfrange(data[..., vi])
+            self.__coverage[..., vol] = self.__fullCoverage()
+
+        self.__updateDataRange()
+
+        return data
+
+
+    def __finishScan(self, percentiles, samples, path):
+        """Called by :meth:`scanDataRange` when all blocks have been
+        processed. Calculates the percentile range, if requested, and saves
+        the data range to the cache.
+        """
+
+        if percentiles is not None and len(samples) > 0:
+            samples = np.concatenate(samples)
+            if samples.size > 0:
+                self.__percentiles = [
+                    list(percentiles),
+                    [float(v) for v in np.percentile(samples, percentiles)]]
+
+        # Don't cache the data range if the
+        # image data has been modified
+        if path is None or self.__data is not None or not self.__covered:
+            return
+
+        log.debug('Saving data range for %s to cache', path)
+
+        DATA_RANGE_CACHE.put(path, {
+            'volRanges'   : self.__volRanges.tolist(),
+            'percentiles' : self.__percentiles})
+
+
     def __imageIsCovered(self):
         """Returns ``True`` if all portions of the image have been covered
         in the data range calculation, ``False`` otherwise.
@@ -455,6 +652,15 @@ class ImageWrapper(fslimage.DataManager, notifier.Notifier):
                 self.__coverage[..., vol] = adjustCoverage(
                     self.__coverage[..., vol], exp)
 
+        self.__updateDataRange()
+
+
+    def __updateDataRange(self):
+        """Called by :meth:`__expandCoverage`, and by :meth:`scanDataRange`.
+        Re-calculates the known data range over the entire image from the
+        per-volume data ranges, and notifies listeners if it has changed.
+        """
+
         # Calculate the new known data
         # range over the entire image
         # (i.e. over all volumes).
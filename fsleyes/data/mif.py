@@ -6,13 +6,21 @@
 #
 """This module provides the :class:`.MIFImage` class, for loading MRtrix3
 ``.mif`` image files.
+
+Uncompressed ``.mif`` image data is accessed via a ``numpy.memmap``, so
+that only the parts of the image which are accessed are read from disk.
+Compressed ``.mif.gz`` image data is decompressed directly into a
+pre-allocated array, with file reads performed on a separate thread.
 """
 
 
 import io
 import gzip
+import zlib
+import queue
 import os.path as op
 import string
+import threading
 
 from typing import Any
 
@@ -67,23 +75,36 @@ MIF_DATATYPES = {
 """Mappings from MIF datatypes to equivalent numpy dtypes."""
 
 
+GZIP_CHUNK_SIZE = 16777216
+"""Size, in bytes, of the blocks in which compressed ``.mif.gz`` files are
+read by the :func:`loadMIFImage` function.
+"""
+
+
 class MIFImage(fslimage.Image):
     """The ``MIFImage`` is an :class:`.Image` sub-class which allows
     loading of MRtrix ``.mif`` image files.
     """
 
-    def __init__(self, filename : str):
-        """Load a ``MIFImage`` from ``filename``. """
+    def __init__(self, filename : str, mmap : bool = True, **kwargs):
+        """Load a ``MIFImage`` from ``filename``.
+
+        :arg filename: ``.mif`` file to load
+        :arg mmap:     Passed through to :func:`loadMIFImage`.
+
+        All other arguments are passed through to :meth:`.Image.__init__`.
+        """
 
         header = loadMIFHeader(filename)
-        data   = loadMIFImage(filename, header)
+        data   = loadMIFImage(filename, header, mmap=mmap)
         xform  = createAffine(header)
         name   = op.basename(filename)
 
         super().__init__(data,
                          xform=xform,
                          name=name,
-                         dataSource=filename)
+                         dataSource=filename,
+                         **kwargs)
 
         self.__mifHeader = header
 
@@ -211,11 +232,19 @@ def loadMIFHeader(filename : str) -> MIFHeader:
     return header
 
 
-def loadMIFImage(filename : str, header : MIFHeader) -> np.ndarray:
+def loadMIFImage(filename : str,
+                 header   : MIFHeader,
+                 mmap     : bool = True) -> np.ndarray:
     """Load MIF image data from the given file.
 
+    If the image data is uncompressed and ``mmap is True``, the data is
+    accessed via a copy-on-write ``numpy.memmap``, and the MIF layout is
+    presented as a strided view, so no data is read until it is accessed.
+    Otherwise the data is read into memory.
+
     :arg filename: Name of file that header was loaded from.
     :arg header:   Dict containing header information.
+    :arg mmap:     Memory-map uncompressed image data.
     :returns:      Numpy array containing the image data.
     """
 
@@ -229,19 +258,124 @@ def loadMIFImage(filename : str, header : MIFHeader) -> np.ndarray:
     if datafile == '.':
         datafile = filename
     else:
-        datafile = op.join(filename.dirname(), datafile)
-
-    if filename.endswith('.gz'): openfunc = gzip.open
-    else:                        openfunc = open
+        datafile = op.join(op.dirname(filename), datafile)
 
-    with openfunc(filename, 'rb') as f:
-        data = np.fromfile(f, dtype=dtype, offset=offset)
+    if datafile.endswith('.gz'):
+        data = readGzipData(datafile, dtype, shape, offset)
+    elif mmap:
+        data = np.memmap(datafile, dtype=dtype, mode='c',
+                         offset=offset, shape=tuple(shape), order='F')
+    else:
+        data = np.fromfile(datafile, dtype=dtype, offset=offset)
 
     data = data.reshape(shape, order='F')
 
-    # Make sure first three
-    # data dimensions are XYZ.
-    if len(layout) >= 4:
-        data = data.transpose(layout)
+    # Make sure first three data dimensions
+    # are XYZ. This is necessary for 3D
+    # images as well as 4D images, as the
+    # spatial axes may be stored in any
+    # order. This returns a view, so the
+    # data is not copied.
+    return data.transpose(layout)
+
+
+def readGzipData(filename  : str,
+                 dtype     : np.dtype,
+                 shape     : list[int],
+                 offset    : int,
+                 chunkSize : int = None) -> np.ndarray:
+    """Used by :func:`loadMIFImage`. Reads and decompresses image data from
+    a ``.mif.gz`` file.
+
+    The data is decompressed directly into a pre-allocated array, so the
+    uncompressed data is only stored in memory once. Compressed data is read
+    from the file on a separate thread, so that file I/O overlaps with
+    decompression (``zlib`` releases the GIL whilst decompressing).
+    Concatenated (multi-member) gzip streams are supported.
+
+    :arg filename:  Name of file to read
+    :arg dtype:     Data type
+    :arg shape:     Data shape, in file (Fortran) order
+    :arg offset:    Offset, into the uncompressed stream, of the image data
+    :arg chunkSize: Size of compressed blocks to read at a time. Defaults to
+                    :data:`GZIP_CHUNK_SIZE`.
+    :returns:       A 1D ``numpy`` array containing the image data
+    """
+
+    if chunkSize is None:
+        chunkSize = GZIP_CHUNK_SIZE
+
+    out    = np.empty(int(np.prod(shape)), dtype=dtype)
+    outbuf = memoryview(out).cast('B')
+    nbytes = len(outbuf)
+    chunks = queue.Queue(maxsize=4)
+    stop   = threading.Event()
+    errors = []
+
+    def reader():
+        try:
+            with open(filename, 'rb') as f:
+                while not stop.is_set():
+                    chunk = f.read(chunkSize)
+                    chunks.put(chunk)
+                    if len(chunk) == 0:
+                        break
+        except Exception as e:
+            errors.append(e)
+            chunks.put(b'')
+
+    thread = threading.Thread(target=reader,
+                              name=f'readGzipData_{op.basename(filename)}',
+                              daemon=True)
+    thread.start()
+
+    # wbits=31 -> expect a gzip header
+    decomp = zlib.decompressobj(31)
+    skip   = offset
+    pos    = 0
+
+    try:
+        while pos < nbytes:
+            chunk = chunks.get()
+            if len(chunk) == 0:
+                break
 
-    return data
+            while len(chunk) > 0 and pos < nbytes:
+
+                # Limit the amount of data decompressed
+                # at a time, as highly compressible data
+                # could otherwise expand to an arbitrary
+                # size in memory.
+                block = decomp.decompress(chunk, chunkSize)
+                chunk = decomp.unconsumed_tail
+
+                # Start of a new gzip member
+                if decomp.eof:
+                    chunk  = decomp.unused_data
+                    decomp = zlib.decompressobj(31)
+
+                # Discard the header
+                if skip > 0:
+                    nskip = min(skip, len(block))
+                    block = block[nskip:]
+                    skip -= nskip
+
+                block = block[:nbytes - pos]
+                outbuf[pos:pos + len(block)] = block
+                pos  += len(block)
+    finally:
+        stop.set()
+        # unblock the reader if it is
+        # waiting on a full queue
+        while thread.is_alive():
+            try:               chunks.get_nowait()
+            except queue.Empty: thread.join(0.01)
+
+    if len(errors) > 0:
+        raise errors[0]
+
+    if pos < nbytes:
+        raise ValueError(f'{filename}: unexpected end of '
+                         f'file ({pos} / {nbytes} bytes)')
+
+    return out
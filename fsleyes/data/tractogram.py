@@ -12,8 +12,9 @@ The ``Tractogram`` class is just a thin wrapper around a
 """
 
 
-import functools as ft
-import os.path   as op
+import functools   as ft
+import os.path     as op
+import collections
 
 import numpy                as np
 import nibabel.streamlines  as nibstrm
@@ -23,6 +24,12 @@ import fsl.transform.affine as affine
 import fsl.data.constants   as constants
 
 
+SPATIAL_INDEX_BINS = 256
+"""Number of bins, along each axis, used by the spatial index which is
+created by the :meth:`Tractogram.verticesInRange` method.
+"""
+
+
 ALLOWED_EXTENSIONS     = ['.tck', '.trk', '.trx']
 EXTENSION_DESCRIPTIONS = ['MRtrix .tck file',
                           'TrackVis .trk file',
@@ -94,6 +101,23 @@ class Tractogram:
         # load.
         self.__vertexData = {}
 
+        # Random keys and index sets used by
+        # the subsample method. Keys are
+        # stored by (perVertex, nitems, seed),
+        # and index sets by (perVertex, nitems,
+        # seed, threshold).
+        self.__subsampleKeys    = {}
+        self.__subsampleIndices = collections.OrderedDict()
+
+        # Spatial index used by verticesInRange,
+        # created on-demand for each axis.
+        self.__spatialIndex = {}
+
+        # Simplified streamlines, created by
+        # the simplify method, stored as
+        # {tolerance : mask} mappings.
+        self.__simplified = collections.OrderedDict()
+
         # Load any per-vertex / per-streamline data
         # which is stored in the streamline file
         if self.fileType == 'trx': tractogram = self.tractFile
@@ -237,19 +261,177 @@ class Tractogram:
         offsets = self.offsets[indices]
         lengths = self.lengths[indices]
 
-        vertIdxs = np.zeros(np.sum(lengths), dtype=np.uint32)
-        i        = 0
-        for o, l in zip(offsets, lengths):
-            vertIdxs[i:i + l] = np.arange(o, o + l, dtype=np.uint32)
-            i                += l
-
-        vertices       = self.vertices[vertIdxs]
         newOffsets     = np.zeros(len(offsets), dtype=np.int32)
         newOffsets[1:] = np.cumsum(lengths)[:-1]
 
+        # The vertex indices for each streamline
+        # are a contiguous range starting from its
+        # old offset. We can generate them all at
+        # once by shifting a single arange by the
+        # difference between the old and new
+        # offsets of each streamline.
+        shifts   = np.asarray(offsets, dtype=np.int64) - newOffsets
+        vertIdxs = np.arange(np.sum(lengths), dtype=np.int64)
+        vertIdxs = (vertIdxs + np.repeat(shifts, lengths)).astype(np.uint32)
+        vertices = self.vertices[vertIdxs]
+
         return vertices, newOffsets, lengths, vertIdxs
 
 
+    def subsample(self, percentage, perVertex=False, seed=0):
+        """Randomly select a sub-sample of streamlines or vertices, returning
+        their (sorted) indices.
+
+        Each streamline/vertex is assigned a random key, generated from the
+        given ``seed``, and those with a key below a threshold determined by
+        ``percentage`` are selected. The result is deterministic for a given
+        ``seed``, and the sub-samples are nested - all of the streamlines or
+        vertices selected for one percentage will also be selected for any
+        higher percentage. The number of selected items is approximately, but
+        not exactly, equal to the requested percentage.
+
+        The random keys, and the most recently selected index sets, are
+        cached, so changing between percentages is cheap.
+
+        :arg percentage: Percentage of streamlines/vertices to select
+        :arg perVertex:  If ``True``, vertices are sampled. Otherwise
+                         streamlines are sampled.
+        :arg seed:       Seed for the random number generator
+        :returns:        A sorted array of indices into the streamlines
+                         (:meth:`offsets` / :meth:`lengths`) or into
+                         :meth:`vertices`.
+        """
+
+        if perVertex: lim = self.nvertices
+        else:         lim = self.nstreamlines
+
+        keys      = self.__subsampleKeys
+        cache     = self.__subsampleIndices
+        maxkey    = np.iinfo(np.uint16).max + 1
+        threshold = int(round(maxkey * np.clip(percentage, 0, 100) / 100))
+        kkey      = (perVertex, lim, seed)
+        ckey      = kkey + (threshold,)
+
+        if ckey in cache:
+            cache.move_to_end(ckey)
+            return cache[ckey]
+
+        # Keys are 16 bit, to keep memory requirements
+        # for per-vertex sampling reasonable, which
+        # gives a percentage resolution of ~0.0015%.
+        if kkey not in keys:
+            rng        = np.random.default_rng(seed)
+            keys[kkey] = rng.integers(0, maxkey, lim, dtype=np.uint16)
+
+        indices     = np.nonzero(keys[kkey] < threshold)[0]
+        cache[ckey] = indices
+
+        while len(cache) > 8:
+            cache.popitem(last=False)
+
+        return indices
+
+
+    def verticesInRange(self, axis, lo, hi):
+        """Returns the indices of all vertices which have a coordinate along
+        the given ``axis`` between ``lo`` and ``hi`` (inclusive).
+
+        The first time this method is called for an axis, a spatial index is
+        created, where the vertices are sorted into :data:`SPATIAL_INDEX_BINS`
+        bins along that axis. Subsequent queries only need to examine the
+        vertices within the bins that overlap the query range, so this
+        method can be used to efficiently retrieve the vertices within a
+        thin slab.
+
+        :arg axis: Axis (0, 1, or 2) in the tractogram coordinate system.
+        :arg lo:   Low coordinate
+        :arg hi:   High coordinate
+        :returns:  A ``uint32`` array containing indices into
+                   :meth:`vertices`, in no particular order.
+        """
+
+        if axis not in self.__spatialIndex:
+            self.__spatialIndex[axis] = self.__createSpatialIndex(axis)
+
+        coords                 = self.vertices[:, axis]
+        blo, bw, order, starts = self.__spatialIndex[axis]
+        nbins                  = len(starts) - 1
+
+        if hi < lo or nbins == 0:
+            return np.zeros(0, dtype=np.uint32)
+
+        lobin = int(np.clip(np.floor((lo - blo) / bw), 0, nbins - 1))
+        hibin = int(np.clip(np.floor((hi - blo) / bw), 0, nbins - 1))
+        idxs  = order[starts[lobin]:starts[hibin + 1]]
+        vals  = coords[idxs]
+
+        return idxs[(vals >= lo) & (vals <= hi)]
+
+
+    def __createSpatialIndex(self, axis):
+        """Called by :meth:`verticesInRange`. Creates a spatial index of
+        all vertices along the given axis.
+
+        :returns: A tuple containing:
+                    - The lower bound of the first bin
+                    - The bin width
+                    - A ``uint32`` array of vertex indices, ordered by bin
+                    - Offsets into the index array for each bin (with an
+                      extra element containing the total number of vertices)
+        """
+
+        coords = self.vertices[:, axis]
+
+        if len(coords) == 0:
+            return 0, 1, np.zeros(0, dtype=np.uint32), np.zeros(1, dtype=int)
+
+        nbins  = SPATIAL_INDEX_BINS
+        lo, hi = self.bounds[0][axis], self.bounds[1][axis]
+        width  = max((hi - lo) / nbins, np.finfo(np.float32).eps)
+        bins   = ((coords - lo) / width).astype(np.int32)
+        bins   = np.clip(bins, 0, nbins - 1)
+
+        order      = np.argsort(bins, kind='stable').astype(np.uint32)
+        starts     = np.zeros(nbins + 1, dtype=int)
+        starts[1:] = np.cumsum(np.bincount(bins, minlength=nbins))
+
+        return lo, width, order, starts
+
+
+    def simplify(self, tolerance):
+        """Simplifies all streamlines with the Douglas-Peucker algorithm,
+        using the given ``tolerance``. This can be used to draw a lower
+        resolution representation of the tractogram.
+
+        The results for the most recently used tolerances are cached. This
+        method may be called from any thread.
+
+        :arg tolerance: Maximum distance, in the tractogram coordinate
+                        system, between a discarded vertex and the
+                        simplified streamline.
+        :returns:       A boolean array with an element for every vertex,
+                        which is ``True`` for vertices which are retained
+                        in the simplified streamlines. The first and last
+                        vertices of every streamline are always retained.
+        """
+
+        cache = self.__simplified
+
+        if tolerance in cache:
+            return cache[tolerance]
+
+        keep = douglasPeucker(self.vertices,
+                              self.offsets,
+                              self.lengths,
+                              tolerance)
+        cache[tolerance] = keep
+
+        while len(cache) > 4:
+            cache.popitem(last=False)
+
+        return keep
+
+
     def loadVertexData(self, infile, key=None):
         """Load per-vertex or per-streamline data from a separate file.  The
         data will be accessible via the :meth:`getVertexData` method.
@@ -294,3 +476,115 @@ class Tractogram:
     def vertexDataSets(self):
         """Returns a list of keys for all loaded vertex data sets. """
         return list(self.__vertexData.keys())
+
+
+def douglasPeucker(vertices, offsets, lengths, tolerance, chunkSize=4194304):
+    """Simplifies a set of streamlines (polylines) with the Douglas-Peucker
+    algorithm. All streamlines are processed together - on each iteration,
+    every streamline segment which has not yet been resolved is split at the
+    vertex which lies furthest from it, until all discarded vertices are
+    within ``tolerance`` of the simplified streamlines.
+
+    :arg vertices:  ``(n, 3)`` array containing all streamline vertices
+    :arg offsets:   Offset of each streamline into ``vertices``
+    :arg lengths:   Number of vertices in each streamline
+    :arg tolerance: Maximum distance between a discarded vertex and the
+                    simplified streamline
+    :arg chunkSize: Maximum number of vertices to process at once, to
+                    limit memory usage.
+    :returns:       A boolean array with an element for every vertex, which
+                    is ``True`` for vertices that are retained.
+    """
+
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    keep    = np.zeros(len(vertices), dtype=bool)
+    valid   = lengths > 0
+
+    keep[offsets[valid]]                      = True
+    keep[offsets[valid] + lengths[valid] - 1] = True
+
+    # (start, end) vertex indices of all
+    # segments which may need to be split
+    split  = lengths > 2
+    starts = offsets[split]
+    ends   = offsets[split] + lengths[split] - 1
+
+    while len(starts) > 0:
+
+        # Process segments in chunks of
+        # at most ~chunkSize vertices
+        ninterior = ends - starts - 1
+        chunks    = np.cumsum(ninterior) // chunkSize
+        bounds    = np.flatnonzero(np.diff(chunks)) + 1
+        bounds    = np.concatenate(([0], bounds, [len(starts)]))
+        newStarts = []
+        newEnds   = []
+
+        for clo, chi in zip(bounds[:-1], bounds[1:]):
+            cstarts      = starts[clo:chi]
+            cends        = ends[  clo:chi]
+            furthest, ok = _furthestVertices(vertices, cstarts, cends)
+            split        = ~ok & (furthest[1] > tolerance)
+            mids         = furthest[0][split]
+
+            keep[mids] = True
+            newStarts.extend((cstarts[split], mids))
+            newEnds  .extend((mids,           cends[split]))
+
+        starts = np.concatenate(newStarts)
+        ends   = np.concatenate(newEnds)
+        split  = (ends - starts) > 1
+        starts = starts[split]
+        ends   = ends[  split]
+
+    return keep
+
+
+def _furthestVertices(vertices, starts, ends):
+    """Used by :func:`douglasPeucker`. For each segment defined by ``starts``
+    and ``ends``, finds the interior vertex which is furthest from the line
+    segment between the start and end vertices.
+
+    :returns: A tuple containing:
+                - A tuple containing the index of the furthest vertex, and
+                  its distance, for each segment
+                - A boolean array which is ``True`` for segments which
+                  have no interior vertices
+    """
+
+    ninterior = ends - starts - 1
+    empty     = ninterior <= 0
+    ninterior = np.maximum(ninterior, 0)
+    segoffs   = np.cumsum(ninterior) - ninterior
+    segids    = np.repeat(np.arange(len(starts)), ninterior)
+
+    # index of every interior vertex
+    # (see the Tractogram.subset method)
+    idxs = np.arange(ninterior.sum()) + np.repeat(starts + 1 - segoffs,
+                                                  ninterior)
+
+    a  = vertices[starts[segids]]
+    ab = vertices[ends[  segids]] - a
+    ap = vertices[idxs]           - a
+
+    # Distance from each vertex to the
+    # closest point on its line segment
+    abab = np.einsum('ij,ij->i', ab, ab)
+    t    = np.einsum('ij,ij->i', ap, ab)
+    t    = np.clip(np.divide(t, abab, out=np.zeros_like(t), where=abab > 0),
+                   0, 1)
+    dist = np.linalg.norm(ap - t[:, None] * ab, axis=1)
+
+    # The furthest vertex in each segment
+    maxdist = np.zeros(len(starts), dtype=dist.dtype)
+    maxidx  = np.array(starts, copy=True)
+
+    if len(dist) > 0:
+        nonempty          = ~empty
+        maxdist[nonempty] = np.maximum.reduceat(dist, segoffs[nonempty])
+        ismax             = np.flatnonzero(dist == maxdist[segids])
+        segs, first       = np.unique(segids[ismax], return_index=True)
+        maxidx[segs]      = idxs[ismax[first]]
+
+    return (maxidx, maxdist), empty
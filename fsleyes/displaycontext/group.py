@@ -70,6 +70,7 @@ class OverlayGroup(props.HasProperties):
         'Volume3DOpts'    : ['numSteps',
                              'numInnerSteps',
                              'resolution',
+                             'progressive',
                              'numClipPlanes',
                              'clipMode',
                              'clipPosition',
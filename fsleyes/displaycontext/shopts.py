@@ -166,12 +166,14 @@ class SHOpts(vectoropts.NiftiVectorOpts):
         return self.__maxOrder
 
 
-    def getSHParameters(self):
+    def getSHParameters(self, resolution=None):
         """Load and return a ``numpy`` array containing pre-calculated SH
         function parameters for the curert maximum SH order and display
         resolution. The returned array has the shape ``(N, C)``, where ``N``
         is the number of vertices used to represent each FOD, and ``C`` is
         the number of SH coefficients.
+
+        :arg resolution: Sphere resolution - defaults to :attr:`shResolution`.
         """
 
         # TODO Adjust matrix if shOrder is
@@ -180,7 +182,9 @@ class SHOpts(vectoropts.NiftiVectorOpts):
         #
         #      Also, calculate the normal vectors.
 
-        resolution = self.shResolution
+        if resolution is None:
+            resolution = self.shResolution
+
         ncoefs     = self.overlay.shape[3]
         order      = self.shOrder
         ftype, _   = SH_COEFFICIENT_TYPE[ncoefs]
@@ -197,26 +201,34 @@ class SHOpts(vectoropts.NiftiVectorOpts):
         return params
 
 
-    def getVertices(self):
+    def getVertices(self, resolution=None):
         """Loads and returns a ``numpy`` array of shape ``(N, 3)``, containing
         ``N`` vertices of a tessellated sphere.
+
+        :arg resolution: Sphere resolution - defaults to :attr:`shResolution`.
         """
+        if resolution is None:
+            resolution = self.shResolution
         fname = op.join(
             fsleyes.assetDir,
             'sh',
-            'vert_{}.txt'.format(self.shResolution))
+            'vert_{}.txt'.format(resolution))
 
         return np.loadtxt(fname)
 
 
-    def getIndices(self):
+    def getIndices(self, resolution=None):
         """Loads and returns a 1D ``numpy`` array, containing indices into
         the vertex array, specifying the order in which they are to be drawn
         as triangles.
+
+        :arg resolution: Sphere resolution - defaults to :attr:`shResolution`.
         """
+        if resolution is None:
+            resolution = self.shResolution
         fname = op.join(
             fsleyes.assetDir,
             'sh',
-            'face_{}.txt'.format(self.shResolution))
+            'face_{}.txt'.format(resolution))
 
         return np.loadtxt(fname).flatten()
@@ -84,6 +84,11 @@ class TractogramOpts(cmapopts.ColourMapOpts,
     subsample = props.Percentage(default=100)
     """Draw a random sub-sample of all streamlines. This is useful when drawing
     very large tractograms.
+
+    The sub-sample is drawn via :meth:`.Tractogram.subsample`, and is cached
+    so that changing the sub-sample percentage is fast. If the
+    ``fsleyes.overlay.tractogram.seed`` setting is set, it is used to seed
+    the sub-sample, so that it is reproducible across sessions.
     """
 
 
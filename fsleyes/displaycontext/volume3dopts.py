@@ -73,6 +73,18 @@ class Volume3DOpts:
     """
 
 
+    progressive = props.Boolean(default=False)
+    """If ``True``, the volume is drawn at a reduced :attr:`resolution` and
+    number of samples while the view is being changed (e.g. rotated, or the
+    clipping planes moved). When the view stops changing, the volume is
+    re-drawn over several successive frames, until it is drawn at full
+    quality. This only applies to on-screen canvases - off-screen renders
+    are always drawn at full quality.
+
+    See the :class:`.GLVolume` class documentation for more details.
+    """
+
+
     smoothing = props.Int(minval=0, maxval=10, default=0, clamped=True)
     """Amount of smoothing to apply to the rendered volume - this setting
     controls the smoothing filter radius, in pixels.
@@ -143,6 +155,7 @@ class Volume3DOpts:
             self.numSteps    = 60
             self.resolution  = 70
             self.blendFactor = 0.3
+            self.progressive = True
 
         # If we're in GL14, restrict the
         # maximum possible amount of
@@ -169,37 +182,49 @@ class Volume3DOpts:
         pass
 
 
-    def getNumSteps(self):
+    def getNumSteps(self, numSteps=None):
         """Return the value of the :attr:`numSteps` property, possibly
         adjusted according to the the :attr:`numInnerSteps` property. The
         result of this method should be used instead of the value of
         the :attr:`numSteps` property.
 
         See the :class:`.GLVolume` class for more details.
+
+        :arg numSteps: Number of steps to use instead of :attr:`numSteps`
+                       (e.g. a reduced number of steps for a
+                       :attr:`progressive` render).
         """
 
+        if numSteps is None:
+            numSteps = self.numSteps
+
         if float(fslgl.GL_COMPATIBILITY) >= 2.1:
-            return self.numSteps
+            return numSteps
 
-        outer = self.getNumOuterSteps()
+        outer = self.getNumOuterSteps(numSteps)
 
-        return min(self.numSteps, int(outer * self.numInnerSteps))
+        return min(numSteps, int(outer * self.numInnerSteps))
 
 
-    def getNumOuterSteps(self):
+    def getNumOuterSteps(self, numSteps=None):
         """Returns the number of iterations for the outer ray-casting loop.
 
         See the :class:`.GLVolume` class for more details.
+
+        :arg numSteps: Number of steps to use instead of :attr:`numSteps`.
         """
 
-        total = self.numSteps
+        if numSteps is None:
+            numSteps = self.numSteps
+
+        total = numSteps
         inner = self.numInnerSteps
         outer = np.ceil(total / float(inner))
 
         return int(outer)
 
 
-    def calculateRayCastSettings(self, view=None, proj=None):
+    def calculateRayCastSettings(self, view=None, proj=None, numSteps=None):
         """Calculates various parameters required for 3D ray-cast rendering
         (see the :class:`.GLVolume` class).
 
@@ -212,6 +237,10 @@ class Volume3DOpts:
                    to normalised device coordinates (i.e. the GL projection
                    matrix).
 
+
+        :arg numSteps: Number of steps to use instead of :attr:`numSteps`
+                       (passed to :meth:`getNumSteps`).
+
         Returns a tuple containing:
 
           - A vector defining the amount by which to move along a ray in a
@@ -257,7 +286,7 @@ class Volume3DOpts:
         # the maximum number of steps will
         # be reached across the longest axis
         # of the image texture cube.
-        rayStep = np.sqrt(3) * cdir / self.getNumSteps()
+        rayStep = np.sqrt(3) * cdir / self.getNumSteps(numSteps)
 
         # A transformation matrix which can
         # transform image texture coordinates
@@ -16,10 +16,11 @@ import fsl.data.image       as fslimage
 import fsleyes_props        as props
 import fsleyes.gl           as fslgl
 
-import fsleyes.colourmaps   as fslcm
-from . import colourmapopts as cmapopts
-from . import volume3dopts  as vol3dopts
-from . import                  niftiopts
+import fsleyes.colourmaps        as fslcm
+import fsleyes.utils.robustrange as robustrange
+from . import colourmapopts      as cmapopts
+from . import volume3dopts       as vol3dopts
+from . import                       niftiopts
 
 
 log = logging.getLogger(__name__)
@@ -190,9 +191,7 @@ class VolumeOpts(cmapopts.ColourMapOpts,
                 # is defined as being "silly"
                 if abs(dmax - dmin) > 10e7:
 
-                    if   overlay.ndim == 3: sample = overlay[:]
-                    elif overlay.ndim == 4: sample = overlay[..., 0]
-
+                    sample = robustrange.sampleImage(overlay)
                     drange = np.percentile(sample[sample != 0], [1, 99])
 
                     self.overrideDataRange       = drange
@@ -216,8 +215,7 @@ class VolumeOpts(cmapopts.ColourMapOpts,
             # Or might be percentiles, or (if percentiles
             # is False) are actual display range values
             elif percentiles:
-                if   overlay.ndim == 3: sample = overlay[:]
-                elif overlay.ndim == 4: sample = overlay[..., 0]
+                sample = robustrange.sampleImage(overlay)
                 drange = np.clip(drange, 0, 100)
                 drange = np.percentile(sample[sample != 0], drange)
 
@@ -38,6 +38,7 @@ to the image data, thus allowing the user to undo/redo any changes.
 __all__ = ['isEditable',
            'Editor',
            'Selection',
+           'BlockChange',
            'ValueChange',
            'SelectionChange']
 
@@ -47,6 +48,7 @@ import fsleyes.displaycontext as fsldisplay
 
 from .selection import  Selection
 from .editor    import (Editor,
+                        BlockChange,
                         ValueChange,
                         SelectionChange)
 
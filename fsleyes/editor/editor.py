@@ -10,6 +10,7 @@ functionality to edit the data in an :class:`.Image` overlay.
 
 
 import logging
+import zlib
 
 import collections.abc as abc
 
@@ -22,6 +23,13 @@ from . import                selection
 log = logging.getLogger(__name__)
 
 
+HISTORY_LIMIT = 256 * 1048576
+"""Default upper limit (in bytes) on the amount of memory that an
+:class:`Editor` will use to store its undo/redo history. When this limit is
+exceeded, the oldest changes are discarded.
+"""
+
+
 class Editor(actions.ActionProvider):
     """The ``Editor`` class provides functionality to edit the data of an
     :class:`.Image` overlay. An ``Editor`` instance is associated with a
@@ -84,6 +92,12 @@ class Editor(actions.ActionProvider):
     completes, call the :meth:`endChangeGroup` to stop group changes.  When
     undoing/redoing changes, all of the changes in a change group will be
     undone/redone together.
+
+
+    Each change only stores the voxels which were actually changed (see the
+    :class:`BlockChange` class), and the total size of the change history is
+    limited to ``historyLimit`` bytes - when this limit is exceeded, the
+    oldest changes are discarded, and can no longer be undone.
     """
 
 
@@ -91,7 +105,8 @@ class Editor(actions.ActionProvider):
                  image,
                  overlayList,
                  displayCtx,
-                 recordSelection=False):
+                 recordSelection=False,
+                 historyLimit=None):
         """Create an ``Editor``.
 
         :arg image:           The :class:`.Image` instance being edited.
@@ -103,8 +118,15 @@ class Editor(actions.ActionProvider):
         :arg recordSelection: Defaults to ``False``. If ``True``, changes to
                               the :class:`.selection.Selection` are recorded
                               in the change history.
+
+        :arg historyLimit:    Maximum amount of memory, in bytes, to use for
+                              storing the change history. Defaults to
+                              :data:`HISTORY_LIMIT`.
         """
 
+        if historyLimit is None:
+            historyLimit = HISTORY_LIMIT
+
         actions.ActionProvider.__init__(self, overlayList, displayCtx)
 
         self.__name      = '{}_{}'.format(self.__class__.__name__, id(self))
@@ -122,9 +144,13 @@ class Editor(actions.ActionProvider):
         # represents previous states, and
         # everything after the doneIndex
         # represents states which have been
-        # undone.
+        # undone. The historySize is the
+        # total size, in bytes, of all
+        # changes in the doneList.
         self.__doneList        = []
         self.__doneIndex       = -1
+        self.__historySize     = 0
+        self.__historyLimit    = historyLimit
         self.__inGroup         = False
         self.__recordChanges   = True
         self.__recordSelection = recordSelection
@@ -164,6 +190,13 @@ class Editor(actions.ActionProvider):
         return self.__selection
 
 
+    def getHistorySize(self):
+        """Returns the amount of memory, in bytes, currently used to store
+        the undo/redo history.
+        """
+        return self.__historySize
+
+
     def clearSelection(self, *args, **kwargs):
         """Clears the :class:`.selection.Selection` (see
         :meth:`.selection.Selection.clearSelection`). If this ``Editor`` is
@@ -247,7 +280,7 @@ class Editor(actions.ActionProvider):
         if not self.__recordChanges:
             return
 
-        del self.__doneList[self.__doneIndex + 1:]
+        self.__discardRedo()
 
         self.__inGroup    = True
         self.__doneIndex += 1
@@ -423,10 +456,13 @@ class Editor(actions.ActionProvider):
         if self.__inGroup:
             self.__doneList[self.__doneIndex].append(change)
         else:
-            del self.__doneList[self.__doneIndex + 1:]
+            self.__discardRedo()
             self.__doneList.append(change)
             self.__doneIndex += 1
 
+        self.__historySize += change.nbytes
+        self.__limitHistory()
+
         self.undo.enabled = True
         self.redo.enabled = False
 
@@ -437,35 +473,55 @@ class Editor(actions.ActionProvider):
             len(self.__doneList)))
 
 
-    def __applyChange(self, change):
-        """Called by the :meth:`fillSelection`  and :meth:`redo` methods.
+    def __discardRedo(self):
+        """Called by :meth:`startChangeGroup` and :meth:`__changeMade`.
+        Discards all changes which have been undone, as they can no longer
+        be redone.
+        """
+        for entry in self.__doneList[self.__doneIndex + 1:]:
+            self.__historySize -= self.__entrySize(entry)
+        del self.__doneList[self.__doneIndex + 1:]
 
-        Applies the given ``change`` (either a :class:`ValueChange` or a
-        :class:`SelectionChange`).
+
+    def __limitHistory(self):
+        """Called by :meth:`__changeMade`. If the change history is larger
+        than the history limit, the oldest changes are discarded. The most
+        recent change is always retained.
         """
 
-        image = change.overlay
-        opts  = self.displayCtx.getOpts(image)
+        ndropped = 0
 
-        if isinstance(change, ValueChange):
-            log.debug('%s: changing image %s data - offset '
-                      '%s, volume %s, size %s',
-                      self.__image.name,
-                      change.overlay.name,
-                      change.offset,
-                      change.volume,
-                      change.oldVals.shape)
+        while self.__historySize > self.__historyLimit and \
+              self.__doneIndex > 0:
+            entry               = self.__doneList.pop(0)
+            self.__historySize -= self.__entrySize(entry)
+            self.__doneIndex   -= 1
+            ndropped           += 1
 
-            sliceobj = self.__makeSlice(change.offset,
-                                        change.newVals.shape,
-                                        opts.index()[3:])
-            image[sliceobj] = change.newVals
+        if ndropped > 0:
+            log.debug('%s: change history exceeds %u bytes - discarded '
+                      '%u oldest change(s)',
+                      self.__image.name, self.__historyLimit, ndropped)
 
-        elif isinstance(change, SelectionChange):
-            recording = self.__recordSelection
-            if recording: self.__selection.disable(self.__name)
-            self.__selection.setSelection(change.newSelection, change.offset)
-            if recording: self.__selection.enable(self.__name)
+
+    @staticmethod
+    def __entrySize(entry):
+        """Returns the size, in bytes, of the given change history entry
+        (either a single change, or a list of changes).
+        """
+        if isinstance(entry, abc.Sequence):
+            return sum(c.nbytes for c in entry)
+        else:
+            return entry.nbytes
+
+
+    def __applyChange(self, change):
+        """Called by the :meth:`fillSelection`  and :meth:`redo` methods.
+
+        Applies the given ``change`` (either a :class:`ValueChange` or a
+        :class:`SelectionChange`).
+        """
+        self.__setBlock(change, True)
 
 
     def __revertChange(self, change):
@@ -473,29 +529,42 @@ class Editor(actions.ActionProvider):
         given ``change`` object, (either a :class:`ValueChange` or a
         :class:`SelectionChange`)
         """
+        self.__setBlock(change, False)
+
+
+    def __setBlock(self, change, new):
+        """Called by :meth:`__applyChange` and :meth:`__revertChange`. Writes
+        the new (``new=True``) or old (``new=False``) values stored in the
+        given ``change`` into the image data or selection.
+        """
 
         image = change.overlay
         opts  = self.displayCtx.getOpts(image)
 
         if isinstance(change, ValueChange):
-            log.debug('{}: reverting image {} data change - offset '
-                      '{}, volume {}, size {}'.format(
-                          self.__image.name,
-                          change.overlay.name,
-                          change.offset,
-                          change.volume,
-                          change.oldVals.shape))
-
-            sliceobj = self.__makeSlice(change.offset,
-                                        change.oldVals.shape,
-                                        opts.index()[3:])
-            image[sliceobj] = change.oldVals
+            log.debug('%s: %s image %s data - offset '
+                      '%s, volume %s, size %s',
+                      self.__image.name,
+                      'changing' if new else 'reverting',
+                      change.overlay.name,
+                      change.offset,
+                      change.volume,
+                      change.shape)
+
+            sliceobj        = self.__makeSlice(change.offset,
+                                               change.shape,
+                                               opts.index()[3:])
+            image[sliceobj] = change.getBlock(new, lambda: image[sliceobj])
 
         elif isinstance(change, SelectionChange):
+            selection = self.__selection
+            sliceobj  = self.__makeSlice(change.offset, change.shape)
+            block     = change.getBlock(
+                new, lambda: selection.getSelection()[sliceobj])
             recording = self.__recordSelection
-            if recording: self.__selection.disable(self.__name)
-            self.__selection.setSelection(change.oldSelection, change.offset)
-            if recording: self.__selection.enable(self.__name)
+            if recording: selection.disable(self.__name)
+            selection.setSelection(block, change.offset)
+            if recording: selection.enable(self.__name)
 
 
     def __makeSlice(self, offset, shape, volume=None):
@@ -520,10 +589,106 @@ class Editor(actions.ActionProvider):
         return tuple(sliceobjs)
 
 
-class ValueChange(object):
+class BlockChange(object):
+    """Base class for the :class:`ValueChange` and :class:`SelectionChange`
+    classes. A ``BlockChange`` represents a change to a rectangular block
+    of voxels, but only stores the voxels which were actually changed.
+
+    If only some voxels in the block were changed, their flat indices, and
+    their old and new values, are stored. Otherwise (e.g. when a selection is
+    inverted), compressed copies of the old and new blocks are stored.
+    """
+
+
+    def __init__(self, overlay, offset, oldBlock, newBlock):
+        """Create a ``BlockChange``.
+
+        :arg overlay:  The :class:`.Image` instance.
+        :arg offset:   Location (voxel coordinates) of the change.
+        :arg oldBlock: A ``numpy`` array containing the old values.
+        :arg newBlock: A ``numpy`` array containing the new values.
+        """
+
+        oldBlock = np.asarray(oldBlock)
+        newBlock = np.asarray(newBlock)
+
+        self.overlay = overlay
+        self.offset  = offset
+        self.shape   = tuple(oldBlock.shape)
+
+        oldFlat  = oldBlock.reshape(-1)
+        newFlat  = newBlock.reshape(-1)
+        changed  = np.flatnonzero(oldFlat != newFlat)
+
+        if oldFlat.size < 2 ** 32: changed = changed.astype(np.uint32)
+
+        sparse = changed.size * (changed.itemsize +
+                                 oldFlat.itemsize +
+                                 newFlat.itemsize)
+
+        # Store sparse indices/values
+        if sparse <= oldFlat.nbytes + newFlat.nbytes:
+            self.__indices = changed
+            self.__old     = oldFlat[changed]
+            self.__new     = newFlat[changed]
+
+        # Or compressed blocks
+        else:
+            self.__indices = None
+            self.__old     = (oldFlat.dtype,
+                              zlib.compress(oldFlat.tobytes(), 1))
+            self.__new     = (newFlat.dtype,
+                              zlib.compress(newFlat.tobytes(), 1))
+
+
+    @property
+    def nbytes(self):
+        """Returns the amount of memory, in bytes, used to store this
+        change.
+        """
+        if self.__indices is None:
+            return len(self.__old[1]) + len(self.__new[1])
+        else:
+            return (self.__indices.nbytes +
+                    self.__old    .nbytes +
+                    self.__new    .nbytes)
+
+
+    @property
+    def sparse(self):
+        """Returns ``True`` if this change is stored as sparse indices/values,
+        ``False`` if it is stored as compressed blocks.
+        """
+        return self.__indices is not None
+
+
+    def getBlock(self, new, current):
+        """Returns the new (``new=True``) or old (``new=False``) block.
+
+        :arg new:     Whether to return the new or old block.
+        :arg current: A function which returns the current block values. If
+                      this change is stored as sparse values, the current
+                      block is assumed to be identical to the requested
+                      block, apart from the changed voxels.
+        """
+
+        if new: vals = self.__new
+        else:   vals = self.__old
+
+        if self.__indices is None:
+            dtype, data = vals
+            return np.frombuffer(
+                zlib.decompress(data), dtype=dtype).reshape(self.shape)
+
+        block                      = np.array(current())
+        block.flat[self.__indices] = vals
+        return block
+
+
+class ValueChange(BlockChange):
     """Represents a change which has been made to the data for an
-    :class:`.Image` instance. Stores the location, the old values,
-    and the new values.
+    :class:`.Image` instance. Stores the location, and the old and new
+    values of the changed voxels.
     """
 
 
@@ -537,18 +702,14 @@ class ValueChange(object):
         :arg oldVals: A ``numpy`` array containing the old image values.
         :arg newVals: A ``numpy`` array containing the new image values.
         """
+        BlockChange.__init__(self, overlay, offset, oldVals, newVals)
+        self.volume = volume
 
-        self.overlay = overlay
-        self.volume  = volume
-        self.offset  = offset
-        self.oldVals = oldVals
-        self.newVals = newVals
 
-
-class SelectionChange(object):
+class SelectionChange(BlockChange):
     """Represents a change which has been made to a
-    :class:`.selection.Selection` instance. Stores the location, the old
-    selection, and the new selection.
+    :class:`.selection.Selection` instance. Stores the location, and the old
+    and new values of the changed selection voxels.
     """
 
 
@@ -560,8 +721,4 @@ class SelectionChange(object):
         :arg oldSelection: A ``numpy`` array containing the old selection.
         :arg newSelection: A ``numpy`` array containing the new selection.
         """
-
-        self.overlay      = overlay
-        self.offset       = offset
-        self.oldSelection = oldSelection
-        self.newSelection = newSelection
+        BlockChange.__init__(self, overlay, offset, oldSelection, newSelection)
@@ -1761,12 +1761,14 @@ class FSLeyesFrame(wx.Frame, actions.ActionProvider):
             action.bindToWidget(self, wx.EVT_MENU, item)
             actionItems.append((action, item))
 
-        # Views provided by FSLeyes plugins
-        pluginViews = plugins.listViews()
+        # Views provided by FSLeyes plugins. These
+        # are listed from the plugin manifest, and
+        # are only imported when selected.
+        pluginViews = plugins.listViews(load=False)
         if len(pluginViews) > 0:
             menu.AppendSeparator()
-            for name, cls in pluginViews.items():
-                func = ft.partial(self.addViewPanel, cls, title=name)
+            for name, clsName in pluginViews.items():
+                func = ft.partial(self.__addPluginViewPanel, clsName, name)
                 item = menu.Append(wx.ID_ANY, name)
                 self.Bind(wx.EVT_MENU, lambda ev, f=func : f(), item)
 
@@ -1779,6 +1781,18 @@ class FSLeyesFrame(wx.Frame, actions.ActionProvider):
         return actionItems
 
 
+    def __addPluginViewPanel(self, clsName, title):
+        """Called when the menu item for a view provided by a FSLeyes plugin
+        is selected. Loads the view class, and passes it to
+        :meth:`addViewPanel`.
+        """
+        cls = plugins.lookupView(clsName)
+        if cls is None:
+            log.warning('Could not load view %s (%s)', title, clsName)
+            return
+        self.addViewPanel(cls, title=title)
+
+
     def __makeLayoutMenu(self):
         """Called by :meth:`refreshLayoutMenu`. Re-creates the *View->Layouts*
         menu.
@@ -1918,14 +1932,14 @@ class FSLeyesFrame(wx.Frame, actions.ActionProvider):
 
         menu        = self.__toolsMenu
         actionItems = []
-        pluginTools = plugins.listTools()
 
         # Tools are either restricted for use with a
         # specific view, or independent of any view.
         # We create the latter here first, and then
-        # use __makeViewPanelTools to create the former
-        pluginTools = {n : c for n, c in pluginTools.items()
-                       if c.supportedViews() is None}
+        # use __makeViewPanelTools to create the former.
+        # View-specific tools are not imported until
+        # a compatible view is opened.
+        pluginTools = plugins.listTools(independent=True)
 
         # Fix the ordering for view-independent plugins
         # (the equivalent of what is done with
@@ -21,6 +21,7 @@ gl    = lazyimport('OpenGL.GL',                        f'{__name__}.gl')
 glfbo = lazyimport('OpenGL.GL.EXT.framebuffer_object', f'{__name__}.glfbo')
 arbia = lazyimport('OpenGL.GL.ARB.instanced_arrays',   f'{__name__}.arbia')
 arbdi = lazyimport('OpenGL.GL.ARB.draw_instanced',     f'{__name__}.arbdi')
+arbpb = lazyimport('OpenGL.GL.ARB.get_program_binary', f'{__name__}.arbpb')
 
 
 class GLSymbolResolver:
@@ -122,3 +123,10 @@ register('GL_DEPTH_ATTACHMENT',       3.0, glfbo, '_EXT')
 register('glVertexAttribDivisor',   3.3, arbia, 'ARB')
 register('glDrawElementsInstanced', 3.1, arbdi, 'ARB')
 register('glDrawArraysInstanced',   3.1, arbdi, 'ARB')
+
+register('glGetProgramBinary',                 4.1, arbpb, '')
+register('glProgramBinary',                    4.1, arbpb, '')
+register('glProgramParameteri',                4.1, arbpb, '')
+register('GL_PROGRAM_BINARY_LENGTH',           4.1, arbpb, '')
+register('GL_PROGRAM_BINARY_RETRIEVABLE_HINT', 4.1, arbpb, '')
+register('GL_NUM_PROGRAM_BINARY_FORMATS',      4.1, arbpb, '')
@@ -60,11 +60,9 @@ def updateShaderState(self):
     if not self.ready():
         return
 
-    opts = self.opts
-
     voxValXform  = self.imageTexture.voxValXform
     voxValXform  = [voxValXform[0, 0], voxValXform[0, 3], 0, 0]
-    invNumLabels = 1.0 / (opts.lut.max() + 1)
+    invNumLabels = 1.0 / self.lutTexture.numLabels
 
     with self.shader.loaded():
         self.shader.setFragParam('voxValXform',  voxValXform)
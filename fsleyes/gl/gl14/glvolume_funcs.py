@@ -230,8 +230,10 @@ def draw3D(self, canvas, xform=None):
         mvpmat = affine.concat(mvpmat, xform)
         mvmat  = affine.concat(mvmat,  xform)
 
+    _, numSteps            = self.get3DQuality()
     vertices, _, texCoords = self.generateVertices3D(bbox)
-    rayStep, texform       = opts.calculateRayCastSettings(mvmat, proj)
+    rayStep, texform       = opts.calculateRayCastSettings(
+        mvmat, proj, numSteps)
 
     rayStep = affine.transformNormal(
         rayStep, self.imageTexture.texCoordXform(shape))
@@ -241,7 +243,7 @@ def draw3D(self, canvas, xform=None):
     vertices = affine.transform(vertices, mvpmat)
     vertices = np.array(vertices, dtype=np.float32).ravel('C')
 
-    outerLoop  = opts.getNumOuterSteps()
+    outerLoop  = opts.getNumOuterSteps(numSteps)
     screenSize = [
         1.0 / w,
         1.0 / h,
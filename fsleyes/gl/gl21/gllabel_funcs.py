@@ -57,7 +57,6 @@ def updateShaderState(self):
     if not self.ready():
         return
 
-    opts   = self.opts
     shader = self.shader
 
     imageShape = np.array(self.image.shape[:3])
@@ -65,7 +64,7 @@ def updateShaderState(self):
 
     with shader.loaded():
         changed  = False
-        changed |= shader.set('numLabels',    opts.lut.max() + 1)
+        changed |= shader.set('numLabels',    self.lutTexture.numLabels)
         changed |= shader.set('imageShape',   imageShape)
         changed |= shader.set('voxValXform',  vvx)
         changed |= shader.set('imageTexture', 0)
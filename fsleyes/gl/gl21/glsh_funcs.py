@@ -55,6 +55,7 @@ def compileShaders(self):
 
     opts                     = self.opts
     self.useVolumeFragShader = opts.colourImage is not None
+    self.sphereIsCoarse      = None
 
     if self.useVolumeFragShader:
         vertShader = 'glsh_volume'
@@ -104,7 +105,6 @@ def updateShaderState(self):
         changed |= shader.set('imageShape',  shape)
         changed |= shader.set('lighting',    opts.lighting)
         changed |= shader.set('lightPos',    lightPos)
-        changed |= shader.set('nVertices',   self.vertices.shape[0])
         changed |= shader.set('sizeScaling', opts.size / 100.0)
         changed |= shader.set('radTexture',  4)
 
@@ -154,13 +154,35 @@ def updateShaderState(self):
             changed |= shader.set('clipCoordXform',   clipXform)
             changed |= shader.set('modCoordXform',    modXform)
 
-        shader.setAtt('vertex',   self.vertices)
-        shader.setAtt('vertexID', self.vertIdxs)
-        shader.setIndices(        self.indices)
+        self.sphereIsCoarse = None
+        setSphere(self, False)
 
     return changed
 
 
+def setSphere(self, coarse):
+    """Loads the vertices and indices of either the full resolution sphere,
+    or the coarse sphere (see :attr:`.GLSH.coarse`) into the shader program,
+    unless they are already loaded.
+    """
+
+    if self.sphereIsCoarse == coarse:
+        return
+
+    if coarse: vertices, indices, vertIdxs = self.coarse
+    else:      vertices, indices, vertIdxs = (self.vertices,
+                                              self.indices,
+                                              self.vertIdxs)
+
+    shader = self.shader
+    shader.set(   'nVertices', vertices.shape[0])
+    shader.setAtt('vertex',    vertices)
+    shader.setAtt('vertexID',  vertIdxs)
+    shader.setIndices(         indices)
+
+    self.sphereIsCoarse = coarse
+
+
 def preDraw(self):
     """Called by :meth:`.GLSH.preDraw`. Loads the shader program, and updates
     some shader attributes.
@@ -192,12 +214,18 @@ def draw2D(self, canvas, zpos, axes, xform=None, applyBbox=True):
     if xform is None: xform = affine.concat(mvp, v2dMat)
     else:             xform = affine.concat(mvp, xform, v2dMat)
 
-    voxels              = self.generateVoxelCoordinates2D(zpos, axes, bbox)
-    voxels, radTexShape = self.updateRadTexture(voxels)
+    voxels = self.generateVoxelCoordinates2D(zpos, axes, bbox)
+    voxels, radTexShape, coarse = self.updateRadTexture(
+        voxels, axes[2], canvas)
 
     if len(voxels) == 0:
         return
 
+    setSphere(self, coarse)
+
+    if coarse: nVertices = len(self.coarse[1])
+    else:      nVertices = self.nVertices
+
     voxIdxs = np.arange(voxels.shape[0], dtype=np.float32)
 
     shader.setAtt('voxel',           voxels,  divisor=1)
@@ -205,11 +233,11 @@ def draw2D(self, canvas, zpos, axes, xform=None, applyBbox=True):
     shader.set(   'voxToDisplayMat', xform)
     shader.set(   'normalMatrix',    normalMatrix)
     shader.set(   'radTexShape',     radTexShape)
-    shader.set(   'radXform',        self.radTexture.voxValXform)\
+    shader.set(   'radXform',        self.radTexture.voxValXform)
 
     with shader.loadedAtts():
         glexts.glDrawElementsInstanced(gl.GL_TRIANGLES,
-                                       self.nVertices,
+                                       nVertices,
                                        gl.GL_UNSIGNED_INT,
                                        None,
                                        len(voxels))
@@ -55,8 +55,12 @@ def compileShaders(self):
         self.shaders[dim][colourMode][clipMode]['geom'] = shader
 
 
-def draw2D(self, canvas, mvp):
-    """Called by :class:`.GLTractogram.draw2D`. """
+def draw2D(self, canvas, mvp, indices=None):
+    """Called by :class:`.GLTractogram.draw2D`. Vertices are drawn with
+    instanced rendering, which does not support drawing a subset of
+    instances in GL 2.1, so the ``indices`` are ignored, and all vertices
+    are drawn (vertices outside of the slice are clipped by GL).
+    """
 
     opts       = self.opts
     colourMode = opts.effectiveColourMode
@@ -91,9 +95,12 @@ def draw3D(self,
            mvp,
            lighting,
            lightPos,
-           xform=None):
+           xform=None,
+           indices=None):
     """Called by :class:`.GLTractogram.draw3D`.
-    The lighting arguments are ignored.
+    The lighting arguments are ignored. If ``indices`` are provided, they
+    are drawn as ``GL_LINES`` (see :meth:`.GLTractogram.lodIndices`).
+    Otherwise all streamlines are drawn as ``GL_LINE_STRIP``.
     """
     opts       = self.opts
     display    = self.display
@@ -108,7 +115,14 @@ def draw3D(self,
     if xform is not None:
         mvp = affine.concat(mvp, xform)
 
+    def draw():
+        if indices is None:
+            gl.glMultiDrawArrays(gl.GL_LINE_STRIP, offsets, counts, nstrms)
+        else:
+            shader.draw(gl.GL_LINES)
+
     with shader.loaded(), shader.loadedAtts():
+        self.setShaderIndices(shader, indices)
         shader.set('MVP', mvp)
         # we don't implement proper line width in
         # gl21 - we would need to use instanced
@@ -116,6 +130,6 @@ def draw3D(self,
         # rectangle (see gl33.gltractogram_funcs.draw3D)
         gl.glLineWidth(lineWidth)
         if display.alpha < 100 or opts.modulateAlpha:
-            gl.glMultiDrawArrays(gl.GL_LINE_STRIP, offsets, counts, nstrms)
+            draw()
         with glroutines.enabled(gl.GL_DEPTH_TEST):
-            gl.glMultiDrawArrays(gl.GL_LINE_STRIP, offsets, counts, nstrms)
+            draw()
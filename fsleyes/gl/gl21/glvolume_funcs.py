@@ -151,6 +151,11 @@ def updateShaderState(self):
     changed |= shader.set('clipTexture',      3)
     changed |= shader.set('modulateTexture',  4)
 
+    # Brick bounds are set in draw2D for
+    # images in a BrickedImageTexture
+    if not self.threedee:
+        changed |= shader.set('useBricks',    self.bricked)
+
     if self.threedee:
         clipPlanes  = np.zeros((opts.numClipPlanes, 4), dtype=np.float32)
         d2tmat      = opts.getTransform('display', 'texture')
@@ -176,6 +181,34 @@ def updateShaderState(self):
         changed |= shader.set('stepLength',       1.0 / opts.getNumSteps())
         changed |= shader.set('alpha',            display.alpha / 100.0)
 
+        # Empty space skipping is only possible
+        # when the brick ranges are up to date,
+        # when the interpolated values are
+        # bounded by the voxel values (i.e. not
+        # with spline interpolation), and when
+        # the clipping range applies to this
+        # image (the brick ranges are calculated
+        # from this image, not the clip image).
+        bricks    = self.brickTexture
+        useBricks = (bricks.ready()                 and
+                     opts.clipImage is None         and
+                     not useSpline                  and
+                     self.imageTexture.ndim  == 3   and
+                     self.imageTexture.nvals == 1)
+
+        if useBricks:
+            brickXform = [bricks.voxValXform[0, 0], bricks.voxValXform[0, 3]]
+            brickShape = bricks.shape[:3]
+        else:
+            brickXform = [1, 0]
+            brickShape = [1, 1, 1]
+
+        changed |= shader.set('useBricks',        useBricks)
+        changed |= shader.set('brickTexture',     5)
+        changed |= shader.set('brickXform',       brickXform)
+        changed |= shader.set('brickShape',       brickShape)
+        changed |= shader.set('brickSize',        bricks.brickSize)
+
     shader.unload()
 
     return changed
@@ -216,6 +249,19 @@ def draw2D(self, canvas, zpos, axes, xform=None):
     vertices, voxCoords, texCoords = self.generateVertices2D(
         zpos, axes, bbox=bbox)
 
+    # This function is shared with other GLObject
+    # types, but only GLVolumes use bricked image
+    # textures. Each brick is drawn separately -
+    # fragments outside of the current brick are
+    # discarded.
+    if isinstance(self, glvolume.GLVolume): brick = self.currentBrick
+    else:                                   brick = None
+
+    if brick is not None:
+        shader.set('brickLow',  brick.drawLow)
+        shader.set('brickHigh', brick.drawHigh)
+        shader.set('texShape',  brick.texture.shape)
+
     # We apply the MVP matrix here rather than in
     # the shader, as we're only drawing 6 vertices.
     if xform is not None:
@@ -261,8 +307,10 @@ def draw3D(self, canvas, xform=None):
         mvmat  = affine.concat(mvmat,  xform)
         mvpmat = affine.concat(mvpmat, xform)
 
+    _, numSteps            = self.get3DQuality()
     vertices, _, texCoords = self.generateVertices3D(bbox)
-    rayStep , texform      = opts.calculateRayCastSettings(mvmat, projmat)
+    rayStep , texform      = opts.calculateRayCastSettings(
+        mvmat, projmat, numSteps)
 
     rayStep = affine.transformNormal(
         rayStep, self.imageTexture.texCoordXform(ovl.shape))
@@ -88,8 +88,11 @@ def compileShaders(self):
         self.shaders[dim][colourMode][clipMode][geom] = prog
 
 
-def draw2D(self, canvas, mvp):
-    """Called by :class:`.GLTractogram.draw2D`. """
+def draw2D(self, canvas, mvp, indices=None):
+    """Called by :class:`.GLTractogram.draw2D`. If ``indices`` are provided,
+    only those vertices are drawn, via an index buffer (see
+    :meth:`.GLTractogram.slabVertices`). Otherwise all vertices are drawn.
+    """
     opts       = self.opts
     colourMode = opts.effectiveColourMode
     clipMode   = opts.effectiveClipMode
@@ -98,10 +101,14 @@ def draw2D(self, canvas, mvp):
 
     gl.glPolygonMode(gl.GL_FRONT_AND_BACK, gl.GL_FILL)
 
+    if indices is not None and len(indices) == 0:
+        return
+
     with shader.loaded(), shader.loadedAtts():
         shader.set('MVP',    mvp)
         shader.set('xscale', scales[0])
         shader.set('yscale', scales[1])
+        self.setShaderIndices(shader, indices)
         shader.draw(gl.GL_POINTS, 0, len(self.vertices))
 
 
@@ -136,8 +143,12 @@ def draw3D(self,
            lighting,
            lightPos,
            threedee=True,
-           xform=None):
-    """Called by :class:`.GLTractogram.draw3D`. """
+           xform=None,
+           indices=None):
+    """Called by :class:`.GLTractogram.draw3D`. If ``indices`` are provided,
+    they are drawn as ``GL_LINES`` (see :meth:`.GLTractogram.lodIndices`).
+    Otherwise all streamlines are drawn as ``GL_LINE_STRIP``.
+    """
 
     opts      = self.opts
     ovl       = self.overlay
@@ -158,7 +169,14 @@ def draw3D(self,
     if xform is not None:
         mvp = affine.concat(mvp, xform)
 
+    def draw():
+        if indices is None:
+            gl.glMultiDrawArrays(gl.GL_LINE_STRIP, offsets, counts, nstrms)
+        else:
+            shader.draw(gl.GL_LINES)
+
     with shader.loaded(), shader.loadedAtts():
+        self.setShaderIndices(shader, indices)
         shader.set('MVP',        mvp)
         shader.set('lineWidth',  lineWidth)
         # Line geometry shader needs to know
@@ -192,6 +210,6 @@ def draw3D(self,
             # ok from any angle, we draw the tractogram twice - first
             # without, and then with depth testing.
             if display.alpha < 100 or opts.modulateAlpha:
-                gl.glMultiDrawArrays(gl.GL_LINE_STRIP, offsets, counts, nstrms)
+                draw()
             with glroutines.enabled(gl.GL_DEPTH_TEST):
-                gl.glMultiDrawArrays(gl.GL_LINE_STRIP, offsets, counts, nstrms)
+                draw()
@@ -41,6 +41,14 @@ class GLLabel(glimageobject.GLImageObject, globject.GLObject):
     modules (:mod:`.gl14.gllabel_funcs` and :mod:`.gl21.gllabel_funcs`) are
     used to configure the vertex/fragment shader programs used for rendering.
 
+    If the maximum label value in the :class:`.LookupTable` is larger than
+    the maximum OpenGL texture size, a *dense* ``LookupTableTexture`` is
+    used, and the image data is converted into lookup table indices (via
+    :meth:`.LookupTable.remap`) before being copied to the GPU. In this case
+    the ``ImageTexture`` is specific to the ``LookupTable``, and is
+    refreshed whenever labels are added to or removed from the
+    ``LookupTable``.
+
     The ``GLLabel`` class is modelled upon the :class:`.GLVolume` class, and
     the version specific modules for the ``GLLabel`` class must provide the
     same set of functions that are required by the ``GLVolume`` class.
@@ -75,7 +83,8 @@ class GLLabel(glimageobject.GLImageObject, globject.GLObject):
         self.renderTexture = textures.RenderTexture(
             self.name, interp=gl.GL_LINEAR, rttype='c')
 
-        self.__lut = self.opts.lut
+        self.__lut   = self.opts.lut
+        self.__dense = False
 
         self.addListeners()
         self.registerLut()
@@ -201,6 +210,11 @@ class GLLabel(glimageobject.GLImageObject, globject.GLObject):
         if unsynced:
             texName = '{}_unsync_{}'.format(texName, id(opts))
 
+        # Remapped image data is
+        # specific to the lookup table
+        if self.__dense:
+            texName = '{}_dense_{}'.format(texName, id(opts.lut))
+
         if self.imageTexture is not None:
 
             if self.imageTexture.name == texName:
@@ -209,13 +223,20 @@ class GLLabel(glimageobject.GLImageObject, globject.GLObject):
             self.imageTexture.deregister(self.name)
             glresources.delete(self.imageTexture.name)
 
+        if self.__dense:
+            prefilter, prefilterRange = self.__remapFuncs()
+        else:
+            prefilter, prefilterRange = None, None
+
         self.imageTexture = glresources.get(
             texName,
             textures.ImageTexture,
             texName,
             self.image,
             notify=False,
-            volume=opts.index()[3:])
+            volume=opts.index()[3:],
+            prefilter=prefilter,
+            prefilterRange=prefilterRange)
 
         self.imageTexture.register(self.name, self.__imageTextureChanged)
 
@@ -227,11 +248,18 @@ class GLLabel(glimageobject.GLImageObject, globject.GLObject):
 
         display = self.display
         opts    = self.opts
+        dense   = self.__useDenseLut()
 
         self.lutTexture.set(alpha=display.alpha           / 100.0,
                             brightness=display.brightness / 100.0,
                             contrast=display.contrast     / 100.0,
-                            lut=opts.lut)
+                            lut=opts.lut,
+                            dense=dense)
+
+        if dense != self.__dense:
+            self.__dense = dense
+            if self.imageTexture is not None:
+                self.refreshImageTexture()
 
 
     def registerLut(self):
@@ -246,8 +274,34 @@ class GLLabel(glimageobject.GLImageObject, globject.GLObject):
         self.__lut = opts.lut
 
         if self.__lut is not None:
-            for topic in ['label', 'added', 'removed']:
-                self.__lut.register(self.name, self.__colourPropChanged, topic)
+            self.__lut.register(self.name, self.__colourPropChanged, 'label')
+            self.__lut.register(self.name, self.__lutLabelsChanged, 'added')
+            self.__lut.register(self.name, self.__lutLabelsChanged, 'removed')
+
+
+    def __useDenseLut(self):
+        """Returns ``True`` if the current :class:`.LookupTable` contains
+        label values which are too large to be stored in a regular
+        :class:`.LookupTableTexture`, ``False`` otherwise.
+        """
+        maxsize = gl.glGetInteger(gl.GL_MAX_TEXTURE_SIZE)
+        return self.opts.lut.max() + 1 > maxsize
+
+
+    def __remapFuncs(self):
+        """Returns ``prefilter`` and ``prefilterRange`` functions which are
+        passed to the :class:`.ImageTexture` in dense mode, to convert label
+        values into indices into the current :class:`.LookupTable`.
+        """
+        lut = self.opts.lut
+
+        def prefilter(data):
+            return lut.remap(data)
+
+        def prefilterRange(dmin, dmax):
+            return 0, len(lut)
+
+        return prefilter, prefilterRange
 
 
     def preDraw(self):
@@ -362,6 +416,7 @@ class GLLabel(glimageobject.GLImageObject, globject.GLObject):
 
         self.registerLut()
         self.refreshLutTexture()
+        self.refreshImageTexture()
         self.updateShaderState(alwaysNotify=True)
 
 
@@ -373,6 +428,24 @@ class GLLabel(glimageobject.GLImageObject, globject.GLObject):
         self.updateShaderState(alwaysNotify=True)
 
 
+    def __lutLabelsChanged(self, *a):
+        """Called when labels are added to or removed from the current
+        :class:`.LookupTable`. Refreshes the LUT texture and, in dense mode,
+        the image texture, as label indices will have changed.
+        """
+        dense = self.__dense
+        self.refreshLutTexture()
+
+        # If dense mode was toggled, the image
+        # texture has already been re-created
+        if dense and self.__dense:
+            prefilter, prefilterRange = self.__remapFuncs()
+            self.imageTexture.set(prefilter=prefilter,
+                                  prefilterRange=prefilterRange)
+
+        self.updateShaderState(alwaysNotify=True)
+
+
     def __imagePropChanged(self, *a):
         """Called when the :attr:`.NiftiOpts.volume` property changes. Updates
         the ``imageTexture`` and calls :meth:`updateShaderState`.
@@ -8,6 +8,7 @@
 rendering :class:`.Image` overlays which contain spherical harmonic (SH)
 coefficients which represent fibre orientation distributions (FODs).  The
 ``GLSH`` class uses functions defined in the :mod:`.gl21.glsh_funcs` module.
+FOD radii are cached by the :class:`RadiusCache` class.
 
 :class:`GLSH` instances can only be rendered in OpenGL 2.1 and above.
 """
@@ -15,11 +16,14 @@ coefficients which represent fibre orientation distributions (FODs).  The
 
 import               logging
 import               warnings
+import               threading
+import collections
 
 import numpy      as np
 
 import OpenGL.GL  as gl
 
+import fsl.utils.idle      as idle
 
 import fsleyes.gl          as fslgl
 import fsleyes.gl.textures as textures
@@ -29,6 +33,241 @@ import fsleyes.gl.glvector as glvector
 log = logging.getLogger(__name__)
 
 
+RADIUS_CACHE_SIZE = 256 * 1048576
+"""Maximum number of bytes of radius data which is cached by each
+:class:`GLSH` instance.
+"""
+
+
+RADIUS_BLOCK_SIZE = 4096
+"""Number of voxels for which radii are calculated at once, when the radii
+for an entire slice are calculated. This limits the amount of memory used
+for intermediate results.
+"""
+
+
+COARSE_RESOLUTION = 3
+"""Sphere resolution (see :attr:`.SHOpts.shResolution`) used to draw FODs
+while the radii at the full resolution are being calculated.
+"""
+
+
+def calculateRadii(coefs, params, threshold, normalise):
+    """Calculates FOD radii from SH coefficients.
+
+    :arg coefs:     ``(N, C)`` array of SH coefficients for ``N`` voxels.
+    :arg params:    ``(V, C)`` array of SH parameters, as returned by
+                    :meth:`.SHOpts.getSHParameters`.
+    :arg threshold: Radius threshold (see :attr:`.SHOpts.radiusThreshold`)
+    :arg normalise: Whether to normalise radii within each voxel (see
+                    :attr:`.SHOpts.normalise`).
+
+    :returns:       A tuple containing:
+
+                     - A ``(M, V)`` ``float32`` array containing the radii
+                       for each vertex of each voxel which passed the
+                       threshold.
+                     - A boolean array of length ``N`` indicating which
+                       voxels passed the threshold.
+    """
+
+    # The dot product of the SH parameters with
+    # the SH coefficients for a single voxel gives
+    # us the radii for every vertex on the FOD
+    # sphere. We can calculate the radii for every
+    # voxel quickly with a matrix multiplication of
+    # the SH parameters with the SH coefficients of
+    # *all* voxels.
+    radii = np.dot(coefs, params.T).astype(np.float32)
+
+    # Remove sub-threshold voxels/radii
+    if threshold > 0:
+        keep  = np.any(radii >= threshold, axis=1)
+        radii = radii[keep, :]
+    else:
+        keep  = np.ones(radii.shape[0], dtype=bool)
+
+    # Normalise within voxel if necessary
+    if normalise and radii.shape[0] > 0:
+        rmin = radii.min(axis=1)
+        rmax = radii.max(axis=1)
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore')
+            radii = ((radii.T - rmin) / (2 * (rmax - rmin))).T
+
+    return radii, keep
+
+
+class RadiusCache:
+    """The ``RadiusCache`` is used by the :class:`GLSH` class to cache FOD
+    radii for image slices. It is a least-recently-used cache, limited to
+    :data:`RADIUS_CACHE_SIZE` bytes.
+
+    Each cache entry is identified by a key, and is calculated by a
+    ``calculate`` function, which is passed the key, and must return a tuple
+    of ``numpy`` arrays. Entries may be calculated synchronously via the
+    :meth:`calculate` method, or queued for calculation on a worker thread
+    via the :meth:`queue` method.
+
+    Every call to :meth:`clear` starts a new *generation* - entries which were
+    being calculated before the cache was cleared are discarded when they
+    finish, rather than being added to the cache.
+
+    A ``RadiusCache`` is accessed by the main thread and by its worker thread,
+    so all accesses are protected by a lock.
+    """
+
+
+    def __init__(self, calculate, onCalculated=None):
+        """Create a ``RadiusCache``.
+
+        :arg calculate:    Function which calculates the entry for a key.
+        :arg onCalculated: Function which is called on the worker thread
+                           (and passed the key) each time an entry that was
+                           passed to :meth:`queue` has been calculated.
+        """
+        self.__calculate    = calculate
+        self.__onCalculated = onCalculated
+        self.__cache        = collections.OrderedDict()
+        self.__pending      = collections.OrderedDict()
+        self.__lock         = threading.Lock()
+        self.__size         = 0
+        self.__working      = False
+        self.__generation   = 0
+
+
+    def __len__(self):
+        """Returns the number of entries in the cache. """
+        return len(self.__cache)
+
+
+    def __contains__(self, key):
+        """Returns ``True`` if an entry for ``key`` is in the cache. """
+        return key in self.__cache
+
+
+    @property
+    def size(self):
+        """Returns the total number of bytes stored in the cache. """
+        return self.__size
+
+
+    @property
+    def generation(self):
+        """Returns the current cache generation, which is incremented every
+        time the cache is cleared.
+        """
+        return self.__generation
+
+
+    @property
+    def pending(self):
+        """Returns a list of keys which are queued for calculation. """
+        with self.__lock:
+            return list(self.__pending.keys())
+
+
+    def clear(self):
+        """Clears the cache, and cancels any queued calculations. """
+        with self.__lock:
+            self.__cache.clear()
+            self.__pending.clear()
+            self.__size        = 0
+            self.__generation += 1
+
+
+    def get(self, keys):
+        """Retrieves entries from the cache, marking them as most recently
+        used.
+
+        :arg keys: Sequence of keys
+        :returns:  A tuple containing a dict of ``{key : entry}`` mappings
+                   for every key which is in the cache, and a list of keys
+                   which are not in the cache.
+        """
+        entries = {}
+        missing = []
+        with self.__lock:
+            for key in keys:
+                entry = self.__cache.get(key, None)
+                if entry is None:
+                    missing.append(key)
+                else:
+                    self.__cache.move_to_end(key)
+                    entries[key] = entry
+        return entries, missing
+
+
+    def put(self, key, entry, generation=None):
+        """Adds an entry to the cache, evicting the least recently used
+        entries if the cache is full. The entry is discarded if the cache
+        has been cleared since ``generation``.
+        """
+
+        nbytes = sum(a.nbytes for a in entry)
+
+        with self.__lock:
+            if generation is not None and generation != self.__generation:
+                return
+            if key in self.__cache:
+                return
+            self.__cache[key] = entry
+            self.__size      += nbytes
+            while self.__size > RADIUS_CACHE_SIZE and len(self.__cache) > 1:
+                _, old       = self.__cache.popitem(last=False)
+                self.__size -= sum(a.nbytes for a in old)
+
+
+    def calculate(self, key):
+        """Calculates the entry for ``key`` on the calling thread, adds it
+        to the cache, and returns it.
+        """
+        generation = self.__generation
+        entry      = self.__calculate(key)
+        self.put(key, entry, generation)
+        return entry
+
+
+    def queue(self, keys):
+        """Queues the given keys for calculation on a worker thread. The most
+        recently requested keys are calculated first. A worker thread is
+        started if one is not already running.
+        """
+
+        with self.__lock:
+            for key in keys:
+                self.__pending[key] = None
+                self.__pending.move_to_end(key, last=False)
+            if self.__working:
+                return
+            self.__working = True
+
+        # The worker keeps running until the queue is
+        # empty. The cache generation is checked for
+        # every key, so that keys which are queued
+        # after the cache has been cleared are still
+        # calculated by the existing worker.
+        def calculate():
+            while True:
+                with self.__lock:
+                    if len(self.__pending) == 0:
+                        self.__working = False
+                        return
+                    key, _     = self.__pending.popitem(last=False)
+                    generation = self.__generation
+                self.put(key, self.__calculate(key), generation)
+                if self.__onCalculated is not None:
+                    self.__onCalculated(key)
+
+        def error(e):
+            log.warning('Error calculating FOD radii: %s', e, exc_info=True)
+            with self.__lock:
+                self.__working = False
+                self.__pending.clear()
+
+        idle.run(calculate, onError=error)
+
+
 class GLSH(glvector.GLVectorBase):
     """The ``GLSH`` class is a :class:`.GLVectorBase` for rendering
     :class:`.Image` overlays which contain spherical harmonic (SH) coefficients
@@ -50,7 +289,7 @@ class GLSH(glvector.GLVectorBase):
     :meth:`.SHOpts.getIndices` methods.
 
 
-    These radii are calculated on every call to :meth:`draw` (via the
+    These radii are retrieved on every call to :meth:`draw` (via the
     :meth:`updateRadTexture` method), and stored in a :class:`.Texture3D`
     instance, which is available as an attribute called ``radTexture``. This
     texture is only 3D out of necessity - it is ultimately interpreted by
@@ -58,6 +297,15 @@ class GLSH(glvector.GLVectorBase):
     then vertex.
 
 
+    Radii are calculated for an entire image slice at a time, and are cached
+    (up to :data:`RADIUS_CACHE_SIZE` bytes), so that they do not need to be
+    re-calculated when the view is panned or zoomed. The cache is cleared
+    whenever the image data changes. When drawing to an on-screen canvas,
+    slices which are not in the cache are calculated on a separate thread -
+    until they are available, the FODs are drawn with a coarser sphere (see
+    :data:`COARSE_RESOLUTION`).
+
+
     The radius texture managed by a ``GLSH`` instance is bound to GL
     texture unit ``GL_TEXTURE4``.
 
@@ -83,6 +331,10 @@ class GLSH(glvector.GLVectorBase):
 
     ``vertIdxs``   Indices for each vertex (equal to
                    ``np.arange(vertices.shape[0])``).
+
+    ``coarse``     Tuple containing ``(vertices, indices, vertIdxs)``
+                   for the coarse sphere which is drawn while radii are
+                   being calculated.
     ============== =====================================================
     """
 
@@ -107,7 +359,13 @@ class GLSH(glvector.GLVectorBase):
 
         # These are updated in the
         # __shStateChanged method.
-        self.__shParams = None
+        self.__shParams     = None
+        self.__coarseParams = None
+
+        # Radii are cached by slice - see
+        # the updateRadTexture method.
+        self.__radCache = RadiusCache(self.__calculateSlice,
+                                      self.__sliceCalculated)
 
         # This texture gets updated on
         # draw calls, so we want it to
@@ -136,6 +394,7 @@ class GLSH(glvector.GLVectorBase):
         """
 
         self.removeListeners()
+        self.clearRadiusCache()
 
         fslgl.glsh_funcs.destroy(self)
 
@@ -192,6 +451,8 @@ class GLSH(glvector.GLVectorBase):
         opts.addListener('radiusThreshold', name, self.notify)
         opts.addListener('normalise',       name, self.notify)
 
+        self.image.register(name, self.__dataChanged, topic='data')
+
 
     def removeListeners(self):
         """Overrides :meth:`.GLVectorBase.removeListeners`. Called by
@@ -212,6 +473,8 @@ class GLSH(glvector.GLVectorBase):
         opts.removeListener('radiusThreshold', name)
         opts.removeListener('normalise',       name)
 
+        self.image.deregister(name, topic='data')
+
 
     def compileShaders(self, *a):
         """Overrides :meth:`.GLVectorBase.compileShaders`. Calls
@@ -238,17 +501,39 @@ class GLSH(glvector.GLVectorBase):
         attribute called ``__shParams``.
         """
 
-        opts = self.opts
+        opts   = self.opts
+        coarse = min(COARSE_RESOLUTION, opts.shResolution)
+
+        self.__shParams     = opts.getSHParameters()
+        self.__coarseParams = opts.getSHParameters(coarse)
+        self.vertices       = opts.getVertices()
+        self.indices        = opts.getIndices()
+        self.nVertices      = len(self.indices)
+        self.vertIdxs       = np.arange(self.vertices.shape[0],
+                                        dtype=np.float32)
 
-        self.__shParams = opts.getSHParameters()
-        self.vertices   = opts.getVertices()
-        self.indices    = opts.getIndices()
-        self.nVertices  = len(self.indices)
-        self.vertIdxs   = np.arange(self.vertices.shape[0], dtype=np.float32)
+        cverts      = opts.getVertices(coarse)
+        self.coarse = (cverts,
+                       opts.getIndices(coarse),
+                       np.arange(cverts.shape[0], dtype=np.float32))
 
+        self.clearRadiusCache()
         self.updateShaderState(alwaysNotify=True)
 
 
+    def __dataChanged(self, *a):
+        """Called when the image data changes. Clears the radius cache. """
+        self.clearRadiusCache()
+        self.notify()
+
+
+    def clearRadiusCache(self):
+        """Clears the radius cache, and cancels any pending slice
+        calculations.
+        """
+        self.__radCache.clear()
+
+
     def __coefVolumeMask(self):
         """Figures out which volumes from the image need to be included in the
         SH radius calculation. If an image has been generated with a particular
@@ -333,7 +618,7 @@ class GLSH(glvector.GLVectorBase):
         return slice(nvols)
 
 
-    def updateRadTexture(self, voxels):
+    def updateRadTexture(self, voxels, zax=2, canvas=None):
         """Called by :func:`.glsh_funcs.draw`. Updates the radius texture to
         contain radii for the given set of voxels (assumed to be an ``(N, 3)``
         numpy array).
@@ -346,6 +631,13 @@ class GLSH(glvector.GLVectorBase):
         are normalised to lie between 0 and 0.5, so that they fit within the
         voxel.
 
+        Radii are calculated for whole slices along the voxel axis which
+        corresponds to the display ``zax``, and are cached. If ``canvas`` is
+        an on-screen canvas, slices which are not in the cache are calculated
+        on a separate thread, and radii for the coarse sphere (see
+        :data:`COARSE_RESOLUTION`) are calculated for the given voxels in
+        the meantime.
+
         This function returns a tuple containing:
 
           - The ``voxels`` array. If ``SHOpts.radiusThreshold == 0``,
@@ -355,6 +647,9 @@ class GLSH(glvector.GLVectorBase):
             the radius threshold), this will be an empty list.
 
           - The adjusted shape of the radius texture.
+
+          - ``True`` if radii for the coarse sphere were calculated,
+            ``False`` otherwise.
         """
 
         opts = self.opts
@@ -369,37 +664,161 @@ class GLSH(glvector.GLVectorBase):
                   (y >= shape[1]) | \
                   (z >= shape[2])
         voxels  = np.asarray(voxels[~out, :], dtype=np.uint32)
-        x, y, z = voxels.T
 
-        # The dot product of the SH parameters with
-        # the SH coefficients for a single voxel gives
-        # us the radii for every vertex on the FOD
-        # sphere. We can calculate the radii for every
-        # voxel quickly with a matrix multiplication of
-        # the SH parameters with the SH coefficients of
-        # *all* voxels.
-        params = self.__shParams
-        vols   = self.__coefVolumeMask()
-        coefs  = self.image.data[x, y, z, vols]
-        radii  = np.dot(coefs, params.T)
-
-        # Remove sub-threshold voxels/radii
-        if opts.radiusThreshold > 0:
-            aboveThres = np.any(radii >= opts.radiusThreshold, axis=1)
-            radii      = radii[ aboveThres, :]
-            voxels     = voxels[aboveThres, :]
+        # Figure out which voxel axis
+        # corresponds to the display
+        # depth axis, and which slices
+        # along that axis we need.
+        d2vMat   = opts.getTransform('display', 'voxel')
+        vaxis    = int(np.argmax(np.abs(d2vMat[:3, zax])))
+        state    = self.__radiusState()
+        slices   = np.unique(voxels[:, vaxis])
+        threaded = isinstance(canvas, fslgl.WXGLCanvasTarget)
+        keys     = [(state, vaxis, int(s)) for s in slices]
+
+        entries, missing = self.__radCache.get(keys)
+
+        if len(missing) > 0 and threaded:
+            self.__radCache.queue(missing)
+            voxels, radii = self.__coarseRadii(voxels)
+            coarse        = True
+        else:
+            for key in missing:
+                entries[key] = self.__radCache.calculate(key)
+            entries       = {k[2] : e for k, e in entries.items()}
+            voxels, radii = self.__gatherRadii(voxels, vaxis, entries)
+            coarse        = False
 
         # No voxels - nothing to do
         if voxels.shape[0] == 0:
-            return [], [0, 0, 0]
+            return [], [0, 0, 0], coarse
+
+        return voxels, self.__setRadTexture(radii), coarse
+
+
+    def __radiusState(self):
+        """Returns a tuple containing the display settings which affect
+        the values of the calculated radii.
+        """
+        opts = self.opts
+        return (opts.shOrder,
+                opts.shResolution,
+                opts.radiusThreshold,
+                opts.normalise)
+
+
+    def __coarseRadii(self, voxels):
+        """Used by :meth:`updateRadTexture`. Calculates radii for the given
+        voxels, using the coarse sphere.
+        """
+        opts     = self.opts
+        x, y, z  = voxels.T
+        coefs    = self.image.data[x, y, z, self.__coefVolumeMask()]
+        radii, keep = calculateRadii(coefs,
+                                     self.__coarseParams,
+                                     opts.radiusThreshold,
+                                     opts.normalise)
+        return voxels[keep, :], radii
+
+
+    def __gatherRadii(self, voxels, vaxis, entries):
+        """Used by :meth:`updateRadTexture`. Retrieves radii for the given
+        voxels from the given cache entries.
+
+        :arg voxels:  ``(N, 3)`` array of voxel coordinates
+        :arg vaxis:   Voxel axis along which slices are cached.
+        :arg entries: Dictionary of ``{slice : entry}`` mappings, containing
+                      cached radii (see :meth:`__calculateSlice`) for each
+                      slice.
+        :returns:     A tuple containing the voxels that passed the radius
+                      threshold, and their radii.
+        """
+
+        shape     = self.image.shape[:3]
+        ax0, ax1  = [ax for ax in range(3) if ax != vaxis]
+        nverts    = self.vertices.shape[0]
+        allVoxels = []
+        allRadii  = []
+
+        for sliceidx, (rowIdxs, radii) in entries.items():
+            svox = voxels[voxels[:, vaxis] == sliceidx]
+            rows = rowIdxs[svox[:, ax0] * shape[ax1] + svox[:, ax1]]
+            keep = rows >= 0
+            allVoxels.append(svox[keep])
+            allRadii .append(radii[rows[keep]])
+
+        if len(allVoxels) == 0:
+            return (np.zeros((0, 3),      dtype=np.uint32),
+                    np.zeros((0, nverts), dtype=np.float32))
+
+        return np.concatenate(allVoxels), np.concatenate(allRadii)
+
 
-        # Normalise within voxel if necessary
-        if opts.normalise:
-            rmin = radii.min(axis=1)
-            rmax = radii.max(axis=1)
-            with warnings.catch_warnings():
-                warnings.filterwarnings('ignore')
-                radii = ((radii.T - rmin) / (2 * (rmax - rmin))).T
+    def __calculateSlice(self, key):
+        """Calculates radii for an entire slice of the image.
+
+        :arg key: Tuple containing the radius state (see
+                  :meth:`__radiusState`), voxel axis, and slice index.
+
+        :returns: A tuple containing:
+
+                    - A 1D ``int32`` array containing an index into the
+                      radius array for every voxel in the slice, or ``-1``
+                      for voxels which did not pass the radius threshold.
+                    - A ``(N, V)`` array containing the radii for every
+                      voxel which passed the threshold.
+        """
+
+        (_, _, threshold, normalise), vaxis, sliceidx = key
+
+        params     = self.__shParams
+        slc        = [slice(None)] * 4
+        slc[vaxis] = sliceidx
+        slc[3]     = self.__coefVolumeMask()
+        coefs      = self.image.data[tuple(slc)]
+        coefs      = coefs.reshape(-1, coefs.shape[-1])
+        rowIdxs    = np.full(coefs.shape[0], -1, dtype=np.int32)
+        blocks     = []
+        nrows      = 0
+
+        for start in range(0, coefs.shape[0], RADIUS_BLOCK_SIZE):
+            end         = start + RADIUS_BLOCK_SIZE
+            radii, keep = calculateRadii(coefs[start:end],
+                                         params,
+                                         threshold,
+                                         normalise)
+            idxs = np.flatnonzero(keep)
+            rowIdxs[start + idxs] = np.arange(nrows, nrows + len(idxs))
+            nrows += len(idxs)
+            blocks.append(radii)
+
+        if len(blocks) == 0:
+            radii = np.zeros((0, params.shape[0]), dtype=np.float32)
+        else:
+            radii = np.concatenate(blocks)
+
+        return rowIdxs, radii
+
+
+    def __sliceCalculated(self, key):
+        """Called by the :class:`RadiusCache` on its worker thread when
+        radii for a slice have been calculated. Triggers a refresh on the
+        main thread.
+        """
+
+        def notify():
+            if not self.destroyed:
+                self.notify()
+
+        idle.idle(notify,
+                  name='{}_{}_radii'.format(self.name, id(self)),
+                  skipIfQueued=True)
+
+
+    def __setRadTexture(self, radii):
+        """Used by :meth:`updateRadTexture`. Copies the given ``(N, V)``
+        radius array into the radius texture, and returns its shape.
+        """
 
         # The radii are interpreted as a 1D vector
         # containing the radii for every vertex
@@ -471,7 +890,7 @@ class GLSH(glvector.GLVectorBase):
         # Copy the data to the texture
         self.radTexture.set(data=radii)
 
-        return voxels, radTexShape
+        return radTexShape
 
 
     def texturesReady(self):
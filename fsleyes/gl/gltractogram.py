@@ -9,12 +9,15 @@
 """
 
 
-import itertools as it
+import itertools   as it
+import                time
+import                collections
 
 import numpy     as np
 import OpenGL.GL as gl
 
 import fsl.utils.idle       as idle
+import fsl.utils.settings   as fslsettings
 import fsl.transform.affine as affine
 import fsl.data.image       as fslimage
 
@@ -23,6 +26,19 @@ import fsleyes.gl.textures  as textures
 import fsleyes.gl.globject  as globject
 
 
+LOD_DELAY = 0.3
+"""Amount of time, in seconds, after the camera has stopped moving, before
+a :class:`GLTractogram` switches from drawing simplified streamlines back
+to drawing streamlines at full detail. See :meth:`GLTractogram.lodIndices`.
+"""
+
+
+LOD_PIXELS = 1
+"""Tolerance, in screen pixels, used when drawing simplified streamlines.
+See :meth:`GLTractogram.lodIndices`.
+"""
+
+
 class GLTractogram(globject.GLObject):
     """The GLTractogram contains logic for drawing :class:`.Tractogram`
     overlays.
@@ -33,6 +49,28 @@ class GLTractogram(globject.GLObject):
         globject.GLObject.__init__(
             self, overlay, overlayList, displayCtx, threedee)
 
+        # Used to draw simplified streamlines
+        # while the 3D camera is moving - see
+        # the lodIndices method.
+        self.__lastMVP       = None
+        self.__lastMove      = 0
+        self.__lodGeneration = 0
+        self.__lodPending    = set()
+
+        # Index arrays currently loaded
+        # into each shader program - see
+        # the setShaderIndices method.
+        self.__shaderIndices = {}
+
+        # Seed used to draw random sub-samples
+        # (see updateStreamlineData). If a seed
+        # has not been set, a random one is
+        # chosen, so that the sub-sample is fixed
+        # for the lifetime of this GLTractogram.
+        seed = fslsettings.read('fsleyes.overlay.tractogram.seed', None)
+        if seed is None: self.__seed = int(np.random.randint(0, 2 ** 31))
+        else:            self.__seed = int(seed)
+
         # Shaders are created in compileShaders.
         # imageTexture created in refreshImageTexture
         #
@@ -215,6 +253,9 @@ class GLTractogram(globject.GLObject):
         self.imageTextures  = None
         self.shaders        = None
 
+        self.__shaderIndices.clear()
+        self.__lodCache     .clear()
+
         self.removeListeners()
         globject.GLObject.destroy(self)
 
@@ -368,20 +409,17 @@ class GLTractogram(globject.GLObject):
         ovl         = self.overlay
         opts        = self.opts
         subsamp     = opts.subsample
-        nverts      = ovl.nvertices
-        nstrms      = ovl.nstreamlines
         kwargs      = self.shaderAttributeArgs()
         threedee    = self.threedee or opts.pseudo3D
         indices     = None
 
         # randomly select a subset of streamlines
-        # (3D) or vertices (2D).
+        # (3D) or vertices (2D). The tractogram
+        # generates and caches the sub-sample, so
+        # changing the sub-sample percentage is
+        # cheap.
         if subsamp < 100:
-            if threedee: lim = nstrms
-            else:        lim = nverts
-            n       = int(lim * subsamp / 100)
-            indices = np.random.choice(lim, n)
-            indices = np.sort(indices)
+            indices = ovl.subsample(subsamp, not threedee, self.__seed)
 
             if threedee:
                 vertices, offsets, counts, indices = ovl.subset(indices)
@@ -407,6 +445,15 @@ class GLTractogram(globject.GLObject):
         self.counts   =        np.asarray(counts,   dtype=np.int32)
         self.indices  = indices
 
+        # Vertex indices for recently drawn
+        # 2D slabs - see slabVertices - and
+        # for simplified 3D streamlines - see
+        # lodIndices.
+        self.__slabCache     = collections.OrderedDict()
+        self.__lodCache      = collections.OrderedDict()
+        self.__lodGeneration = self.__lodGeneration + 1
+        self.__lodPending    = set()
+
         # upload vertices/orients/indices to GL.
         # For 3D, offsets/counts are passed on
         # each draw
@@ -423,6 +470,217 @@ class GLTractogram(globject.GLObject):
             self.updateClipData()
 
 
+    def slabVertices(self, zax, zmin, zmax):
+        """Used by :meth:`draw2D`. Returns the indices of all vertices in
+        :attr:`vertices` which lie within the given slab of the display
+        coordinate system, as identified by
+        :meth:`.Tractogram.verticesInRange`.
+
+        Returns ``None`` if the slab cannot be mapped onto a single axis of
+        the tractogram coordinate system (e.g. when the tractogram is
+        displayed with an oblique transform), in which case all vertices
+        need to be drawn.
+
+        Results for recently drawn slabs are cached, up to a total of
+        :attr:`.Tractogram.nvertices` indices.
+        """
+
+        ovl       = self.overlay
+        strm2disp = self.opts.getTransform(to='display')
+        row       = strm2disp[zax, :3]
+        axis      = np.argmax(np.abs(row))
+        scale     = row[axis]
+        offset    = strm2disp[zax, 3]
+
+        if np.isclose(scale, 0) or \
+           np.count_nonzero(~np.isclose(row, 0)) > 1:
+            return None
+
+        lo, hi = sorted(((zmin - offset) / scale, (zmax - offset) / scale))
+        key    = (axis, lo, hi)
+        cache  = self.__slabCache
+
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        indices = ovl.verticesInRange(axis, lo, hi)
+
+        # If the vertices have been sub-sampled,
+        # translate from indices into the full
+        # vertex array into indices into the
+        # sub-sample.
+        if self.indices is not None:
+            pos     = np.searchsorted(self.indices, indices)
+            valid   = pos < len(self.indices)
+            pos     = pos[valid]
+            indices = pos[self.indices[pos] == indices[valid]]
+
+        cache[key] = indices
+        while len(cache) > 1 and \
+              sum(len(i) for i in cache.values()) > ovl.nvertices:
+            cache.popitem(last=False)
+
+        return indices
+
+
+    def lodTolerance(self, canvas):
+        """Returns the tolerance, in the tractogram coordinate system, to use
+        when drawing simplified streamlines on the given canvas. This is
+        equivalent to :data:`LOD_PIXELS` pixels, rounded down to a power of
+        two so that a small number of simplification levels are used across
+        all zoom levels.
+        """
+
+        width   = canvas.GetScaledSize()[0]
+        scaling = affine.concat(canvas.projectionMatrix, canvas.viewScale)
+        scaling = np.abs(scaling[0, 0])
+
+        if width == 0 or scaling == 0:
+            return None
+
+        # Display units per pixel, converted
+        # into tractogram units
+        strm2disp = self.opts.getTransform(to='display')
+        scale     = np.mean(np.linalg.norm(strm2disp[:3, :3], axis=0))
+        tolerance = LOD_PIXELS * 2 / (scaling * width * scale)
+
+        return 2.0 ** np.floor(np.log2(tolerance))
+
+
+    def lodIndices(self, canvas):
+        """Used by :meth:`draw3D`. Returns an array of vertex index pairs, to
+        be drawn as ``GL_LINES``, which represent simplified versions of all
+        streamlines (see :meth:`.Tractogram.simplify`), or ``None`` if the
+        streamlines should be drawn at full detail.
+
+        Simplified streamlines are only drawn on on-screen canvases, while
+        the camera is moving (e.g. while the user is rotating the scene).
+        Once the camera has been stationary for :data:`LOD_DELAY` seconds,
+        the tractogram is re-drawn at full detail.
+
+        Simplified streamlines are calculated on a separate thread. Full
+        detail streamlines are drawn until they are available.
+        """
+
+        if not isinstance(canvas, fslgl.WXGLCanvasTarget):
+            return None
+
+        now     = time.time()
+        mvp     = canvas.mvpMatrix
+        lastMVP = self.__lastMVP
+
+        self.__lastMVP = mvp
+
+        if lastMVP is not None and not np.allclose(mvp, lastMVP):
+            self.__lastMove = now
+            idle.idle(self.__checkCameraStopped,
+                      name=f'{self.name}_{id(self)}_lod',
+                      after=LOD_DELAY,
+                      skipIfQueued=True)
+
+        if now - self.__lastMove >= LOD_DELAY:
+            return None
+
+        tolerance = self.lodTolerance(canvas)
+        cache     = self.__lodCache
+
+        if tolerance is None:
+            return None
+
+        if tolerance in cache:
+            cache.move_to_end(tolerance)
+            return cache[tolerance]
+
+        if tolerance not in self.__lodPending:
+            self.__lodPending.add(tolerance)
+            self.__calculateLOD(tolerance)
+
+        return None
+
+
+    def __checkCameraStopped(self):
+        """Called by :meth:`lodIndices` while the camera is moving. Once the
+        camera has stopped, triggers a re-draw at full detail.
+        """
+
+        if self.destroyed:
+            return
+
+        remaining = self.__lastMove + LOD_DELAY - time.time()
+
+        if remaining > 0:
+            idle.idle(self.__checkCameraStopped,
+                      name=f'{self.name}_{id(self)}_lod',
+                      after=remaining)
+        else:
+            self.notify()
+
+
+    def __calculateLOD(self, tolerance):
+        """Called by :meth:`lodIndices`. Calculates vertex index pairs for
+        drawing simplified streamlines with the given tolerance, on a
+        separate thread.
+        """
+
+        ovl        = self.overlay
+        indices    = self.indices
+        counts     = self.counts
+        generation = self.__lodGeneration
+        result     = []
+
+        def calculate():
+            keep = ovl.simplify(tolerance)
+
+            # Streamlines have been sub-sampled -
+            # get the flags for the vertices that
+            # we are actually drawing
+            if indices is not None:
+                keep = keep[indices]
+
+            # Each retained vertex is joined
+            # to the next, as long as they are
+            # from the same streamline
+            verts = np.flatnonzero(keep)
+            strms = np.repeat(np.arange(len(counts), dtype=np.uint32), counts)
+            strms = strms[verts]
+            same  = strms[:-1] == strms[1:]
+            pairs = np.vstack((verts[:-1][same], verts[1:][same]))
+
+            result.append(pairs.T.ravel().astype(np.uint32))
+
+        def finish():
+
+            # The streamline data has changed
+            if self.destroyed or generation != self.__lodGeneration:
+                return
+
+            cache = self.__lodCache
+            cache[tolerance] = result[0]
+            self.__lodPending.discard(tolerance)
+
+            while len(cache) > 4:
+                cache.popitem(last=False)
+
+            self.notify()
+
+        def error(e):
+            self.__lodPending.discard(tolerance)
+
+        idle.run(calculate, onFinish=finish, onError=error)
+
+
+    def setShaderIndices(self, shader, indices):
+        """Loads the given index array into the given shader program, via
+        :meth:`.GLSLShader.setIndices`, unless it is already loaded. This
+        must be called while the shader attributes are loaded.
+        """
+        if self.__shaderIndices.get(shader) is indices:
+            return
+        shader.setIndices(indices)
+        self.__shaderIndices[shader] = indices
+
+
     def updateShaderState(self):
         """Passes display properties as uniform values to the shader programs.
         """
@@ -669,8 +927,9 @@ class GLTractogram(globject.GLObject):
 
         strm2disp = opts.getTransform(to='display')
         mvp       = affine.concat(projmat, viewmat, xform, strm2disp)
+        indices   = self.slabVertices(zax, zmin, zmax)
 
-        fslgl.gltractogram_funcs.draw2D(self, canvas, mvp)
+        fslgl.gltractogram_funcs.draw2D(self, canvas, mvp, indices)
 
 
     def drawPseudo3D(self, canvas, zpos, axes, xform=None):
@@ -726,9 +985,11 @@ class GLTractogram(globject.GLObject):
         lightPos  = affine.transform(canvas.lightPos, mvp)
         strm2disp = self.opts.getTransform(to='display')
         mvp       = affine.concat(mvp, strm2disp)
+        indices   = self.lodIndices(canvas)
 
         fslgl.gltractogram_funcs.draw3D(
-            self, canvas, mvp, lighting, lightPos, xform=xform)
+            self, canvas, mvp, lighting, lightPos, xform=xform,
+            indices=indices)
 
 
     def postDraw(self):
@@ -10,6 +10,8 @@ encapsulates the data and logic required to render 2D slice of an
 """
 
 import logging
+import itertools
+import time
 
 import numpy                     as np
 import OpenGL.GL                 as gl
@@ -28,6 +30,20 @@ import fsleyes.gl.resources      as glresources
 log = logging.getLogger(__name__)
 
 
+PROGRESSIVE_LEVELS = [0.25, 0.5, 1.0]
+"""Quality levels used for progressive 3D rendering (see the
+:attr:`.Volume3DOpts.progressive` property). Each level is a scaling factor
+which is applied to the :attr:`.Volume3DOpts.resolution` and
+:attr:`.Volume3DOpts.numSteps`.
+"""
+
+
+PROGRESSIVE_DELAY = 0.25
+"""Time, in seconds, that the view must remain unchanged before a progressive
+3D render is refined.
+"""
+
+
 class GLVolume(glimageobject.GLImageObject, globject.GLObject):
     """The ``GLVolume`` class is a :class:`.GLImageObject` which encapsulates
     the data and logic required to render  :class:`.Image` overlays in 2D and
@@ -131,13 +147,31 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
     ``renderTexture1``.
 
 
+    If the :attr:`.Volume3DOpts.progressive` property is ``True``, the
+    volume is rendered with a reduced resolution and number of samples
+    whenever the view (the camera or the 3D clipping planes) changes. Once
+    the view has been unchanged for :data:`PROGRESSIVE_DELAY` seconds, the
+    render is refined over successive frames, through each of the
+    :data:`PROGRESSIVE_LEVELS`, until it is drawn at full quality. Any change
+    to the view during refinement causes the render to return to the lowest
+    quality level. The ``glvolume_funcs`` modules must use the number of
+    samples returned by the :meth:`get3DQuality` method. Progressive
+    rendering is only performed on on-screen canvases (a
+    :class:`.WXGLCanvasTarget`) - off-screen renders (e.g. ``fsleyes
+    render``) are always drawn at full quality.
+
+
     **Textures**
 
 
     The ``GLVolume`` class uses the following textures:
 
      - An :class:`.ImageTexture`, a 3D texture which contains image data.
-       This is bound to texture unit 0.
+       This is bound to texture unit 0. Images which are too large to be
+       stored in a single texture are instead stored in a
+       :class:`.BrickedImageTexture`, and can only be drawn in 2D - each
+       brick is bound to texture unit 0 while it is drawn (see
+       :meth:`draw2D`).
 
      - A :class:`.ColourMapTexture`, a 1D texture which contains the
        colour map defined by the :attr:`.VolumeOpts.cmap` property.
@@ -158,6 +192,11 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
        is being drawn it is bound to texture units 4 (for RGBA) and 5 (for
        depth).
 
+     - A :class:`.BrickRangeTexture`, used for 3D rendering, which contains
+       the data range within coarse bricks of the image, and allows the
+       ray-caster to skip over bricks which are entirely clipped. This is
+       bound to texture unit 5 while the image is being ray-cast.
+
 
     **Attributes**
 
@@ -179,6 +218,8 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
                          rendering.
     ``renderTexture2``   The first :class:`.RenderTexture` used for 3D
                          rendering.
+    ``brickTexture``     The :class:`.BrickRangeTexture` used for 3D
+                         rendering.
     ``texName``          A name used for the ``imageTexture``.
     ==================== ==================================================
     """
@@ -247,6 +288,23 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
             self.renderTexture2 = textures.RenderTexture(
                 self.name, interp=gl.GL_LINEAR, rttype='cd')
 
+            self.brickTexture = textures.BrickRangeTexture(
+                '{}_bricks'.format(self.name))
+            self.brickTexture.register(self.name, self.__texturesChanged)
+
+        # The brick currently being drawn, if
+        # the image is stored in a bricked
+        # texture - see the draw2D method.
+        self.__brick       = None
+        self.__brickWarned = False
+
+        # Used for progressive 3D rendering -
+        # see the __updateProgressive method.
+        self.__quality    = None
+        self.__level      = len(PROGRESSIVE_LEVELS) - 1
+        self.__lastView   = None
+        self.__lastChange = 0
+
         # This attribute is used by the
         # updateShaderState method to
         # make sure that the Notifier.notify()
@@ -294,11 +352,14 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
         self.imageTexture = None
 
         if self.threedee:
+            self.brickTexture.deregister(self.name)
             self.renderTexture1.destroy()
             self.renderTexture2.destroy()
+            self.brickTexture  .destroy()
             self.smoothFilter  .destroy()
             self.renderTexture1 = None
             self.renderTexture2 = None
+            self.brickTexture   = None
             self.smoothFilter   = None
 
         fslgl.glvolume_funcs       .destroy(self)
@@ -444,6 +505,8 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
             opts.addListener('numInnerSteps',   name,
                              self._numInnerStepsChanged)
             opts.addListener('resolution',      name,  self._resolutionChanged)
+            opts.addListener('progressive',     name,
+                             self._progressiveChanged)
             opts.addListener('blendFactor',     name,
                              self._blendPropertiesChanged)
             opts.addListener('blendByIntensity', name,
@@ -459,6 +522,8 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
             opts.addListener('clipAzimuth',     name, self._clipping3DChanged)
             opts.addListener('clipInclination', name, self._clipping3DChanged)
 
+            self.image.register(name, self._imageDataChanged, topic='data')
+
         # GLVolume instances need to keep track of whether
         # the volume/channel properties of their corresponding
         # VolumeOpts instance is synced to other VolumeOpts
@@ -526,6 +591,7 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
             opts.removeListener('numSteps',         name)
             opts.removeListener('numInnerSteps',    name)
             opts.removeListener('resolution',       name)
+            opts.removeListener('progressive',      name)
             opts.removeListener('blendFactor',      name)
             opts.removeListener('blendByIntensity', name)
             opts.removeListener('smoothing',        name)
@@ -536,6 +602,8 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
             opts.removeListener('clipAzimuth',      name)
             opts.removeListener('clipInclination',  name)
 
+            self.image.deregister(name, topic='data')
+
         if self.__syncListenersRegistered:
             opts.removeSyncChangeListener('volume',  name)
             opts.removeSyncChangeListener('channel', name)
@@ -654,9 +722,11 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
             channel=opts.channel,
             volume=opts.index()[3:],
             normaliseRange=normRange,
+            allowBricks=True,
             notify=False)
 
         self.imageTexture.register(self.name, self.__texturesChanged)
+        self.__buildBricks()
 
 
     def registerAuxImage(self, which, image, onReady=None):
@@ -687,27 +757,164 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
         self.clipTexture     .bindTexture(gl.GL_TEXTURE3)
         self.modulateTexture .bindTexture(gl.GL_TEXTURE4)
 
+        if self.threedee:
+            self.brickTexture.bindTexture(gl.GL_TEXTURE5)
+
         fslgl.glvolume_funcs.preDraw(self)
 
 
+    @property
+    def bricked(self):
+        """Returns ``True`` if the image is stored in a
+        :class:`.BrickedImageTexture`, ``False`` otherwise.
+        """
+        return isinstance(self.imageTexture, textures.BrickedImageTexture)
+
+
+    @property
+    def currentBrick(self):
+        """If the image is stored in a :class:`.BrickedImageTexture`, and
+        a slice is currently being drawn, returns the :class:`.ImageBrick`
+        that is being drawn. Otherwise returns ``None``.
+        """
+        return self.__brick
+
+
     def draw2D(self, canvas, *args, **kwargs):
-        """Calls the version dependent ``draw2D`` function. """
+        """Calls the version dependent ``draw2D`` function. If the image is
+        stored in a :class:`.BrickedImageTexture`, the ``draw2D`` function
+        is called once for each brick which intersects the slice - see
+        :meth:`__drawBricks`.
+        """
 
         with glroutines.enabled((gl.GL_CULL_FACE)):
             gl.glPolygonMode(gl.GL_FRONT_AND_BACK, gl.GL_FILL)
             gl.glCullFace(gl.GL_BACK)
             gl.glFrontFace(self.frontFace(canvas))
-            fslgl.glvolume_funcs.draw2D(self, canvas, *args, **kwargs)
+
+            if self.bricked:
+                self.__drawBricks(canvas, *args, **kwargs)
+            else:
+                fslgl.glvolume_funcs.draw2D(self, canvas, *args, **kwargs)
+
+
+    def __drawBricks(self, canvas, zpos, axes, xform=None):
+        """Called by :meth:`draw2D` for images which are stored in a
+        :class:`.BrickedImageTexture`. Retrieves the bricks which intersect
+        the slice, and draws each of them in turn. While each brick is being
+        drawn, it is bound to texture unit 0, and is accessible via the
+        :meth:`currentBrick` property. The :meth:`generateVertices2D` method
+        restricts the slice vertices and texture coordinates to the current
+        brick.
+        """
+
+        _, voxCoords, _ = glimageobject.GLImageObject.generateVertices2D(
+            self, zpos, axes, bbox=canvas.viewport)
+
+        for brick in self.imageTexture.bricks(voxCoords):
+            self.__brick = brick
+            try:
+                with brick.texture.bound(gl.GL_TEXTURE0):
+                    fslgl.glvolume_funcs.draw2D(
+                        self, canvas, zpos, axes, xform)
+            finally:
+                self.__brick = None
+
+
+    def get3DQuality(self):
+        """Returns a tuple containing the resolution (as a percentage) and
+        number of samples which are to be used for the current 3D render.
+        These will be less than the :attr:`.Volume3DOpts.resolution` and
+        :attr:`.Volume3DOpts.numSteps` during a progressive render.
+        """
+        if self.__quality is None:
+            return self.opts.resolution, self.opts.numSteps
+        return self.__quality
+
+
+    def __updateProgressive(self, canvas):
+        """Called by :meth:`draw3D`. If :attr:`.Volume3DOpts.progressive` is
+        active, determines the quality level at which the next frame should
+        be drawn, and schedules a refresh if the render needs refining.
+        Off-screen canvases are always drawn at full quality.
+        """
+
+        opts     = self.opts
+        nlvls    = len(PROGRESSIVE_LEVELS)
+        onscreen = isinstance(canvas, fslgl.WXGLCanvasTarget)
+
+        if not (opts.progressive and onscreen):
+            self.__quality  = None
+            self.__level    = nlvls - 1
+            self.__lastView = None
+            return
+
+        view = (canvas.mvpMatrix.tobytes(),
+                tuple(canvas.GetScaledSize()),
+                opts.numClipPlanes,
+                opts.clipMode,
+                tuple(opts.clipPosition),
+                tuple(opts.clipAzimuth),
+                tuple(opts.clipInclination))
+        now  = time.time()
+
+        # The view has changed - drop back
+        # to the lowest quality, until the
+        # view has stopped changing.
+        if view != self.__lastView:
+            self.__lastView   = view
+            self.__lastChange = now
+            self.__level      = 0
+
+        elif self.__level < nlvls - 1 and \
+             (now - self.__lastChange) >= PROGRESSIVE_DELAY:
+            self.__level += 1
+
+        scale          = PROGRESSIVE_LEVELS[self.__level]
+        res            = max(10, int(round(opts.resolution * scale)))
+        nsteps         = max(10, int(round(opts.numSteps   * scale)))
+        self.__quality = (res, nsteps)
+
+        # Schedule a re-draw to refine the
+        # render. If the view changes in the
+        # meantime, the re-draw will be at
+        # the lowest quality level again.
+        if self.__level < nlvls - 1:
+
+            def refine():
+                if not self.destroyed:
+                    self.notify()
+
+            if self.__level == 0: after = PROGRESSIVE_DELAY
+            else:                 after = 0
+
+            idle.idle(refine,
+                      after=after,
+                      name='{}_refine'.format(self.name),
+                      skipIfQueued=True)
 
 
     def draw3D(self, canvas, xform=None):
         """Calls the version dependent ``draw3D`` function. """
 
-        opts = self.opts
-        w, h = canvas.GetScaledSize()
-        res  = self.opts.resolution / 100.0
-        sw   = int(np.ceil(w * res))
-        sh   = int(np.ceil(h * res))
+        # Bricked textures are only
+        # supported for 2D rendering
+        if self.bricked:
+            if not self.__brickWarned:
+                log.warning('%s is too large to be displayed in 3D',
+                            self.image.name)
+                self.__brickWarned = True
+            return
+
+        self.__updateProgressive(canvas)
+
+        opts     = self.opts
+        w, h     = canvas.GetScaledSize()
+        res, _   = self.get3DQuality()
+        fullres  = res == 100
+        res      = res / 100.0
+        sw       = int(np.ceil(w * res))
+        sh       = int(np.ceil(h * res))
 
         # Initialise and resize
         # the offscreen textures
@@ -716,7 +923,7 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
             with rt.target():
                 glroutines.clear((0, 0, 0, 0))
 
-        if self.opts.resolution != 100:
+        if not fullres:
             gl.glViewport(0, 0, sw, sh)
 
         # Do the render. Even though we're
@@ -734,7 +941,7 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
             gl.glCullFace(gl.GL_BACK)
             fslgl.glvolume_funcs.draw3D(self, canvas, xform)
 
-        if self.opts.resolution != 100:
+        if not fullres:
             gl.glViewport(0, 0, w, h)
 
         # Apply smoothing if needed. If smoothing
@@ -776,9 +983,16 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
             src.depthTexture = olddep
 
 
-    def drawAll(self, *args, **kwargs):
-        """Calls the version dependent ``drawAll`` function. """
-        fslgl.glvolume_funcs.drawAll(self, *args, **kwargs)
+    def drawAll(self, canvas, axes, zposes, xforms):
+        """Calls the version dependent ``drawAll`` function. Slices through
+        images which are stored in a :class:`.BrickedImageTexture` are drawn
+        one at a time via :meth:`draw2D`.
+        """
+        if self.bricked:
+            for zpos, xform in zip(zposes, xforms):
+                self.draw2D(canvas, zpos, axes, xform)
+        else:
+            fslgl.glvolume_funcs.drawAll(self, canvas, axes, zposes, xforms)
 
 
     def postDraw(self):
@@ -792,6 +1006,9 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
         self.clipTexture     .unbindTexture()
         self.modulateTexture .unbindTexture()
 
+        if self.threedee:
+            self.brickTexture.unbindTexture()
+
         fslgl.glvolume_funcs.postDraw(self)
 
 
@@ -840,8 +1057,18 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
 
         Appliies the :meth:`.ImageTextureBase.texCoordXform` to the texture
         coordinates - this is performed to support 2D images/textures.
+
+        If a brick of a :class:`.BrickedImageTexture` is being drawn (see
+        :meth:`currentBrick`), the vertices are restricted to the bounding
+        box of the brick, and the texture coordinates are transformed into
+        the brick texture coordinate system.
         """
 
+        brick = self.__brick
+
+        if brick is not None:
+            bbox = self.__brickBBox(brick, bbox)
+
         vertices, voxCoords, texCoords = \
             glimageobject.GLImageObject.generateVertices2D(
                 self, zpos, axes, bbox)
@@ -849,9 +1076,31 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
         texCoords = affine.transform(
             texCoords, self.imageTexture.texCoordXform(self.overlay.shape))
 
+        if brick is not None:
+            texCoords = affine.transform(texCoords, brick.texCoordXform)
+
         return vertices, voxCoords, texCoords
 
 
+    def __brickBBox(self, brick, bbox=None):
+        """Used by :meth:`generateVertices2D`. Returns the display coordinate
+        system bounding box of the given :class:`.ImageBrick`, intersected
+        with ``bbox``.
+        """
+
+        corners = list(itertools.product(*zip(brick.drawLow, brick.drawHigh)))
+        corners = affine.transform(corners,
+                                   self.opts.getTransform('voxel', 'display'))
+        blo     = corners.min(axis=0)
+        bhi     = corners.max(axis=0)
+
+        if bbox is None:
+            return list(zip(blo, bhi))
+
+        return [(max(lo, blo[i]), min(hi, bhi[i]))
+                for i, (lo, hi) in enumerate(bbox)]
+
+
     def generateVertices3D(self, bbox=None):
         """Overrides :meth:`.GLImageObject.generateVertices3D`.
 
@@ -1035,6 +1284,22 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
         self.notify()
 
 
+    def _progressiveChanged(self, *a):
+        """Called when the :attr:`.Volume3DOpts.progressive` property
+        changes.
+        """
+        self.notify()
+
+
+    def _imageDataChanged(self, *a):
+        """Called in 3D when the :class:`.Image` data changes. Forces the
+        ``brickTexture`` to be re-built, as the data may have been modified
+        in place.
+        """
+        self.__buildBricks(force=True)
+        self.updateShaderState(alwaysNotify=True)
+
+
     def _numClipPlanesChanged(self, *a):
         """Called when the :attr:`.Volume3DOpts.numClipPlanes` property
         changes.
@@ -1095,7 +1360,17 @@ class GLVolume(glimageobject.GLImageObject, globject.GLObject):
 
 
     def __texturesChanged(self, *a):
-        """Called when either the ``imageTexture`` or the ``clipTexture``
-        changes. Calls :meth:`updateShaderState`.
+        """Called when either the ``imageTexture``, ``clipTexture``, or
+        ``brickTexture`` changes. Calls :meth:`updateShaderState`.
         """
+        self.__buildBricks()
         self.updateShaderState(alwaysNotify=True)
+
+
+    def __buildBricks(self, force=False):
+        """Called when the ``imageTexture`` changes. In 3D, (re-)builds the
+        ``brickTexture`` from the image texture data (see
+        :meth:`.BrickRangeTexture.build`).
+        """
+        if self.threedee and self.imageTexture.ready():
+            self.brickTexture.build(self.imageTexture, force=force)
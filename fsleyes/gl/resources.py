@@ -63,9 +63,55 @@ count; when this count reaches zero, the texture will be destroyed::
           objects, but can actually be used with any type - the only
           requirement is that the type defines a method called ``destroy``,
           which performs any required clean-up operations.
+
+
+Memory budget
+-------------
+
+
+This module also keeps track of the approximate amount of memory used by
+all registered resources, and allows a memory *budget* to be imposed. The
+following functions are available:
+
+
+.. autosummary::
+   :nosignatures:
+
+   setBudget
+   getBudget
+   usage
+   report
+   enforceBudget
+
+
+A resource may take part in memory accounting and eviction by providing some
+or all of the following attributes (all of which are provided by the
+:class:`.Texture` class):
+
+============== ===========================================================
+``nbytes``     Approximate number of bytes used by the resource.
+``lastUsed``   Time (as returned by ``time.time()``) at which the resource
+               was last used (e.g. bound for drawing).
+``evictable``  ``True`` if the resource can be evicted.
+``evicted``    ``True`` if the resource has been evicted.
+``evict``      Method which releases the memory used by the resource. An
+               evicted resource must transparently re-create itself when it
+               is next needed.
+============== ===========================================================
+
+
+When a budget has been set (e.g. via the ``--gpuMemLimit`` command-line
+option), and the total memory used by all resources exceeds the budget, the
+:func:`enforceBudget` function will evict resources, least recently used
+first, until the total falls below the budget. Resources which have been used
+within the last :data:`MIN_IDLE_TIME` seconds are never evicted - as
+resources associated with hidden overlays are not drawn, they will be the
+first to be evicted.
 """
 
-import logging
+import            time
+import            logging
+import collections
 
 
 log = logging.getLogger(__name__)
@@ -138,6 +184,8 @@ def set(key, resource, overwrite=False):
         log.debug('Resource %s reference count '
                   'increased to %s', str(key), r.refcount)
 
+        enforceBudget()
+
     else:
         log.debug('Updating resource %s', str(key))
 
@@ -168,6 +216,102 @@ def delete(key):
         r.resource.destroy()
 
 
+def setBudget(nbytes):
+    """Set the memory budget, in bytes. If ``nbytes`` is ``None`` or ``0``,
+    the budget is removed. Calls :func:`enforceBudget`.
+    """
+    global _budget
+
+    if not nbytes: nbytes = None
+    else:          nbytes = int(nbytes)
+
+    log.debug('Setting resource memory budget: %s', nbytes)
+
+    _budget = nbytes
+    enforceBudget()
+
+
+def getBudget():
+    """Returns the current memory budget in bytes, or ``None`` if there is
+    no budget.
+    """
+    return _budget
+
+
+def usage():
+    """Returns the approximate total number of bytes used by all resources.
+    """
+    return sum(r.nbytes for r in _resources.values())
+
+
+def report():
+    """Returns a ``dict`` containing information about the current memory
+    usage and budget, and about each registered resource.
+    """
+
+    resources = collections.OrderedDict()
+
+    for key, r in _resources.items():
+        resources[str(key)] = collections.OrderedDict([
+            ('type',     type(r.resource).__name__),
+            ('refcount', r.refcount),
+            ('nbytes',   r.nbytes),
+            ('evicted',  r.evicted)])
+
+    return collections.OrderedDict([
+        ('usage',     usage()),
+        ('budget',    getBudget()),
+        ('resources', resources)])
+
+
+def enforceBudget():
+    """If a memory budget has been set, and the total memory used by all
+    resources exceeds it, evicts resources, in least-recently-used order,
+    until the total falls below the budget. Resources which have been used in
+    the last :data:`MIN_IDLE_TIME` seconds are not evicted.
+
+    This function must be called while a GL context is current.
+
+    :returns: A list containing the keys of all evicted resources.
+    """
+
+    budget = _budget
+
+    if budget is None:
+        return []
+
+    total = usage()
+
+    if total <= budget:
+        return []
+
+    now        = time.time()
+    evicted    = []
+    candidates = [r for r in _resources.values()
+                  if r.evictable and
+                  not r.evicted  and
+                  r.nbytes > 0   and
+                  (now - r.lastUsed) >= MIN_IDLE_TIME]
+
+    for r in sorted(candidates, key=lambda r: r.lastUsed):
+
+        if total <= budget:
+            break
+
+        nbytes = r.nbytes
+
+        log.debug('Resource memory budget exceeded (%s > %s) - '
+                  'evicting %s (%s bytes)', total, budget, r.key, nbytes)
+
+        r.resource.evict()
+
+        if r.evicted:
+            total -= nbytes
+            evicted.append(r.key)
+
+    return evicted
+
+
 class _Resource:
     """Internal type which is used to encapsulate a resource, and the
     number of active references to that resources. The following attributes
@@ -178,6 +322,10 @@ class _Resource:
     ``resource`` The resource itself.
     ``refcount`` Number of references to the resource (initialised to ``0``).
     ============ ============================================================
+
+    The ``nbytes``, ``lastUsed``, ``evictable`` and ``evicted`` properties
+    return the corresponding attribute of the resource, or a default value
+    if the resource does not have the attribute.
     """
 
     def __init__(self, key, resource):
@@ -189,9 +337,50 @@ class _Resource:
         self.key      = key
         self.resource = resource
         self.refcount = 0
+        self.created  = time.time()
+
+
+    @property
+    def nbytes(self):
+        """Approximate number of bytes used by the resource, or ``0``. """
+        return getattr(self.resource, 'nbytes', 0) or 0
+
+
+    @property
+    def lastUsed(self):
+        """Time at which the resource was last used, or the time at which
+        this ``_Resource`` was created.
+        """
+        lastUsed = getattr(self.resource, 'lastUsed', None)
+        if lastUsed is None:
+            lastUsed = self.created
+        return lastUsed
+
+
+    @property
+    def evictable(self):
+        """``True`` if the resource can be evicted, ``False`` otherwise. """
+        return getattr(self.resource, 'evictable', False)
+
+
+    @property
+    def evicted(self):
+        """``True`` if the resource has been evicted, ``False`` otherwise. """
+        return getattr(self.resource, 'evicted', False)
 
 
 _resources = {}
 """A dictionary containing ``{key : _Resource}`` mappings for all resources
 that exist.
 """
+
+
+_budget = None
+"""Memory budget in bytes, or ``None`` for no budget. See :func:`setBudget`.
+"""
+
+
+MIN_IDLE_TIME = 2.0
+"""Resources which have been used within this many seconds are not evicted
+by :func:`enforceBudget`.
+"""
@@ -7,11 +7,34 @@
 """This module provides the :class:`GLSLShader` class, which encapsulates
 a GLSL shader program comprising a vertex shader, a fragment shader, and
 optionally a geometry shader (for OpenGL >= 3.3).
+
+
+Many ``GLSLShader`` instances are created from the same source code and
+constants - for example, one per overlay, per canvas. Rather than compiling
+and linking a new GL program for each of them, linked programs are stored in
+a process-wide cache, and shared between all ``GLSLShader`` instances with
+identical (pre-processed) source code. Each ``GLSLShader`` keeps its own copy
+of its uniform values, and re-applies them whenever the shared program is
+loaded after having been used by another ``GLSLShader``. Shared programs are
+reference counted, and are deleted when the last ``GLSLShader`` using them
+is destroyed.
+
+
+If the ``GL_ARB_get_program_binary`` extension is available, linked program
+binaries are also saved to the FSLeyes cache directory (see the
+:mod:`.filecache` module), so that they do not need to be re-compiled the
+next time FSLeyes is started. This can be disabled via the
+:data:`CACHE_BINARIES` flag.
 """
 
 
-import logging
-import contextlib
+import os.path   as op
+import              os
+import              logging
+import              hashlib
+import              weakref
+import              contextlib
+import functools as ft
 
 import jinja2                as j2
 import numpy                 as np
@@ -20,6 +43,7 @@ from   fsl.utils               import memoize
 import fsleyes.gl.extensions       as glexts
 import fsleyes.gl.resources        as glresources
 import fsleyes.gl                  as fslgl
+import fsleyes.utils.filecache     as filecache
 from   fsleyes.gl.shaders.glsl import parse
 from   fsleyes.utils           import lazyimport
 
@@ -49,6 +73,342 @@ def glslAttributeType(typename):
     }[typename]
 
 
+CACHE_BINARIES = True
+"""If ``True``, and the ``GL_ARB_get_program_binary`` extension is available,
+linked shader program binaries are saved to, and loaded from, the FSLeyes
+cache directory.
+"""
+
+
+_programs = {}
+"""Process-wide cache of all shared programs which are currently in use,
+stored as ``{key : SharedProgram}`` mappings. See :func:`acquireProgram`.
+"""
+
+
+_binarySupport = None
+"""Set to ``True`` or ``False`` by :func:`binarySupported` the first time it
+is called.
+"""
+
+
+@ft.lru_cache(maxsize=256)
+def _template(src):
+    """Returns a ``jinja2.Template`` for the given shader source code. """
+    return j2.Template(src)
+
+
+@ft.lru_cache(maxsize=1024)
+def _render(src, constants):
+    """Passes the given shader source code through ``jinja2``.
+
+    :arg src:       Shader source code
+    :arg constants: Tuple of ``(name, value)`` pairs
+    """
+    return _template(src).render(**dict(constants))
+
+
+def preprocess(src, constants=None):
+    """Passes the given shader source code through ``jinja2``, replacing any
+    expressions on the basis of ``constants``. Results are cached, so
+    repeated calls with the same source and constants are cheap.
+    """
+    if src is None:
+        return None
+    if constants is None:
+        constants = {}
+    try:
+        key = tuple(sorted(constants.items()))
+        hash(key)
+    except TypeError:
+        return _template(src).render(**constants)
+    return _render(src, key)
+
+
+def binarySupported():
+    """Returns ``True`` if linked program binaries can be saved and loaded
+    via the ``GL_ARB_get_program_binary`` extension, ``False`` otherwise.
+    """
+
+    global _binarySupport
+
+    if _binarySupport is None:
+        try:
+            nformats = gl.glGetIntegerv(glexts.GL_NUM_PROGRAM_BINARY_FORMATS)
+            _binarySupport = (bool(glexts.glGetProgramBinary) and
+                              bool(glexts.glProgramBinary)    and
+                              int(nformats) > 0)
+        except Exception:
+            _binarySupport = False
+        log.debug('Program binary caching supported: %s', _binarySupport)
+
+    return _binarySupport
+
+
+def binaryPath(key):
+    """Returns a path to a file within the FSLeyes cache directory, to be used
+    to store the binary for the program with the given key. Returns ``None``
+    if binary caching is disabled or not supported.
+    """
+    if not (CACHE_BINARIES and binarySupported()):
+        return None
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    try:
+        return filecache.cachePath('shaders', f'{digest}.bin')
+    except Exception:
+        return None
+
+
+def acquireProgram(vertSrc, fragSrc, geomSrc=None):
+    """Returns a :class:`SharedProgram` for the given pre-processed shader
+    source code, compiling it if necessary. The program reference count is
+    incremented - :func:`releaseProgram` must be called when the program is
+    no longer needed.
+    """
+
+    key = (vertSrc, fragSrc, geomSrc,
+           fslgl.GL_VERSION, fslgl.GL_RENDERER, fslgl.GL_COMPATIBILITY)
+    prog = _programs.get(key)
+
+    if prog is None:
+        prog = SharedProgram(key, vertSrc, fragSrc, geomSrc)
+        _programs[key] = prog
+
+    prog.refcount += 1
+    return prog
+
+
+def releaseProgram(prog):
+    """Decrements the reference count of the given :class:`SharedProgram`,
+    deleting it if it is no longer in use.
+    """
+    prog.refcount -= 1
+    if prog.refcount <= 0:
+        _programs.pop(prog.key, None)
+        prog.destroy()
+
+
+class SharedProgram:
+    """A ``SharedProgram`` represents a linked GL program which may be shared
+    between multiple :class:`GLSLShader` instances. It contains the program
+    handle, information about the program inputs, and the
+    :class:`GLSLShader` which most recently loaded the program.
+    ``SharedProgram`` instances are created and managed by the
+    :func:`acquireProgram` and :func:`releaseProgram` functions.
+    """
+
+
+    def __init__(self, key, vertSrc, fragSrc, geomSrc):
+        """Create a ``SharedProgram``, compiling and linking the given
+        shader source code.
+        """
+
+        srcs = {'vert' : vertSrc,
+                'frag' : fragSrc,
+                'geom' : geomSrc}
+
+        types      = {}
+        sizes      = {}
+        attributes = []
+        uniforms   = set()
+
+        # Extract vertex and constant inputs
+        # required by the shader program -
+        # anything from the vertex shader
+        # declared as 'varying' or 'in', and
+        # anything from any of the shaders
+        # declared as 'uniform'.
+        for stype, src in srcs.items():
+            if src is None:
+                continue
+            decs = parse.parseGLSL(src)
+
+            # get attributes/vertex inputs from
+            # vertex shader. For the other shaders,
+            # we only care about uniforms.
+            if stype == 'vert':
+                atts  = decs['attribute']
+                unifs = decs['uniform']
+            else:
+                atts  = []
+                unifs = decs['uniform']
+
+            attributes.extend(atts)
+            uniforms = uniforms.union(unifs)
+            for dname, dtype, dsize in (atts + unifs):
+                types[dname] = dtype
+                sizes[dname] = dsize
+
+        self.key        = key
+        self.refcount   = 0
+        self.owner      = None
+        self.types      = types
+        self.sizes      = sizes
+        self.attributes = [a[0] for a in attributes]
+        self.uniforms   = [u[0] for u in uniforms]
+        self.program    = self.__link(vertSrc, fragSrc, geomSrc)
+        self.positions  = self.__getPositions(self.program,
+                                              self.attributes,
+                                              self.uniforms)
+
+
+    def destroy(self):
+        """Deletes the GL program. """
+        if self.program is not None:
+            gl.glDeleteProgram(self.program)
+        self.program = None
+        self.owner   = None
+
+
+    def __getPositions(self, shaders, attributes, uniforms):
+        """Gets the position indices for all shader attributes (vertex inputs),
+        and uniforms (constant inputs) for the given shader programs.
+
+        :arg shaders:    Reference to the compiled shader program.
+        :arg attributes: List of attributes required by the shader.
+        :arg uniforms:   List of uniforms required by the shader.
+
+        :returns:  A dictionary of ``{name : position}`` mappings.
+        """
+
+        shaderVars = {}
+
+        for v in uniforms:
+            shaderVars[v] = gl.glGetUniformLocation(shaders, v)
+
+        for v in attributes:
+            shaderVars[v] = gl.glGetAttribLocation(shaders, v)
+
+        return shaderVars
+
+
+    def __link(self, vertShaderSrc, fragShaderSrc, geomShaderSrc=None):
+        """Creates a GL program from a cached binary if possible, otherwise
+        compiles it from source, saving the binary to the cache.
+        """
+
+        fname = binaryPath(self.key)
+
+        if fname is not None and op.exists(fname):
+            program = self.__loadBinary(fname)
+            if program is not None:
+                return program
+
+        program = self.__compile(vertShaderSrc, fragShaderSrc, geomShaderSrc,
+                                 retrievable=(fname is not None))
+
+        if fname is not None:
+            self.__saveBinary(program, fname)
+
+        return program
+
+
+    def __loadBinary(self, fname):
+        """Creates a GL program from the binary stored in the given file.
+        Returns ``None`` if the binary is rejected by the driver (e.g.
+        because the driver has been updated since it was saved).
+        """
+
+        program = gl.glCreateProgram()
+        try:
+            with open(fname, 'rb') as f:
+                data = f.read()
+            fmt    = int.from_bytes(data[:4], 'little')
+            binary = np.frombuffer(data[4:], dtype=np.uint8)
+            glexts.glProgramBinary(program, fmt, binary, len(binary))
+            ok = gl.glGetProgramiv(program, gl.GL_LINK_STATUS) == gl.GL_TRUE
+        except Exception as e:
+            log.debug('Error loading program binary %s: %s', fname, e)
+            ok = False
+
+        if ok:
+            log.debug('Loaded program binary from %s', fname)
+            return program
+
+        gl.glDeleteProgram(program)
+        try:
+            os.remove(fname)
+        except OSError:
+            pass
+        return None
+
+
+    def __saveBinary(self, program, fname):
+        """Saves the binary for the given linked program to the given file.
+        Failures are logged and otherwise ignored.
+        """
+
+        try:
+            length = int(gl.glGetProgramiv(
+                program, glexts.GL_PROGRAM_BINARY_LENGTH))
+            if length <= 0:
+                return
+            binary = np.zeros(length, dtype=np.uint8)
+            outlen = np.zeros(1,      dtype=np.int32)
+            fmt    = np.zeros(1,      dtype=np.uint32)
+            glexts.glGetProgramBinary(program, length, outlen, fmt, binary)
+
+            os.makedirs(op.dirname(fname), exist_ok=True)
+            tmpname = f'{fname}.{os.getpid()}.tmp'
+            with open(tmpname, 'wb') as f:
+                f.write(int(fmt[0]).to_bytes(4, 'little'))
+                f.write(binary[:int(outlen[0])].tobytes())
+            os.replace(tmpname, fname)
+        except Exception as e:
+            log.debug('Could not save program binary %s: %s', fname, e)
+
+
+    def __compile(self,
+                  vertShaderSrc,
+                  fragShaderSrc,
+                  geomShaderSrc=None,
+                  retrievable=False):
+        """Compiles and links the OpenGL GLSL vertex, fragment, and optionally
+        geometry shader programs, and returns a reference to the resulting
+        program. Raises an error if compilation/linking fails.
+
+        If ``retrievable`` is ``True``, the driver is told that the program
+        binary will be retrieved after linking.
+
+        .. note:: I'm explicitly not using the PyOpenGL
+                  :func:`OpenGL.GL.shaders.compileProgram` function, because
+                  it attempts to validate the program after compilation, which
+                  fails due to texture data not being bound at the time of
+                  validation.
+        """
+
+        program = gl.glCreateProgram()
+        srcs    = [(vertShaderSrc, gl.GL_VERTEX_SHADER),
+                   (fragShaderSrc, gl.GL_FRAGMENT_SHADER),
+                   (geomShaderSrc, gl.GL_GEOMETRY_SHADER)]
+
+        for src, srcType in srcs:
+            if src is None:
+                continue
+
+            shader = gl.glCreateShader(srcType)
+            gl.glShaderSource(shader, src)
+            gl.glCompileShader(shader)
+            result = gl.glGetShaderiv(shader, gl.GL_COMPILE_STATUS)
+            if result != gl.GL_TRUE:
+                raise RuntimeError(
+                    '{}: {}'.format(srcType, gl.glGetShaderInfoLog(shader)))
+            gl.glAttachShader(program, shader)
+            gl.glDeleteShader(shader)
+
+        if retrievable:
+            glexts.glProgramParameteri(
+                program, glexts.GL_PROGRAM_BINARY_RETRIEVABLE_HINT, gl.GL_TRUE)
+
+        gl.glLinkProgram(program)
+        linkResult = gl.glGetProgramiv(program, gl.GL_LINK_STATUS)
+
+        if linkResult != gl.GL_TRUE:
+            raise RuntimeError(gl.glGetProgramInfoLog(program))
+
+        return program
+
+
 class GLSLShader:
     """The ``GLSLShader`` class encapsulates information and logic about a GLSL
     shader program, comprising a vertex shader, a fragment shader, and
@@ -140,57 +500,28 @@ class GLSLShader:
         if constants is None:
             constants = {}
 
-        srcs = {'vert' : vertSrc,
-                'frag' : fragSrc,
-                'geom' : geomSrc}
-
-        for stype, src in srcs.items():
-            if src is not None:
-                srcs[stype] = j2.Template(src).render(**constants)
-
-        self.__srcs = srcs
-
-        types      = {}
-        sizes      = {}
-        attributes = []
-        uniforms   = set()
-
-        # Extract vertex and constant inputs
-        # required by the shader program -
-        # anything from the vertex shader
-        # declared as 'varying' or 'in', and
-        # anything from any of the shaders
-        # declared as 'uniform'.
-        for stype, src in srcs.items():
-            if src is None:
-                continue
-            decs = parse.parseGLSL(src)
-
-            # get attributes/vertex inputs from
-            # vertex shader. For the other shaders,
-            # we only care about uniforms.
-            if stype == 'vert':
-                atts  = decs['attribute']
-                unifs = decs['uniform']
-            else:
-                atts  = []
-                unifs = decs['uniform']
-
-            attributes.extend(atts)
-            uniforms = uniforms.union(unifs)
-            for dname, dtype, dsize in (atts + unifs):
-                types[dname] = dtype
-                sizes[dname] = dsize
-
-        self.program     = self.__compile(srcs['vert'], srcs['frag'], srcs['geom'])
+        srcs = {'vert' : preprocess(vertSrc, constants),
+                'frag' : preprocess(fragSrc, constants),
+                'geom' : preprocess(geomSrc, constants)}
+
+        self.__srcs       = srcs
+        self.__sharedProg = acquireProgram(srcs['vert'],
+                                           srcs['frag'],
+                                           srcs['geom'])
+
+        # Program inputs are shared, but uniform
+        # values are specific to this instance -
+        # they are stored here, and re-applied
+        # when the program is loaded after being
+        # used by another GLSLShader.
+        self.__values    = {}
+        self.program     = self.__sharedProg.program
         self.attDivisors = {}
-        self.types       = types
-        self.sizes       = sizes
-        self.attributes  = [a[0] for a in attributes]
-        self.uniforms    = [u[0] for u in uniforms]
-        self.positions   = self.__getPositions(self.program,
-                                               self.attributes,
-                                               self.uniforms)
+        self.types       = self.__sharedProg.types
+        self.sizes       = self.__sharedProg.sizes
+        self.attributes  = self.__sharedProg.attributes
+        self.uniforms    = self.__sharedProg.uniforms
+        self.positions   = self.__sharedProg.positions
 
         # Flags indicating whether each uniform/attribute
         # has been given a value via set/setAtt
@@ -299,9 +630,20 @@ class GLSLShader:
 
 
     def load(self):
-        """Loads this ``GLSLShader`` into the GL state. """
+        """Loads this ``GLSLShader`` into the GL state. If the program was
+        last used by another ``GLSLShader``, all uniform values which have
+        been set on this ``GLSLShader`` are re-applied.
+        """
         gl.glUseProgram(self.program)
 
+        shared = self.__sharedProg
+        owner  = shared.owner
+        if owner is None or owner() is not self:
+            shared.owner = weakref.ref(self)
+            if owner is not None:
+                for name, (value, size) in self.__values.items():
+                    self.__setUniform(name, value, size)
+
 
     def loadAtts(self):
         """Binds all of the shader program ``attribute`` variables - you
@@ -372,8 +714,12 @@ class GLSLShader:
 
 
     def destroy(self):
-        """Deletes all GL resources managed by this ``GLSLShader``. """
-        gl.glDeleteProgram(self.program)
+        """Deletes all GL resources managed by this ``GLSLShader``. The GL
+        program is only deleted if it is not in use by any other
+        ``GLSLShader``.
+        """
+        if self.__sharedProg is not None:
+            releaseProgram(self.__sharedProg)
         if self.vao is not None:
             gl.glDeleteVertexArrays(1, self.vao)
         if self.indexBuffer is not None:
@@ -385,6 +731,7 @@ class GLSLShader:
         self.vao         = None
         self.indexBuffer = None
         self.buffers     = None
+        self.__sharedProg = None
 
 
     @memoize.Instanceify(memoize.skipUnchanged)
@@ -399,6 +746,15 @@ class GLSLShader:
                   :func:`.memoize.skipUnchanged` decorator, which returns
                   ``True`` if the value was changed, ``False`` otherwise.
         """
+        self.__values[name] = (np.array(value), size)
+        self.__setUniform(name, value, size)
+        self.hasValue[name] = True
+
+
+    def __setUniform(self, name, value, size=None):
+        """Used by :meth:`set` and :meth:`load`. Sets the value of the
+        specified GLSL ``uniform`` variable.
+        """
 
         vPos  = self.positions[name]
         vType = self.types[    name]
@@ -422,7 +778,6 @@ class GLSLShader:
             vType, size, name, value)
 
         setfunc(vPos, value, size)
-        self.hasValue[name] = True
 
 
     def setAtt(self, name, value, divisor=None):
@@ -515,68 +870,6 @@ class GLSLShader:
                 gl.glDrawArrays(prim, *args)
 
 
-    def __getPositions(self, shaders, attributes, uniforms):
-        """Gets the position indices for all shader attributes (vertex inputs),
-        and uniforms (constant inputs) for the given shader programs.
-
-        :arg shaders:    Reference to the compiled shader program.
-        :arg attributes: List of attributes required by the shader.
-        :arg uniforms:   List of uniforms required by the shader.
-
-        :returns:  A dictionary of ``{name : position}`` mappings.
-        """
-
-        shaderVars = {}
-
-        for v in uniforms:
-            shaderVars[v] = gl.glGetUniformLocation(shaders, v)
-
-        for v in attributes:
-            shaderVars[v] = gl.glGetAttribLocation(shaders, v)
-
-        return shaderVars
-
-
-    def __compile(self, vertShaderSrc, fragShaderSrc, geomShaderSrc=None):
-        """Compiles and links the OpenGL GLSL vertex, fragment, and optionally
-        geometry shader programs, and returns a reference to the resulting
-        program. Raises an error if compilation/linking fails.
-
-        .. note:: I'm explicitly not using the PyOpenGL
-                  :func:`OpenGL.GL.shaders.compileProgram` function, because
-                  it attempts to validate the program after compilation, which
-                  fails due to texture data not being bound at the time of
-                  validation.
-        """
-
-        program = gl.glCreateProgram()
-        srcs    = [(vertShaderSrc, gl.GL_VERTEX_SHADER),
-                   (fragShaderSrc, gl.GL_FRAGMENT_SHADER),
-                   (geomShaderSrc, gl.GL_GEOMETRY_SHADER)]
-
-        for src, srcType in srcs:
-            if src is None:
-                continue
-
-            shader = gl.glCreateShader(srcType)
-            gl.glShaderSource(shader, src)
-            gl.glCompileShader(shader)
-            result = gl.glGetShaderiv(shader, gl.GL_COMPILE_STATUS)
-            if result != gl.GL_TRUE:
-                raise RuntimeError(
-                    '{}: {}'.format(srcType, gl.glGetShaderInfoLog(shader)))
-            gl.glAttachShader(program, shader)
-            gl.glDeleteShader(shader)
-
-        gl.glLinkProgram(program)
-        linkResult = gl.glGetProgramiv(program, gl.GL_LINK_STATUS)
-
-        if linkResult != gl.GL_TRUE:
-            raise RuntimeError(gl.glGetProgramInfoLog(program))
-
-        return program
-
-
     def _attribute_bool(self, val):
         return np.asarray(val, dtype=np.bool)
 
@@ -16,20 +16,22 @@ textures for various purposes.
 
 # All *Texture classes are made available at the
 # textures package level due to these imports
-from .texture            import  Texture
-from .texture2d          import (Texture2D,
-                                 DepthTexture)
-from .texture3d          import  Texture3D
-from .imagetexture       import (ImageTexture,
-                                 ImageTexture2D,
-                                 createImageTexture)
-from .colourmaptexture   import  ColourMapTexture
-from .lookuptabletexture import  LookupTableTexture
-from .selectiontexture   import (SelectionTexture2D,
-                                 SelectionTexture3D)
-from .rendertexture      import (RenderTexture,
-                                 GLObjectRenderTexture)
-from .rendertexturestack import  RenderTextureStack
-from .manager            import (ColourMapTextureManager,
-                                 AuxImageTextureManager)
-from .data               import  splineFilter
+from .texture             import  Texture
+from .texture2d           import (Texture2D,
+                                  DepthTexture)
+from .texture3d           import  Texture3D
+from .imagetexture        import (ImageTexture,
+                                  ImageTexture2D,
+                                  createImageTexture)
+from .colourmaptexture    import  ColourMapTexture
+from .lookuptabletexture  import  LookupTableTexture
+from .selectiontexture    import (SelectionTexture2D,
+                                  SelectionTexture3D)
+from .rendertexture       import (RenderTexture,
+                                  GLObjectRenderTexture)
+from .rendertexturestack  import  RenderTextureStack
+from .brickrangetexture   import  BrickRangeTexture
+from .brickedimagetexture import  BrickedImageTexture
+from .manager             import (ColourMapTextureManager,
+                                  AuxImageTextureManager)
+from .data                import  splineFilter
@@ -0,0 +1,708 @@
+#!/usr/bin/env python
+#
+# brickedimagetexture.py - The BrickedImageTexture class.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :class:`BrickedImageTexture` class, which can be
+used in place of an :class:`.ImageTexture` to display 2D slices through
+images which are too large to be stored in a single OpenGL texture.
+"""
+
+
+import logging
+import itertools
+import collections
+import collections.abc as abc
+
+import numpy as np
+
+import fsl.utils.idle                as idle
+import fsl.utils.notifier            as notifier
+import fsl.transform.affine          as affine
+import fsleyes_widgets               as fwidgets
+import fsleyes.gl.textures.data      as texdata
+import fsleyes.gl.textures.texture3d as texture3d
+from   fsleyes.utils                 import lazyimport
+
+
+log = logging.getLogger(__name__)
+
+
+gl = lazyimport('OpenGL.GL', f'{__name__}.gl')
+
+
+class ImageBrick:
+    """An ``ImageBrick`` represents a single brick of a
+    :class:`BrickedImageTexture`. ``ImageBrick`` instances are created by the
+    ``BrickedImageTexture``, and have the following attributes:
+
+    ================= ======================================================
+    ``index``         ``(i, j, k)`` index of the brick within the brick grid.
+    ``dataLow``       Voxel index of the first voxel stored in the brick
+                      texture.
+    ``dataHigh``      Voxel index of the last voxel stored in the brick
+                      texture, plus one.
+    ``drawLow``       Lower voxel coordinate bounds of the region of the
+                      image that the brick is to be used to draw.
+    ``drawHigh``      Upper voxel coordinate bounds of the region of the
+                      image that the brick is to be used to draw.
+    ``texCoordXform`` Affine which transforms from image texture coordinates
+                      into brick texture coordinates.
+    ``texture``       The :class:`.Texture3D` containing the brick data, or
+                      ``None`` if the brick has not yet been loaded.
+    ================= ======================================================
+
+    Each brick texture contains a few voxels from its neighbours (see
+    :attr:`BrickedImageTexture.halo`), so that interpolated values are
+    continuous across brick boundaries.
+    """
+
+
+    def __init__(self, index, brickSize, halo, shape):
+        """Create an ``ImageBrick``.
+
+        :arg index:     ``(i, j, k)`` brick index
+        :arg brickSize: Brick size, in voxels
+        :arg halo:      Number of voxels from neighbouring bricks
+        :arg shape:     Image shape
+        """
+
+        index    = np.array(index)
+        shape    = np.array(shape[:3])
+        low      = index * brickSize
+        high     = np.minimum(low + brickSize, shape)
+        dataLow  = np.maximum(low  - halo, 0)
+        dataHigh = np.minimum(high + halo, shape)
+        dshape   = dataHigh - dataLow
+
+        # Bricks on the edge of the image are
+        # given a looser bound, so that the
+        # image bounds test in the fragment
+        # shader takes precedence
+        drawLow  = np.where(low  == 0,     -1,        low  - 0.5)
+        drawHigh = np.where(high == shape, shape + 1, high - 0.5)
+
+        self.index         = tuple(int(i) for i in index)
+        self.dataLow       = dataLow
+        self.dataHigh      = dataHigh
+        self.drawLow       = drawLow
+        self.drawHigh      = drawHigh
+        self.texCoordXform = affine.scaleOffsetXform(shape    / dshape,
+                                                     -dataLow / dshape)
+        self.texture       = None
+
+
+    @property
+    def slices(self):
+        """Returns a tuple of ``slice`` objects which can be used to extract
+        the brick data from the image.
+        """
+        return tuple(slice(lo, hi) for lo, hi in zip(self.dataLow,
+                                                     self.dataHigh))
+
+
+class BrickedImageTexture(notifier.Notifier):
+    """The ``BrickedImageTexture`` manages the data for an :class:`.Image`
+    which exceeds the maximum OpenGL texture size on the current platform
+    (see :func:`.data.numTextureDims`).
+
+
+    The image is split into a grid of cubic bricks, each of which is small
+    enough to be stored as a :class:`.Texture3D`. Bricks are only loaded
+    when they are needed to draw a slice through the image - the
+    :meth:`bricks` method returns the bricks which intersect a slice, and
+    loads any of those bricks which are not already resident. Bricks are
+    loaded on a separate thread when a GUI is available, in which case
+    registered listeners are notified as each brick becomes available.
+
+
+    Resident bricks are kept in a least-recently-used cache - when the
+    total size of all resident bricks exceeds :attr:`maxResidentBytes`,
+    the least recently used bricks are destroyed. Bricks which are needed
+    to draw the current slice are never destroyed, so the limit may be
+    temporarily exceeded for large slices.
+
+
+    The ``BrickedImageTexture`` provides a subset of the :class:`.Texture`
+    and :class:`.ImageTexture` interface, so that it can be used by the
+    :class:`.GLVolume` class with minimal changes. All bricks share the same
+    value scaling (see :meth:`voxValXform`), so the brick textures can be
+    used interchangeably in a shader program. Only single-valued images are
+    supported, and bricked textures can only be used for 2D rendering.
+    """
+
+
+    defaultBrickSize = 128
+    """Default brick size, in voxels. The brick size used for a
+    ``BrickedImageTexture`` may be smaller, if it exceeds the
+    ``GL_MAX_3D_TEXTURE_SIZE``.
+    """
+
+
+    halo = 2
+    """Number of voxels which are duplicated from neighbouring bricks, along
+    each brick edge. Two voxels are required to support cubic spline
+    interpolation.
+    """
+
+
+    maxResidentBytes = 512 * 1048576
+    """Approximate upper limit on the total amount of memory used by all
+    resident bricks of a ``BrickedImageTexture``.
+    """
+
+
+    threadedDefault = None
+    """Default value used for the ``threaded`` argument passed to
+    :meth:`__init__`. When this is set to ``None``, the default value will be
+    the value of :func:`.fsleyes_widgets.haveGui`.
+    """
+
+
+    def __init__(self, name, image, **kwargs):
+        """Create a ``BrickedImageTexture``.
+
+        :arg name:     A unique name for this ``BrickedImageTexture``
+        :arg image:    The :class:`.Image`
+        :arg threaded: If ``True``, bricks are loaded on a separate
+                       thread. Defaults to :attr:`threadedDefault`.
+
+        All other arguments are passed through to :meth:`set`.
+        """
+
+        if kwargs.pop('nvals', 1) != 1:
+            raise RuntimeError('Bricked textures can only be used '
+                               'with single-valued textures')
+
+        threaded = kwargs.pop('threaded', None)
+
+        if threaded is None:
+            threaded = BrickedImageTexture.threadedDefault
+        if threaded is None:
+            threaded = fwidgets.haveGui()
+
+        max3d     = gl.glGetInteger(gl.GL_MAX_3D_TEXTURE_SIZE)
+        brickSize = min(BrickedImageTexture.defaultBrickSize,
+                        max3d - 2 * self.halo)
+        shape     = np.array(image.shape[:3])
+
+        self.__name      = name
+        self.__image     = image
+        self.__brickSize = brickSize
+        self.__nbricks   = np.ceil(shape / brickSize).astype(int)
+        self.__bricks    = collections.OrderedDict()
+        self.__pending   = set()
+        self.__gen       = 0
+        self.__ready     = False
+        self.__destroyed = False
+
+        self.__settings = {
+            'interp'         : gl.GL_NEAREST,
+            'prefilter'      : None,
+            'prefilterRange' : None,
+            'normalise'      : False,
+            'normaliseRange' : None,
+            'volume'         : None,
+            'channel'        : None,
+        }
+        self.__voxValXform    = np.eye(4)
+        self.__invVoxValXform = np.eye(4)
+
+        if threaded:
+            self.__taskThread = idle.TaskThread()
+            self.__taskThread.daemon = True
+            self.__taskThread.start()
+        else:
+            self.__taskThread = None
+
+        log.debug('Creating bricked texture %s for %s (brick size %s, '
+                  'grid %s)', name, image.name, brickSize, self.__nbricks)
+
+        self.__regName = '{}_{}'.format(type(self).__name__, id(self))
+        image.register(self.__regName,
+                       self.__imageDataChanged,
+                       'data',
+                       runOnIdle=True)
+
+        self.set(**kwargs)
+
+
+    def destroy(self):
+        """Must be called when this ``BrickedImageTexture`` is no longer
+        needed. Destroys all resident bricks.
+        """
+        if self.__taskThread is not None:
+            self.__taskThread.stop()
+        self.__image.deregister(self.__regName, 'data')
+        self.__clear()
+        self.__taskThread = None
+        self.__image      = None
+        self.__destroyed  = True
+
+
+    @property
+    def destroyed(self):
+        """Returns ``True`` if this ``BrickedImageTexture`` has been
+        destroyed, ``False`` otherwise.
+        """
+        return self.__destroyed
+
+
+    def ready(self):
+        """Returns ``True`` if this ``BrickedImageTexture`` has been
+        configured. Individual bricks may not yet be available.
+        """
+        return self.__ready
+
+
+    @property
+    def name(self):
+        """Returns the name of this ``BrickedImageTexture``. """
+        return self.__name
+
+
+    @property
+    def image(self):
+        """Returns the :class:`.Image` managed by this
+        ``BrickedImageTexture``.
+        """
+        return self.__image
+
+
+    @property
+    def ndim(self):
+        """Returns ``3``. """
+        return 3
+
+
+    @property
+    def nvals(self):
+        """Returns ``1``. """
+        return 1
+
+
+    @property
+    def shape(self):
+        """Returns the image shape. """
+        return tuple(self.__image.shape[:3])
+
+
+    @property
+    def data(self):
+        """Returns ``None`` - the image data is not held in memory. """
+        return None
+
+
+    @property
+    def brickSize(self):
+        """Returns the brick size, in voxels. """
+        return self.__brickSize
+
+
+    @property
+    def nbricks(self):
+        """Returns the number of bricks along each dimension. """
+        return tuple(self.__nbricks)
+
+
+    @property
+    def nbytes(self):
+        """Returns the approximate number of bytes used by all resident
+        bricks.
+        """
+        return sum(b.texture.nbytes for b in self.__bricks.values())
+
+
+    @property
+    def interp(self):
+        """Returns the current interpolation setting. """
+        return self.__settings['interp']
+
+
+    @property
+    def prefilter(self):
+        """Returns the current prefilter function. """
+        return self.__settings['prefilter']
+
+
+    @property
+    def volume(self):
+        """Returns the current volume indices, for images with more than
+        three dimensions.
+        """
+        return self.__settings['volume']
+
+
+    @property
+    def channel(self):
+        """Returns the current channel. """
+        return self.__settings['channel']
+
+
+    @property
+    def voxValXform(self):
+        """Return a transformation matrix that can be used to transform
+        values read from any brick texture back to the original data range.
+        """
+        return self.__voxValXform
+
+
+    @property
+    def invVoxValXform(self):
+        """Return a transformation matrix that can be used to transform
+        values in the original data range to brick texture values.
+        """
+        return self.__invVoxValXform
+
+
+    def texCoordXform(self, origShape):
+        """Returns an identity matrix - see
+        :meth:`.Texture.texCoordXform`.
+        """
+        return np.eye(4)
+
+
+    def invTexCoordXform(self, origShape):
+        """Returns an identity matrix - see
+        :meth:`.Texture.invTexCoordXform`.
+        """
+        return np.eye(4)
+
+
+    def getTaskThread(self):
+        """Returns ``None`` - brick data is not prepared on a
+        :class:`.TaskThread` which is accessible to other code.
+        """
+        return None
+
+
+    def bindTexture(self, textureUnit=None):
+        """Does nothing - brick textures must be bound individually. """
+
+
+    def unbindTexture(self):
+        """Does nothing - brick textures must be bound individually. """
+
+
+    def set(self, **kwargs):
+        """Set any parameters on this ``BrickedImageTexture``. Valid keyword
+        arguments are ``interp``, ``prefilter``, ``prefilterRange``,
+        ``normaliseRange``, ``volume``, ``channel``, ``volRefresh`` and
+        ``notify`` - see :meth:`.ImageTextureBase.prepareSetArgs`. All other
+        arguments are ignored.
+
+        Changes to any setting other than ``interp`` cause all resident
+        bricks to be discarded.
+
+        :returns: ``True`` if any settings have changed, ``False``
+                  otherwise.
+        """
+
+        image      = self.__image
+        settings   = dict(self.__settings)
+        notify     = kwargs.pop('notify',     True)
+        volRefresh = kwargs.pop('volRefresh', True)
+        normRange  = kwargs.pop('normaliseRange', None)
+        volume     = kwargs.pop('volume',  settings['volume'])
+        channel    = kwargs.pop('channel', settings['channel'])
+
+        if image.ndim == 3:
+            volume = None
+        elif volume is None:
+            volume = [0] * (image.ndim - 3)
+        elif not isinstance(volume, abc.Sequence):
+            volume = [volume]
+        else:
+            volume = list(volume)
+
+        if image.nvals == 1:
+            channel = None
+
+        if normRange is None:
+            dmin, dmax = image.dataRange
+            normRange  = (float(dmin), float(dmax))
+
+        for key in ('interp', 'prefilter', 'prefilterRange'):
+            settings[key] = kwargs.get(key, settings[key])
+
+        settings['normaliseRange'] = normRange
+        settings['volume']         = volume
+        settings['channel']        = channel
+
+        changed = [k for k in settings if settings[k] != self.__settings[k]]
+
+        if (not volRefresh) and len(changed) == 0 and self.__ready:
+            return False
+
+        self.__settings = settings
+
+        if volRefresh or any(c != 'interp' for c in changed):
+            self.__clear()
+            self.__calculateValueXforms()
+        else:
+            for brick in self.__bricks.values():
+                brick.texture.set(interp=settings['interp'])
+
+        self.__ready = True
+
+        if notify:
+            self.notify()
+
+        return True
+
+
+    def bricks(self, voxCoords):
+        """Returns a list of resident :class:`ImageBrick` objects which
+        intersect the slice defined by the given voxel coordinates.
+
+        Any intersecting bricks which are not resident are loaded - if this
+        ``BrickedImageTexture`` is threaded, they are loaded asynchronously,
+        and registered listeners will be notified when each brick becomes
+        available. Otherwise they are loaded immediately.
+
+        :arg voxCoords: ``(N, 3)`` array containing the voxel coordinates of
+                        the vertices of a polygon which defines the slice.
+        """
+
+        indices = self.__sliceBricks(voxCoords)
+        bricks  = []
+
+        for index in indices:
+            brick = self.__bricks.get(index, None)
+            if brick is not None:
+                self.__bricks.move_to_end(index)
+                bricks.append(brick)
+            elif self.__taskThread is None:
+                bricks.append(self.__loadBrick(index))
+            else:
+                self.__enqueueBrick(index)
+
+        self.__evict(keep=indices)
+
+        return bricks
+
+
+    def __sliceBricks(self, voxCoords):
+        """Returns a list of the indices of all bricks which intersect the
+        plane defined by the given voxel coordinates.
+        """
+
+        voxCoords = np.asarray(voxCoords, dtype=np.float64)
+        size      = self.__brickSize
+        shape     = np.array(self.shape)
+
+        # Limit the search to the voxel bounding box
+        # of the slice. Voxel coordinates are centred
+        # on the voxel, and we pad by one voxel on each
+        # side, to allow for interpolation.
+        low  = np.clip(np.floor(voxCoords.min(axis=0) - 1), 0, shape - 1)
+        high = np.clip(np.ceil( voxCoords.max(axis=0) + 1), 0, shape - 1)
+        low  = (low  // size).astype(int)
+        high = (high // size).astype(int)
+
+        # Calculate the plane equation, so
+        # we can discard bricks which do
+        # not intersect the slice (for
+        # slices which are not aligned with
+        # the voxel axes).
+        normal = np.cross(voxCoords[1] - voxCoords[0],
+                          voxCoords[2] - voxCoords[0])
+        nlen   = np.sqrt(np.dot(normal, normal))
+
+        if nlen > 1e-9:
+            normal = normal / nlen
+            offset = -np.dot(normal, voxCoords[0])
+        else:
+            normal = None
+
+        indices = []
+
+        for index in itertools.product(*[range(lo, hi + 1)
+                                         for lo, hi in zip(low, high)]):
+
+            if normal is not None:
+                blow    = np.array(index) * size - 1
+                bhigh   = blow + size + 1
+                corners = np.array(list(itertools.product(*zip(blow, bhigh))))
+                dists   = np.dot(corners, normal) + offset
+
+                if dists.min() > 0 or dists.max() < 0:
+                    continue
+
+            indices.append(index)
+
+        return indices
+
+
+    def __readBrick(self, brick, gen):
+        """Reads and returns the data for the given :class:`ImageBrick` from
+        the image, or returns ``None`` if this ``BrickedImageTexture`` has
+        been destroyed or cleared since the read was requested.
+        """
+
+        if self.__destroyed or gen != self.__gen:
+            return None
+
+        image   = self.__image
+        volume  = self.__settings['volume']
+        channel = self.__settings['channel']
+        slc     = brick.slices
+
+        if volume is not None:
+            slc = slc + tuple(volume)
+
+        if channel is None: data = image[slc]
+        else:               data = image[slc][channel]
+
+        data = np.asarray(data)
+
+        # Restore any singleton dimensions
+        # that may have been dropped
+        return data.reshape(brick.dataHigh - brick.dataLow)
+
+
+    def __createBrick(self, brick, data):
+        """Creates a :class:`.Texture3D` for the given :class:`ImageBrick`,
+        and adds it to the brick cache.
+        """
+
+        settings = self.__settings
+        name     = '{}_brick_{}_{}_{}'.format(self.__name, *brick.index)
+
+        brick.texture = texture3d.Texture3D(
+            name,
+            data=data,
+            interp=settings['interp'],
+            prefilter=settings['prefilter'],
+            prefilterRange=settings['prefilterRange'],
+            normalise=settings['normalise'],
+            normaliseRange=settings['normaliseRange'])
+
+        self.__bricks[brick.index] = brick
+
+        log.debug('%s: loaded brick %s (%s bytes)',
+                  self.__name, brick.index, brick.texture.nbytes)
+
+        return brick
+
+
+    def __newBrick(self, index):
+        """Creates and returns an :class:`ImageBrick` for the given index. """
+        return ImageBrick(index, self.__brickSize, self.halo, self.shape)
+
+
+    def __loadBrick(self, index):
+        """Loads the brick at the given index on the calling thread. """
+        brick = self.__newBrick(index)
+        data  = self.__readBrick(brick, self.__gen)
+        return self.__createBrick(brick, data)
+
+
+    def __enqueueBrick(self, index):
+        """Enqueues a task on the :class:`.TaskThread` to load the brick at
+        the given index.
+        """
+
+        if index in self.__pending:
+            return
+
+        gen    = self.__gen
+        brick  = self.__newBrick(index)
+        result = []
+
+        def read():
+            result.append(self.__readBrick(brick, gen))
+
+        def finish():
+            self.__pending.discard(index)
+            if self.__destroyed or gen != self.__gen or result[0] is None:
+                return
+            self.__createBrick(brick, result[0])
+            self.notify()
+
+        def error(e):
+            self.__pending.discard(index)
+            log.warning('%s: error loading brick %s: %s',
+                        self.__name, index, e, exc_info=True)
+
+        self.__pending.add(index)
+        self.__taskThread.enqueue(read, onFinish=finish, onError=error)
+
+
+    def __evict(self, keep):
+        """Destroys the least recently used bricks until the total size of
+        all resident bricks is below :attr:`maxResidentBytes`. Bricks in
+        ``keep`` are not destroyed.
+        """
+
+        total = self.nbytes
+        limit = BrickedImageTexture.maxResidentBytes
+        keep  = set(keep)
+
+        for index in list(self.__bricks.keys()):
+
+            if total <= limit:
+                break
+            if index in keep:
+                continue
+
+            brick  = self.__bricks.pop(index)
+            total -= brick.texture.nbytes
+            brick.texture.destroy()
+            brick.texture = None
+
+            log.debug('%s: evicted brick %s', self.__name, index)
+
+
+    def __clear(self):
+        """Destroys all resident bricks, and causes any pending brick loads
+        to be discarded.
+        """
+        self.__gen += 1
+        self.__pending.clear()
+        for brick in self.__bricks.values():
+            brick.texture.destroy()
+            brick.texture = None
+        self.__bricks.clear()
+
+
+    def __calculateValueXforms(self):
+        """Called by :meth:`set`. Calculates the transformations between
+        voxel values and brick texture values. The same settings are used
+        when creating every brick texture, so this transformation applies
+        to all of them.
+        """
+
+        settings = self.__settings
+        channel  = settings['channel']
+        dtype    = self.__image.dtype
+
+        if channel is not None:
+            dtype = dtype[channel]
+
+        # Texture.set will enable normalisation
+        # if the data type cannot be stored
+        # natively - we do the same here, and
+        # pass the flag through to each brick
+        # texture, so they are all consistent.
+        normalise = not texdata.canUseFloatTextures()[0] and \
+            (dtype not in (np.uint8, np.int8, np.uint16, np.int16))
+
+        _, xform, invXform = texdata.prepareData(
+            np.zeros((1, 1, 1), dtype=dtype),
+            prefilterRange=settings['prefilterRange'],
+            normalise=normalise,
+            normaliseRange=settings['normaliseRange'])
+
+        settings['normalise'] = normalise
+        self.__voxValXform    = xform
+        self.__invVoxValXform = invXform
+
+
+    def __imageDataChanged(self, *a):
+        """Called when the image data changes. Discards all resident bricks,
+        and notifies registered listeners.
+        """
+        self.__clear()
+        self.notify()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+#
+# brickrangetexture.py - The BrickRangeTexture class.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :class:`BrickRangeTexture` class, a small
+:class:`.Texture3D` which stores the minimum and maximum values within
+coarse bricks of an :class:`.ImageTexture`. It is used by the 3D
+:class:`.GLVolume` ray caster to skip over regions of the image which cannot
+contribute to the rendered scene.
+"""
+
+
+import logging
+
+import numpy as np
+
+from   fsleyes.gl.textures import texture3d
+from   fsleyes.utils       import lazyimport
+
+
+log = logging.getLogger(__name__)
+
+
+gl = lazyimport('OpenGL.GL', f'{__name__}.gl')
+
+
+BRICK_SIZE = 8
+"""Default size, in voxels, of each brick along each dimension. """
+
+
+def brickRanges(data, brickSize):
+    """Calculates the minimum and maximum values within each brick of the
+    given 3D ``data`` array.
+
+    Each brick is enlarged by one voxel on every side, so that the range of a
+    brick also covers any values which may be blended into the brick by
+    linear interpolation. ``nan`` values are ignored - the minimum and
+    maximum of a brick which only contains ``nan`` values are both ``nan``.
+
+    :arg data:      3D ``numpy`` array
+    :arg brickSize: Brick size along each dimension, in voxels
+    :returns:       A tuple containing two ``numpy`` arrays of shape
+                    ``ceil(data.shape / brickSize)``, containing the
+                    minimum and maximum values within each brick.
+    """
+
+    def reduce(arr, axis, func):
+        nvox   = arr.shape[axis]
+        starts = np.arange(0, nvox, brickSize)
+        result = func.reduceat(arr, starts, axis=axis)
+        before = np.take(arr, np.maximum(starts - 1,         0),        axis)
+        after  = np.take(arr, np.minimum(starts + brickSize, nvox - 1), axis)
+        return func(result, func(before, after))
+
+    # min/max are separable, so we can reduce
+    # along each axis in turn. fmin/fmax are
+    # used as they ignore nans.
+    data = np.asarray(data)
+    lo   = data
+    hi   = data
+    for axis in range(3):
+        lo = reduce(lo, axis, np.fmin)
+        hi = reduce(hi, axis, np.fmax)
+
+    return lo, hi
+
+
+class BrickRangeTexture(texture3d.Texture3D):
+    """The ``BrickRangeTexture`` stores the data range of coarse bricks of an
+    :class:`.ImageTexture`.
+
+    Each texel corresponds to a ``BRICK_SIZE**3`` brick of the image
+    texture, and contains the minimum and maximum (in the first and second
+    channels) values within that brick, as calculated by :func:`brickRanges`.
+    The values are stored in the same value space as the image texture, so
+    they can be compared directly with image texture values, after being
+    transformed by the :meth:`.Texture.voxValXform`. Texels for bricks which
+    only contain ``nan`` values have a minimum greater than their maximum.
+
+    The ranges are (re-)calculated via the :meth:`build` method, which
+    should be called whenever the image texture is refreshed. Calculation is
+    performed on the image texture :class:`.TaskThread`, if it has one, and
+    only if the image texture data or value scaling has changed.
+    """
+
+
+    def __init__(self, name, brickSize=BRICK_SIZE):
+        """Create a ``BrickRangeTexture``.
+
+        :arg name:      A unique name for this ``BrickRangeTexture``.
+        :arg brickSize: Brick size, in voxels.
+        """
+        texture3d.Texture3D.__init__(self,
+                                     name,
+                                     nvals=3,
+                                     interp=gl.GL_NEAREST)
+        self.__brickSize = brickSize
+        self.__key       = None
+        self.__pending   = False
+
+
+    def destroy(self):
+        """Must be called when this ``BrickRangeTexture`` is no longer
+        needed.
+        """
+        texture3d.Texture3D.destroy(self)
+        self.__key = None
+
+
+    @property
+    def brickSize(self):
+        """Returns the brick size, in voxels. """
+        return self.__brickSize
+
+
+    def ready(self):
+        """Overrides :meth:`.Texture.ready`. Returns ``False`` while brick
+        ranges are being re-calculated, as the existing ranges will be out of
+        date.
+        """
+        return (not self.__pending) and texture3d.Texture3D.ready(self)
+
+
+    def build(self, imageTexture, force=False):
+        """(Re-)calculates brick ranges for the given :class:`.ImageTexture`,
+        if its data or value scaling has changed since the last call.
+
+        :arg imageTexture: The :class:`.ImageTexture`
+        :arg force:        Re-calculate the ranges even if the image
+                           texture data does not appear to have changed
+                           (e.g. if the image data has been modified in
+                           place).
+
+        Once the ranges have been calculated, the texture is refreshed, and
+        registered listeners are notified.
+        """
+
+        data      = imageTexture.data
+        xform     = imageTexture.invVoxValXform
+        prefilter = imageTexture.prefilter
+        thread    = imageTexture.getTaskThread()
+
+        if data is None or xform is None or data.ndim != 3:
+            return
+
+        # We hold a reference to the data
+        # array, rather than its id, as the
+        # id may be re-used after the array
+        # is garbage collected.
+        key = (data, id(prefilter), xform.tobytes())
+
+        if (not force)               and \
+           (self.__key is not None)  and \
+           (self.__key[0] is data)   and \
+           (self.__key[1:] == key[1:]):
+            return
+
+        self.__key     = key
+        self.__pending = True
+        brickSize      = self.__brickSize
+        result         = []
+
+        def calc():
+            if self.destroyed or key is not self.__key:
+                return
+
+            vdata = data
+            if prefilter is not None:
+                vdata = prefilter(vdata)
+
+            lo, hi = brickRanges(vdata, brickSize)
+
+            # Transform ranges into the image
+            # texture value space, swapping them
+            # if the transform is an inversion
+            scale  = xform[0, 0]
+            offset = xform[0, 3]
+            lo     = lo * scale + offset
+            hi     = hi * scale + offset
+            if scale < 0:
+                lo, hi = hi, lo
+
+            # Bricks which only contain nans are
+            # given a minimum greater than their
+            # maximum. The ranges are widened
+            # slightly, so they are still
+            # conservative if stored at a lower
+            # precision.
+            empty  = np.isnan(lo)
+            vmin   = np.nanmin(lo) if not np.all(empty) else 0
+            vmax   = np.nanmax(hi) if not np.all(empty) else 1
+            margin = max((vmax - vmin) * 1e-3, 1e-6)
+            vmin   = vmin - margin
+            vmax   = vmax + margin
+            lo     = lo - margin
+            hi     = hi + margin
+            lo[empty] = vmax
+            hi[empty] = vmin
+
+            ranges    = np.zeros([3] + list(lo.shape), dtype=np.float32)
+            ranges[0] = lo
+            ranges[1] = hi
+            result[:] = [ranges, (vmin, vmax)]
+
+        def finish():
+            if self.destroyed or key is not self.__key or len(result) == 0:
+                return
+
+            ranges, vrange = result
+            self.__pending = False
+
+            log.debug('Calculated %s brick ranges for %s (shape: %s)',
+                      self.name, imageTexture.name, ranges.shape[1:])
+
+            self.set(data=ranges, normaliseRange=vrange)
+
+        if thread is not None:
+            thread.enqueue(calc, onFinish=finish)
+        else:
+            calc()
+            finish()
@@ -10,6 +10,7 @@
    :nosignatures:
 
    numTextureDims
+   exceedsTextureLimits
    canUseFloatTextures
    oneChannelFormat
    getTextureType
@@ -78,6 +79,18 @@ def numTextureDims(shape):
     return len(shape)
 
 
+def exceedsTextureLimits(shape):
+    """Returns ``True`` if an image of the given 3D shape is too large to be
+    stored as a single texture (i.e. if :func:`numTextureDims` would raise an
+    error), ``False`` otherwise.
+    """
+    try:
+        numTextureDims(shape)
+        return False
+    except RuntimeError:
+        return True
+
+
 @memoize.memoize
 def canUseFloatTextures(nvals=1):
     """Returns ``True`` if this GL environment supports floating
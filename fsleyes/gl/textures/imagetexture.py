@@ -7,22 +7,30 @@
 """This module provides the :class:`ImageTexture` and :class:`.ImageTexture2D`
 classes, :class:`.Texture3D` and :class:`.Texture2D` classes for storing an
 :class:`.Image` instance.
+
+The :class:`VolumePrefetchRing` is used by both texture types to pre-load and
+prepare the volumes either side of the currently displayed volume of a 4D
+image, so that stepping through the volumes (e.g. in movie mode) does not
+have to wait for the data to be read from disk.
 """
 
 
 import logging
+import threading
 import contextlib
+import collections
 import collections.abc as abc
 
 import numpy as np
 
-import fsl.transform.affine             as affine
-import fsleyes.data.imagewrapper        as imagewrapper
-import fsleyes_widgets                  as fwidgets
-import fsleyes.displaycontext.niftiopts as niftiopts
-import fsleyes.gl.textures.data         as texdata
-import fsleyes.gl.textures.texture2d    as texture2d
-import fsleyes.gl.textures.texture3d    as texture3d
+import fsl.transform.affine                    as affine
+import fsleyes.data.imagewrapper               as imagewrapper
+import fsleyes_widgets                         as fwidgets
+import fsleyes.displaycontext.niftiopts        as niftiopts
+import fsleyes.gl.textures.data                as texdata
+import fsleyes.gl.textures.texture2d           as texture2d
+import fsleyes.gl.textures.texture3d           as texture3d
+import fsleyes.gl.textures.brickedimagetexture as bricked
 
 
 log = logging.getLogger(__name__)
@@ -31,19 +39,184 @@ log = logging.getLogger(__name__)
 def createImageTexture(name, image, *args, **kwargs):
     """Creates and returns an appropriate texture type (either
     :class:`ImageTexture` or :class:`ImageTexture2D`) for the given image.
+
+    If the ``allowBricks`` argument is ``True``, and the image is too large
+    to be stored in a single texture, a :class:`.BrickedImageTexture` is
+    returned. Otherwise a :exc:`RuntimeError` is raised for such images.
     """
 
+    allowBricks = kwargs.pop('allowBricks', False)
+
+    if allowBricks and texdata.exceedsTextureLimits(image.shape[:3]):
+        return bricked.BrickedImageTexture(name, image, *args, **kwargs)
+
     ndims = texdata.numTextureDims(image.shape[:3])
 
     if ndims == 3: return ImageTexture(  name, image, *args, **kwargs)
     else:          return ImageTexture2D(name, image, *args, **kwargs)
 
 
+class VolumePrefetchRing:
+    """The ``VolumePrefetchRing`` is a small, bounded, thread-safe cache of
+    image volumes, used by the :class:`ImageTextureBase` class.
+
+    Each entry in the ring is identified by a key (a ``(volume, channel)``
+    tuple), and contains the raw volume data, as passed to the
+    :meth:`.Texture.set` method, and, optionally, the result of passing that
+    data through :meth:`.Texture.prepareData`, along with the texture
+    settings that were used to prepare it.
+
+    When the ring is full, the least recently used entry is discarded.
+    """
+
+
+    def __init__(self, size):
+        """Create a ``VolumePrefetchRing``.
+
+        :arg size: Maximum number of volumes to store.
+        """
+        self.__size    = size
+        self.__lock    = threading.Lock()
+        self.__entries = collections.OrderedDict()
+
+
+    @property
+    def size(self):
+        """Returns the maximum number of volumes stored in this ring. """
+        return self.__size
+
+
+    def __len__(self):
+        """Returns the number of volumes currently stored in this ring. """
+        return len(self.__entries)
+
+
+    def __contains__(self, key):
+        """Returns ``True`` if the data for ``key`` is in this ring. """
+        return key in self.__entries
+
+
+    def keys(self):
+        """Returns a list of the keys of all volumes in this ring. """
+        with self.__lock:
+            return list(self.__entries.keys())
+
+
+    def get(self, key):
+        """Returns the raw data for the given ``key``, or ``None`` if it is
+        not in the ring.
+        """
+        with self.__lock:
+            entry = self.__entries.get(key, None)
+            if entry is None:
+                return None
+            self.__entries.move_to_end(key)
+            return entry[0]
+
+
+    def put(self, key, data, settings=None, prepared=None):
+        """Adds the raw ``data`` for the given ``key`` to the ring, evicting
+        the least recently used entry if necessary.
+
+        :arg key:      Volume key
+        :arg data:     Raw volume data
+        :arg settings: Texture settings used to create ``prepared``
+        :arg prepared: Result of passing ``data`` through
+                       :meth:`.Texture.prepareData`
+        """
+        with self.__lock:
+            self.__entries[key] = [data, settings, prepared]
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__size:
+                self.__entries.popitem(last=False)
+
+
+    def hasPrepared(self, key, settings):
+        """Returns ``True`` if the data for ``key`` has been prepared with the
+        given ``settings``, ``False`` otherwise.
+        """
+        with self.__lock:
+            entry = self.__entries.get(key, None)
+            return entry is not None and \
+                entry[2] is not None and \
+                entry[1] == settings
+
+
+    def getPrepared(self, data, settings):
+        """Returns the prepared version of ``data``, if ``data`` is in the
+        ring and was prepared with the given ``settings``. Otherwise returns
+        ``None``. Entries are matched by identity, not by value.
+        """
+        with self.__lock:
+            for entry in self.__entries.values():
+                if entry[0] is data:
+                    if entry[1] == settings:
+                        return entry[2]
+                    return None
+            return None
+
+
+    def setPrepared(self, data, settings, prepared):
+        """Stores the ``prepared`` version of ``data``, if ``data`` is in the
+        ring. Otherwise does nothing.
+        """
+        with self.__lock:
+            for entry in self.__entries.values():
+                if entry[0] is data:
+                    entry[1] = settings
+                    entry[2] = prepared
+                    break
+
+
+    def retain(self, keys):
+        """Discards all entries apart from those with the given ``keys``. """
+        keys = set(keys)
+        with self.__lock:
+            for key in list(self.__entries.keys()):
+                if key not in keys:
+                    self.__entries.pop(key)
+
+
+    def clear(self):
+        """Discards all entries. """
+        with self.__lock:
+            self.__entries.clear()
+
+
 class ImageTextureBase:
     """Base class shared by the :class:`ImageTexture` and
     :class:`ImageTexture2D` classes. Contains logic for retrieving a
     specific volume from a 3D + time or 2D + time :class:`.Image`, and
     for retrieving a specific channel from an RGB(A) ``Image``.
+
+
+    ``ImageTextureBase`` textures may be evicted by the :mod:`.resources`
+    module when a memory budget is in place - see :meth:`.Texture.evict`.
+    When an evicted texture is restored, the data for the current volume is
+    re-read from the image.
+
+
+    For 4D images, an ``ImageTextureBase`` may *prefetch* the volumes either
+    side of the current volume. When a new volume is displayed, a task is
+    enqueued on the texture :class:`.TaskThread` (see
+    :meth:`.Texture.getTaskThread`) which reads the neighbouring volumes, and
+    passes them through :meth:`.Texture.prepareData`. The results are stored
+    in a :class:`VolumePrefetchRing`, so that when one of those volumes is
+    subsequently displayed, the texture can be refreshed without having to
+    read or prepare the data again. Prefetching is only performed for
+    threaded textures.
+    """
+
+
+    prefetchDefault = 2
+    """Default value for the ``prefetch`` argument passed to :meth:`__init__`.
+    """
+
+
+    prefetchMaxBytes = 256 * 1048576
+    """Upper limit on the approximate amount of memory used by the volume
+    prefetch ring of a single texture. The number of volumes that are
+    prefetched is reduced so that this limit is not exceeded.
     """
 
 
@@ -90,20 +263,45 @@ class ImageTextureBase:
                 'image with nvals {}'.format(texnvals, imgnvals))
 
 
-    def __init__(self, image, nvals, ndims):
+    def __init__(self, image, nvals, ndims, prefetch=None):
         """Create an ``ImageTextureBase``
 
-        :arg image: The :class:`.Image`
-        :arg nvals: Number of values per texture element
-        :arg ndims: Number of texture dimensions
+        :arg image:    The :class:`.Image`
+        :arg nvals:    Number of values per texture element
+        :arg ndims:    Number of texture dimensions
+        :arg prefetch: Number of volumes either side of the current volume
+                       to prefetch, for 4D images. Defaults to
+                       :attr:`prefetchDefault`.
         """
 
         self.validateShape(image, nvals, ndims)
 
-        self.__name    = 'ImageTextureBase_{}'.format(id(self))
-        self.__image   = image
-        self.__volume  = None
-        self.__channel = None
+        if prefetch is None:
+            prefetch = ImageTextureBase.prefetchDefault
+
+        # Limit the number of prefetched volumes
+        # according to prefetchMaxBytes - we
+        # assume that each ring entry may hold
+        # two copies (raw and prepared) of the
+        # volume, each of at most 4 bytes/voxel
+        if len(image.shape) > 3 and nvals == 1 and prefetch > 0:
+            volBytes = np.prod(image.shape[:3]) * max(4, image.dtype.itemsize)
+            maxVols  = ImageTextureBase.prefetchMaxBytes // (2 * volBytes)
+            prefetch = int(min(prefetch, (maxVols - 1) // 2))
+        else:
+            prefetch = 0
+
+        if prefetch > 0: ring = VolumePrefetchRing(2 * prefetch + 1)
+        else:            ring = None
+
+        self.__name        = 'ImageTextureBase_{}'.format(id(self))
+        self.__image       = image
+        self.__volume      = None
+        self.__channel     = None
+        self.__prefetch    = prefetch
+        self.__ring        = ring
+        self.__prefetchGen = 0
+        self.__prefetchKey = None
 
         self.__image.register(self.__name,
                               self.__imageDataChanged,
@@ -115,7 +313,11 @@ class ImageTextureBase:
         """Must be called when this ``ImageTextureBase`` is no longer needed.
         """
         self.__image.deregister(self.__name, 'data')
-        self.__image = None
+        self.__image        = None
+        self.__prefetchGen += 1
+        self.__prefetchKey  = None
+        if self.__ring is not None:
+            self.__ring.clear()
 
 
     @property
@@ -125,6 +327,42 @@ class ImageTextureBase:
         return self.__image
 
 
+    @property
+    def evictable(self):
+        """Overrides :meth:`.Texture.evictable`. Returns ``True``, as the
+        texture data can always be re-read from the image.
+        """
+        return True
+
+
+    def evict(self):
+        """Overrides :meth:`.Texture.evict`. Evicts the texture, releasing
+        the texture data and any prefetched volumes.
+        """
+        super().evict(releaseData=True)
+        if self.evicted and self.__ring is not None:
+            self.__prefetchKey = None
+            self.__ring.clear()
+
+
+    def restore(self):
+        """Overrides :meth:`.Texture.restore`. Re-reads the data for the
+        current volume/channel from the image, and refreshes the texture.
+        """
+        if not self.evicted:
+            return
+        super().restore()
+        self.set(volRefresh=True)
+
+
+    @property
+    def prefetchRing(self):
+        """Returns the :class:`VolumePrefetchRing` used by this
+        ``ImageTextureBase``, or ``None`` if prefetching is disabled.
+        """
+        return self.__ring
+
+
     @property
     def volume(self):
         """For :class:`.Image` instances with more than three dimensions,
@@ -222,8 +460,7 @@ class ImageTextureBase:
         self.__channel = channel
 
         if volRefresh:
-            data = self.__getData(volume, channel)
-            data = self.shapeData(data)
+            data = self.__getVolume(volume, channel)
         else:
             data = None
 
@@ -233,6 +470,174 @@ class ImageTextureBase:
         return kwargs
 
 
+    def prepareData(self, data):
+        """Overrides :meth:`.Texture.prepareData`. If the given ``data`` is a
+        volume which has already been prepared by the prefetch task, the
+        prepared data is returned. Otherwise the data is prepared, and
+        stored in the prefetch ring.
+        """
+
+        ring = self.__ring
+
+        if ring is None:
+            return super().prepareData(data)
+
+        settings = self.__prepareSettings()
+        prepared = ring.getPrepared(data, settings)
+
+        if prepared is None:
+            prepared = super().prepareData(data)
+            ring.setPrepared(data, settings, prepared)
+
+        return prepared
+
+
+    def prefetchVolumes(self):
+        """Called by the sub-class ``set`` methods. If prefetching is enabled,
+        and the texture is threaded, enqueues a task on the texture
+        :class:`.TaskThread` which reads and prepares the volumes either side
+        of the current volume. Volumes ahead of the current volume are
+        prefetched first, and the task is abandoned as soon as a different
+        volume is selected.
+
+        A prefetch task is only enqueued when the current volume has changed
+        since the last call - changes to other texture settings do not
+        trigger a prefetch. Data is read and prepared without holding the
+        :attr:`.Texture.dataLock`, which is only acquired to store the
+        result, so that texture refreshes are not blocked by disk reads.
+        """
+
+        ring       = self.__ring
+        volume     = self.__volume
+        channel    = self.__channel
+        taskThread = self.getTaskThread()
+
+        if ring is None or volume is None or taskThread is None:
+            return
+
+        # Only prefetch when the volume
+        # has changed since the last call
+        curKey = self.__volumeKey(volume, channel)
+        if curKey == self.__prefetchKey:
+            return
+        self.__prefetchKey = curKey
+
+        # Volumes are prefetched along
+        # the fourth dimension only
+        nvols  = self.image.shape[3]
+        cur    = volume[0]
+        window = [cur]
+        for off in range(1, self.__prefetch + 1):
+            window.extend((cur + off, cur - off))
+
+        keys = [self.__volumeKey([v] + list(volume[1:]), channel)
+                for v in window if 0 <= v < nvols]
+
+        ring.retain(keys)
+
+        # Any prefetch task which is currently
+        # running will stop when it sees that
+        # the generation counter has changed.
+        self.__prefetchGen += 1
+        gen      = self.__prefetchGen
+        taskName = '{}_{}_prefetch'.format(type(self).__name__, id(self))
+
+        def cancelled():
+            return self.destroyed or gen != self.__prefetchGen
+
+        def prefetch():
+            for key in keys[1:]:
+
+                if cancelled():
+                    return
+
+                settings = self.__prepareSettings()
+
+                if ring.hasPrepared(key, settings):
+                    continue
+
+                # The data is read and prepared
+                # without holding the data lock,
+                # so that texture refreshes are
+                # not held up by disk reads.
+                data = ring.get(key)
+                if data is None:
+                    data = self.__getData(list(key[0]), key[1])
+                    data = self.shapeData(data)
+
+                if cancelled():
+                    return
+
+                prepared = super(ImageTextureBase, self).prepareData(data)
+
+                with self.dataLock:
+                    if cancelled():
+                        return
+
+                    # The settings may have been changed
+                    # on the main thread while we were
+                    # preparing the data, in which case
+                    # the prepared data is discarded.
+                    if settings == self.__prepareSettings():
+                        ring.put(key, data, settings, prepared)
+                    else:
+                        ring.put(key, data)
+
+                log.debug('%s: prefetched volume %s', self.name, key[0])
+
+        taskThread.dequeue(taskName)
+        taskThread.enqueue(prefetch, taskName=taskName)
+
+
+    def __prepareSettings(self):
+        """Returns a tuple containing the texture settings which affect the
+        result of :meth:`.Texture.prepareData`. Used to determine whether
+        data in the prefetch ring needs to be re-prepared.
+        """
+        scales = self.scales
+        if scales is not None:
+            scales = tuple(scales)
+        return (self.prefilter,
+                self.prefilterRange,
+                self.resolution,
+                scales,
+                self.normalise,
+                self.normaliseRange)
+
+
+    @staticmethod
+    def __volumeKey(volume, channel):
+        """Returns a key for the given volume/channel, for use with the
+        :class:`VolumePrefetchRing`.
+        """
+        if volume is not None:
+            volume = tuple(volume)
+        return volume, channel
+
+
+    def __getVolume(self, volume, channel):
+        """Called by :meth:`prepareSetArgs`. Returns the shaped data for the
+        specified ``volume`` and ``channel``, retrieving it from the prefetch
+        ring if possible.
+        """
+
+        ring = self.__ring
+
+        if ring is None:
+            return self.shapeData(self.__getData(volume, channel))
+
+        key  = self.__volumeKey(volume, channel)
+        data = ring.get(key)
+
+        if data is None:
+            data = self.shapeData(self.__getData(volume, channel))
+            ring.put(key, data)
+        else:
+            log.debug('%s: using prefetched volume %s', self.name, volume)
+
+        return data
+
+
     def __getData(self, volume, channel):
         """Extracts data from the :class:`.Image` for use as texture data.
 
@@ -300,6 +705,12 @@ class ImageTextureBase:
         #      data range notification; perhaps
         #      you can use this somehow.
 
+        # Any prefetched volumes are now out of date
+        if self.__ring is not None:
+            self.__prefetchGen += 1
+            self.__prefetchKey  = None
+            self.__ring.clear()
+
         # If the data change was performed using
         # normal array indexing, we can just replace
         # that part of the image texture.
@@ -390,6 +801,10 @@ class ImageTexture(ImageTextureBase, texture3d.Texture3D):
 
         :arg volume: Initial volume index/indices, for >3D images.
 
+        :arg prefetch: Number of volumes either side of the current volume
+                       to prefetch, for 4D images. See
+                       :class:`ImageTextureBase`.
+
         All other arguments are passed through to the
         :meth:`.Texture3D.__init__` method, and thus used as initial texture
         settings.
@@ -400,6 +815,7 @@ class ImageTexture(ImageTextureBase, texture3d.Texture3D):
         """
 
         nvals              = kwargs.get('nvals', 1)
+        prefetch           = kwargs.pop('prefetch', None)
         kwargs['nvals']    = nvals
         kwargs['scales']   = image.pixdim[:3]
         kwargs['threaded'] = kwargs.get('threaded',
@@ -408,7 +824,7 @@ class ImageTexture(ImageTextureBase, texture3d.Texture3D):
         if kwargs['threaded'] is None:
             kwargs['threaded'] = fwidgets.haveGui()
 
-        ImageTextureBase   .__init__(self, image, nvals, 3)
+        ImageTextureBase   .__init__(self, image, nvals, 3, prefetch)
         texture3d.Texture3D.__init__(self, name, **kwargs)
 
 
@@ -426,7 +842,9 @@ class ImageTexture(ImageTextureBase, texture3d.Texture3D):
         :returns: ``True`` if any settings have changed and the
                   ``ImageTexture`` is to be refreshed , ``False`` otherwise.
         """
-        return texture3d.Texture3D.set(self, **self.prepareSetArgs(**kwargs))
+        result = texture3d.Texture3D.set(self, **self.prepareSetArgs(**kwargs))
+        self.prefetchVolumes()
+        return result
 
 
 class ImageTexture2D(ImageTextureBase, texture2d.Texture2D):
@@ -443,11 +861,12 @@ class ImageTexture2D(ImageTextureBase, texture2d.Texture2D):
         """Create an ``ImageTexture2D``. """
 
         nvals            = kwargs.get('nvals', 1)
+        prefetch         = kwargs.pop('prefetch', None)
         kwargs['nvals']  = nvals
         kwargs['border'] = [0, 0, 0, 0]
         kwargs['scales'] = image.pixdim[:3]
 
-        ImageTextureBase   .__init__(self, image, nvals, 2)
+        ImageTextureBase   .__init__(self, image, nvals, 2, prefetch)
         texture2d.Texture2D.__init__(self, name, **kwargs)
 
 
@@ -465,4 +884,6 @@ class ImageTexture2D(ImageTextureBase, texture2d.Texture2D):
         :returns: ``True`` if any settings have changed and the
                   ``ImageTexture`` is to be refreshed , ``False`` otherwise.
         """
-        return texture2d.Texture2D.set(self, **self.prepareSetArgs(**kwargs))
+        result = texture2d.Texture2D.set(self, **self.prepareSetArgs(**kwargs))
+        self.prefetchVolumes()
+        return result
@@ -30,7 +30,7 @@ class LookupTableTexture(texture.Texture):
 
 
     A :class:`.LookupTable` stores a collection of label values (assumed to be
-    unsigned 16 bit integers), and colours associated with each label. This
+    unsigned integers), and colours associated with each label. This
     mapping of ``{label : colour}`` is converted into a ``numpy`` array
     of size :math:`max(labels)\\times 3` containing the lookup table, where
     a label value can be used as an array index to retrieve the corresponding
@@ -39,15 +39,18 @@ class LookupTableTexture(texture.Texture):
 
 
     As OpenGL textures are indexed by coordinates in the range ``[0.0, 1.0]``,
-    you will need to divide label values by :math:`max(labels)` to convert
+    you will need to divide label values by :meth:`numLabels` to convert
     them into texture coordinates.
 
-    .. note:: Currently, the maximum label value in a lookup table cannot be
-              greater than the maximum size of an OpenGL texture - this limit
-              differs between platforms. In the future, if this class needs
-              to be modified to support larger lookup tables, it will need to
-              be changed to use a 2D texture, and users will need to
-              ravel/unravel texture indices between 1D and 2D coordinates.
+
+    The maximum label value in a lookup table cannot be greater than the
+    maximum size of an OpenGL texture - this limit differs between platforms.
+    For lookup tables with large label values, the ``dense`` option may be
+    used - in this case the texture contains one entry for each label, in
+    ascending order, so its size is determined by the number of labels rather
+    than by the maximum label value. Label data must then be converted into
+    indices via the :meth:`.LookupTable.remap` method before being used as
+    texture coordinates.
     """
 
     def __init__(self, name):
@@ -60,6 +63,8 @@ class LookupTableTexture(texture.Texture):
         self.__alpha      = None
         self.__brightness = None
         self.__contrast   = None
+        self.__dense      = False
+        self.__numLabels  = 0
 
         texture.Texture.__init__(self, name, 1, 4)
 
@@ -76,6 +81,9 @@ class LookupTableTexture(texture.Texture):
                        0.5.
         ``contrast``   Contrast, a value between 0.0 and 1.0. Defaults to
                        0.5.
+        ``dense``      If ``True``, the texture contains one entry for each
+                       label, rather than one entry for each value between
+                       0 and the maximum label value. Defaults to ``False``.
         ============== ======================================================
         """
 
@@ -83,15 +91,32 @@ class LookupTableTexture(texture.Texture):
         alpha      = kwargs.get('alpha',      self)
         brightness = kwargs.get('brightness', self)
         contrast   = kwargs.get('contrast',   self)
+        dense      = kwargs.get('dense',      self)
 
         if lut        is not self: self.__lut        = lut
         if alpha      is not self: self.__alpha      = alpha
         if brightness is not self: self.__brightness = brightness
         if contrast   is not self: self.__contrast   = contrast
+        if dense      is not self: self.__dense      = dense
 
         self.__refresh()
 
 
+    @property
+    def dense(self):
+        """Returns ``True`` if this ``LookupTableTexture`` contains one entry
+        for each label, ``False`` if it contains one entry for each value
+        up to the maximum label value.
+        """
+        return self.__dense
+
+
+    @property
+    def numLabels(self):
+        """Returns the number of entries in this ``LookupTableTexture``. """
+        return self.__numLabels
+
+
     def refresh(self):
         """Forces a refresh of this ``LookupTableTexture``. This method should
         be called when the :class:`.LookupTable` has changed, so that the
@@ -114,23 +139,36 @@ class LookupTableTexture(texture.Texture):
         if brightness is None: brightness = 0.5
         if contrast   is None: contrast   = 0.5
 
-        # Enough memory is allocated for the lut texture
-        # so that shader programs can use label values
-        # as indices into the texture. Not very memory
-        # efficient, but greatly reduces complexity.
-        nvals  = lut.max() + 1
-        data   = np.zeros((nvals, 4), dtype=np.uint8)
-
-        for lbl in lut:
-
-            value  = lbl.value
-            colour = fslcmaps.applyBricon(lbl.colour, brightness, contrast)
+        values, colours, enabled = lut.arrays()
 
-            data[value, :3] = [np.floor(c * 255) for c in colour[:3]]
-
-            if not lbl.enabled:     data[value, 3] = 0
-            elif alpha is not None: data[value, 3] = 255 * alpha
-            else:                   data[value, 3] = 255
+        # In dense mode, the texture contains one
+        # entry for each label, and shader programs
+        # must use remapped label data (see
+        # LookupTable.remap). Otherwise enough memory
+        # is allocated for the lut texture so that
+        # shader programs can use label values as
+        # indices into the texture. Not very memory
+        # efficient, but greatly reduces complexity.
+        if self.__dense:
+            nvals   = max(1, len(values))
+            indices = np.arange(len(values))
+        else:
+            nvals   = lut.max() + 1
+            indices = values
+
+        if alpha is None:
+            alpha = 1
+
+        data = np.zeros((nvals, 4), dtype=np.uint8)
+
+        if len(values) > 0:
+            colours           = fslcmaps.applyBricon(colours,
+                                                     brightness,
+                                                     contrast)
+            data[indices, :3] = np.floor(colours * 255)
+            data[indices,  3] = np.where(enabled, 255 * alpha, 0)
+
+        self.__numLabels = nvals
 
         data = data.ravel('C')
 
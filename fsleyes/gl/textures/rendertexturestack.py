@@ -93,6 +93,15 @@ class RenderTextureStack:
         self.__destroyTextures()
 
 
+    @property
+    def nbytes(self):
+        """Returns the approximate number of bytes used by all of the
+        :class:`.RenderTexture` instances in this ``RenderTextureStack``.
+        Used by the :mod:`.resources` module for memory accounting.
+        """
+        return sum(t.nbytes for t in self.__textures)
+
+
     def getGLObject(self):
         """Returns the :class:`.GLObject` associated with this
         ``RenderTextureStack``.
@@ -10,6 +10,7 @@ for all other FSLeyes texture types. See also the :class:`.Texture2D` and
 """
 
 
+import              time
 import              logging
 import              contextlib
 import functools as ft
@@ -24,6 +25,7 @@ from   fsleyes_widgets.utils import status
 from   fsleyes               import strings
 
 import fsleyes.gl                as fslgl
+import fsleyes.gl.resources      as glresources
 import fsleyes.gl.textures.data  as texdata
 from   fsleyes.utils         import lazyimport
 
@@ -49,6 +51,8 @@ class TextureBase:
        target
        ndim
        nvals
+       lastUsed
+       touch
        isBound
        bound
        bindTexture
@@ -95,6 +99,7 @@ class TextureBase:
         self.__nvals       = nvals
         self.__bound       = 0
         self.__textureUnit = None
+        self.__lastUsed    = time.time()
 
 
     def __del__(self):
@@ -171,6 +176,21 @@ class TextureBase:
         return self.__nvals
 
 
+    @property
+    def lastUsed(self):
+        """Returns the time (as returned by ``time.time()``) at which this
+        texture was last bound. This is used by the :mod:`.resources` module
+        to determine which textures should be evicted when a memory budget
+        is in place.
+        """
+        return self.__lastUsed
+
+
+    def touch(self):
+        """Updates the :meth:`lastUsed` time of this texture. """
+        self.__lastUsed = time.time()
+
+
     def isBound(self):
         """Returns ``True`` if this texture is currently bound, ``False``
         otherwise.
@@ -212,6 +232,7 @@ class TextureBase:
             gl.glBindTexture(self.__ttype, self.__texture)
 
             self.__textureUnit = textureUnit
+            self.touch()
 
         self.__bound += 1
 
@@ -488,6 +509,7 @@ class Texture(notifier.Notifier, TextureBase, TextureSettingsMixin):
        internalFormat
        data
        preparedData
+       nbytes
 
 
     When a ``Texture`` is created, and when its settings are changed, it may
@@ -515,6 +537,13 @@ class Texture(notifier.Notifier, TextureBase, TextureSettingsMixin):
 
 
     See the :mod:`.resources` module for a method of sharing texture resources.
+
+
+    The :mod:`.resources` module may also *evict* a texture in order to keep
+    within a memory budget, via the :meth:`evict` method. Textures which are
+    able to regenerate their data (e.g. the :class:`.ImageTexture`) return
+    ``True`` from :meth:`evictable`. An evicted texture is transparently
+    re-created, via :meth:`restore`, when :meth:`ready` is next called.
     """
 
 
@@ -583,6 +612,7 @@ class Texture(notifier.Notifier, TextureBase, TextureSettingsMixin):
                              'must be specified')
 
         self.__ready    = False
+        self.__evicted  = False
         self.__threaded = threaded
 
         # The data, type and shape are
@@ -650,11 +680,106 @@ class Texture(notifier.Notifier, TextureBase, TextureSettingsMixin):
 
     def ready(self):
         """Returns ``True`` if this ``Texture`` is ready to be used,
-        ``False`` otherwise.
+        ``False`` otherwise. If this ``Texture`` has been evicted, it is
+        restored (see :meth:`restore`), and ``False`` is returned.
         """
+        if self.__evicted:
+            self.restore()
         return self.__ready
 
 
+    @property
+    def evictable(self):
+        """Returns ``True`` if this ``Texture`` can be evicted, ``False``
+        otherwise. This implementation returns ``False``; sub-classes
+        which are able to regenerate their data may override it.
+        """
+        return False
+
+
+    @property
+    def evicted(self):
+        """Returns ``True`` if this ``Texture`` has been evicted, ``False``
+        otherwise.
+        """
+        return self.__evicted
+
+
+    def evict(self, releaseData=False):
+        """Releases the GL texture storage and the prepared data for this
+        ``Texture``. The texture will be re-created when :meth:`ready` is
+        next called. Textures which are not :meth:`evictable`, or which are
+        being refreshed, are not evicted.
+
+        :arg releaseData: If ``True``, the reference to the :meth:`data` is
+                          also cleared. This should only be used by
+                          sub-classes which are able to regenerate the data
+                          in :meth:`restore`.
+        """
+
+        with self.dataLock:
+            if not self.evictable or \
+               self.destroyed     or \
+               self.__evicted     or \
+               not self.__ready:
+                return
+
+            log.debug('Evicting texture %s', self.name)
+
+            self.recreateHandle()
+            self.__ready        = False
+            self.__evicted      = True
+            self.__preparedData = None
+            if releaseData:
+                self.__data = None
+
+
+    def restore(self):
+        """Restores this ``Texture`` after it has been evicted. This
+        implementation calls :meth:`refresh` if the data is still available.
+        Sub-classes which call :meth:`evict` with ``releaseData=True`` must
+        override this method to regenerate the data.
+        """
+        if not self.__evicted:
+            return
+
+        log.debug('Restoring evicted texture %s', self.name)
+
+        self.__evicted = False
+        if self.__data is not None:
+            self.refresh()
+
+
+    @property
+    def nbytes(self):
+        """Returns the approximate number of bytes used to store this
+        ``Texture`` on the GPU, or ``0`` if it has not yet been configured.
+        """
+
+        if self.__evicted or self.__texDtype is None:
+            return 0
+
+        nbytes = {gl.GL_UNSIGNED_BYTE  : 1,
+                  gl.GL_UNSIGNED_SHORT : 2,
+                  gl.GL_UNSIGNED_INT   : 4,
+                  gl.GL_FLOAT          : 4}.get(self.__texDtype, 4)
+
+        if self.__preparedData is not None:
+            return int(self.__preparedData.size * nbytes)
+        elif self.__shape is not None:
+            return int(np.prod(self.__shape) * self.nvals * nbytes)
+        else:
+            return 0
+
+
+    def getTaskThread(self):
+        """If this ``Texture`` was created with ``threaded=True``, returns the
+        :class:`.TaskThread` that is used to prepare texture data. Otherwise
+        returns ``None``.
+        """
+        return self.__taskThread
+
+
     @property
     def dataLock(self):
         """Return a ``threading.RLock`` that is used to limit concurrent
@@ -956,6 +1081,15 @@ class Texture(notifier.Notifier, TextureBase, TextureSettingsMixin):
 
             self.__ready = True
 
+            # The texture size may have
+            # changed, so make sure that
+            # we're within the memory
+            # budget. We mark this texture
+            # as recently used, so that
+            # it is not evicted.
+            self.touch()
+            glresources.enforceBudget()
+
             if notify:
                 self.notify()
             if callback is not None:
@@ -1015,18 +1149,30 @@ class Texture(notifier.Notifier, TextureBase, TextureSettingsMixin):
             newshape = list(data.shape) + [1] * (self.ndim - len(data.shape))
             data     = data.reshape(newshape)
 
-        data = texdata.prepareData(
+        data = self.prepareData(data)[0]
+
+        self.doPatch(data, offset)
+
+        self.notify()
+
+
+    def prepareData(self, data):
+        """Passes the given ``data`` through the :func:`.data.prepareData`
+        function, using the current texture settings, and returns the result.
+
+        This method is called (potentially on a separate thread) whenever the
+        texture data needs to be prepared. It may be overridden by sub-classes
+        which are able to re-use previously prepared data (e.g. the
+        :class:`.ImageTexture` class).
+        """
+        return texdata.prepareData(
             data,
             prefilter=self.prefilter,
             prefilterRange=self.prefilterRange,
             resolution=self.resolution,
             scales=self.scales,
             normalise=self.normalise,
-            normaliseRange=self.normaliseRange)[0]
-
-        self.doPatch(data, offset)
-
-        self.notify()
+            normaliseRange=self.normaliseRange)
 
 
     def doRefresh(self):
@@ -1106,8 +1252,8 @@ class Texture(notifier.Notifier, TextureBase, TextureSettingsMixin):
     def __prepareTextureData(self):
         """Prepare the texture data.
 
-        This method passes the stored data to the :func:`.data.prepareData`
-        function and then stores references to its return valuesa as
+        This method passes the stored data to the :meth:`prepareData`
+        method and then stores references to its return valuesa as
         attributes on this ``Texture`` instance:
 
         ==================== =============================================
@@ -1123,14 +1269,7 @@ class Texture(notifier.Notifier, TextureBase, TextureSettingsMixin):
         ==================== =============================================
         """
 
-        data, voxValXform, invVoxValXform = texdata.prepareData(
-            self.__data,
-            prefilter=self.prefilter,
-            prefilterRange=self.prefilterRange,
-            resolution=self.resolution,
-            scales=self.scales,
-            normalise=self.normalise,
-            normaliseRange=self.normaliseRange)
+        data, voxValXform, invVoxValXform = self.prepareData(self.__data)
 
         self.__preparedData   = data
         self.__dtype          = data.dtype
@@ -683,11 +683,12 @@ def deserialiseLayout(layout):
                 if isinstance(att, type) and issubclass(att, basetype):
                     panels.append(att)
 
-        # plugins
-        if paneltype == 'control':
-            panels.extend(plugins.listControls().values())
-        else:
-            panels.extend(plugins.listViews().values())
+        # plugins - only the module which
+        # provides the panel is imported
+        if paneltype == 'control': plugin = plugins.lookupControl(panelname)
+        else:                      plugin = plugins.lookupView(   panelname)
+        if plugin is not None:
+            panels.append(plugin)
 
         for panel in panels:
             if panel.__name__ == panelname:
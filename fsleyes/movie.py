@@ -0,0 +1,524 @@
+#!/usr/bin/env python
+#
+# movie.py - Logic for playing and recording movies.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module contains logic for stepping through, and recording, *movies* -
+sequences of frames which are generated by changing the displayed volume of a
+4D image, by moving the display location along the X, Y, or Z axis, or by
+rotating a 3D scene.
+
+The following functions are used by the :class:`.CanvasPanel` to implement
+its movie mode, and by the :mod:`.render` module to generate movies
+off-screen:
+
+.. autosummary::
+   :nosignatures:
+
+   canRunMovie
+   getMovieFrame
+   doMovieUpdate
+   rotateScene
+
+
+The :class:`MovieContext` class is used to detect when a complete movie has
+been recorded.
+
+
+Recorded frames are written to a file one at a time, via one of the following
+*movie writer* classes, so that the memory required to record a movie does
+not depend on its length:
+
+.. autosummary::
+   :nosignatures:
+
+   GifWriter
+   APNGWriter
+   RawWriter
+   openMovieWriter
+"""
+
+
+import os.path as op
+import            sys
+import            zlib
+import            struct
+import            logging
+
+import numpy   as np
+
+import fsl.transform.affine as affine
+
+
+log = logging.getLogger(__name__)
+
+
+def canRunMovie(overlay, opts, axis):
+    """Returns ``True`` or ``False``, depending on whether a movie can be
+    played for the given ``overlay`` along the given ``axis`` (``0``, ``1``,
+    or ``2`` for the display X/Y/Z axes, or ``3`` for time).
+    """
+
+    import fsl.data.image         as fslimage
+    import fsl.data.mesh          as fslmesh
+    import fsleyes.displaycontext as displayctx
+
+    # 3D movies are good for all overlays
+    if axis < 3:
+        return True
+
+    # 4D Nifti images are all good
+    if isinstance(overlay, fslimage.Nifti) and \
+       len(overlay.shape) > 3              and \
+       overlay.shape[3] > 1                and \
+       isinstance(opts, displayctx.VolumeOpts):
+        return True
+
+    # Mesh surfaces with N-D
+    # vertex data are all good
+    if isinstance(overlay, fslmesh.Mesh) and \
+       opts.vertexDataLen() > 1:
+        return True
+
+    return False
+
+
+def getMovieFrame(displayCtx, overlay, opts, axis):
+    """Returns the current movie frame for the given overlay.
+
+    A movie frame is typically a sequentially increasing number in
+    some minimum/maximum range, e.g. a voxel or volume index.
+    """
+
+    def nifti():
+        if axis < 3: return opts.getVoxel(vround=False)[axis]
+        else:        return opts.volume
+
+    def mesh():
+        if axis < 3: return other()
+        else:        return opts.vertexDataIndex
+
+    def other():
+        return displayCtx.location.getPos(axis)
+
+    import fsl.data.image as fslimage
+    import fsl.data.mesh  as fslmesh
+
+    if   isinstance(overlay, fslimage.Nifti): return nifti()
+    elif isinstance(overlay, fslmesh.Mesh):   return mesh()
+    else:                                     return other()
+
+
+def doMovieUpdate(displayCtx, overlay, opts, axis):
+    """Updates the properties on the given ``opts`` instance (or the
+    ``displayCtx``) to move forward one frame in the movie.
+
+    :returns:   A value which identifies the current movie frame. This may
+                be a volume or voxel index, or a world coordinate location
+                on one axis.
+    """
+
+    def nifti():
+
+        limit = overlay.shape[axis] - 1
+
+        # If this function has been called off
+        # the props event queue, all listeners on
+        # the opts.volume or DisplayContext.location
+        # properties should be called immediately,
+        # in these assignments.
+        #
+        # When the movie axis == 3 (time), this means
+        # that image texture refreshes should be
+        # triggered and, after the opts.volume
+        # assignment, all affected GLObjects should
+        # return ready() == False.
+        if axis == 3:
+            if opts.volume >= limit: opts.volume  = 0
+            else:                    opts.volume += 1
+
+            frame = opts.volume
+
+        else:
+            # voxel location may not be an integer,
+            # so use mod limit when wrapping around.
+            voxel = opts.getVoxel(vround=False)
+            if voxel[axis] >= limit: voxel[axis]  = voxel[axis] % limit
+            else:                    voxel[axis] += 1
+
+            displayCtx.location = opts.transformCoords(
+                voxel, 'voxel', 'display')
+
+            frame = voxel[axis]
+        return frame
+
+    def mesh():
+
+        if axis == 3:
+            limit = opts.vertexDataLen() - 1
+            val   = opts.vertexDataIndex
+
+            if val >= limit: val  = val % limit
+            else:            val += 1
+
+            opts.vertexDataIndex = val
+
+            return val
+
+        else:
+            return other()
+
+    def other():
+
+        bmin, bmax = opts.bounds.getRange(axis)
+        delta      = (bmax - bmin) / 75.0
+        pos        = displayCtx.location.getPos(axis)
+
+        if pos >= bmax: pos = bmin + (pos % bmax)
+        else:           pos = pos  + delta
+
+        displayCtx.location.setPos(axis, pos)
+        return pos
+
+    import fsl.data.image as fslimage
+    import fsl.data.mesh  as fslmesh
+
+    if   isinstance(overlay, fslimage.Nifti): frame = nifti()
+    elif isinstance(overlay, fslmesh.Mesh):   frame = mesh()
+    else:                                     frame = other()
+
+    return frame
+
+
+def rotateScene(rotation, axis, rate):
+    """Used for 3D movies. Rotates the given 3D scene ``rotation`` matrix by
+    a small amount about the given ``axis``, and returns the new rotation
+    matrix.
+
+    :arg rotation: Current ``(3, 3)`` or ``(4, 4)`` rotation matrix
+    :arg axis:     Axis to rotate about (``0``, ``1``, or ``2``)
+    :arg rate:     Rotation rate, a value between ``0`` and ``1``.
+    """
+
+    rate       = 0.1 + 0.9 * rate
+    rate       = rate * np.pi / 10
+    rots       = [0, 0, 0]
+    rots[axis] = rate
+
+    xform = affine.axisAnglesToRotMat(*rots)
+    return affine.concat(xform, rotation)
+
+
+class MovieContext:
+    """Used when recording a movie. Stores the values of captured frames,
+    and contains logic to detect when enough frames have been captured.
+    """
+
+    def __init__(self, is3d):
+        """Create a ``MovieContext``.
+
+        If ``is3d is True``, it is assumed that we are capturing a movie
+        from a :class:`.Scene3DPanel` along the X/Y/Z axes (i.e. the scene
+        is rotating around).
+
+        Otherwise is is assumed that we are capturing a movie through time,
+        or along the X/Y/Z axes in 2D (i.e. scrolling through slices in
+        an :class:`.OrthoView`).
+        """
+        self.is3d       = is3d
+        self.looped     = False
+        self.cancelled  = False
+        self.startFrame = None
+        self.images     = []
+        self.frames     = []
+
+    def addFrame(self, frame, image=None):
+        """Save a ref to a movie frame and, if provided, an associated
+        screenshot.
+        """
+        if image is not None:
+            self.images.append(image)
+        self.frames.append(frame)
+
+    def processFrame(self, frame):
+        """Return true if the movie has completed. The provided ``frame``
+        is the value of the next frame that would be captured.
+        """
+        # The 3D X/Y/Z movie mode performs rotations,
+        # rather than moving the display location
+        # through the X/Y/Z axes. The "frame" returned
+        # by getMovieFrame is a rotation matrix.  We
+        # convert these rotation matrices into
+        # rms-deviations (average deviation of the
+        # current frame from the starting frame), which
+        # has an inverted "V"-shaped wave form as the
+        # scene is rotated 360 degrees. So we continue
+        # capturing frames until the rmsdev of the
+        # current frame is:
+        #
+        #   - close to 0 (i.e. very similar to
+        #     the rotation matrix of the starting
+        #     frame), and
+        #
+        #   - less than the most recent frame (i.e.
+        #     has rotated past 180 degrees, and is
+        #     rotating back twoards the starting
+        #     point)
+
+        if self.is3d:
+
+            # save a ref to the starting rotation matrix
+            if len(self.frames) == 0:
+                self.startFrame = frame
+
+            # normalise the rotmat for this
+            # frame to the rms difference
+            # from the starting rotmat
+            frame = affine.rmsdev(self.startFrame, frame)
+
+            # Keep capturing frames until we
+            # have performed a full 360 degree
+            # rotation (rmsdev of current
+            # frame is decreasing towards 0)
+            if len(self.frames) > 1    and \
+               frame < self.frames[-1] and \
+               abs(frame) < 0.1:
+                return frame, True
+
+        # All other movie frames have a range
+        # (fmin, fmax) and start at some arbitrary
+        # point within this range. We capture frames
+        # until a full loop through this range has
+        # been completed.
+        else:
+            # detect when frame has wrapped around
+            # back to the beginning of the range
+            if not self.looped:
+                self.looped = (len(self.frames) > 1) and \
+                              (frame <= self.frames[-1])
+
+            if self.looped and frame >= self.frames[0]:
+                return frame, True
+
+        return frame, False
+
+
+class MovieWriter:
+    """Base class for the movie writer classes. A ``MovieWriter`` writes
+    frames to a file-like object, one at a time, as they are passed to the
+    :meth:`write` method. The :meth:`close` method must be called once all
+    frames have been written. ``MovieWriter`` instances can be used as
+    context managers.
+    """
+
+    def __init__(self, fileobj, delay=50, closefile=False):
+        """Create a ``MovieWriter``.
+
+        :arg fileobj:   Binary file-like object to write to.
+        :arg delay:     Delay between frames in milliseconds.
+        :arg closefile: If ``True``, ``fileobj`` is closed by :meth:`close`.
+        """
+        self.fileobj   = fileobj
+        self.delay     = delay
+        self.nframes   = 0
+        self.shape     = None
+        self.closefile = closefile
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        self.close()
+
+    def write(self, frame):
+        """Write a frame to the movie file.
+
+        :arg frame: ``uint8`` array of shape ``(height, width, 3)``
+                    or ``(height, width, 4)`` - the alpha channel
+                    is discarded.
+        """
+
+        frame = np.ascontiguousarray(frame[:, :, :3], dtype=np.uint8)
+
+        if self.shape is None:
+            self.shape = frame.shape
+        elif frame.shape != self.shape:
+            raise ValueError('All movie frames must have the same shape '
+                             f'({frame.shape} != {self.shape})')
+
+        self.writeFrame(frame)
+        self.nframes += 1
+
+    def writeFrame(self, frame):
+        """Must be implemented by sub-classes. Writes the given ``(height,
+        width, 3)`` ``uint8`` frame to the file.
+        """
+        raise NotImplementedError()
+
+    def finish(self):
+        """May be implemented by sub-classes. Called by :meth:`close` -
+        writes any remaining data to the file.
+        """
+
+    def close(self):
+        """Finishes writing the movie file. """
+        if self.fileobj is None:
+            return
+        try:
+            self.finish()
+            self.fileobj.flush()
+        finally:
+            if self.closefile:
+                self.fileobj.close()
+            self.fileobj = None
+
+
+class GifWriter(MovieWriter):
+    """Writes frames to an animated GIF file. Each frame is quantised to its
+    own 256 colour palette.
+    """
+
+    def writeFrame(self, frame):
+        """Quantises the frame and writes it to the GIF file. """
+
+        import PIL.Image          as Image
+        import PIL.GifImagePlugin as gifplugin
+
+        image = Image.fromarray(frame).quantize(256)
+
+        if self.nframes == 0:
+            header, _ = gifplugin.getheader(image, None, {'loop' : 0})
+            for chunk in header:
+                self.fileobj.write(chunk)
+
+        for chunk in gifplugin.getdata(image,
+                                       include_color_table=True,
+                                       duration=self.delay):
+            self.fileobj.write(chunk)
+
+    def finish(self):
+        """Writes the GIF trailer. """
+        if self.nframes > 0:
+            self.fileobj.write(b';')
+
+
+class APNGWriter(MovieWriter):
+    """Writes frames to an animated PNG file. The number of frames must be
+    stored at the beginning of an APNG file, so the file object must be
+    seekable - the frame count is updated when the writer is closed.
+    """
+
+    SIGNATURE = b'\x89PNG\r\n\x1a\n'
+    """PNG file signature. """
+
+
+    def __init__(self, *args, **kwargs):
+        """Create an ``APNGWriter``. All arguments are passed through to
+        :meth:`MovieWriter.__init__`.
+        """
+        MovieWriter.__init__(self, *args, **kwargs)
+        if not self.fileobj.seekable():
+            raise ValueError('APNG movies must be written to a seekable file')
+        self.__seqno     = 0
+        self.__actlStart = None
+
+
+    def __chunk(self, ctype, data):
+        """Writes a PNG chunk to the file. """
+        crc = zlib.crc32(ctype + data) & 0xffffffff
+        self.fileobj.write(struct.pack('>I', len(data)))
+        self.fileobj.write(ctype)
+        self.fileobj.write(data)
+        self.fileobj.write(struct.pack('>I', crc))
+
+
+    def writeFrame(self, frame):
+        """Compresses the frame and writes it to the APNG file. """
+
+        height, width = frame.shape[:2]
+
+        if self.nframes == 0:
+            self.fileobj.write(self.SIGNATURE)
+            self.__chunk(b'IHDR', struct.pack('>IIBBBBB',
+                                              width, height, 8, 2, 0, 0, 0))
+            # number of frames is
+            # written in finish()
+            self.__actlStart = self.fileobj.tell()
+            self.__chunk(b'acTL', struct.pack('>II', 0, 0))
+
+        self.__chunk(b'fcTL', struct.pack('>IIIIIHHBB',
+                                          self.__seqno,
+                                          width,
+                                          height,
+                                          0,
+                                          0,
+                                          int(self.delay),
+                                          1000,
+                                          0,
+                                          0))
+        self.__seqno += 1
+
+        # Each scanline is preceded by
+        # a filter type byte (0 - none)
+        rows        = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+        rows[:, 1:] = frame.reshape(height, width * 3)
+        data        = zlib.compress(rows.tobytes())
+
+        if self.nframes == 0:
+            self.__chunk(b'IDAT', data)
+        else:
+            self.__chunk(b'fdAT', struct.pack('>I', self.__seqno) + data)
+            self.__seqno += 1
+
+
+    def finish(self):
+        """Writes the PNG trailer, and updates the frame count. """
+
+        if self.nframes == 0:
+            return
+
+        self.__chunk(b'IEND', b'')
+
+        end = self.fileobj.tell()
+        self.fileobj.seek(self.__actlStart)
+        self.__chunk(b'acTL', struct.pack('>II', self.nframes, 0))
+        self.fileobj.seek(end)
+
+
+class RawWriter(MovieWriter):
+    """Writes frames as raw RGB data (e.g. to be piped into a video encoder
+    such as ``ffmpeg -f rawvideo -pix_fmt rgb24``).
+    """
+
+    def writeFrame(self, frame):
+        """Writes the frame to the file. """
+        self.fileobj.write(frame.tobytes())
+
+
+def openMovieWriter(filename, delay=50):
+    """Creates and returns a :class:`MovieWriter` for the given file. The
+    movie format is determined by the file suffix:
+
+     - ``.gif``: :class:`GifWriter`
+     - ``.png`` or ``.apng``: :class:`APNGWriter`
+     - ``.raw`` or ``.rgb``: :class:`RawWriter`
+
+    If ``filename`` is ``-``, raw frames are written to standard output.
+
+    :arg filename: File to save the movie to
+    :arg delay:    Delay between frames in milliseconds
+    """
+
+    if filename == '-':
+        return RawWriter(sys.stdout.buffer, delay)
+
+    suffix = op.splitext(filename)[1].lower()
+
+    if   suffix == '.gif':            cls = GifWriter
+    elif suffix in ('.png', '.apng'): cls = APNGWriter
+    elif suffix in ('.raw', '.rgb'):  cls = RawWriter
+    else:
+        raise ValueError(f'Unsupported movie format: {filename}')
+
+    return cls(open(filename, 'wb'), delay, closefile=True)
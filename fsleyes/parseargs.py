@@ -270,6 +270,7 @@ import fsleyes.autodisplay    as autodisplay
 import fsleyes.colourmaps     as colourmaps
 import fsleyes.data           as dutils
 import fsleyes.displaycontext as fsldisplay
+import fsleyes.gl.resources   as glresources
 import fsleyes.plugins        as plugins
 import fsleyes.utils          as fslutils
 
@@ -447,7 +448,8 @@ OPTIONS = td.TypeDict({
                        'annotations',
                        'no3DInterp',
                        'showAllPlugins',
-                       'autoName'],
+                       'autoName',
+                       'gpuMemLimit'],
 
     # Hidden/advanced/silly options
     'Extras'        : ['nolink',
@@ -852,6 +854,7 @@ ARGUMENTS = td.TypeDict({
     'Main.no3DInterp'              : ('ni',      'no3DInterp',              False),
     'Main.showAllPlugins'          : ('ap',      'showAllPlugins',          False),
     'Main.autoName'                : ('an',      'autoName',                False),
+    'Main.gpuMemLimit'             : ('gml',     'gpuMemLimit',             True),
 
     'Extras.nolink'  : ('nl',   'nolink',  False),
     'Extras.bumMode' : ('bums', 'bumMode', False),
@@ -1127,9 +1130,9 @@ HELP = td.TypeDict({
     'percentiles by appending a "%%" to the high value.',
     'Main.robustRange' :
     'Set the initial display range for volume overlays to the "robust range" '
-    'as calculated by fslstats. Ignored if --initialDisplayRange is also '
+    '(as calculated by fslstats -r). Ignored if --initialDisplayRange is also '
     'specified. For 4D images, the robust range is calculated on the first '
-    'volume. If fslstats is not available, the image data range is used.',
+    'volume.',
     'Main.cmapCycle' :
     'Automatically assign a different colour map to each volume overlay '
     '(unless one is explicitly specified).',
@@ -1146,6 +1149,11 @@ HELP = td.TypeDict({
     'Main.showAllPlugins' : 'Expose plugins from third party packages',
     'Main.autoName'       : 'Automatically give each overlay a unique '
                             'name based on its file path',
+    'Main.gpuMemLimit'    : 'Approximate limit, in megabytes, on the amount '
+                            'of texture memory used. When the limit is '
+                            'exceeded, textures for overlays which have not '
+                            'recently been drawn are released, and re-created '
+                            'when they are next drawn.',
 
     'Main.notebook' :
     'Start the Jupyter notebook server',
@@ -1871,6 +1879,8 @@ def _configMainParser(mainParser, exclude=None):
         'no3DInterp'              : {'action'  : 'store_true'},
         'showAllPlugins'          : {'action'  : 'store_true'},
         'autoName'                : {'action'  : 'store_true'},
+        'gpuMemLimit'             : {'type'    : int,
+                                     'metavar' : 'MB'},
     }
 
     if fsleyes.disableLogging:
@@ -2728,6 +2738,9 @@ def applyMainArgs(args, overlayList, displayCtx):
 
     plugins.SHOW_THIRD_PARTY_PLUGINS = args.showAllPlugins
 
+    if args.gpuMemLimit is not None:
+        glresources.setBudget(args.gpuMemLimit * 1048576)
+
     # Apply extra/silly arguments
     if args.bumMode:
         import fsleyes.icons as icons
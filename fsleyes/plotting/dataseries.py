@@ -17,6 +17,8 @@ import fsl.utils.idle  as idle
 import fsl.utils.cache as cache
 import fsleyes_props   as props
 
+from . import timeseriescache
+
 
 log = logging.getLogger(__name__)
 
@@ -210,7 +212,9 @@ class VoxelDataSeries(DataSeries):
     from a voxel in an :class:`.Image` overlay.
 
     It contains a built-in cache which is used to prevent repeated access
-    to data from the same voxel.
+    to data from the same voxel. For 4D images, a voxel-major sidecar file
+    may also be used to accelerate access to the data at any voxel (see the
+    :mod:`.timeseriescache` module).
 
     Sub-classes may need to override:
 
@@ -241,6 +245,11 @@ class VoxelDataSeries(DataSeries):
         #      when the image data changes.
         self.__cache = cache.Cache(maxsize=1000)
 
+        # A TimeSeriesCache, if enabled, is
+        # used to retrieve voxel data from a
+        # voxel-major copy of the image.
+        self.__tsCache = timeseriescache.getCache(self.overlay)
+
 
     def makeLabel(self):
         """Returns a string representation of this ``VoxelDataSeries``
@@ -346,8 +355,13 @@ class VoxelDataSeries(DataSeries):
 
         This method may be overridden by sub-classes.
         """
-        voxel = location[:3]
-        opts  = self.displayCtx.getOpts(self.overlay)
-        data  = self.overlay[opts.index(voxel, atVolume=False)]
+        voxel   = location[:3]
+        opts    = self.displayCtx.getOpts(self.overlay)
+        tsCache = self.__tsCache
+
+        if tsCache is not None and tsCache.valid(self.overlay):
+            return tsCache.timeseries(*voxel)
+
+        data = self.overlay[opts.index(voxel, atVolume=False)]
 
         return data
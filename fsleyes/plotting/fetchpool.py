@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+#
+# fetchpool.py - A bounded worker pool for fetching data series data.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :class:`FetchPool` and :class:`FetchRequest`
+classes, which are used by the :class:`.PlotCanvas` to retrieve data from
+:class:`.DataSeries` instances on a fixed number of worker threads.
+
+Every time that a :class:`.PlotCanvas` is drawn, it creates a
+``FetchRequest``, and submits one *fetch* function to the ``FetchPool`` for
+each ``DataSeries`` which is to be plotted. Each fetch is identified by a
+key (e.g. the ``DataSeries``). If a fetch for the same key is already
+queued, it is replaced by the new one, and the request which it belonged to
+is cancelled - for example, when the user drags the cursor across an image,
+only the most recent location for each ``DataSeries`` is retrieved.  Fetches
+which belong to a cancelled request are skipped when they reach the front of
+the queue. Fetches which are already running cannot be interrupted, but their
+results will be ignored.
+"""
+
+
+import os
+import time
+import logging
+import threading
+import collections
+
+
+log = logging.getLogger(__name__)
+
+
+class FetchRequest:
+    """A ``FetchRequest`` represents a group of fetches which have been
+    submitted to a :class:`FetchPool`. A ``FetchRequest`` is complete when
+    all of its fetches have finished, or when it is cancelled. The
+    :meth:`wait` method can be used to wait for either to happen.
+    """
+
+
+    def __init__(self, nfetches):
+        """Create a ``FetchRequest``.
+
+        :arg nfetches: Number of fetches which will be submitted as part of
+                       this request.
+        """
+        self.__remaining = nfetches
+        self.__cancelled = False
+        self.__submitted = time.time()
+        self.__finished  = None
+        self.__lock      = threading.Lock()
+        self.__event     = threading.Event()
+
+        if nfetches == 0:
+            self.__finish()
+
+
+    @property
+    def cancelled(self):
+        """Returns ``True`` if this request has been cancelled, ``False``
+        otherwise.
+        """
+        return self.__cancelled
+
+
+    @property
+    def latency(self):
+        """Returns the time, in seconds, between the creation of this request,
+        and the completion of all of its fetches, or ``None`` if this request
+        has not completed, or has been cancelled.
+        """
+        if self.__cancelled or self.__finished is None:
+            return None
+        return self.__finished - self.__submitted
+
+
+    def cancel(self):
+        """Cancels this request. Any threads which are blocking on
+        :meth:`wait` are released.
+        """
+        self.__cancelled = True
+        self.__event.set()
+
+
+    def wait(self, timeout=None):
+        """Blocks until all fetches in this request have finished, or this
+        request has been cancelled.  Returns ``True`` if all fetches finished,
+        ``False`` if the request was cancelled, or the timeout elapsed.
+        """
+        self.__event.wait(timeout)
+        return self.__event.is_set() and not self.__cancelled
+
+
+    def fetchDone(self):
+        """Called by the :class:`FetchPool` when a fetch belonging to this
+        request has finished (or has been replaced). Returns ``True`` if
+        this was the last fetch, ``False`` otherwise.
+        """
+        with self.__lock:
+            self.__remaining -= 1
+            if self.__remaining == 0:
+                self.__finish()
+                return True
+        return False
+
+
+    def __finish(self):
+        """Called when all fetches in this request have finished. """
+        self.__finished = time.time()
+        self.__event.set()
+
+
+class FetchPool:
+    """A ``FetchPool`` runs fetch functions on a fixed number of worker
+    threads. See the module documentation for more details.
+    """
+
+
+    def __init__(self, nthreads=None, name=None):
+        """Create a ``FetchPool``. The worker threads are started
+        immediately.
+
+        :arg nthreads: Number of worker threads. Defaults to the number of
+                       CPUs, up to a maximum of 4.
+        :arg name:     Name to use for the worker threads.
+        """
+
+        if nthreads is None: nthreads = min(4, os.cpu_count() or 1)
+        if name     is None: name     = f'{type(self).__name__}_{id(self)}'
+
+        self.__name      = name
+        self.__queue     = collections.OrderedDict()
+        self.__cond      = threading.Condition()
+        self.__running   = True
+        self.__active    = 0
+        self.__completed = 0
+        self.__cancelled = 0
+        self.__latencies = collections.deque(maxlen=50)
+        self.__threads   = []
+
+        for i in range(nthreads):
+            thread = threading.Thread(target=self.__worker,
+                                      name=f'{name}_{i}',
+                                      daemon=True)
+            thread.start()
+            self.__threads.append(thread)
+
+
+    def stop(self):
+        """Stops the worker threads. Queued fetches are discarded, and their
+        requests cancelled. Fetches which are currently running will be
+        allowed to finish.
+        """
+        with self.__cond:
+            self.__running = False
+            for request, _ in self.__queue.values():
+                request.cancel()
+            self.__queue.clear()
+            self.__cond.notify_all()
+
+
+    @property
+    def queueDepth(self):
+        """Returns the number of fetches which are waiting to be run. """
+        with self.__cond:
+            return len(self.__queue)
+
+
+    def stats(self):
+        """Returns a dictionary containing some statistics about this
+        ``FetchPool``:
+
+          - ``queued``:      Number of fetches waiting to be run
+          - ``active``:      Number of fetches currently running
+          - ``completed``:   Total number of fetches which have been run
+          - ``cancelled``:   Total number of fetches which were replaced or
+                             skipped
+          - ``latency``:     Latency, in seconds, of the most recently
+                             completed request (or ``None``)
+          - ``meanLatency``: Mean latency over recently completed requests
+                             (or ``None``)
+        """
+        with self.__cond:
+            latencies = list(self.__latencies)
+            stats     = {
+                'queued'    : len(self.__queue),
+                'active'    : self.__active,
+                'completed' : self.__completed,
+                'cancelled' : self.__cancelled,
+            }
+
+        if len(latencies) > 0:
+            stats['latency']     = latencies[-1]
+            stats['meanLatency'] = sum(latencies) / len(latencies)
+        else:
+            stats['latency']     = None
+            stats['meanLatency'] = None
+
+        return stats
+
+
+    def submit(self, request, key, func):
+        """Submits a fetch function to be run.
+
+        If a fetch with the same ``key`` is already queued, it is replaced,
+        and the :class:`FetchRequest` that it belongs to is cancelled (unless
+        it is the same as ``request``).
+
+        :arg request: The :class:`FetchRequest` that this fetch belongs to.
+        :arg key:     Key identifying the fetch.
+        :arg func:    Function to run. Must accept no arguments.
+        """
+
+        with self.__cond:
+
+            if not self.__running:
+                request.cancel()
+                return
+
+            old = self.__queue.get(key, None)
+
+            if old is not None:
+                oldRequest, _    = old
+                self.__cancelled += 1
+                if oldRequest is request: request.fetchDone()
+                else:                     oldRequest.cancel()
+
+            self.__queue[key] = (request, func)
+            self.__cond.notify()
+
+
+    def __worker(self):
+        """Run by each worker thread. Runs queued fetches until :meth:`stop`
+        is called.
+        """
+
+        while True:
+
+            with self.__cond:
+                while self.__running and len(self.__queue) == 0:
+                    self.__cond.wait()
+
+                if not self.__running:
+                    return
+
+                _, (request, func) = self.__queue.popitem(last=False)
+
+                if request.cancelled:
+                    self.__cancelled += 1
+                    continue
+
+                self.__active += 1
+
+            try:
+                func()
+            except Exception as e:
+                log.warning('%s: fetch crashed: %s', self.__name, e,
+                            exc_info=True)
+            finally:
+                finished = request.fetchDone()
+                with self.__cond:
+                    self.__active    -= 1
+                    self.__completed += 1
+                    if finished and not request.cancelled:
+                        self.__latencies.append(request.latency)
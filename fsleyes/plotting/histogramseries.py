@@ -9,6 +9,11 @@
  :class:`MeshHistogramSeries` classes, used by the :class:`.HistogramPanel`
  for plotting histogram data.
 
+The :class:`BaseHistogram` class is used by the :class:`HistogramSeries`
+to store a compact summary of the data for each image volume (or mesh
+vertex data set), from which histograms with any bins/range can be
+calculated without needing to re-visit the data.
+
 Two standalone functions are also defined in this module:
 
   .. autosummary::
@@ -84,16 +89,13 @@ class HistogramSeries(dataseries.DataSeries):
         dataseries.DataSeries.__init__(
             self, overlay, overlayList, displayCtx, plotCanvas)
 
-        self.__nvals              = 0
-        self.__dataKey            = None
-        self.__xdata              = np.array([])
-        self.__ydata              = np.array([])
-        self.__finiteData         = np.array([])
-        self.__nonZeroData        = np.array([])
-        self.__clippedFiniteData  = np.array([])
-        self.__clippedNonZeroData = np.array([])
-        self.__dataCache          = cache.Cache(maxsize=10)
-        self.__histCache          = cache.Cache(maxsize=100)
+        self.__nvals     = 0
+        self.__dataKey   = None
+        self.__xdata     = np.array([])
+        self.__ydata     = np.array([])
+        self.__base      = BaseHistogram(np.array([]))
+        self.__dataCache = cache.Cache(maxsize=10)
+        self.__histCache = cache.Cache(maxsize=100)
 
         self.addListener('dataRange',       self.name, self.__dataRangeChanged)
         self.addListener('nbins',           self.name, self.__histPropsChanged)
@@ -115,16 +117,13 @@ class HistogramSeries(dataseries.DataSeries):
 
         self.__dataCache.clear()
         self.__histCache.clear()
-        self.__dataCache          = None
-        self.__histCache          = None
-        self.__nvals              = 0
-        self.__dataKey            = None
-        self.__xdata              = None
-        self.__ydata              = None
-        self.__finiteData         = None
-        self.__nonZeroData        = None
-        self.__clippedFiniteData  = None
-        self.__clippedNonZeroData = None
+        self.__dataCache = None
+        self.__histCache = None
+        self.__nvals     = 0
+        self.__dataKey   = None
+        self.__xdata     = None
+        self.__ydata     = None
+        self.__base      = None
         dataseries.DataSeries.destroy(self)
 
 
@@ -141,47 +140,36 @@ class HistogramSeries(dataseries.DataSeries):
         """
 
         if data is None:
-            self.__nvals              = 0
-            self.__dataKey            = None
-            self.__xdata              = np.array([])
-            self.__ydata              = np.array([])
-            self.__finiteData         = np.array([])
-            self.__nonZeroData        = np.array([])
-            self.__clippedFiniteData  = np.array([])
-            self.__clippedNonZeroData = np.array([])
+            self.__nvals   = 0
+            self.__dataKey = None
+            self.__xdata   = np.array([])
+            self.__ydata   = np.array([])
+            self.__base    = BaseHistogram(np.array([]))
 
             # force the panel to refresh
             with props.skip(self, 'dataRange', self.name):
                 self.propNotify('dataRange')
             return
 
-        # We cache the following data, based
-        # on the provided key, so they don't
-        # need to be recalculated:
-        #  - finite data
-        #  - non-zero data
-        #  - finite minimum
-        #  - finite maximum
+        # We cache a BaseHistogram for each
+        # key, from which histograms for any
+        # bin/range settings can be quickly
+        # calculated.
         #
         # The cache size is restricted (see its
         # creation in __init__) so we don't blow
         # out RAM
-        cached = self.__dataCache.get(key, None)
-
-        if cached is None:
-
-            log.debug('New histogram data {} - extracting '
-                      'finite/non-zero data'.format(key))
-
-            finData = data[np.isfinite(data)]
-            nzData  = finData[finData != 0]
-            dmin    = finData.min()
-            dmax    = finData.max()
+        base = self.__dataCache.get(key, None)
 
-            self.__dataCache.put(key, (finData, nzData, dmin, dmax))
+        if base is None:
+            log.debug('New histogram data {} - calculating '
+                      'base histogram'.format(key))
+            base = BaseHistogram(data)
+            self.__dataCache.put(key, base)
         else:
             log.debug('Got histogram data {} from cache'.format(key))
-            finData, nzData, dmin, dmax = cached
+
+        dmin, dmax = base.min, base.max
 
         # The upper bound on the dataRange
         # is exclusive, so we initialise it
@@ -194,11 +182,10 @@ class HistogramSeries(dataseries.DataSeries):
             self.dataRange.xmax = dmax + dist
             self.dataRange.xlo  = dmin
             self.dataRange.xhi  = dmax + dist
-            self.nbins          = autoBin(nzData, self.dataRange.x)
+            self.nbins          = autoBin(base, self.dataRange.x)
 
-            self.__dataKey     = key
-            self.__finiteData  = finData
-            self.__nonZeroData = nzData
+            self.__dataKey = key
+            self.__base    = base
 
             self.__dataRangeChanged()
 
@@ -261,14 +248,6 @@ class HistogramSeries(dataseries.DataSeries):
         :meth:`__initProperties` and :meth:`__volumeChanged` methods.
         """
 
-        finData = self.__finiteData
-        nzData  = self.__nonZeroData
-
-        self.__clippedFiniteData  = finData[(finData >= self.dataRange.xlo) &
-                                            (finData <  self.dataRange.xhi)]
-        self.__clippedNonZeroData = nzData[ (nzData  >= self.dataRange.xlo) &
-                                            (nzData  <  self.dataRange.xhi)]
-
         self.onDataRangeChange()
         self.__histPropsChanged()
 
@@ -290,15 +269,10 @@ class HistogramSeries(dataseries.DataSeries):
             self.__nvals = 0
             return
 
-        if self.ignoreZeros:
-            if self.includeOutliers: data = self.__nonZeroData
-            else:                    data = self.__clippedNonZeroData
-        else:
-            if self.includeOutliers: data = self.__finiteData
-            else:                    data = self.__clippedFiniteData
+        base = self.__base
 
         # Figure out the number of bins to use
-        if self.autoBin: nbins = autoBin(data, self.dataRange.x)
+        if self.autoBin: nbins = autoBin(base, self.dataRange.x)
         else:            nbins = self.nbins
 
         # nbins is unclamped, but
@@ -327,12 +301,12 @@ class HistogramSeries(dataseries.DataSeries):
         if cached is not None:
             histX, histY, nvals = cached
         else:
-            histX, histY, nvals = histogram(data,
-                                            self.nbins,
-                                            hrange,
-                                            drange,
-                                            self.includeOutliers,
-                                            True)
+            histX, histY, nvals = base.histogram(self.nbins,
+                                                 hrange,
+                                                 drange,
+                                                 self.includeOutliers,
+                                                 self.ignoreZeros,
+                                                 True)
             self.__histCache.put(histkey, (histX, histY, nvals))
 
         self.__xdata = histX
@@ -613,6 +587,206 @@ class MeshHistogramSeries(HistogramSeries):
         else:          self.setHistogramData(vd[:, vdi],   (vdname, vdi))
 
 
+class BaseHistogram:
+    """A ``BaseHistogram`` is a fixed-size summary of the finite values in a
+    data set, from which histograms with any bins/range can be derived via
+    the :meth:`histogram` method, in ``O(nbins)`` time, rather than
+    ``O(nvoxels)``.
+
+    The summary is calculated in fixed-size chunks, so no filtered copies of
+    the data are created, and never comprises more than ``nbins`` entries:
+
+     - If the data contains no more than ``nbins`` distinct non-zero values
+       (e.g. integer data), the summary contains each distinct value, and the
+       number of times that it occurs. Histograms derived from it are
+       identical to those calculated by the :func:`histogram` function.
+
+     - Otherwise the summary is a fine histogram, with ``nbins`` equal-width
+       bins spanning the data range. Histograms derived from it are
+       approximate - counts for bins which do not line up with the fine bins
+       are linearly interpolated.
+
+    Zeros are counted separately, so histograms which ignore zeros are
+    always accurate.
+    """
+
+
+    def __init__(self, data, nbins=65536, chunkSize=1048576):
+        """Create a ``BaseHistogram``.
+
+        :arg data:      ``numpy`` array containing the data
+        :arg nbins:     Maximum number of distinct values, and number of fine
+                        bins to use if there are more distinct values.
+        :arg chunkSize: Number of values to process at a time
+        """
+
+        data   = np.asanyarray(data)
+        dmin   = None
+        dmax   = None
+        nzero  = 0
+        values = np.array([], dtype=data.dtype)
+        counts = np.array([], dtype=np.int64)
+
+        def chunks():
+            for lo in range(0, data.size, chunkSize):
+                chunk = np.asarray(data.flat[lo:lo + chunkSize])
+                yield chunk[np.isfinite(chunk)]
+
+        # First pass - calculate the data range and
+        # the number of zeros, and summarise the
+        # non-zero values as their distinct values,
+        # giving up if there are too many of them.
+        for chunk in chunks():
+
+            if chunk.size == 0:
+                continue
+
+            cmin, cmax = chunk.min(), chunk.max()
+            nonzero    = chunk[chunk != 0]
+            nzero     += chunk.size - nonzero.size
+
+            if dmin is None: dmin, dmax = cmin, cmax
+            else:            dmin, dmax = min(dmin, cmin), max(dmax, cmax)
+
+            if values is None:
+                continue
+
+            u, c        = np.unique(nonzero, return_counts=True)
+            values, inv = np.unique(np.concatenate((values, u)),
+                                    return_inverse=True)
+            counts      = np.bincount(inv.ravel(),
+                                      weights=np.concatenate((counts, c)),
+                                      minlength=len(values))
+            counts      = counts.astype(np.int64)
+
+            if len(values) > nbins:
+                values = None
+
+        # Second pass - too many distinct
+        # values, so calculate a fine histogram
+        if values is None:
+            edges  = np.linspace(dmin, dmax, nbins + 1)
+            counts = np.zeros(nbins, dtype=np.int64)
+            for chunk in chunks():
+                chunk   = chunk[chunk != 0]
+                counts += np.histogram(chunk, nbins, (dmin, dmax))[0]
+        else:
+            edges = None
+
+        if dmin is None:
+            dmin, dmax = 0, 0
+
+        # Cumulative counts, such that the number
+        # of values in values[i:j] (or in fine
+        # bins [i, j)) is cumul[j] - cumul[i]
+        self.__dtype      = data.dtype
+        self.__min        = dmin
+        self.__max        = dmax
+        self.__nzero      = nzero
+        self.__values     = values
+        self.__edges      = edges
+        self.__cumul      = np.zeros(len(counts) + 1, dtype=np.int64)
+        self.__cumul[1:]  = np.cumsum(counts)
+
+
+    @property
+    def dtype(self):
+        """Returns the ``numpy`` data type of the data. """
+        return self.__dtype
+
+
+    @property
+    def exact(self):
+        """Returns ``True`` if this ``BaseHistogram`` stores the distinct
+        values in the data, ``False`` if it stores a fine histogram.
+        """
+        return self.__values is not None
+
+
+    @property
+    def min(self):
+        """Returns the minimum finite value, or 0 if there are no finite
+        values.
+        """
+        return self.__min
+
+
+    @property
+    def max(self):
+        """Returns the maximum finite value, or 0 if there are no finite
+        values.
+        """
+        return self.__max
+
+
+    def __below(self, edges, inclusive=False):
+        """Returns the number of non-zero values which are less than (or
+        equal to, if ``inclusive``) each of the given ``edges``. The result
+        is approximate if this ``BaseHistogram`` stores a fine histogram.
+        """
+        if self.__values is not None:
+            if inclusive: side = 'right'
+            else:         side = 'left'
+            idxs = np.searchsorted(self.__values, edges, side=side)
+            return self.__cumul[idxs].astype(np.float64)
+        else:
+            return np.interp(edges, self.__edges, self.__cumul)
+
+
+    def histogram(self,
+                  nbins,
+                  histRange,
+                  dataRange,
+                  includeOutliers=False,
+                  ignoreZeros=False,
+                  count=True):
+        """Calculates a histogram of the data. Values outside of the
+        ``histRange`` are excluded (unless ``includeOutliers is True``),
+        as are zeros (if ``ignoreZeros is True``).  All other arguments,
+        and the return value, are the same as for the :func:`histogram`
+        function.
+        """
+
+        hlo, hhi = histRange
+        dlo, dhi = dataRange
+
+        bins = np.linspace(hlo, hhi, nbins + 1)
+
+        if includeOutliers:
+            bins[ 0] = dlo
+            bins[-1] = dhi
+
+        # Bins are closed on the left. The last bin
+        # is only closed on the right when outliers
+        # are included - otherwise values equal to
+        # the upper bound of the histogram range are
+        # excluded. Floating point data is compared
+        # against the histogram range bounds in its
+        # own precision.
+        edges = np.array(bins)
+        if (not includeOutliers) and self.__dtype.kind == 'f':
+            edges[[0, -1]] = edges[[0, -1]].astype(self.__dtype)
+
+        below = self.__below(edges)
+        if includeOutliers:
+            below[-1] = self.__below(edges[-1:], True)[0]
+
+        if not ignoreZeros:
+            zeros = edges > 0
+            if includeOutliers:
+                zeros[-1] = edges[-1] >= 0
+            below = below + self.__nzero * zeros
+
+        histY = np.diff(np.round(below).astype(np.int64))
+        histX = bins
+        nvals = histY.sum()
+
+        if not count:
+            histY = histY / nvals
+
+        return histX, histY, nvals
+
+
 def histogram(data,
               nbins,
               histRange,
@@ -675,7 +849,9 @@ def autoBin(data, dataRange):
     of the given data. The calculation is identical to that implemented
     in the original FSLView.
 
-    :arg data:      The data that the histogram is to be calculated on.
+    :arg data:      The data that the histogram is to be calculated on, or
+                    a :class:`BaseHistogram` of the data - only the data
+                    type is used.
 
     :arg dataRange: A tuple containing the ``(min, max)`` histogram range.
     """
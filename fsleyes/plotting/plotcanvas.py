@@ -25,6 +25,7 @@ import fsleyes_props                     as props
 import fsleyes_widgets                   as fwidgets
 
 import fsleyes.strings                   as strings
+from . import                               fetchpool
 
 
 log = logging.getLogger(__name__)
@@ -88,6 +89,14 @@ class PlotCanvas(props.HasProperties):
     blocked while this is occurring. The ``TaskThread`` instance is accessible
     through the :meth:`getDrawQueue` method, in case anything needs to be
     scheduled on it.
+
+
+    The data for each ``DataSeries`` is retrieved on a fixed-size pool of
+    worker threads (see the :mod:`.fetchpool` module). Requests are coalesced
+    for each ``DataSeries``, and requests which are superseded by a newer
+    draw are cancelled, so the plot keeps up with e.g. the user dragging the
+    cursor around. The :meth:`getFetchStats` method returns some statistics
+    about the worker pool.
     """
 
 
@@ -239,20 +248,19 @@ class PlotCanvas(props.HasProperties):
         self.__drawQueue.daemon = True
         self.__drawQueue.start()
 
-        # Whenever a new request comes in to
-        # draw the plot, we can't cancel any
-        # pending requests, as they are running
-        # on separate threads and out of our
-        # control (and could be blocking on I/O).
-        #
-        # Instead, we keep track of the total
-        # number of pending requests. The
-        # __drawDataSeries method (which does the
-        # actual plotting) will only draw the
-        # plot if there are no pending requests
-        # (because otherwise it would be drawing
+        # Data for each data series is fetched
+        # on a pool of worker threads. Whenever
+        # a new request comes in to draw the
+        # plot, the most recent request is
+        # cancelled - its queued fetches are
+        # skipped, and the __drawDataSeries
+        # method (which does the actual
+        # plotting) will only draw the plot
+        # for the most recent request (because
+        # otherwise it would be drawing
         # out-of-date data).
-        self.__drawRequests = 0
+        self.__fetchPool    = fetchpool.FetchPool(name=self.__name)
+        self.__fetchRequest = None
 
         # The getDrawnDataSeries method returns
         # data as it is shown on the plot - some
@@ -333,7 +341,13 @@ class PlotCanvas(props.HasProperties):
                 ds.removeListener(propName, self.__name)
             ds.destroy()
 
+        if self.__fetchRequest is not None:
+            self.__fetchRequest.cancel()
+
+        self.__fetchPool.stop()
         self.__drawQueue.stop()
+        self.__fetchPool       = None
+        self.__fetchRequest    = None
         self.__drawQueue       = None
         self.__drawnDataSeries = None
         self.dataSeries        = []
@@ -375,6 +389,15 @@ class PlotCanvas(props.HasProperties):
         return self.__drawQueue
 
 
+    def getFetchStats(self):
+        """Returns a dictionary containing statistics about the worker pool
+        which is used to fetch data for plotting, including the number of
+        queued fetches, and the latency of recent draw requests - see
+        :meth:`.FetchPool.stats`.
+        """
+        return self.__fetchPool.stats()
+
+
     def draw(self, *a):
         """Call :meth:`drawDataSeries` and then :meth:`drawArtists`.
         Or, if a ``drawFunc`` was provided, calls that instead.
@@ -515,15 +538,16 @@ class PlotCanvas(props.HasProperties):
         This method does not do the actual plotting - it is performed
         asynchronously, to avoid locking up the GUI:
 
-         1. The data for each ``DataSeries`` instance is prepared on
-            separate threads (using :func:`.idle.run`).
+         1. The data for each ``DataSeries`` instance is prepared on a
+            :class:`.FetchPool`. Any previous request which has not yet
+            completed is cancelled.
 
-         2. A call to :func:`.idle.wait` is enqueued on a
+         2. A call to :meth:`__waitForData` is enqueued on a
             :class:`.TaskThread`.
 
-         3. This ``wait`` function waits until all of the data preparation
-            threads have completed, and then passes all of the data to
-            the :meth:`__drawDataSeries` method.
+         3. The ``__waitForData`` method waits until all of the data has
+            been prepared, and then passes all of the data to the
+            :meth:`__drawDataSeries` method.
 
         :arg extraSeries: A sequence of additional ``DataSeries`` to be
                           plotted. These series are passed through the
@@ -559,6 +583,9 @@ class PlotCanvas(props.HasProperties):
         preprocs    = [True] * len(extraSeries) + [False] * len(toPlot)
 
         if len(toPlot) == 0:
+            if self.__fetchRequest is not None:
+                self.__fetchRequest.cancel()
+                self.__fetchRequest = None
             self.__drawnDataSeries.clear()
             axis.clear()
             canvas.draw()
@@ -580,14 +607,20 @@ class PlotCanvas(props.HasProperties):
         axylim = list(sorted(self.limits.y))
 
         # Here we are preparing the data for
-        # each data series on separate threads,
+        # each data series on the fetch pool,
         # as data preparation can be time
         # consuming for large images. We
         # display a message on the canvas
         # during preparation.
-        tasks    = []
         allXdata = [None] * len(toPlot)
         allYdata = [None] * len(toPlot)
+        request  = fetchpool.FetchRequest(len(toPlot))
+
+        # Any previous request is now
+        # out of date.
+        if self.__fetchRequest is not None:
+            self.__fetchRequest.cancel()
+        self.__fetchRequest = request
 
         # Create a separate function
         # for each data series
@@ -604,11 +637,7 @@ class PlotCanvas(props.HasProperties):
                 allXdata[i] = xdata
                 allYdata[i] = ydata
 
-            tasks.append(getData)
-
-        # Run the data preparation tasks,
-        # a separate thread for each.
-        tasks = [idle.run(t) for t in tasks]
+            self.__fetchPool.submit(request, id(ds), getData)
 
         # Show a message while we're
         # preparing the data.
@@ -619,10 +648,8 @@ class PlotCanvas(props.HasProperties):
 
         # Wait until data preparation is
         # done, then call __drawDataSeries.
-        self.__drawRequests += 1
-        self.__drawQueue.enqueue(idle.wait,
-                                 tasks,
-                                 self.__drawDataSeries,
+        self.__drawQueue.enqueue(self.__waitForData,
+                                 request,
                                  toPlot,
                                  allXdata,
                                  allYdata,
@@ -630,12 +657,22 @@ class PlotCanvas(props.HasProperties):
                                  axylim,
                                  refresh,
                                  taskName=f'{id(self)}.wait',
-                                 wait_direct=True,
                                  **plotArgs)
 
 
+    def __waitForData(self, request, *args, **kwargs):
+        """Called by :meth:`drawDataSeries` on the draw queue. Waits until
+        all data for the given :class:`.FetchRequest` has been retrieved, and
+        then schedules a call to :meth:`__drawDataSeries` on the idle loop.
+        Nothing is drawn if the request is cancelled.
+        """
+        if request.wait():
+            idle.idle(self.__drawDataSeries, request, *args, **kwargs)
+
+
     def __drawDataSeries(
             self,
+            request,
             dataSeries,
             allXdata,
             allYdata,
@@ -645,9 +682,11 @@ class PlotCanvas(props.HasProperties):
             xlabel=None,
             ylabel=None,
             **plotArgs):
-        """Called by :meth:`__drawDataSeries`. Plots all of the data
+        """Called by :meth:`__waitForData`. Plots all of the data
         in the given ``dataSeries`` list.
 
+        :arg request:    The :class:`.FetchRequest` used to retrieve the data.
+
         :arg dataSeries: The list of :class:`.DataSeries` instances to plot.
 
         :arg allXdata:   A list of arrays containing X axis data, one for each
@@ -681,12 +720,14 @@ class PlotCanvas(props.HasProperties):
             return
 
         # Only draw the plot if there are no
-        # pending draw requests. Otherwise
+        # newer draw requests. Otherwise
         # we would be drawing out-of-date data.
-        self.__drawRequests -= 1
-        if self.__drawRequests != 0:
+        if request is not self.__fetchRequest:
             return
 
+        log.debug('%s: data fetched in %0.3f seconds (%s)',
+                  self.__name, request.latency, self.getFetchStats())
+
         axis          = self.axis
         canvas        = self.canvas
         width, height = canvas.get_width_height()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+#
+# timeseriescache.py - Voxel-major sidecar files for 4D images.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :class:`TimeSeriesCache` class, which is used by
+the :class:`.VoxelDataSeries` class to accelerate access to the time series
+of individual voxels in large (and in particular compressed) 4D images.
+
+Accessing the time series for a single voxel of a 4D image requires every
+volume of the image to be visited - for a ``.nii.gz`` file this means that
+the entire file must be decompressed. A ``TimeSeriesCache`` transposes a 4D
+image, once, in a background thread, into a voxel-major (time-contiguous)
+``.npy`` *sidecar* file, which is stored in the FSLeyes cache directory (see
+:func:`.filecache.cachePath`), and is memory-mapped for reading.  Once it has
+been created, the time series for any voxel can be retrieved with a single
+contiguous read.
+
+Sidecar files are identified by the :func:`.filecache.fileIdentity` of the
+image file, so will be re-created if the image file is modified. Only the
+:data:`MAX_SIDECARS` most recently created sidecar files are retained.
+
+Sidecar creation is disabled by default - it can be enabled via the
+``fsleyes.plotting.timeseriescache`` setting (see :mod:`fsl.utils.settings`).
+The :func:`getCache` function should be used to create/retrieve a
+``TimeSeriesCache`` for an image.
+"""
+
+
+import os.path as op
+import            os
+import            glob
+import            hashlib
+import            logging
+import            threading
+
+import numpy as np
+
+import fsl.utils.idle          as idle
+import fsl.utils.settings      as fslsettings
+import fsleyes.utils.filecache as filecache
+
+
+log = logging.getLogger(__name__)
+
+
+MAX_SIDECARS = 8
+"""Maximum number of sidecar files to retain in the cache directory. The
+oldest files are deleted when new ones are created.
+"""
+
+
+BUFFER_SIZE = 134217728
+"""Approximate maximum amount of memory, in bytes, to use when transposing
+an image into a sidecar file.
+"""
+
+
+_caches = {}
+"""Dictionary of ``{file identity : TimeSeriesCache}`` mappings used by
+the :func:`getCache` function.
+"""
+
+
+_lock = threading.Lock()
+"""Used to protect access to ``_caches``."""
+
+
+def enabled():
+    """Returns ``True`` if sidecar creation is enabled, ``False``
+    otherwise.
+    """
+    return bool(fslsettings.read('fsleyes.plotting.timeseriescache', False))
+
+
+def getCache(image):
+    """Returns a :class:`TimeSeriesCache` for the given :class:`.Image`, or
+    ``None`` if sidecar creation is disabled, or the image is not suitable
+    (e.g. is not a 4D image which was loaded from file, and is not already
+    loaded into memory). If a ``TimeSeriesCache`` does not already exist for
+    the image file, one is created, and it starts creating the sidecar file.
+    """
+
+    if not enabled():
+        return None
+
+    if image.ndim != 4 or image.inMemory or not image.saveState:
+        return None
+
+    identity = filecache.fileIdentity(image.dataSource)
+
+    if identity is None:
+        return None
+
+    with _lock:
+        tsc = _caches.get(identity, None)
+        if tsc is None:
+            tsc = TimeSeriesCache(identity)
+            _caches[identity] = tsc
+            tsc.create(image)
+
+    return tsc
+
+
+def sidecarPath(identity):
+    """Returns a path to the sidecar file for the given file identity. """
+    name = hashlib.sha1(identity.encode()).hexdigest()
+    return filecache.cachePath('timeseries', f'{name}.npy')
+
+
+class TimeSeriesCache:
+    """A ``TimeSeriesCache`` manages a voxel-major sidecar file for a 4D
+    image file. The sidecar file is created by the :meth:`create`
+    method. Once it exists (see :meth:`ready`), the :meth:`timeseries`
+    method can be used to retrieve the time series at any voxel.
+    """
+
+
+    def __init__(self, identity):
+        """Create a ``TimeSeriesCache``. The sidecar file is not created
+        until :meth:`create` is called.
+
+        :arg identity: The :func:`.filecache.fileIdentity` of the image file
+        """
+        self.__identity = identity
+        self.__path     = sidecarPath(identity)
+        self.__data     = None
+        self.__running  = False
+
+
+    @property
+    def identity(self):
+        """Returns the file identity of the image file at the time that this
+        ``TimeSeriesCache`` was created.
+        """
+        return self.__identity
+
+
+    @property
+    def ready(self):
+        """Returns ``True`` if the sidecar file has been created and opened,
+        ``False`` otherwise.
+        """
+        return self.__data is not None
+
+
+    def valid(self, image):
+        """Returns ``True`` if the sidecar file is ready and can be used
+        to retrieve data for the given ``image`` - the image must not have
+        been modified since the sidecar file was created.
+        """
+        return (self.ready                                  and
+                image.saveState                             and
+                filecache.fileIdentity(image.dataSource) == self.__identity)
+
+
+    def timeseries(self, x, y, z):
+        """Returns the time series at the given voxel, or ``None`` if the
+        sidecar file has not yet been created.
+        """
+        data = self.__data
+        if data is None:
+            return None
+        return np.array(data[x, y, z, :])
+
+
+    def create(self, image):
+        """Opens the sidecar file if it already exists, otherwise creates it
+        from the given :class:`.Image` in a background thread.
+        """
+
+        if self.ready or self.__running:
+            return
+
+        if self.__open():
+            return
+
+        self.__running = True
+
+        def onError(e):
+            self.__running = False
+            log.warning('Could not create time series sidecar file for %s: '
+                        '%s', image.dataSource, e, exc_info=True)
+
+        idle.run(lambda: self.__create(image), onError=onError)
+
+
+    def __open(self):
+        """Opens the sidecar file as a read-only memory map. Returns ``True``
+        if successful, ``False`` otherwise.
+        """
+
+        if not op.exists(self.__path):
+            return False
+        try:
+            self.__data = np.load(self.__path, mmap_mode='r')
+            return True
+        except Exception as e:
+            log.warning('Could not open time series sidecar file %s: %s',
+                        self.__path, e)
+            return False
+
+
+    def __create(self, image):
+        """Transposes the image into a voxel-major sidecar file. The image
+        is read in blocks of volumes, so that only a limited amount of
+        memory is used. The file is written to a temporary location, and
+        then moved into place, so that a partially written file is never
+        used.
+        """
+
+        shape  = image.shape
+        nvols  = shape[3]
+        dtype  = np.asarray(image[..., 0]).dtype
+        nvox   = int(np.prod(shape[:3]))
+        step   = max(1, min(nvols, BUFFER_SIZE // (nvox * dtype.itemsize)))
+        tmp    = f'{self.__path}.{os.getpid()}.tmp'
+
+        log.debug('Creating time series sidecar file for %s: %s',
+                  image.dataSource, self.__path)
+
+        os.makedirs(op.dirname(self.__path), exist_ok=True)
+
+        try:
+            out = np.lib.format.open_memmap(
+                tmp, mode='w+', dtype=dtype, shape=tuple(shape))
+            for vlo in range(0, nvols, step):
+                vhi               = min(nvols, vlo + step)
+                out[..., vlo:vhi] = image[..., vlo:vhi]
+            out.flush()
+            del out
+            os.replace(tmp, self.__path)
+
+        finally:
+            if op.exists(tmp):
+                os.remove(tmp)
+
+        self.__open()
+        self.__running = False
+        prune()
+
+
+def prune():
+    """Deletes the oldest sidecar files from the cache directory, so that no
+    more than :data:`MAX_SIDECARS` are retained. A :class:`TimeSeriesCache`
+    which has already opened a deleted file will continue to work, on
+    platforms which allow open files to be deleted.
+    """
+
+    files = glob.glob(op.join(filecache.cachePath('timeseries'), '*.npy'))
+    files = sorted(files, key=op.getmtime, reverse=True)
+
+    for f in files[MAX_SIDECARS:]:
+        try:
+            os.remove(f)
+        except OSError as e:
+            log.warning('Could not remove sidecar file %s: %s', f, e)
@@ -207,6 +207,25 @@ but there are enough clues in the ``importlib.metadata`` documentation at:
 https://docs.python.org/3/library/importlib.metadata.html#extending-the-search-algorithm.
 
 
+Plugin manifest
+---------------
+
+
+Importing every plugin module in order to find out what it provides can be
+slow, as plugin modules typically import many other libraries. So information
+about each plugin (its name, title, kind, and the views that it supports) is
+recorded in a *manifest*, which is saved to the FSLeyes settings directory.
+On subsequent runs, built-in plugins, and plugins provided by installed
+third-party libraries, are registered from the manifest, and their modules
+are only imported when the plugin is actually used.
+
+Manifest entries for built-in plugins are invalidated when the FSLeyes
+version, or the modification time of any built-in plugin file, changes.
+Entries for third-party plugins are invalidated when the version of the
+library that provides them changes. The whole manifest is discarded if it
+was saved with a different :attr:`MANIFEST_VERSION`.
+
+
 The following functions can be used to load/install new plugins:
 
 .. autosummary::
@@ -227,6 +246,7 @@ The following functions can be used to access plugins:
    listTools
    listLayouts
    listLoaders
+   lookupView
    lookupControl
    lookupTool
    pluginModule
@@ -241,6 +261,7 @@ import                        sys
 import                        glob
 import                        random
 import                        string
+import                        json
 import                        fnmatch
 import                        inspect
 import                        pkgutil
@@ -254,6 +275,7 @@ from typing import Any, Dict, Union, Type, Optional, Sequence, Callable
 from types  import ModuleType
 
 import fsl.utils.settings            as fslsettings
+import fsleyes
 import fsleyes.actions               as actions
 import fsleyes.strings               as strings
 import fsleyes.views.viewpanel       as viewpanel
@@ -284,6 +306,36 @@ off.
 """
 
 
+MANIFEST_FILE = op.join('cache', 'plugin_manifest.json')
+"""Location of the plugin manifest file, relative to the FSLeyes settings
+directory.
+"""
+
+
+MANIFEST_VERSION = 2
+"""Version of the plugin manifest format. Must be incremented whenever the
+information stored in the manifest changes, so that manifests saved by
+older versions of FSLeyes are discarded.
+"""
+
+
+BUILTIN_PLUGIN_PACKAGES = ['fsleyes.plugins.views',
+                           'fsleyes.controls',
+                           'fsleyes.plugins.controls',
+                           'fsleyes.plugins.tools']
+"""Packages containing built-in FSLeyes plugins. """
+
+
+_manifest = None
+"""Plugin manifest, loaded on first use by :func:`_loadManifest`. """
+
+
+_metadata = {}
+"""Metadata for every plugin entry point that FSLeyes knows about, stored as
+``{(group, value) : dict}`` mappings. See :func:`_describePlugin`.
+"""
+
+
 def _isLoader(func : Callable) -> bool:
     """Checks the signature of ``func`` and returns ``True`` if it
     looks like a loader function, ``False`` otherwise.
@@ -335,16 +387,25 @@ class FSLeyesPlugin(impmeta.Distribution):
     is registered with the :meth:`FSLeyesPluginFinder.add_plugin` method.
     """
 
-    def __init__(self, module : ModuleType, modname : str):
+    def __init__(self,
+                 module  : Optional[ModuleType],
+                 modname : str,
+                 entries : Optional[Sequence[dict]] = None):
         """Create a ``FSLeyesPlugin`` from a single-file plugin file that
         has already been loaded as a module.
 
         :arg module:  The loaded module
         :arg modname: The module name
+        :arg entries: Sequence of plugin manifest entries. If provided,
+                      ``module`` may be ``None`` - the entry points are
+                      created from these entries instead of by scanning
+                      the module, and the module is only imported when
+                      one of its entry points is loaded.
         """
         log.debug('New FSLeyesPlugin(%s)', modname)
         self.__module  = module
         self.__modname = modname
+        self.__entries = entries
 
 
     @property
@@ -370,9 +431,16 @@ class FSLeyesPlugin(impmeta.Distribution):
     def entry_points(self) -> Sequence[impmeta.EntryPoint]:
         """Return a sequence of ``EntryPoint`` objects provided by the plugin.  The
         :meth:`FSLeyesPlugin.find_entry_points` function is used to scan the
-        module for entry points.
+        module for entry points, unless this ``FSLeyesPlugin`` was created
+        from plugin manifest entries.
         """
 
+        if self.__entries is not None:
+            return [impmeta.EntryPoint(e['title'],
+                                       e['value'],
+                                       group=e['group'])
+                    for e in self.__entries]
+
         modname = self.__modname
         alleps  = FSLeyesPlugin.find_entry_points(self.__module)
         epobjs  = []
@@ -500,13 +568,21 @@ class FSLeyesPluginFinder(importlib.abc.MetaPathFinder):
         self.__plugins = {}
 
 
-    def add_plugin(self, module : ModuleType, modname : str):
+    def add_plugin(self,
+                   module  : Optional[ModuleType],
+                   modname : str,
+                   entries : Optional[Sequence[dict]] = None
+    ) -> FSLeyesPlugin:
         """Register a FSLeyes plugin module.
 
         :arg module:  The loaded module
         :arg modname: The module name
+        :arg entries: Plugin manifest entries - see :class:`FSLeyesPlugin`.
+        :returns:     The :class:`FSLeyesPlugin` distribution.
         """
-        self.__plugins[modname] = FSLeyesPlugin(module, modname)
+        plugin = FSLeyesPlugin(module, modname, entries)
+        self.__plugins[modname] = plugin
+        return plugin
 
 
     def find_distributions(self, context=None):
@@ -577,24 +653,251 @@ def _pluginGroup(plg : Plugin) -> Optional[str]:
 def _loadBuiltIns():
     """Called by :func:`initialise`. Loads all bulit-in plugins, from
     sub-modules of the ``fsleyes.plugins`` directory.
+
+    If the plugin manifest contains up to date information about the built-in
+    plugins, they are registered from the manifest, and are not imported.
+    Otherwise all built-in plugin modules are imported, and the manifest is
+    updated.
     """
 
-    import fsleyes.plugins.views    as views
-    import fsleyes.controls         as controls
-    import fsleyes.plugins.controls as pcontrols
-    import fsleyes.plugins.tools    as tools
+    finder   = FSLeyesPluginFinder.instance()
+    manifest = _loadManifest()
+    stamp    = _builtInStamp()
+    builtins = manifest.get('builtins', {})
+
+    if builtins.get('stamp') == stamp:
+        log.debug('Registering built-in plugins from manifest')
+        for modname, entries in builtins['modules'].items():
+            for entry in entries:
+                _metadata[entry['group'], entry['value']] = entry
+            finder.add_plugin(None, modname, entries)
+        return
+
+    modules = {}
 
     def load_all_submodules(mod):
         submods = pkgutil.iter_modules(mod.__path__, mod.__name__ + '.')
         for _, name, ispkg in submods:
             log.debug('Loading built-in plugin module %s', name)
-            submod = importlib.import_module(name)
-            FSLeyesPluginFinder.instance().add_plugin(submod, submod.__name__)
+            submod  = importlib.import_module(name)
+            plugin  = finder.add_plugin(submod, submod.__name__)
+            entries = []
+            for ep in plugin.entry_points:
+                entry = _entryMetadata(ep)
+                if entry is not None:
+                    entries.append(entry)
+            modules[submod.__name__] = entries
             if ispkg:
                 load_all_submodules(submod)
 
-    for mod in (views, controls, pcontrols, tools):
-        load_all_submodules(mod)
+    for modname in BUILTIN_PLUGIN_PACKAGES:
+        load_all_submodules(importlib.import_module(modname))
+
+    manifest['builtins'] = {'stamp' : stamp, 'modules' : modules}
+    _saveManifest()
+
+
+def _builtInStamp() -> str:
+    """Returns a string which identifies the current state of the built-in
+    plugin modules - the FSLeyes version, and the number and most recent
+    modification time of the built-in plugin files.
+    """
+
+    basedir = op.dirname(fsleyes.__file__)
+    mtime   = 0
+    nfiles  = 0
+
+    for pkg in BUILTIN_PLUGIN_PACKAGES:
+        pkgdir = op.join(basedir, *pkg.split('.')[1:])
+        for dirpath, _, filenames in os.walk(pkgdir):
+            for fname in fnmatch.filter(filenames, '*.py'):
+                try:
+                    mtime = max(mtime,
+                                os.stat(op.join(dirpath, fname)).st_mtime_ns)
+                except OSError:
+                    continue
+                nfiles += 1
+
+    return f'{fsleyes.__version__}:{nfiles}:{mtime}'
+
+
+def _loadManifest() -> dict:
+    """Loads and returns the plugin manifest from the FSLeyes settings
+    directory. An empty manifest is returned if it cannot be loaded.
+    """
+
+    global _manifest
+
+    if _manifest is not None:
+        return _manifest
+
+    _manifest = {}
+
+    try:
+        contents = fslsettings.readFile(MANIFEST_FILE)
+        if contents is not None:
+            _manifest = dict(json.loads(contents))
+    except Exception as e:
+        log.warning('Could not load plugin manifest %s: %s', MANIFEST_FILE, e)
+
+    if _manifest.get('version') != MANIFEST_VERSION:
+        _manifest = {}
+
+    return _manifest
+
+
+def _saveManifest():
+    """Saves the plugin manifest to the FSLeyes settings directory. """
+    try:
+        manifest            = _loadManifest()
+        manifest['version'] = MANIFEST_VERSION
+        with fslsettings.writeFile(MANIFEST_FILE) as f:
+            f.write(json.dumps(manifest))
+    except Exception as e:
+        log.debug('Could not save plugin manifest %s: %s', MANIFEST_FILE, e)
+
+
+def _distStamp(ep : impmeta.EntryPoint) -> Optional[str]:
+    """Returns a string which identifies the distribution that provides the
+    given third-party entry point, or ``None`` if the entry point does not
+    come from a third-party library (or the distribution cannot be
+    identified).
+    """
+    dist = getattr(ep, 'dist', None)
+    if dist is None or isinstance(dist, FSLeyesPlugin):
+        return None
+    try:
+        return f'{dist.name}:{dist.version}'
+    except Exception:
+        return None
+
+
+def _className(cls : type) -> str:
+    """Returns the fully qualified name of the given class. """
+    return f'{cls.__module__}.{cls.__qualname__}'
+
+
+def _describePlugin(ep : impmeta.EntryPoint, plugin : Plugin) -> dict:
+    """Returns a dictionary containing metadata about the given plugin, which
+    has been loaded from the given entry point. The dictionary contains:
+
+      - ``group``:             The entry point group
+      - ``title``:             The entry point name, i.e. the plugin title
+      - ``value``:             The entry point value
+      - ``kind``:              The plugin type, as returned by
+                               :func:`_pluginType`, or ``None`` if the
+                               object is not a valid plugin.
+      - ``name``:              The plugin class name, or ``None``
+      - ``supportedViews``:    For controls and tools, the fully qualified
+                               names of the views that the plugin supports
+                               (see :meth:`.ControlMixin.supportedViews` and
+                               :meth:`.Action.supportedViews`), or ``None``.
+      - ``supportSubClasses``: For controls, the value returned by
+                               :meth:`.ControlMixin.supportSubClasses`.
+    """
+
+    meta = {'group'             : ep.group,
+            'title'             : ep.name,
+            'value'             : ep.value,
+            'kind'              : _pluginType(plugin) or None,
+            'name'              : None,
+            'supportedViews'    : None,
+            'supportSubClasses' : True}
+
+    if not isinstance(plugin, type):
+        return meta
+
+    meta['name'] = plugin.__name__
+
+    if issubclass(plugin, (ctrlpanel.ControlMixin, actions.Action)):
+        supported = plugin.supportedViews()
+        if supported is not None:
+            meta['supportedViews'] = [_className(v) for v in supported]
+
+    if issubclass(plugin, ctrlpanel.ControlMixin) and \
+       'supportSubClasses' in plugin.__dict__:
+        meta['supportSubClasses'] = bool(plugin.supportSubClasses())
+
+    return meta
+
+
+def _entryMetadata(ep : impmeta.EntryPoint) -> Optional[dict]:
+    """Returns metadata about the plugin provided by the given entry point
+    (see :func:`_describePlugin`). The metadata is retrieved from the plugin
+    manifest if possible. Otherwise the entry point is loaded, and (for
+    third-party plugins) the manifest is updated. ``None`` is returned if
+    the entry point cannot be loaded.
+    """
+
+    key  = (ep.group, ep.value)
+    meta = _metadata.get(key, None)
+
+    if meta is not None:
+        return meta
+
+    stamp    = _distStamp(ep)
+    manifest = _loadManifest().setdefault('entrypoints', {})
+    mkey     = f'{ep.group}:{ep.name}:{ep.value}'
+
+    if stamp is not None:
+        meta = manifest.get(mkey, None)
+        if meta is not None and meta.get('stamp') == stamp:
+            _metadata[key] = meta
+            return meta
+
+    try:
+        meta = _describePlugin(ep, ep.load())
+    except Exception as e:
+        log.warning('Could not load FSLeyes entry point %s ("%s"): %s',
+                    ep.value, ep.name, e)
+        return None
+
+    _metadata[key] = meta
+
+    if stamp is not None:
+        manifest[mkey] = dict(meta, stamp=stamp)
+        _saveManifest()
+
+    return meta
+
+
+def _supportsView(
+        meta      : dict,
+        viewType  : View,
+        noneIsAll : bool = True
+) -> bool:
+    """Returns ``True`` if the plugin described by ``meta`` (see
+    :func:`_describePlugin`) supports the given view type, ``False``
+    otherwise.
+
+    :arg meta:      Plugin metadata
+    :arg viewType:  :class:`.ViewPanel` sub-class
+    :arg noneIsAll: If ``True`` (the default), plugins which do not specify
+                    any supported views are assumed to support all views.
+                    Otherwise they are assumed to not support any views.
+    """
+
+    supported = meta['supportedViews']
+
+    if supported is None:
+        return noneIsAll
+
+    if meta['supportSubClasses']:
+        return any(_className(c) in supported for c in viewType.__mro__)
+    else:
+        return _className(viewType) in supported
+
+
+def _loadEntryPoint(ep : impmeta.EntryPoint) -> Optional[Plugin]:
+    """Loads and returns the plugin provided by the given entry point, or
+    ``None`` if it cannot be loaded.
+    """
+    try:
+        return ep.load()
+    except Exception as e:
+        log.warning('Could not load FSLeyes entry point %s ("%s"): %s',
+                    ep.value, ep.name, e)
+        return None
 
 
 def _listEntryPoints(
@@ -652,10 +955,29 @@ def _listEntryPoints(
     return items
 
 
-def listViews() -> Dict[str, View]:
+def listViews(load : bool = True) -> Dict[str, Union[View, str]]:
     """Returns a dictionary of ``{name : ViewPanel}`` mappings containing
     the custom views provided by all installed FSLeyes plugins.
+
+    :arg load: If ``True`` (the default), the view classes are loaded.
+               Otherwise the views are listed from the plugin manifest,
+               without being imported, and a dictionary of ``{name :
+               clsName}`` mappings is returned - views can then be loaded
+               with :func:`lookupView`.
     """
+
+    if not load:
+        eps   = _listEntryPoints('fsleyes_views', load=False)
+        views = {}
+        for name, ep in eps.items():
+            meta = _entryMetadata(ep)
+            if meta is None or meta['kind'] != 'view':
+                log.debug('Ignoring fsleyes_views entry point '
+                          '%s - not a ViewPanel', name)
+                continue
+            views[name] = meta['name']
+        return views
+
     views = _listEntryPoints('fsleyes_views')
     for name, cls in list(views.items()):
         if not issubclass(cls, viewpanel.ViewPanel):
@@ -673,67 +995,86 @@ def listControls(viewType : Optional[View] = None) -> Dict[str, Control]:
     :arg viewType: Sub-class of :class:`.ViewPanel` - if provided, only
                    controls which are compatible with this view type are
                    returned (as determined by
-                   :meth:`.ControlMixin.supportedViews.`).
+                   :meth:`.ControlMixin.supportedViews.`). Controls which
+                   are not compatible are not imported.
     """
-    ctrls = _listEntryPoints('fsleyes_controls')
+    eps   = _listEntryPoints('fsleyes_controls', load=False)
+    ctrls = {}
+
+    for name, ep in eps.items():
+
+        # Use the plugin manifest to figure out
+        # which views the control supports -
+        # supportedViews might be None, in which
+        # case the control is assumed to support
+        # all views.
+        meta = _entryMetadata(ep)
+        if meta is None:
+            continue
+        if viewType is not None and not _supportsView(meta, viewType):
+            continue
 
-    for name, cls in list(ctrls.items()):
+        cls = _loadEntryPoint(ep)
+        if cls is None:
+            continue
 
-        if not issubclass(cls, (ctrlpanel.ControlPanel,
+        if not isinstance(cls, type) or \
+           not issubclass(cls, (ctrlpanel.ControlPanel,
                                 ctrlpanel.ControlToolBar)):
             log.debug('Ignoring fsleyes_controls entry point %s - '
                       'not a ControlPanel/ToolBar', name)
-            ctrls.pop(name)
             continue
 
-        # views that this control supports - might be None,
-        # in which case the control is assumed to support
-        # all views.
-        supported = cls.supportedViews()
-
-        # does the control support sub-classes of the
-        # views that it supports, or only the specific
-        # view classes returned by supportedViews?
-        subclassok = True
-        if 'supportSubClasses' in cls.__dict__:
-            subclassok = cls.supportSubClasses()
-
-        if viewType  is not None and \
-           supported is not None:
-            if subclassok:
-                if not issubclass(viewType, tuple(supported)):
-                    ctrls.pop(name)
-            elif viewType not in supported:
-                ctrls.pop(name)
+        ctrls[name] = cls
     return ctrls
 
 
-def listTools(viewType : Optional[View] = None) -> Dict[str, Tool]:
+def listTools(
+        viewType    : Optional[View] = None,
+        independent : bool           = False
+) -> Dict[str, Tool]:
     """Returns a dictionary of ``{name : Action}`` mappings containing
     the custom tools provided by all installed FSLeyes plugins.
 
-    :arg viewType: Sub-class of :class:`.ViewPanel` - if provided, only
-                   tools which are compatible with this view type are
-                   returned (as determined by
-                   :meth:`.Action.supportedViews.`).
+    :arg viewType:    Sub-class of :class:`.ViewPanel` - if provided, only
+                      tools which are compatible with this view type are
+                      returned (as determined by
+                      :meth:`.Action.supportedViews.`). Tools which are not
+                      compatible are not imported.
+
+    :arg independent: If ``True``, only tools which are not coupled to any
+                      view (i.e. for which :meth:`.Action.supportedViews`
+                      returns ``None``) are returned. Other tools are not
+                      imported. Ignored if ``viewType`` is provided.
     """
-    tools = _listEntryPoints('fsleyes_tools')
-    for name, cls in list(tools.items()):
+    eps   = _listEntryPoints('fsleyes_tools', load=False)
+    tools = {}
+
+    for name, ep in eps.items():
+
+        # If a viewType is provided, we don't
+        # return view-independent tools
+        meta = _entryMetadata(ep)
+        if meta is None:
+            continue
+        if viewType is not None and \
+           not _supportsView(meta, viewType, noneIsAll=False):
+            continue
+        if viewType is None and independent and \
+           meta['supportedViews'] is not None:
+            continue
 
-        if not issubclass(cls, actions.Action):
+        cls = _loadEntryPoint(ep)
+        if cls is None:
+            continue
+
+        if not isinstance(cls, type) or \
+           not issubclass(cls, actions.Action):
             log.debug('Ignoring fsleyes_tools entry point '
                       '%s - not an Action', name)
-            tools.pop(name)
             continue
 
-        if viewType is not None:
-
-            supported = cls.supportedViews()
-            # If a viewType is provided, we don't
-            # return view-independent views
-            if (supported is None) or \
-               (not issubclass(viewType, tuple(supported))):
-                tools.pop(name)
+        tools[name] = cls
 
     return tools
 
@@ -778,20 +1119,45 @@ def listLoaders() -> Dict[str, Loader]:
 
 
 def _lookupPlugin(plgname : str, group : str) -> Optional[Plugin]:
-    """Looks up the FSLeyes plugin with the given name. """
-    entries = _listEntryPoints(f'fsleyes_{group}', True)
-    for name, plugin in entries.items():
-        if isinstance(plugin, (str, tuple)):
-            if isinstance(plugin, tuple):
-                if plugin[0] == plgname:
-                    return plugin[1]
-            elif name == plgname:
+    """Looks up the FSLeyes plugin with the given name. Only the module
+    which provides the plugin is imported.
+    """
+    entries = _listEntryPoints(f'fsleyes_{group}', True, load=False)
+    for name, ep in entries.items():
+        meta = _entryMetadata(ep)
+        if meta is None:
+            continue
+
+        # class-based plugins (views,
+        # controls, tools) are matched by
+        # the class name in the manifest
+        if meta['name'] is not None:
+            if meta['name'] == plgname:
+                return _loadEntryPoint(ep)
+            continue
+
+        plugin = _loadEntryPoint(ep)
+        if isinstance(plugin, tuple):
+            if plugin[0] == plgname:
+                return plugin[1]
+        elif isinstance(plugin, str):
+            if name == plgname:
                 return plugin
-        elif plugin.__name__ == plgname:
+        elif getattr(plugin, '__name__', None) == plgname:
             return plugin
     return None
 
 
+def lookupView(clsName : str) -> Optional[View]:
+    """Looks up the FSLeyes view with the given class name. """
+    view = _lookupPlugin(clsName, 'views')
+    if not (isinstance(view, type) and issubclass(view, viewpanel.ViewPanel)):
+        log.debug('Ignoring fsleyes_views entry point %s - '
+                  'not a ViewPanel', clsName)
+        return None
+    return view
+
+
 def lookupControl(clsName : str) -> Control:
     """Looks up the FSLeyes control with the given class name. """
     return _lookupPlugin(clsName, 'controls')
@@ -819,7 +1185,19 @@ def pluginTitle(plugin : Plugin) -> Optional[str]:
     registered.
     """
     group   = _pluginGroup(plugin)
-    entries = _listEntryPoints(f'fsleyes_{group}', True)
+    group   = f'fsleyes_{group}'
+
+    # Plugin classes can usually be found
+    # by their module and name, without
+    # having to load any other plugins
+    if isinstance(plugin, type):
+        value   = f'{plugin.__module__}:{plugin.__name__}'
+        entries = _listEntryPoints(group, True, load=False)
+        for title, ep in entries.items():
+            if ep.value == value:
+                return title
+
+    entries = _listEntryPoints(group, True)
     for title, cls in entries.items():
         if cls is plugin:
             return title
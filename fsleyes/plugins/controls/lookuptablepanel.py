@@ -785,7 +785,7 @@ class LutLabelDialog(wx.Dialog):
 
         wx.Dialog.__init__(self, parent, title=strings.titles[self])
 
-        self.__value  = wx.SpinCtrl(        self, min=0, max=65535)
+        self.__value  = wx.SpinCtrl(self, min=0, max=fslcmaps.MAX_LUT_VALUE)
         self.__name   = wx.TextCtrl(        self)
         self.__colour = wx.ColourPickerCtrl(self)
 
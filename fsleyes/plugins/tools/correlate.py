@@ -7,14 +7,21 @@
 """This module provides the :class:`.PearsonCorrelateAction` class, which is
 an :class:`.Action` that calculates seed-based correlation on 4D
 :class:`.Image` overlays.
+
+Correlation values are calculated by the :class:`PearsonCorrelation` class,
+which pre-standardises the time series for every voxel, so that the
+correlation between a seed and all other voxels can be calculated with a
+single (multi-threaded) matrix-vector product.
 """
 
 
-import threading
-import logging
+import concurrent.futures as futures
+import                       os
+import                       tempfile
+import                       threading
+import                       logging
 
 import numpy                  as np
-import scipy.spatial.distance as spd
 
 import fsl.data.image               as fslimage
 import fsl.utils.idle               as idle
@@ -215,14 +222,13 @@ class CorrelateAction(base.Action):
         # add it to the overlay list after the
         # correlation values have been calculated.
 
-        opts = self.displayCtx.getOpts(ovl)
-        xyz  = opts.getVoxel(vround=True)
+        opts  = self.displayCtx.getOpts(ovl)
+        xyz   = opts.getVoxel(vround=True)
+        index = opts.index(atVolume=False)
 
         if xyz is None:
             return
 
-        data = ovl.data[opts.index(atVolume=False)]
-
         # The correlation calculation is performed
         # on a separate thread. This thread then
         # schedules a function on idle.idle to
@@ -230,7 +236,7 @@ class CorrelateAction(base.Action):
         # main thread.
         def calcCorr():
 
-            correlations = self.calculateCorrelation(xyz, data)
+            correlations = self.correlate(ovl, index, xyz)
 
             # The correlation overlay is updated/
             # created on the main thread.
@@ -264,6 +270,22 @@ class CorrelateAction(base.Action):
         idle.run(calcCorr)
 
 
+    def correlate(self, overlay, index, seed):
+        """Called by :meth:`__runCorrelateAction` on a separate thread.
+        Retrieves the data for the given ``overlay``, and passes it to
+        :meth:`calculateCorrelation`. May be overridden by sub-classes which
+        need to manage access to the data themselves (e.g. to cache
+        pre-processed data across calls).
+
+        :arg overlay: The 4D :class:`.Image`
+        :arg index:   Slice object used to retrieve the 4D data from
+                      ``overlay`` (see :meth:`.NiftiOpts.index`).
+        :arg seed:    An ``(x, y, z)`` tuple specifying the seed voxel
+        :returns:     A 3D ``numpy`` array containing the correlation values.
+        """
+        return self.calculateCorrelation(seed, overlay.data[index])
+
+
     def calculateCorrelation(self, seed, data):
         """Calculates correlation values between the given ``seed`` voxel (an
         ``(x, y, z)`` tuple) and all other voxels. This method must be
@@ -283,8 +305,109 @@ class PearsonCorrelateAction(CorrelateAction):
     """The ``PearsonCorrelateAction`` is a :class:`CorrelateAction` which
     calculates Pearson correlation coefficient values between the seed voxel
     and all other voxels.
+
+    A :class:`PearsonCorrelation` object is created for the most recently
+    used 4D image, and is re-used for subsequent seeds, until the image data
+    is modified, or the image is removed from the :class:`.OverlayList`.
     """
 
+
+    def __init__(self, overlayList, displayCtx, panel):
+        """Create a ``PearsonCorrelateAction``. All arguments are passed
+        through to :meth:`CorrelateAction.__init__`.
+        """
+        CorrelateAction.__init__(self, overlayList, displayCtx, panel)
+
+        # Tuple containing (overlay, index,
+        # PearsonCorrelation) for the most
+        # recently used overlay.
+        self.__cache = None
+        self.__name  = '{}_{}_cache'.format(type(self).__name__, id(self))
+
+        overlayList.addListener('overlays',
+                                self.__name,
+                                self.__overlayListChanged)
+
+
+    def destroy(self):
+        """Clears the cache, and calls :meth:`CorrelateAction.destroy`. """
+        if self.destroyed:
+            return
+        self.overlayList.removeListener('overlays', self.__name)
+        self.__clearCache()
+        CorrelateAction.destroy(self)
+
+
+    def __overlayListChanged(self, *a):
+        """Called when the :class:`.OverlayList` changes. Clears the cache
+        if its overlay has been removed.
+        """
+        cache = self.__cache
+        if cache is not None and cache[0] not in self.overlayList:
+            self.__clearCache()
+
+
+    def __dataChanged(self, *a):
+        """Called when the data of the cached overlay changes. Clears the
+        cache.
+        """
+        self.__clearCache()
+
+
+    def __clearCache(self):
+        """Clears the cached :class:`PearsonCorrelation`. """
+        cache        = self.__cache
+        self.__cache = None
+        if cache is not None:
+            overlay = cache[0]
+            overlay.deregister(self.__name, topic='data')
+            cache[2].destroy()
+
+
+    def correlate(self, overlay, index, seed):
+        """Overrides :meth:`CorrelateAction.correlate`. Creates a
+        :class:`PearsonCorrelation` for the given overlay, or re-uses a
+        previously created one, and uses it to calculate correlation values.
+
+        The cache may be cleared on the main thread while this method is
+        running, so the :class:`PearsonCorrelation` is acquired for the
+        duration of the calculation - it will not be destroyed until it
+        has been released (see :meth:`PearsonCorrelation.acquire`).
+        """
+
+        cache = self.__cache
+
+        if cache is not None      and \
+           cache[0] is overlay    and \
+           cache[1] == index      and \
+           cache[2].acquire():
+            engine = cache[2]
+
+        else:
+            # The image is passed to the engine, rather
+            # than its data, so the data is read in
+            # chunks, and is never loaded in its
+            # entirety.
+            engine = PearsonCorrelation(overlay, index=index)
+            engine.acquire()
+
+            def update():
+                if self.destroyed:
+                    engine.destroy()
+                    return
+                self.__clearCache()
+                self.__cache = (overlay, index, engine)
+                overlay.register(self.__name, self.__dataChanged,
+                                 topic='data')
+
+            idle.idle(update)
+
+        try:
+            return engine.correlate(seed)
+        finally:
+            engine.release()
+
+
     def calculateCorrelation(self, seed, data):
         """Calculates Pearson correlation between the data at the specified
         seed voxel, and all other voxels.
@@ -292,24 +415,244 @@ class PearsonCorrelateAction(CorrelateAction):
         return pearsonCorrelation(seed, data)
 
 
-def pearsonCorrelation(seed, data):
-    """Calculates Pearson correlation between the data at the specified
-    seed voxel, and all other voxels.
+MMAP_THRESHOLD = 1073741824
+"""Standardised time series which are larger than this number of bytes are
+stored in a memory-mapped temporary file by :class:`PearsonCorrelation`,
+rather than in memory.
+"""
+
+
+class PearsonCorrelation:
+    """The ``PearsonCorrelation`` class can be used to calculate Pearson
+    correlation coefficients between a seed voxel and all voxels of a 4D
+    data set.
+
+    When a ``PearsonCorrelation`` is created, the time series for every voxel
+    is standardised, such that the correlation between two voxels is equal to
+    the dot product of their standardised time series. This is performed in
+    chunks, so that the data is never copied in its entirety.
+
+    Correlation values for a seed voxel are then calculated via the
+    :meth:`correlate` method, as a matrix-vector product, split into blocks
+    which are processed in parallel.
+
+    A ``PearsonCorrelation`` which is shared between threads should be
+    protected with the :meth:`acquire` and :meth:`release` methods - when
+    :meth:`destroy` is called, the standardised data is not released until
+    all users have called :meth:`release`.
     """
 
-    x, y, z = seed
-    npoints = data.shape[3]
 
-    # the scipy.spatial.distance.cdist
-    # function can be used to calculate
-    # one-to-many correlation values.
-    with np.errstate(invalid='ignore'):
-        correlations = 1 - spd.cdist(
-            data[x, y, z, :].reshape( 1, npoints),
-            data            .reshape(-1, npoints),
-            metric='correlation')
+    def __init__(self,
+                 data,
+                 index=None,
+                 dtype=np.float32,
+                 mmap=None,
+                 nthreads=None,
+                 chunkSize=67108864):
+        """Create a ``PearsonCorrelation``.
+
+        :arg data:      4D ``numpy`` array, or any other array-like object
+                        (e.g. an :class:`.Image`) which supports slicing.
+                        The data is read in chunks along the first axis.
+
+        :arg index:     Slice object used to select 4D data from ``data``
+                        (see :meth:`.NiftiOpts.index`). The first three
+                        dimensions must not be sliced.
+
+        :arg dtype:     Data type to store the standardised time series as.
+
+        :arg mmap:      If ``True``, the standardised time series are stored
+                        in a memory-mapped temporary file. Defaults to
+                        ``True`` if they would require more than
+                        :data:`MMAP_THRESHOLD` bytes.
+
+        :arg nthreads:  Number of threads to use in :meth:`correlate`.
+                        Defaults to the number of CPUs.
+
+        :arg chunkSize: Approximate upper limit, in bytes, on the amount of
+                        memory used to standardise the data. The data is
+                        standardised in chunks, each of which requires
+                        several ``float64`` copies - this limits both the
+                        size of each chunk, and the number of chunks which
+                        are processed at once.
+        """
+
+        if index is None:
+            index = ()
+
+        # Figure out the shape of the
+        # data selected by the index
+        index   = tuple(index)
+        index   = index + (slice(None),) * (len(data.shape) - len(index))
+        dshape  = [len(range(*s.indices(n)))
+                   for s, n in zip(index, data.shape)
+                   if isinstance(s, slice)]
+        shape   = tuple(dshape[:3])
+        nvoxels = int(np.prod(shape))
+        npoints = dshape[3]
+        nbytes  = nvoxels * npoints * np.dtype(dtype).itemsize
+
+        if mmap     is None: mmap     = nbytes > MMAP_THRESHOLD
+        if nthreads is None: nthreads = os.cpu_count() or 1
+
+        # Number of voxels to process at a time in correlate
+        blockSize = max(1, chunkSize // (npoints * np.dtype(dtype).itemsize))
+
+        self.__shape     = shape
+        self.__nthreads  = nthreads
+        self.__blockSize = blockSize
+        self.__tempfile  = None
+        self.__lock      = threading.Lock()
+        self.__refs      = 0
+        self.__destroyed = False
+
+        if mmap:
+            self.__tempfile = tempfile.TemporaryFile(prefix='fsleyes_corr_')
+            self.__stdata   = np.memmap(self.__tempfile,
+                                        dtype=dtype,
+                                        mode='w+',
+                                        shape=(nvoxels, npoints))
+        else:
+            self.__stdata = np.empty((nvoxels, npoints), dtype=dtype)
+
+        # Standardise in chunks of slices along
+        # the first axis, in parallel. Each slice
+        # is processed as float64, with up to three
+        # copies in memory at once (the data, and
+        # temporaries), so we limit the number of
+        # slices per chunk and the number of chunks
+        # in flight, such that their total size
+        # stays within chunkSize bytes. A single
+        # slice is processed if it exceeds this.
+        slcsize  = nvoxels // max(1, shape[0])
+        slcbytes = max(1, slcsize * npoints * 8 * 3)
+        nworkers = max(1, min(nthreads, chunkSize // slcbytes))
+        nslices  = max(1, chunkSize // (slcbytes * nworkers))
+        chunks   = range(0, shape[0], nslices)
+
+        def standardise(x):
+            slc   = (slice(x, x + nslices),) + index[1:]
+            chunk = np.asarray(data[slc], dtype=np.float64)
+            chunk = chunk.reshape(-1, npoints)
+            chunk = chunk - chunk.mean(axis=1, keepdims=True)
+            norm  = np.sqrt(np.einsum('ij,ij->i', chunk, chunk))[:, None]
+
+            # Time series with no variance
+            # have a correlation of 0
+            with np.errstate(invalid='ignore', divide='ignore'):
+                chunk = chunk / norm
+            chunk[~np.isfinite(chunk)] = 0
+
+            lo = x * slcsize
+            self.__stdata[lo:lo + len(chunk)] = chunk
+
+        self.__parallel(standardise, chunks, nworkers)
+
+
+    def acquire(self):
+        """Marks this ``PearsonCorrelation`` as being in use. Every call to
+        ``acquire`` must be followed by a call to :meth:`release`.
+
+        :returns: ``True`` if this ``PearsonCorrelation`` has been acquired,
+                  ``False`` if it has already been destroyed, in which case
+                  it must not be used.
+        """
+        with self.__lock:
+            if self.__destroyed:
+                return False
+            self.__refs += 1
+            return True
+
+
+    def release(self):
+        """Marks this ``PearsonCorrelation`` as no longer being in use by
+        the caller. If :meth:`destroy` has been called, and there are no
+        other users, the standardised data is released.
+        """
+        with self.__lock:
+            self.__refs -= 1
+            free = self.__destroyed and self.__refs <= 0
+        if free:
+            self.__free()
+
+
+    def destroy(self):
+        """Releases the standardised data, and closes the temporary file
+        if one was used. If the ``PearsonCorrelation`` is currently in use
+        (see :meth:`acquire`), this is deferred until it is released.
+        """
+        with self.__lock:
+            self.__destroyed = True
+            free = self.__refs <= 0
+        if free:
+            self.__free()
+
+
+    def __free(self):
+        """Called by :meth:`destroy` and :meth:`release`. Releases the
+        standardised data, and closes the temporary file if one was used.
+        """
+        self.__stdata = None
+        if self.__tempfile is not None:
+            self.__tempfile.close()
+            self.__tempfile = None
+
+
+    @property
+    def shape(self):
+        """Returns the shape of the first three dimensions of the data. """
+        return self.__shape
+
+
+    def correlate(self, seed):
+        """Calculates Pearson correlation coefficients between the given
+        ``seed`` voxel and all other voxels.
+
+        :arg seed: An ``(x, y, z)`` tuple specifying the seed voxel
+        :returns:  A 3D ``numpy`` array containing the correlation values.
+        """
+
+        stdata  = self.__stdata
+        nvoxels = stdata.shape[0]
+        seed    = np.ravel_multi_index(seed, self.__shape)
+        seed    = np.array(stdata[seed])
+        result  = np.zeros(nvoxels, dtype=stdata.dtype)
+        blocks  = range(0, nvoxels, self.__blockSize)
+
+        def block(lo):
+            hi            = min(lo + self.__blockSize, nvoxels)
+            result[lo:hi] = stdata[lo:hi] @ seed
 
-    # Set any nans to 0
-    correlations[np.isnan(correlations)] = 0
+        self.__parallel(block, blocks)
 
-    return correlations.reshape(data.shape[:3])
+        return result.reshape(self.__shape)
+
+
+    def __parallel(self, func, args, nthreads=None):
+        """Calls ``func`` on each of ``args``, using a pool of threads if
+        more than one thread is to be used. At most ``nthreads`` (default:
+        the ``nthreads`` passed to :meth:`__init__`) calls are in flight at
+        once.
+        """
+        if nthreads is None:
+            nthreads = self.__nthreads
+        if nthreads > 1 and len(args) > 1:
+            with futures.ThreadPoolExecutor(nthreads) as pool:
+                list(pool.map(func, args))
+        else:
+            for arg in args:
+                func(arg)
+
+
+def pearsonCorrelation(seed, data):
+    """Calculates Pearson correlation between the data at the specified
+    seed voxel, and all other voxels. See the :class:`PearsonCorrelation`
+    class - if correlation values for more than one seed are needed, it is
+    more efficient to use it directly.
+    """
+    engine = PearsonCorrelation(data)
+    try:
+        return engine.correlate(seed)
+    finally:
+        engine.destroy()
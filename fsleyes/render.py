@@ -6,21 +6,64 @@
 #
 """The ``render`` module is a program which provides off-screen rendering
 capability for scenes which can otherwise be displayed via *FSLeyes*.
+
+
+In addition to rendering a single scene, ``render`` can be used to render
+many scenes from a single process, re-using the same GL context and any
+overlays which are common to multiple scenes:
+
+ - With the ``--batch FILE`` option, render jobs are read from ``FILE`` (or
+   from standard input if ``FILE`` is ``-``). Each line of the file must
+   contain a complete set of ``render`` arguments.
+
+ - With the ``--server [PORT]`` option, a TCP server is started on
+   ``localhost``, which accepts render jobs, one per line, and replies to
+   each job with a single line, beginning with either ``OK`` or ``ERROR``.
+   The port number is printed to standard output when the server starts.
+
+Loaded overlays are stored in an :class:`OverlayCache`, so that images which
+are used in several jobs (e.g. a standard template) only need to be loaded
+once.
+
+Batch jobs can be distributed across multiple worker processes, each with
+their own off-screen GL context, with the ``--jobs N`` option, or via the
+:func:`renderJobs` function. Results are reported in the same order as the
+jobs, regardless of the order in which they are completed.
+
+
+With the ``--movie`` option, a movie is rendered instead of a single image,
+by stepping through the volumes of the selected 4D image, by moving through
+the display X, Y, or Z axes, or (for 3D scenes) by rotating the scene, in the
+same way as the :class:`.CanvasPanel` movie mode (see the :mod:`.movie`
+module). Frames are encoded as they are rendered, so the memory used does
+not depend on the number of frames. The movie format is determined by the
+output file suffix (see :func:`.movie.openMovieWriter`). Frames may be
+rendered in parallel with the ``--jobs`` option - see
+:func:`renderMovieJobs`.
 """
 
 
-import os.path as op
-import            sys
-import            logging
-import            textwrap
+import os.path     as op
+import                os
+import                sys
+import                shlex
+import                socket
+import                logging
+import                textwrap
+import                contextlib
+import                collections
+import multiprocessing    as mp
+import concurrent.futures as cf
 
 import numpy as np
 
 import fsl.utils.idle                        as idle
+import fsl.data.mesh                         as fslmesh
 import fsleyes_widgets.utils.layout          as fsllayout
 
 import                                          fsleyes
 import fsleyes.version                       as version
+import fsleyes.movie                         as movie
 import fsleyes.overlay                       as fsloverlay
 import fsleyes.colourmaps                    as fslcm
 import fsleyes.parseargs                     as parseargs
@@ -36,17 +79,27 @@ import fsleyes.gl.ortholabels                as ortholabels
 import fsleyes.gl.offscreenslicecanvas       as slicecanvas
 import fsleyes.gl.offscreenlightboxcanvas    as lightboxcanvas
 import fsleyes.gl.offscreenscene3dcanvas     as scene3dcanvas
+import fsleyes.utils.filecache               as filecache
 
 
 log = logging.getLogger(__name__)
 
 
+OVERLAY_CACHE_SIZE = 16
+"""Maximum number of files for which overlays are kept in memory by the
+:class:`OverlayCache` when running in batch/server mode.
+"""
+
+
 def main(args=None, hook=None):
     """Entry point for ``render``.
 
     Creates and renders an OpenGL scene, and saves it to a file, according
     to the specified command line arguments (which default to
-    ``sys.argv[1:]``).
+    ``sys.argv[1:]``). If the ``--batch`` or ``--server`` options are
+    provided, multiple scenes are rendered - see :func:`runBatch` and
+    :func:`runServer`. In batch mode, the process exits with status ``1``
+    if any of the jobs failed.
     """
 
     if args is None:
@@ -65,6 +118,21 @@ def main(args=None, hook=None):
     namespace = parseArgs(args)
     fsleyes.configLogging(namespace.verbose, namespace.noisy)
 
+    # Parallel batch rendering - each
+    # worker process creates its own
+    # GL context, so we don't need one
+    if namespace.batch is not None and namespace.jobs != 1:
+        nerrors = runBatch(namespace.batch,
+                           njobs=namespace.jobs,
+                           glversion=namespace.glversion,
+                           verbose=namespace.verbose,
+                           noisy=namespace.noisy)
+        if nerrors > 0:
+            sys.exit(1)
+        return
+
+    nerrors = 0
+
     # Create a GL context
     fslgl.getGLContext(offscreen=True,
                        createApp=True,
@@ -80,33 +148,449 @@ def main(args=None, hook=None):
     with idle.idleLoop.synchronous(), \
          imagetexture.ImageTexture.enableThreading(False):
 
-
         # Initialise the fsleyes.gl modules
         fslgl.bootstrap(namespace.glversion)
 
-        # Create a description of the scene
-        overlayList, displayCtx, sceneOpts = makeDisplayContext(namespace)
+        if namespace.batch is not None:
+            nerrors = runBatch(namespace.batch, hook)
+        elif namespace.server is not None:
+            runServer(namespace.server, hook)
+        elif namespace.movie and namespace.jobs != 1:
+            renderMovieJobs(args,
+                            njobs=namespace.jobs,
+                            glversion=namespace.glversion,
+                            verbose=namespace.verbose,
+                            noisy=namespace.noisy)
+        else:
+            renderScene(namespace, hook)
+
+        # Clear the GL context
+        fslgl.shutdown()
+
+    # Exit with a non-zero status
+    # if any batch jobs failed
+    if nerrors > 0:
+        sys.exit(1)
+
+
+def renderScene(namespace, hook=None, overlayCache=None):
+    """Renders a single scene described by ``namespace``, and saves it to
+    ``namespace.outfile``. Must be called after the GL context has been
+    created and :func:`.fsleyes.gl.bootstrap` has been called. If
+    ``namespace.movie`` is set, a movie is rendered via :func:`renderMovie`.
 
-        import matplotlib.image as mplimg
+    :arg namespace:    ``argparse.Namespace`` object containing command line
+                       arguments, as returned by :func:`parseArgs`.
+    :arg hook:         Passed through to the :func:`render` function.
+    :arg overlayCache: :class:`OverlayCache` used to look up previously
+                       loaded overlays, passed to :func:`makeDisplayContext`.
+    """
+
+    import matplotlib.image as mplimg
+
+    # Create a description of the scene
+    overlayList, displayCtx, sceneOpts = makeDisplayContext(
+        namespace, overlayCache)
+
+    try:
+        if namespace.movie:
+            renderMovie(namespace, overlayList, displayCtx, sceneOpts, hook)
+            return
 
         # Render that scene, and save it to file
         bitmap, bg = render(
             namespace, overlayList, displayCtx, sceneOpts, hook)
 
-        if namespace.crop is not None:
-            bitmap = autocrop(bitmap, bg, namespace.crop)
+    finally:
+        # Overlays may be re-used in another
+        # scene, so we make sure that the
+        # display contexts for this scene no
+        # longer refer to them.
+        if overlayCache is not None:
+            overlayList.clear()
+            displayCtx.destroy()
+            displayCtx.masterDisplayCtx.destroy()
+
+    if namespace.crop is not None:
+        bitmap = autocrop(bitmap, bg, namespace.crop)
+
+    # Alpha-blending does work, but the final
+    # pixel values seem to take on the alpha
+    # value of the most recently drawn item,
+    # which is undesirable. So we save out
+    # as rgb
+    bitmap = bitmap[:, :, :3]
+
+    mplimg.imsave(namespace.outfile, bitmap)
+
+
+def renderJob(line, hook=None, overlayCache=None):
+    """Renders the scene described by one line of a batch file, or one line
+    received by the server (see :func:`runBatch` and :func:`runServer`).
+
+    :arg line:         String containing ``render`` arguments.
+    :arg hook:         Passed through to :func:`renderScene`.
+    :arg overlayCache: Passed through to :func:`renderScene`.
+    :returns:          Absolute path to the output file.
+    """
 
-        # Alpha-blending does work, but the final
-        # pixel values seem to take on the alpha
-        # value of the most recently drawn item,
-        # which is undesirable. So we save out
-        # as rgb
-        bitmap = bitmap[:, :, :3]
+    args = shlex.split(line)
 
-        mplimg.imsave(namespace.outfile, bitmap)
+    try:
+        namespace = parseArgs(args)
+    except SystemExit as e:
+        raise ValueError(f'Invalid arguments: {line}') from e
 
-        # Clear the GL context
-        fslgl.shutdown()
+    if namespace.batch is not None or namespace.server is not None:
+        raise ValueError('--batch/--server cannot be used within a job')
+
+    try:
+        renderScene(namespace, hook, overlayCache)
+    finally:
+        if overlayCache is not None:
+            overlayCache.release()
+    return namespace.outfile
+
+
+def runBatch(fname, hook=None, njobs=1, **kwargs):
+    """Renders every job contained in ``fname``. Each line in the file is
+    expected to contain a complete set of ``render`` arguments. Empty lines
+    and lines beginning with ``#`` are ignored. If ``fname`` is ``-``, jobs
+    are read from standard input until it is closed.
+
+    A line is written to standard output for each job, beginning with ``OK``
+    and the output file name if the job succeeded, or ``ERROR`` and an error
+    message if it failed.
+
+    :arg fname: File to read jobs from.
+    :arg hook:  Passed through to :func:`renderScene`. Ignored if
+                ``njobs != 1``.
+    :arg njobs: Number of worker processes to use. If ``1`` (the default),
+                jobs are rendered in this process, which must have already
+                created a GL context. Otherwise jobs are rendered via
+                :func:`renderJobs`, which is passed all other keyword
+                arguments.
+
+    :returns: The number of jobs which failed.
+    """
+
+    nerrors = 0
+    cache   = None
+
+    if fname == '-': f = sys.stdin
+    else:            f = open(fname, 'rt')
+
+    lines = (line.strip() for line in f)
+    lines = (line for line in lines if line != '' and not line.startswith('#'))
+
+    if njobs == 1:
+        cache   = OverlayCache()
+        results = (_runJob(line, hook, cache) for line in lines)
+    else:
+        results = renderJobs(lines, njobs, **kwargs)
+
+    try:
+        for ok, msg in results:
+            if ok:
+                print(f'OK {msg}', flush=True)
+            else:
+                print(f'ERROR {msg}', flush=True)
+                nerrors += 1
+    finally:
+        if f is not sys.stdin:
+            f.close()
+        if cache is not None:
+            cache.clear()
+
+    return nerrors
+
+
+def renderJobs(jobs, njobs=None, glversion=None, verbose=0, noisy=None):
+    """Renders all of the given jobs in parallel, across ``njobs`` worker
+    processes. Each worker process creates its own off-screen GL context, and
+    its own :class:`OverlayCache`.
+
+    This is a generator function which yields one ``(success, message)``
+    tuple for each job, in the same order as ``jobs``. ``success`` is
+    ``True`` if the job succeeded, in which case ``message`` is the absolute
+    path to the output file. Otherwise ``message`` contains a description of
+    the error.
+
+    Worker processes are started with the ``spawn`` method, so scripts which
+    call this function must guard their entry point with
+    ``if __name__ == '__main__':``.
+
+    :arg jobs:      Sequence or iterable of jobs. Each job may either be a
+                    string or a sequence of strings containing a complete
+                    set of ``render`` arguments.
+    :arg njobs:     Number of worker processes. If ``None`` or less than
+                    ``1``, the number of CPUs is used.
+    :arg glversion: GL version to request, passed to
+                    :func:`.fsleyes.gl.getGLContext`.
+    :arg verbose:   Logging verbosity for the worker processes.
+    :arg noisy:     Modules to enable logging on in the worker processes.
+    """
+
+    if njobs is None or njobs < 1:
+        njobs = os.cpu_count() or 1
+
+    # Limit the number of pending jobs, so
+    # that jobs can be streamed in (e.g. from
+    # stdin) and results streamed out, without
+    # the whole job list being held in memory
+    maxPending = 2 * njobs
+    pending    = collections.deque()
+    executor   = cf.ProcessPoolExecutor(
+        max_workers=njobs,
+        mp_context=mp.get_context('spawn'),
+        initializer=_initWorker,
+        initargs=(glversion, verbose, noisy))
+
+    def result(future):
+        try:
+            return future.result()
+        except Exception as e:
+            # e.g. BrokenProcessPool, if a
+            # worker process crashed
+            msg = ' '.join(str(e).split())
+            return False, f'{type(e).__name__}: {msg}'
+
+    with executor:
+        for job in jobs:
+            if not isinstance(job, str):
+                job = shlex.join(job)
+            pending.append(executor.submit(_workerJob, job))
+            if len(pending) >= maxPending:
+                yield result(pending.popleft())
+
+        while len(pending) > 0:
+            yield result(pending.popleft())
+
+
+def _initWorker(glversion, verbose, noisy):
+    """Initialises a :func:`renderJobs` worker process - initialises
+    FSLeyes, and creates an off-screen GL context.
+    """
+
+    global _workerState
+
+    fsleyes.initialise()
+    fslcm.init()
+    fsleyes.configLogging(verbose, noisy)
+    fslgl.getGLContext(offscreen=True,
+                       createApp=True,
+                       requestVersion=glversion)
+
+    # See main - these remain in
+    # effect for the lifetime of
+    # the worker process.
+    ctx = contextlib.ExitStack()
+    ctx.enter_context(idle.idleLoop.synchronous())
+    ctx.enter_context(imagetexture.ImageTexture.enableThreading(False))
+
+    fslgl.bootstrap(glversion)
+
+    _workerState = (ctx, OverlayCache())
+
+
+_workerState = None
+"""Used by :func:`renderJobs` worker processes to store their state (see
+:func:`_initWorker`).
+"""
+
+
+def _workerJob(line):
+    """Runs in a :func:`renderJobs` worker process. Renders the given job
+    with :func:`_runJob`.
+    """
+    return _runJob(line, None, _workerState[1])
+
+
+def runServer(port=0, hook=None, ev=None):
+    """Starts a TCP server on ``localhost``, and renders jobs which are sent
+    to it until the server is stopped. If ``port`` is ``0``, a free port is
+    chosen. The port number is printed to standard output.
+
+    Each connection may send any number of jobs, one per line. Each line
+    must contain a complete set of ``render`` arguments - relative file
+    paths are interpreted relative to the directory that the server was
+    started from. A single reply line, beginning with ``OK`` or ``ERROR``,
+    is sent back for each job. A line containing just ``quit`` stops the
+    server.
+
+    :arg port: TCP port number
+    :arg hook: Passed through to :func:`renderScene`.
+    :arg ev:   Optional ``threading.Event`` which can be used to stop the
+               server.
+    """
+
+    cache = OverlayCache()
+    sock  = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('localhost', port))
+    sock.listen(1)
+    sock.settimeout(1)
+
+    print(sock.getsockname()[1], flush=True)
+
+    try:
+        while ev is None or not ev.is_set():
+
+            try:
+                conn, addr = sock.accept()
+            except socket.timeout:
+                continue
+
+            log.debug('Connection from %s', addr)
+
+            with conn, conn.makefile('rw') as f:
+                for line in f:
+                    line = line.strip()
+                    if line == '':
+                        continue
+                    if line == 'quit':
+                        return
+                    ok, msg = _runJob(line, hook, cache)
+                    if ok: f.write(f'OK {msg}\n')
+                    else:  f.write(f'ERROR {msg}\n')
+                    f.flush()
+    finally:
+        sock.close()
+        cache.clear()
+
+
+def _runJob(line, hook, cache):
+    """Used by :func:`runBatch`, :func:`runServer` and :func:`renderJobs`.
+    Calls :func:`renderJob`, and returns a tuple containing ``True`` and
+    the output file if the job succeeded, or ``False`` and an error message
+    if it failed.
+    """
+    try:
+        return True, renderJob(line, hook, cache)
+    except Exception as e:
+        log.error('Error rendering job (%s): %s', line, e,
+                  exc_info=log.getEffectiveLevel() <= logging.DEBUG)
+        return False, ' '.join(str(e).split())
+
+
+class OverlayCache:
+    """The ``OverlayCache`` is used by :func:`runBatch` and
+    :func:`runServer` to keep overlays in memory, so that overlays which are
+    used in more than one job only need to be loaded once. It is passed to
+    the :func:`.loadoverlay.loadOverlays` function.
+
+    Overlays are keyed by the :func:`.filecache.fileIdentity` of their file,
+    so a file which is modified between jobs will be re-loaded. At most
+    :data:`OVERLAY_CACHE_SIZE` files are cached - the least recently used
+    files are discarded first.
+
+    A job may change the state of the overlays that it uses (e.g. the
+    overlay name, or the selected vertex set of a :class:`.Mesh`). The state
+    of each overlay is recorded when it is added to the cache, and is
+    restored whenever it is retrieved from the cache, so that changes made
+    by one job do not carry over into later jobs. An overlay is only
+    returned once per job - the :meth:`release` method must be called at the
+    end of each job.
+    """
+
+
+    def __init__(self, maxEntries=None):
+        """Create an ``OverlayCache``.
+
+        :arg maxEntries: Maximum number of files to cache. Defaults to
+                         :data:`OVERLAY_CACHE_SIZE`.
+        """
+        if maxEntries is None:
+            maxEntries = OVERLAY_CACHE_SIZE
+        self.__maxEntries = maxEntries
+        self.__entries    = collections.OrderedDict()
+        self.__inUse      = set()
+
+
+    def __len__(self):
+        """Returns the number of files that are currently cached. """
+        return len(self.__entries)
+
+
+    @staticmethod
+    def __key(path):
+        """Returns a key to use for the given path. """
+        key = filecache.fileIdentity(path)
+        if key is None:
+            key = op.abspath(path)
+        return key
+
+
+    @staticmethod
+    def __saveState(overlay):
+        """Returns a dictionary containing the state of the given overlay
+        which may be changed by a job.
+        """
+        state = {'name' : overlay.name}
+        if isinstance(overlay, fslmesh.Mesh):
+            state['vertices']   = overlay.selectedVertices()
+            state['vertexData'] = {key : overlay.getVertexData(key)
+                                   for key in overlay.vertexDataSets()}
+        return state
+
+
+    @staticmethod
+    def __restoreState(overlay, state):
+        """Restores the state of the given overlay, as returned by
+        :meth:`__saveState`.
+        """
+        overlay.name = state['name']
+        if isinstance(overlay, fslmesh.Mesh):
+            vdata = state['vertexData']
+            if list(overlay.vertexDataSets()) != list(vdata.keys()):
+                overlay.clearVertexData()
+                for key, data in vdata.items():
+                    overlay.addVertexData(key, data)
+            overlay.vertices = state['vertices']
+
+
+    def get(self, path):
+        """Returns a list of overlays previously loaded from ``path``, or
+        ``None`` if there are no overlays cached for ``path``, or if they
+        have already been used in the current job.
+        """
+        key     = self.__key(path)
+        entries = self.__entries.get(key, None)
+
+        if entries is None:
+            return None
+        if any(id(ovl) in self.__inUse for ovl, _ in entries):
+            return None
+
+        self.__entries.move_to_end(key)
+
+        for ovl, state in entries:
+            self.__restoreState(ovl, state)
+            self.__inUse.add(id(ovl))
+
+        return [ovl for ovl, _ in entries]
+
+
+    def put(self, path, overlays):
+        """Adds the given overlays, loaded from ``path``, to the cache. """
+        entries = [(ovl, self.__saveState(ovl)) for ovl in overlays]
+        self.__entries[self.__key(path)] = entries
+        self.__inUse.update(id(ovl) for ovl in overlays)
+        while len(self.__entries) > self.__maxEntries:
+            self.__entries.popitem(last=False)
+
+
+    def release(self):
+        """Must be called at the end of every job. Makes all cached overlays
+        available to the next job.
+        """
+        self.__inUse.clear()
+
+
+    def clear(self):
+        """Clears the cache. """
+        self.__entries.clear()
+        self.__inUse.clear()
 
 
 def parseArgs(argv):
@@ -138,6 +622,55 @@ def parseArgs(argv):
                             metavar=('W', 'H'),
                             help='Size in pixels (width, height)',
                             default=(800, 600))
+    mainParser.add_argument('-bt',
+                            '--batch',
+                            metavar='FILE',
+                            help='Render all jobs in FILE, one set of '
+                                 'render arguments per line (\'-\' to '
+                                 'read jobs from standard input)')
+    mainParser.add_argument('-sv',
+                            '--server',
+                            type=int,
+                            nargs='?',
+                            const=0,
+                            metavar='PORT',
+                            help='Run a server on localhost which accepts '
+                                 'render jobs, one per line')
+    mainParser.add_argument('-j',
+                            '--jobs',
+                            type=int,
+                            metavar='N',
+                            default=1,
+                            help='Number of processes to use with --batch '
+                                 'or --movie (0: one per CPU, default: 1)')
+    mainParser.add_argument('-mv',
+                            '--movie',
+                            action='store_true',
+                            help='Render a movie (GIF, animated PNG, or raw '
+                                 'RGB frames, depending on the outfile '
+                                 'suffix, or \'-\' to write raw frames to '
+                                 'standard output)')
+    mainParser.add_argument('-mvx',
+                            '--movieAxis',
+                            type=int,
+                            choices=(0, 1, 2, 3),
+                            default=3,
+                            help='Movie axis - X, Y, Z (rotation for 3D '
+                                 'scenes), or time (default: 3)')
+    mainParser.add_argument('-mvr',
+                            '--movieRate',
+                            type=int,
+                            metavar='RATE',
+                            default=400,
+                            help='3D movie rotation rate, between 10 '
+                                 '(slowest) and 500 (fastest, default: 400)')
+    mainParser.add_argument('-mvd',
+                            '--movieDelay',
+                            type=int,
+                            metavar='MS',
+                            default=50,
+                            help='Delay between movie frames in milliseconds '
+                                 '(default: 50)')
 
     name        = 'render'
     prolog      = 'FSLeyes render version {}\n'.format(version.__version__)
@@ -166,8 +699,15 @@ def parseArgs(argv):
         usageProlog=optStr,
         argOpts=['-of', '--outfile',
                  '-sz', '--size',
-                 '-c',  '--crop'],
-        shortHelpExtra=['--outfile', '--size', '--crop'],
+                 '-c',  '--crop',
+                 '-bt', '--batch',
+                 '-sv', '--server',
+                 '-j',  '--jobs',
+                 '-mvx', '--movieAxis',
+                 '-mvr', '--movieRate',
+                 '-mvd', '--movieDelay'],
+        shortHelpExtra=['--outfile', '--size', '--crop', '--batch',
+                        '--server', '--jobs', '--movie', '--movieAxis'],
         exclude=exclude)
 
     if namespace.outfile is None:
@@ -175,7 +715,8 @@ def parseArgs(argv):
         mainParser.print_usage()
         sys.exit(1)
 
-    namespace.outfile = op.abspath(namespace.outfile)
+    if namespace.outfile != '-':
+        namespace.outfile = op.abspath(namespace.outfile)
 
     if namespace.scene not in ('ortho', 'lightbox', '3d'):
         log.info('Unknown scene specified  ("{}") - defaulting '
@@ -185,10 +726,13 @@ def parseArgs(argv):
     return namespace
 
 
-def makeDisplayContext(namespace):
+def makeDisplayContext(namespace, overlayCache=None):
     """Creates :class:`.OverlayList`, :class:`.DisplayContext``, and
     :class:`.SceneOpts` instances which represent the scene to be rendered,
     as described by the arguments in the given ``namespace`` object.
+
+    If an :class:`OverlayCache` is provided, overlays are retrieved from it
+    where possible, and newly loaded overlays are added to it.
     """
 
     # Set a display type hint. When running FSLeyes
@@ -238,7 +782,8 @@ def makeDisplayContext(namespace):
                                overlayList,
                                masterDisplayCtx,
                                loadFunc=load,
-                               errorFunc=error)
+                               errorFunc=error,
+                               cache=overlayCache)
 
     # Create a SceneOpts instance describing
     # the scene to be rendered. The parseargs
@@ -312,6 +857,259 @@ def render(namespace, overlayList, displayCtx, sceneOpts, hook=None):
               be useful in other situations.
     """
 
+    canvases, sizes, labelMgr = createCanvases(
+        namespace, overlayList, displayCtx, sceneOpts)
+
+    # Call hook if provided (used for testing)
+    if hook is not None:
+        hook(overlayList, displayCtx, sceneOpts, canvases)
+
+    try:
+        return renderCanvases(
+            namespace, overlayList, displayCtx, sceneOpts, canvases, sizes)
+
+    # destroy the canvases
+    finally:
+        destroyCanvases(canvases, labelMgr)
+
+
+def renderMovie(namespace, overlayList, displayCtx, sceneOpts, hook=None):
+    """Renders a movie of the scene, and saves it to ``namespace.outfile``.
+    Each frame is passed to a :class:`.MovieWriter` as soon as it has been
+    rendered.
+
+    :arg namespace:   ``argparse.Namespace`` object containing command line
+                      arguments.
+    :arg overlayList: The :class:`.OverlayList` instance.
+    :arg displayCtx:  The :class:`.DisplayContext` instance.
+    :arg sceneOpts:   The :class:`.SceneOpts` instance.
+    :arg hook:        Passed through to :func:`render`.
+    """
+
+    checkMovie(namespace, displayCtx)
+
+    if namespace.crop is not None:
+        log.warning('--crop is ignored when rendering a movie')
+
+    canvases, sizes, labelMgr = createCanvases(
+        namespace, overlayList, displayCtx, sceneOpts)
+
+    if hook is not None:
+        hook(overlayList, displayCtx, sceneOpts, canvases)
+
+    try:
+        with movie.openMovieWriter(namespace.outfile,
+                                   namespace.movieDelay) as writer:
+            for frame in movieFrames(namespace, displayCtx, sceneOpts):
+                applyMovieFrame(frame, displayCtx, sceneOpts, canvases)
+                bitmap, _ = renderCanvases(namespace,
+                                           overlayList,
+                                           displayCtx,
+                                           sceneOpts,
+                                           canvases,
+                                           sizes)
+                writer.write(bitmap)
+    finally:
+        destroyCanvases(canvases, labelMgr)
+
+
+def renderMovieJobs(args, njobs=None, glversion=None, verbose=0, noisy=None):
+    """Renders a movie, with frames rendered in parallel across ``njobs``
+    worker processes. Each worker process creates its own off-screen GL
+    context, and its own copy of the scene.
+
+    The scene is stepped through in this process, to determine the state
+    (e.g. display location or volume) of every frame. Frames are written to
+    the movie file in order as they are completed, and at most ``2 * njobs``
+    frames are pending at any one time. Must be called after the GL context
+    has been created and :func:`.fsleyes.gl.bootstrap` has been called.
+
+    See :func:`renderJobs` for details on the ``njobs``, ``glversion``,
+    ``verbose`` and ``noisy`` arguments.
+
+    :arg args: Sequence of ``render`` arguments describing the movie.
+    """
+
+    if njobs is None or njobs < 1:
+        njobs = os.cpu_count() or 1
+
+    args      = list(args)
+    namespace = parseArgs(args)
+
+    overlayList, displayCtx, sceneOpts = makeDisplayContext(namespace)
+
+    checkMovie(namespace, displayCtx)
+
+    maxPending = 2 * njobs
+    pending    = collections.deque()
+    executor   = cf.ProcessPoolExecutor(
+        max_workers=njobs,
+        mp_context=mp.get_context('spawn'),
+        initializer=_initMovieWorker,
+        initargs=(args, glversion, verbose, noisy))
+
+    with executor, movie.openMovieWriter(namespace.outfile,
+                                         namespace.movieDelay) as writer:
+        for frame in movieFrames(namespace, displayCtx, sceneOpts):
+            pending.append(executor.submit(_movieWorkerFrame, frame))
+            if len(pending) >= maxPending:
+                writer.write(pending.popleft().result())
+
+        while len(pending) > 0:
+            writer.write(pending.popleft().result())
+
+
+def _initMovieWorker(args, glversion, verbose, noisy):
+    """Initialises a :func:`renderMovieJobs` worker process. Calls
+    :func:`_initWorker`, then creates the scene described by ``args``.
+    """
+
+    global _movieState
+
+    _initWorker(glversion, verbose, noisy)
+
+    namespace = parseArgs(args)
+
+    overlayList, displayCtx, sceneOpts = makeDisplayContext(namespace)
+
+    canvases, sizes, labelMgr = createCanvases(
+        namespace, overlayList, displayCtx, sceneOpts)
+
+    _movieState = (namespace, overlayList, displayCtx, sceneOpts,
+                   canvases, sizes, labelMgr)
+
+
+_movieState = None
+"""Used by :func:`renderMovieJobs` worker processes to store the scene
+being rendered (see :func:`_initMovieWorker`).
+"""
+
+
+def _movieWorkerFrame(frame):
+    """Runs in a :func:`renderMovieJobs` worker process. Renders and
+    returns the given movie frame.
+    """
+
+    namespace, overlayList, displayCtx, sceneOpts, canvases, sizes, _ = \
+        _movieState
+
+    applyMovieFrame(frame, displayCtx, sceneOpts, canvases)
+    bitmap, _ = renderCanvases(namespace,
+                               overlayList,
+                               displayCtx,
+                               sceneOpts,
+                               canvases,
+                               sizes)
+
+    return bitmap[:, :, :3]
+
+
+def checkMovie(namespace, displayCtx):
+    """Raises a ``ValueError`` if a movie cannot be rendered for the
+    currently selected overlay, along ``namespace.movieAxis``.
+    """
+
+    overlay = displayCtx.getSelectedOverlay()
+    opts    = displayCtx.getOpts(overlay)
+
+    if not movie.canRunMovie(overlay, opts, namespace.movieAxis):
+        raise ValueError(f'Cannot render a movie for {overlay.name} '
+                         f'along axis {namespace.movieAxis}')
+
+
+def movieFrames(namespace, displayCtx, sceneOpts):
+    """Generator which steps through the movie described by ``namespace``,
+    using a :class:`.MovieContext` to detect when a complete movie has been
+    generated.
+
+    The scene is updated before each frame is yielded. Each frame is a
+    ``dict`` containing the values of the properties which describe the
+    frame, and which can be passed to :func:`applyMovieFrame`.
+    """
+
+    axis    = namespace.movieAxis
+    is3d    = namespace.scene == '3d' and axis < 3
+    overlay = displayCtx.getSelectedOverlay()
+    opts    = displayCtx.getOpts(overlay)
+    rate    = np.clip(namespace.movieRate, 10, 500)
+    rate    = (rate - 10) / 490
+    ctx     = movie.MovieContext(is3d)
+
+    if   is3d:                              prop = 'rotation'
+    elif axis < 3:                          prop = 'location'
+    elif isinstance(overlay, fslmesh.Mesh): prop = 'vertexDataIndex'
+    else:                                   prop = 'volume'
+
+    while True:
+
+        if is3d: frame = np.copy(sceneOpts.rotation)
+        else:    frame = movie.getMovieFrame(displayCtx, overlay, opts, axis)
+
+        frame, finished = ctx.processFrame(frame)
+
+        if finished:
+            break
+
+        ctx.addFrame(frame)
+
+        if   prop == 'rotation': yield {prop : np.copy(sceneOpts.rotation)}
+        elif prop == 'location': yield {prop : list(displayCtx.location)}
+        else:                    yield {prop : getattr(opts, prop)}
+
+        if is3d:
+            sceneOpts.rotation = movie.rotateScene(
+                sceneOpts.rotation, axis, rate)
+        else:
+            movie.doMovieUpdate(displayCtx, overlay, opts, axis)
+
+
+def applyMovieFrame(frame, displayCtx, sceneOpts, canvases):
+    """Applies a movie frame generated by :func:`movieFrames` to the scene.
+    """
+
+    overlay = displayCtx.getSelectedOverlay()
+    opts    = displayCtx.getOpts(overlay)
+
+    for prop, value in frame.items():
+        if prop == 'location':
+            displayCtx.location = value
+        elif prop == 'rotation':
+            sceneOpts.rotation = value
+            for c in canvases:
+                c.opts.rotation = value
+        else:
+            setattr(opts, prop, value)
+
+
+def destroyCanvases(canvases, labelMgr=None):
+    """Destroys canvases created by :func:`createCanvases`. """
+    if labelMgr is not None:
+        labelMgr.destroy()
+    for c in canvases:
+        c.destroy()
+
+
+def createCanvases(namespace, overlayList, displayCtx, sceneOpts):
+    """Creates and configures the off-screen canvases for the scene. The
+    canvases may be drawn multiple times with :func:`renderCanvases`, and
+    must be destroyed by the caller when no longer needed.
+
+    :arg namespace:   ``argparse.Namespace`` object containing command line
+                      arguments.
+    :arg overlayList: The :class:`.OverlayList` instance.
+    :arg displayCtx:  The :class:`.DisplayContext` instance.
+    :arg sceneOpts:   The :class:`.SceneOpts` instance.
+
+    :returns: A tuple containing:
+
+               - A list of canvases.
+               - A tuple containing the canvas area ``(width, height)``,
+                 and the colour bar ``(width, height)``.
+               - An :class:`.OrthoLabels` instance for ortho scenes, or
+                 ``None`` otherwise. A reference to this must be kept for
+                 as long as the canvases are in use.
+    """
+
     # Calculate canvas and colour bar sizes
     # so that the entire scene will fit in
     # the width/height specified by the user
@@ -323,6 +1121,8 @@ def render(namespace, overlayList, displayCtx, sceneOpts, hook=None):
                                sceneOpts.colourBarLocation,
                                sceneOpts.labelSize)
 
+    labelMgr = None
+
     # Lightbox view -> only one canvas
     if namespace.scene == 'lightbox':
         c = createLightBoxCanvas(namespace,
@@ -390,26 +1190,41 @@ def render(namespace, overlayList, displayCtx, sceneOpts, hook=None):
         saveannotations.loadAnnotations(MockOrthoPanel(canvases),
                                         namespace.annotations)
 
+    return canvases, ((width, height), (cbarWidth, cbarHeight)), labelMgr
+
+
+def renderCanvases(namespace,
+                   overlayList,
+                   displayCtx,
+                   sceneOpts,
+                   canvases,
+                   sizes):
+    """Draws the given canvases, and returns a tuple containing the bitmap
+    and the background colour.
+
+    :arg namespace:   ``argparse.Namespace`` object containing command line
+                      arguments.
+    :arg overlayList: The :class:`.OverlayList` instance.
+    :arg displayCtx:  The :class:`.DisplayContext` instance.
+    :arg sceneOpts:   The :class:`.SceneOpts` instance.
+    :arg canvases:    Canvases created by :func:`createCanvases`.
+    :arg sizes:       Canvas area and colour bar sizes, as returned by
+                      :func:`createCanvases`.
+    """
+
+    (width, height), (cbarWidth, cbarHeight) = sizes
+
     # Configure each of the canvases (with those
     # properties that are common to both ortho and
     # lightbox canvases) and render them one by one
     canvasBmps = []
 
-    # Call hook if provided (used for testing)
-    if hook is not None:
-        hook(overlayList, displayCtx, sceneOpts, canvases)
-
     for c in canvases:
 
         c.opts.pos = displayCtx.location
         c.draw()
         canvasBmps.append(c.getBitmap())
 
-    # destroy the canvases
-    for c in canvases:
-        c.destroy()
-    canvases = None
-
     # layout the bitmaps
     if namespace.scene in ('lightbox', '3d'):
         layout = fsllayout.Bitmap(canvasBmps[0])
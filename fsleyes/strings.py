@@ -628,6 +628,7 @@ labels = TypeDict({
     'LocationInfoPanel.noData'                : 'No data',
     'LocationInfoPanel.outOfBounds'           : 'Out of bounds',
     'LocationInfoPanel.notAvailable'          : 'N/A',
+    'LocationInfoPanel.pendingValue'          : '\u2026',
     'LocationInfoPanel.copy'                  : 'Copy coordinates',
     'LocationInfoPanel.copied'                : 'Copied!',
     'LocationHistoryPanel.load'               : 'Load',
@@ -1252,6 +1253,7 @@ properties = TypeDict({
     'Volume3DOpts.blendByIntensity'        : 'Blend by intensity',
     'Volume3DOpts.smoothing'               : 'Smoothing',
     'Volume3DOpts.resolution'              : 'Quality',
+    'Volume3DOpts.progressive'             : 'Progressive rendering',
     'Volume3DOpts.numClipPlanes'           : 'Number of clipping planes',
     'Volume3DOpts.showClipPlanes'          : 'Show clipping planes',
     'Volume3DOpts.clipMode'                : 'Clipping mode',
@@ -9,11 +9,15 @@ import numpy as np
 
 import wx
 
-from fsl.data.image import Image
+from fsl.data.image    import Image
+from fsl.utils.tempdir import tempdir
 
-from fsleyes.controls.locationpanel import LocationPanel
+from fsleyes.controls.locationpanel import LocationPanel, VoxelLookup
 
-from fsleyes.tests import run_with_orthopanel, realYield, simclick
+from fsleyes.tests import (run_with_orthopanel,
+                           realYield,
+                           simclick,
+                           yieldUntil)
 
 
 datadir = op.join(op.dirname(__file__), '..', 'testdata')
@@ -61,3 +65,52 @@ def _test_LocationPanel_copy_coordinates(ortho, overlayList, displayCtx):
 
     else:
         warnings.warn('Could not access clipboard')
+
+
+def test_VoxelLookup():
+    run_with_orthopanel(_test_VoxelLookup)
+def _test_VoxelLookup(ortho, overlayList, displayCtx):
+
+    with tempdir():
+        data = np.random.random((10, 10, 10, 5)).astype(np.float32)
+        Image(data).save('image.nii.gz')
+        img  = Image('image.nii.gz')
+
+        lookup   = VoxelLookup(cacheSize=4)
+        finished = [0]
+
+        def onFinish():
+            finished[0] += 1
+
+        assert lookup.get(img, (1, 2, 3, 0)) is None
+
+        lookup.request([(img, (1, 2, 3, 0)), (img, (4, 5, 6, 1))], onFinish)
+        yieldUntil(lambda: finished[0] == 1)
+
+        assert lookup.get(img, (1, 2, 3, 0)) == data[1, 2, 3, 0]
+        assert lookup.get(img, (4, 5, 6, 1)) == data[4, 5, 6, 1]
+
+        # Cache is cleared when
+        # the image data changes
+        img[1, 2, 3, 0] = 10
+        assert lookup.get(img, (1, 2, 3, 0)) is None
+
+        lookup.request([(img, (1, 2, 3, 0))], onFinish)
+        yieldUntil(lambda: finished[0] == 2)
+        assert lookup.get(img, (1, 2, 3, 0)) == 10
+
+        lookup.prune([])
+        assert lookup.get(img, (1, 2, 3, 0)) is None
+
+        # Least recently used values
+        # are evicted from the cache
+        vlocs = [(i, i, i, 0) for i in range(5)]
+        lookup.request([(img, v) for v in vlocs[:4]], onFinish)
+        yieldUntil(lambda: finished[0] == 3)
+        assert lookup.get(img, vlocs[0]) == data[vlocs[0]]
+        lookup.request([(img, vlocs[4])], onFinish)
+        yieldUntil(lambda: finished[0] == 4)
+        assert lookup.get(img, vlocs[0]) == data[vlocs[0]]
+        assert lookup.get(img, vlocs[1]) is None
+        assert lookup.get(img, vlocs[4]) == data[vlocs[4]]
+        lookup.destroy()
@@ -6,7 +6,11 @@
 #
 
 
-import numpy as np
+import threading
+import time
+
+import numpy  as np
+import pytest
 
 
 from fsl.data.image import Image
@@ -53,3 +57,119 @@ def test_pearsonCorrelation():
     data   = np.random.randint(0, 1000, (10, 10, 10, 50)).astype(np.int32)
     result = correlate.pearsonCorrelation((0, 0, 0), data)
     assert result.shape == data.shape[:3]
+
+
+def test_PearsonCorrelation():
+    data             = np.random.randint(0, 1000, (10, 11, 12, 50))
+    data             = data.astype(np.int32)
+    data[1, 2, 3, :] = 7
+    flat             = data.reshape(-1, 50).astype(np.float64)
+
+    for mmap, nthreads, chunkSize in [(False, 1, 67108864),
+                                      (False, 4, 100),
+                                      (True,  2, 1000),
+                                      (False, 4, 1000000)]:
+        engine = correlate.PearsonCorrelation(
+            data, mmap=mmap, nthreads=nthreads, chunkSize=chunkSize)
+
+        for seed in [(0, 0, 0), (5, 6, 7), (9, 10, 11), (1, 2, 3)]:
+            result = engine.correlate(seed)
+            sidx   = np.ravel_multi_index(seed, data.shape[:3])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                exp = np.corrcoef(flat)[sidx].reshape(data.shape[:3])
+            exp[np.isnan(exp)] = 0
+
+            assert result.shape == data.shape[:3]
+            assert np.all(np.isclose(result, exp, atol=1e-5))
+            assert np.all(result[1, 2, 3] == 0)
+
+        engine.destroy()
+
+
+def test_PearsonCorrelation_image():
+
+    # 5D image - correlate across the 4th dimension
+    data  = np.random.randint(0, 1000, (10, 11, 12, 20, 3)).astype(np.int32)
+    img   = Image(data)
+    index = (slice(None), slice(None), slice(None), slice(None), 1)
+
+    # The data should be read in chunks,
+    # never in its entirety
+    class Reader:
+        shape = img.shape
+        def __getitem__(self, slc):
+            assert slc[0] != slice(None)
+            return img[slc]
+
+    engine = correlate.PearsonCorrelation(Reader(), index=index, chunkSize=100)
+    exp    = correlate.pearsonCorrelation((5, 6, 7), data[..., 1])
+
+    assert engine.shape == (10, 11, 12)
+    assert np.all(np.isclose(engine.correlate((5, 6, 7)), exp, atol=1e-5))
+    engine.destroy()
+
+
+def test_PearsonCorrelation_chunkSize():
+
+    # Each slice is 10*10*50 voxels, processed
+    # as float64 with three copies in memory
+    data     = np.random.randint(0, 1000, (20, 10, 10, 50)).astype(np.int32)
+    slcbytes = 10 * 10 * 50 * 8 * 3
+    lock     = threading.Lock()
+    inflight = [0]
+    maxin    = [0]
+    nslices  = []
+
+    class Reader:
+        shape = data.shape
+        def __getitem__(self, slc):
+            with lock:
+                inflight[0] += 1
+                maxin[0]     = max(maxin[0], inflight[0])
+                nslices.append(len(range(*slc[0].indices(20))))
+            time.sleep(0.01)
+            with lock:
+                inflight[0] -= 1
+            return data[slc]
+
+    # room for four slices, with two threads -
+    # two chunks of two slices at a time
+    engine = correlate.PearsonCorrelation(
+        Reader(), nthreads=2, chunkSize=slcbytes * 4)
+    exp    = correlate.pearsonCorrelation((5, 6, 7), data)
+
+    assert maxin[0]     <= 2
+    assert max(nslices) == 2
+    assert sum(nslices) == 20
+    assert np.all(np.isclose(engine.correlate((5, 6, 7)), exp, atol=1e-5))
+    engine.destroy()
+
+    # with more threads, the chunks get smaller
+    nslices[:] = []
+    maxin[0]   = 0
+    engine     = correlate.PearsonCorrelation(
+        Reader(), nthreads=8, chunkSize=slcbytes * 4)
+    assert maxin[0]     <= 4
+    assert max(nslices) == 1
+    assert np.all(np.isclose(engine.correlate((5, 6, 7)), exp, atol=1e-5))
+    engine.destroy()
+
+
+def test_PearsonCorrelation_acquire():
+    data   = np.random.randint(0, 1000, (10, 10, 10, 20)).astype(np.int32)
+    engine = correlate.PearsonCorrelation(data)
+    exp    = engine.correlate((1, 2, 3))
+
+    # destroy is deferred until all users
+    # have released the engine
+    assert engine.acquire()
+    assert engine.acquire()
+    engine.destroy()
+    assert not engine.acquire()
+    assert np.all(engine.correlate((1, 2, 3)) == exp)
+    engine.release()
+    assert np.all(engine.correlate((1, 2, 3)) == exp)
+    engine.release()
+    assert not engine.acquire()
+    with pytest.raises(Exception):
+        engine.correlate((1, 2, 3))
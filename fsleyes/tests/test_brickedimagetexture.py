@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+#
+# test_brickedimagetexture.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import itertools as it
+import contextlib
+from unittest import mock
+
+import numpy  as np
+import pytest
+
+import fsl.data.image       as fslimage
+import fsl.transform.affine as affine
+
+import fsleyes.gl.glvolume                     as glvolume
+import fsleyes.gl.textures.data                as texdata
+import fsleyes.gl.textures.imagetexture        as imagetexture
+import fsleyes.gl.textures.brickedimagetexture as bricked
+
+
+def test_ImageBrick():
+
+    shape = (20, 30, 10)
+    size  = 8
+    halo  = 2
+
+    nbricks = [int(np.ceil(s / size)) for s in shape]
+    covered = np.zeros(shape, dtype=int)
+    data    = np.arange(np.prod(shape)).reshape(shape)
+    voxels  = np.array(list(it.product(*[range(s) for s in shape])))
+
+    for idx in it.product(*[range(n) for n in nbricks]):
+
+        brick = bricked.ImageBrick(idx, size, halo, shape)
+        low   = np.array(idx) * size
+        high  = np.minimum(low + size, shape)
+
+        assert brick.index == idx
+        assert np.all(brick.dataLow  == np.maximum(low  - halo, 0))
+        assert np.all(brick.dataHigh == np.minimum(high + halo, shape))
+
+        # draw bounds cover the brick voxels,
+        # and extend beyond the image edges
+        for d in range(3):
+            if low[d] == 0: assert brick.drawLow[d] < -0.5
+            else:           assert brick.drawLow[d] == low[d] - 0.5
+            if high[d] == shape[d]: assert brick.drawHigh[d] > shape[d] - 0.5
+            else:                   assert brick.drawHigh[d] == high[d] - 0.5
+
+        # every voxel is drawn by exactly one brick
+        inside = np.all((voxels >= brick.drawLow) &
+                        (voxels <  brick.drawHigh), axis=1)
+        covered[tuple(voxels[inside].T)] += 1
+
+        # image texture coordinates for the first/last
+        # voxels in the brick texture should map to
+        # the first/last texels in the brick texture
+        dshape   = brick.dataHigh - brick.dataLow
+        imgCoord = (np.array([brick.dataLow, brick.dataHigh - 1]) + 0.5)
+        brkCoord = affine.transform(imgCoord / shape, brick.texCoordXform)
+        assert np.all(np.isclose(brkCoord[0], 0.5 / dshape))
+        assert np.all(np.isclose(brkCoord[1], 1 - 0.5 / dshape))
+
+        assert data[brick.slices].shape == tuple(dshape)
+
+    assert np.all(covered == 1)
+
+
+class MockTexture3D:
+    """Stand-in for a Texture3D, which just stores its data. """
+    def __init__(self, name, data, **kwargs):
+        self.name      = name
+        self.data      = data
+        self.nbytes    = data.nbytes
+        self.settings  = kwargs
+        self.destroyed = False
+
+    def set(self, **kwargs):
+        self.settings.update(kwargs)
+
+    def destroy(self):
+        self.destroyed = True
+
+
+@contextlib.contextmanager
+def mockGL(max3d=36, max2d=256):
+    """Mocks out the OpenGL texture size limits, and brick texture
+    creation.
+    """
+    gl     = mock.MagicMock()
+    limits = {gl.GL_MAX_3D_TEXTURE_SIZE : max3d,
+              gl.GL_MAX_TEXTURE_SIZE    : max2d}
+    gl.glGetInteger.side_effect = limits.__getitem__
+
+    with mock.patch.object(bricked, 'gl', gl), \
+         mock.patch.object(texdata, 'gl', gl), \
+         mock.patch('fsleyes.gl.textures.data.canUseFloatTextures',
+                    return_value=(True, None, None)), \
+         mock.patch('fsleyes.gl.textures.texture3d.Texture3D',
+                    MockTexture3D):
+        yield gl
+
+
+def makeImage(shape=(100, 70, 30)):
+    data = np.random.randint(0, 255, shape).astype(np.uint8)
+    return fslimage.Image(data)
+
+
+def sliceCoords(shape, axis, pos):
+    """Returns voxel coordinates for the corners of an axis-aligned slice
+    through an image of the given shape.
+    """
+    xax, yax = [a for a in range(3) if a != axis]
+    coords   = np.zeros((4, 3))
+    coords[:, axis] = pos
+    coords[:, xax]  = [-0.5, shape[xax] - 0.5, shape[xax] - 0.5, -0.5]
+    coords[:, yax]  = [-0.5, -0.5, shape[yax] - 0.5, shape[yax] - 0.5]
+    return coords
+
+
+def test_exceedsTextureLimits():
+    with mockGL(max3d=64, max2d=256):
+        assert not texdata.exceedsTextureLimits((64, 64, 64))
+        assert not texdata.exceedsTextureLimits((200, 200, 1))
+        assert not texdata.exceedsTextureLimits((1, 1, 1))
+        assert     texdata.exceedsTextureLimits((65, 10, 10))
+        assert     texdata.exceedsTextureLimits((10, 10, 65))
+        assert     texdata.exceedsTextureLimits((300, 1, 1))
+        assert     texdata.exceedsTextureLimits((1, 257, 100))
+
+
+def test_createImageTexture_allowBricks():
+
+    big   = mock.MagicMock(shape=(100, 10, 10))
+    small = mock.MagicMock(shape=(10, 10, 10))
+
+    with mockGL(max3d=64), \
+         mock.patch.object(bricked,      'BrickedImageTexture') as brk, \
+         mock.patch.object(imagetexture, 'ImageTexture')        as tex:
+
+        # too big, and bricks allowed
+        result = imagetexture.createImageTexture(
+            'big', big, interp=1, allowBricks=True)
+        assert result is brk.return_value
+        brk.assert_called_once_with('big', big, interp=1)
+        tex.assert_not_called()
+
+        # too big, and bricks not allowed
+        brk.reset_mock()
+        with pytest.raises(RuntimeError):
+            imagetexture.createImageTexture('big', big)
+        brk.assert_not_called()
+
+        # small enough for a normal texture
+        result = imagetexture.createImageTexture(
+            'small', small, allowBricks=True)
+        assert result is tex.return_value
+        tex.assert_called_once_with('small', small)
+        brk.assert_not_called()
+
+
+def test_BrickedImageTexture_grid():
+
+    image = makeImage()
+
+    # brick size is limited by the max texture
+    # size, allowing for a halo on each side
+    with mockGL(max3d=36):
+        tex = bricked.BrickedImageTexture('tex', image, threaded=False)
+        assert tex.brickSize == 32
+        assert tex.nbricks   == (4, 3, 1)
+        assert tex.shape     == (100, 70, 30)
+        assert tex.ready()
+        tex.destroy()
+
+    with mockGL(max3d=2048):
+        tex = bricked.BrickedImageTexture('tex', image, threaded=False)
+        assert tex.brickSize == bricked.BrickedImageTexture.defaultBrickSize
+        assert tex.nbricks   == (1, 1, 1)
+        tex.destroy()
+
+    with mockGL(), pytest.raises(RuntimeError):
+        bricked.BrickedImageTexture('tex', image, nvals=3)
+
+
+def test_BrickedImageTexture_sliceBricks():
+
+    image = makeImage()
+    shape = image.shape
+
+    def sliceBricks(voxCoords):
+        return sorted(tex._BrickedImageTexture__sliceBricks(voxCoords))
+
+    with mockGL(max3d=36):
+        tex = bricked.BrickedImageTexture('tex', image, threaded=False)
+
+        # axial slice - every brick
+        assert sliceBricks(sliceCoords(shape, 2, 10)) == \
+            sorted(it.product(range(4), range(3), [0]))
+
+        # sagittal slice through the middle of a brick
+        assert sliceBricks(sliceCoords(shape, 0, 40)) == \
+            [(1, 0, 0), (1, 1, 0), (1, 2, 0)]
+
+        # slices on a brick boundary touch
+        # the bricks on either side of it
+        assert sliceBricks(sliceCoords(shape, 1, 32)) == \
+            [(0, 0, 0), (0, 1, 0), (1, 0, 0), (1, 1, 0),
+             (2, 0, 0), (2, 1, 0), (3, 0, 0), (3, 1, 0)]
+
+        # oblique slice (x + y = 60) - the
+        # brick bounding boxes intersect brick
+        # (1, 1), but the plane does not
+        oblique = [[60, 0, 0], [0, 60, 0], [0, 60, 29], [60, 0, 29]]
+        assert sliceBricks(oblique) == [(0, 0, 0), (0, 1, 0), (1, 0, 0)]
+
+        tex.destroy()
+
+
+def test_BrickedImageTexture_bricks():
+
+    image = makeImage()
+    shape = image.shape
+
+    with mockGL(max3d=36):
+        tex    = bricked.BrickedImageTexture('tex', image, threaded=False)
+        bricks = tex.bricks(sliceCoords(shape, 0, 40))
+
+        assert [b.index for b in bricks] == [(1, 0, 0), (1, 1, 0), (1, 2, 0)]
+        for b in bricks:
+            assert np.all(b.texture.data == image[b.slices])
+        assert tex.nbytes == sum(b.texture.nbytes for b in bricks)
+
+        # resident bricks are re-used
+        again = tex.bricks(sliceCoords(shape, 0, 40))
+        assert all(a is b for a, b in zip(bricks, again))
+
+        # least recently used bricks are evicted
+        # when the memory limit is exceeded, but
+        # bricks for the current slice are kept
+        with mock.patch.object(bricked.BrickedImageTexture,
+                               'maxResidentBytes', 0):
+            new = tex.bricks(sliceCoords(shape, 0, 70))
+
+        assert [b.index for b in new] == [(2, 0, 0), (2, 1, 0), (2, 2, 0)]
+        assert all(b.texture is None for b in bricks)
+        assert tex.nbytes == sum(b.texture.nbytes for b in new)
+
+        # changing settings discards all bricks
+        textures = [b.texture for b in new]
+        tex.set(volRefresh=True)
+        assert tex.nbytes == 0
+        assert all(t.destroyed for t in textures)
+
+        tex.destroy()
+
+
+class MockGLVolume:
+    """Stand-in for a GLVolume, with just enough state to test
+    drawing images which are stored in a bricked texture.
+    """
+
+    currentBrick = glvolume.GLVolume.currentBrick
+    drawBricks   = glvolume.GLVolume._GLVolume__drawBricks
+    brickBBox    = glvolume.GLVolume._GLVolume__brickBBox
+
+    def __init__(self, xform=None):
+        if xform is None:
+            xform = np.eye(4)
+        self.opts                = mock.MagicMock()
+        self.opts.getTransform   = mock.Mock(return_value=xform)
+        self.imageTexture        = mock.MagicMock()
+        self._GLVolume__brick    = None
+
+
+def test_GLVolume_brickBBox():
+
+    xform = affine.scaleOffsetXform([2, 2, 2], [10, 0, 0])
+    vol   = MockGLVolume(xform)
+    brick = bricked.ImageBrick((1, 0, 0), 32, 2, (100, 70, 30))
+
+    # drawLow:  [31.5, -1,   -1]
+    # drawHigh: [63.5, 31.5, 31]
+    assert np.all(np.isclose(vol.brickBBox(brick),
+                             [(73, 137), (-2, 63), (-2, 62)]))
+
+    bbox = [(0, 100), (10, 20), (-50, 50)]
+    assert np.all(np.isclose(vol.brickBBox(brick, bbox),
+                             [(73, 100), (10, 20), (-2, 50)]))
+    vol.opts.getTransform.assert_called_with('voxel', 'display')
+
+
+def test_GLVolume_drawBricks():
+
+    vol       = MockGLVolume()
+    canvas    = mock.MagicMock()
+    voxCoords = sliceCoords((100, 70, 30), 2, 10)
+    bricks    = [bricked.ImageBrick((i, 0, 0), 32, 2, (100, 70, 30))
+                 for i in range(3)]
+    drawn     = []
+
+    for b in bricks:
+        b.texture = mock.MagicMock()
+
+    def draw2D(v, c, zpos, axes, xform):
+        drawn.append(v.currentBrick)
+        assert v.currentBrick.texture.bound.called
+
+    vol.imageTexture.bricks.return_value = bricks
+
+    with mock.patch.object(glvolume.glimageobject.GLImageObject,
+                           'generateVertices2D',
+                           return_value=(None, voxCoords, None)) as gv, \
+         mock.patch.object(glvolume.fslgl, 'glvolume_funcs',
+                           create=True) as funcs:
+        funcs.draw2D.side_effect = draw2D
+        vol.drawBricks(canvas, 10, (0, 1, 2))
+
+        gv.assert_called_once_with(vol, 10, (0, 1, 2),
+                                   bbox=canvas.viewport)
+        vol.imageTexture.bricks.assert_called_once_with(voxCoords)
+        assert drawn == bricks
+        assert vol.currentBrick is None
+
+        # current brick is cleared on error
+        funcs.draw2D.side_effect = RuntimeError()
+        with pytest.raises(RuntimeError):
+            vol.drawBricks(canvas, 10, (0, 1, 2))
+        assert vol.currentBrick is None
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+#
+# test_brickrangetexture.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import itertools as it
+
+import numpy as np
+
+import fsleyes.gl.textures.brickrangetexture as brickrangetexture
+
+
+def test_brickRanges():
+
+    data           = np.random.random((17, 9, 20))
+    data[0, 0, 0]  = np.nan
+    data[9:, :, :] = np.nan
+
+    lo, hi = brickrangetexture.brickRanges(data, 4)
+
+    assert lo.shape == (5, 3, 5)
+    assert hi.shape == (5, 3, 5)
+
+    # Each brick range should include
+    # the voxels either side of the brick
+    for i, j, k in it.product(*[range(s) for s in lo.shape]):
+        slc   = tuple(slice(max(b * 4 - 1, 0), b * 4 + 5) for b in (i, j, k))
+        brick = data[slc]
+
+        if np.all(np.isnan(brick)):
+            assert np.isnan(lo[i, j, k])
+            assert np.isnan(hi[i, j, k])
+        else:
+            assert np.isclose(lo[i, j, k], np.nanmin(brick))
+            assert np.isclose(hi[i, j, k], np.nanmax(brick))
+
+
+def test_brickRanges_integer():
+
+    data = np.zeros((16, 16, 16), dtype=np.int16)
+    data[4, 4, 4]   = 10
+    data[12, 12, 8] = -5
+
+    lo, hi = brickrangetexture.brickRanges(data, 8)
+
+    assert lo.shape == (2, 2, 2)
+    assert lo.dtype == np.int16
+
+    # brick (0, 0, 0) contains the 10, and
+    # the neighbouring bricks include the
+    # -5 at their boundary
+    assert hi[0, 0, 0] == 10
+    assert lo[0, 0, 0] == 0
+    assert lo[1, 1, 1] == -5
+    assert lo[1, 1, 0] == -5
+    assert hi[1, 1, 1] == 0
+    assert np.all(lo[:, 0, :] == 0)
@@ -16,7 +16,8 @@ import numpy as np
 
 import fsl.utils.settings as fslsettings
 from   fsl.utils.tempdir import tempdir
-import fsleyes.colourmaps as fslcm
+import fsleyes.colourmaps      as fslcm
+import fsleyes.utils.filecache as filecache
 
 from fsleyes.tests import (mockSettingsDir,
                            mockSiteDir,
@@ -245,6 +246,67 @@ def test_register():
 
 
 
+@clearCmapsDecorator
+def test_init_lazy():
+
+    with mockCmaps() as (assetDir, userDir, siteDir):
+
+        # Files are parsed the first time
+        # they are seen, and then cached
+        fslcm.init()
+
+        cmap1 = op.join(assetDir, 'colourmaps', 'cmap1.cmap')
+        lut1  = op.join(assetDir, 'luts',       'lut1.lut')
+        assert op.exists(fslcm._mapCachePath(cmap1, 'cmap'))
+        assert op.exists(fslcm._mapCachePath(lut1,  'lut'))
+
+        # On subsequent runs, maps are
+        # only loaded when they are used,
+        # and are loaded from the cache
+        with mock.patch.dict('fsleyes.colourmaps._cmapData', clear=True), \
+             mock.patch('fsleyes.colourmaps._loadMapFile',
+                        wraps=fslcm._loadMapFile) as loadMapFile, \
+             mock.patch('fsleyes.colourmaps.loadColourMapFile') as loadCmap, \
+             mock.patch('fsleyes.colourmaps.loadLookupTableFile') as loadLut:
+            fslcm.init(force=True)
+            assert loadMapFile.call_count == 0
+
+            cmap = fslcm.getColourMap('cmap1')
+            assert cmap.N == 2
+            assert np.all(np.isclose(cmap(0.0), [0.3, 0.4, 0.5, 1]))
+            assert loadMapFile.call_count == 1
+
+            lut = fslcm.getLookupTable('lut1')
+            assert len(lut) == 2
+            assert lut[1].name == 'label 2'
+            assert loadMapFile.call_count == 2
+
+            loadCmap.assert_not_called()
+            loadLut .assert_not_called()
+
+
+@clearCmapsDecorator
+def test_init_cmapSizes_single_write():
+
+    with mockCmaps() as (assetDir, userDir, siteDir):
+
+        # The colour map sizes cache should be
+        # written once, rather than once per map
+        cmapSizes = filecache.FileCache('colourmap_sizes.json')
+        with mock.patch('fsleyes.colourmaps._cmapSizes', cmapSizes), \
+             mock.patch.object(fslsettings, 'writeFile',
+                               wraps=fslsettings.writeFile) as writeFile:
+            fslcm.init(force=True)
+
+        writes = [c for c in writeFile.call_args_list
+                  if 'colourmap_sizes' in c[0][0]]
+        assert len(writes) == 1
+
+        for cmap in ['cmap1', 'cmap2', 'cmap3']:
+            cmapFile = fslcm.getColourMapFile(cmap)
+            assert cmapSizes.get(cmapFile) == 2
+
+
 ##########
 # File I/O
 ##########
@@ -560,3 +622,56 @@ def test_LookupTable():
         assert len(lut)  == 5
         assert not lut.saved
         assert called['added'] == (lbl, 4)
+
+
+def test_LookupTable_index_remap():
+    lut = fslcm.LookupTable('mylut', 'My LUT')
+
+    values = [500000, 3, 70000, 12, 0]
+    for v in values:
+        lut.insert(v, name=str(v), colour=(v % 2, 0, 1))
+
+    svalues = sorted(values)
+
+    for i, v in enumerate(svalues):
+        assert lut.index(v)             == i
+        assert lut.index(np.int32(v))   == i
+        assert lut.index(lut[i])        == i
+        assert lut.get(v).value         == v
+    assert lut.get(4)     is None
+    assert lut.get('abc') is None
+    with pytest.raises(ValueError):
+        lut.index(4)
+
+    lvals, colours, enabled = lut.arrays()
+    assert np.all(lvals     == svalues)
+    assert np.all(colours   == [(v % 2, 0, 1) for v in svalues])
+    assert np.all(enabled)
+
+    lut[1].enabled = False
+    lut[1].colour  = (0.5, 0.5, 0.5)
+    assert not lut.arrays()[2][1]
+    assert np.all(lut.arrays()[1][1] == (0.5, 0.5, 0.5))
+
+    data     = np.array([[0, 3, 4], [70000, 500000, 600000]], dtype=np.int32)
+    expected = np.array([[0, 1, 5], [3,     4,      5]])
+    assert np.all(lut.remap(data) == expected)
+    assert np.all(lut.remap(data.astype(np.float32)) == expected)
+
+    # index map is updated on insert/delete
+    lut.delete(12)
+    assert lut.get(12)       is None
+    assert lut.index(70000)  == 2
+    assert lut.index(500000) == 3
+    assert np.all(lut.remap(data) == [[0, 1, 4], [2, 3, 4]])
+
+    lut.insert(4)
+    assert lut.index(4)      == 2
+    assert lut.index(500000) == 4
+    assert np.all(lut.remap(data) == [[0, 1, 2], [3, 4, 5]])
+
+    with pytest.raises(ValueError):
+        lut.insert(fslcm.MAX_LUT_VALUE + 1)
+
+    empty = fslcm.LookupTable('empty', 'empty')
+    assert np.all(empty.remap(data) == 0)
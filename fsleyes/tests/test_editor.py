@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+#
+# test_editor.py - Tests for the fsleyes.editor.editor module.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import numpy as np
+
+from fsl.data.image import Image
+
+import fsleyes.editor.editor as fsleditor
+
+from fsleyes.tests import run_with_orthopanel, realYield
+
+
+def test_BlockChange_sparse():
+
+    old = np.random.randint(0, 100, (20, 20, 20)).astype(np.int16)
+    new = np.array(old)
+    new[5, 6, 7]  = 500
+    new[10:12, 3] = -1
+
+    change = fsleditor.ValueChange(None, None, (0, 0, 0), old, new)
+
+    assert change.sparse
+    assert change.shape  == (20, 20, 20)
+    assert change.nbytes <  old.nbytes
+
+    assert np.all(change.getBlock(True,  lambda: old) == new)
+    assert np.all(change.getBlock(False, lambda: new) == old)
+
+
+def test_BlockChange_dense():
+
+    old    = np.zeros((20, 20, 20), dtype=np.uint8)
+    old[:10] = 1
+    new    = (old == 0).astype(np.uint8)
+    change = fsleditor.SelectionChange(None, (0, 0, 0), old, new)
+
+    assert not change.sparse
+    assert change.nbytes < old.nbytes
+
+    def current():
+        raise AssertionError('Should not be called')
+
+    assert np.all(change.getBlock(True,  current) == new)
+    assert np.all(change.getBlock(False, current) == old)
+
+
+def test_Editor_historyLimit():
+    run_with_orthopanel(_test_Editor_historyLimit)
+def _test_Editor_historyLimit(panel, overlayList, displayCtx):
+
+    img = Image(np.zeros((20, 20, 20), dtype=np.float32))
+    overlayList.append(img)
+    realYield()
+
+    # each fill below changes 2 voxels
+    # in a 10*10 block, which is stored
+    # sparsely in 2 * (4 + 4 + 4) bytes
+    editor = fsleditor.Editor(img, overlayList, displayCtx,
+                              historyLimit=50)
+    sel    = editor.getSelection()
+
+    for i in range(5):
+        block       = np.zeros((10, 10, 1), dtype=np.uint8)
+        block[0, 0] = 1
+        block[9, 9] = 1
+        sel.setSelection(block, (0, 0, i))
+        editor.fillSelection(i + 1)
+        sel.clearSelection()
+
+    assert editor.getHistorySize() == 48
+
+    # The oldest changes should have
+    # been discarded, but the two most
+    # recent ones should be undoable
+    nundone = 0
+    while editor.undo.enabled:
+        editor.undo()
+        nundone += 1
+
+    assert nundone == 2
+    assert img[0, 0, 4] == 0 and img[9, 9, 4] == 0
+    assert img[0, 0, 3] == 0 and img[9, 9, 3] == 0
+    assert img[0, 0, 2] == 3 and img[9, 9, 2] == 3
+
+    while editor.redo.enabled:
+        editor.redo()
+
+    for i in range(5):
+        assert img[0, 0, i] == i + 1
+        assert img[9, 9, i] == i + 1
+        assert img[5, 5, i] == 0
+
+    editor.destroy()
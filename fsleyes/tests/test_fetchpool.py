@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+#
+# test_fetchpool.py - Tests for the fsleyes.plotting.fetchpool module.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import threading
+
+import fsleyes.plotting.fetchpool as fetchpool
+
+
+def test_FetchPool():
+
+    pool   = fetchpool.FetchPool(nthreads=2)
+    result = {}
+
+    def fetch(key, val):
+        def func():
+            result[key] = val
+        return func
+
+    request = fetchpool.FetchRequest(3)
+    for i in range(3):
+        pool.submit(request, i, fetch(i, i * 10))
+
+    assert request.wait(5)
+    assert not request.cancelled
+    assert request.latency is not None
+    assert result == {0 : 0, 1 : 10, 2 : 20}
+
+    stats = pool.stats()
+    assert stats['completed']   == 3
+    assert stats['queued']      == 0
+    assert stats['latency']     is not None
+    assert stats['meanLatency'] is not None
+
+    pool.stop()
+
+
+def test_FetchPool_coalesce():
+
+    pool    = fetchpool.FetchPool(nthreads=1)
+    block   = threading.Event()
+    started = threading.Event()
+    calls   = []
+
+    def blocker():
+        started.set()
+        block.wait()
+
+    def fetch(val):
+        def func():
+            calls.append(val)
+        return func
+
+    # Occupy the single worker
+    # thread, so that subsequent
+    # fetches remain queued
+    req0 = fetchpool.FetchRequest(1)
+    pool.submit(req0, 'block', blocker)
+    started.wait(5)
+
+    req1 = fetchpool.FetchRequest(2)
+    pool.submit(req1, 'a', fetch('a1'))
+    pool.submit(req1, 'b', fetch('b1'))
+
+    # New request for the same
+    # keys supersedes the old one
+    req2 = fetchpool.FetchRequest(2)
+    pool.submit(req2, 'a', fetch('a2'))
+    pool.submit(req2, 'b', fetch('b2'))
+
+    assert req1.cancelled
+    assert not req1.wait(0)
+    assert pool.queueDepth == 2
+
+    block.set()
+    assert req0.wait(5)
+    assert req2.wait(5)
+
+    assert sorted(calls) == ['a2', 'b2']
+    assert pool.stats()['cancelled'] == 2
+
+    pool.stop()
+
+
+def test_FetchPool_skipCancelled():
+
+    pool    = fetchpool.FetchPool(nthreads=1)
+    block   = threading.Event()
+    started = threading.Event()
+    calls   = []
+
+    def blocker():
+        started.set()
+        block.wait()
+
+    req0 = fetchpool.FetchRequest(1)
+    pool.submit(req0, 'block', blocker)
+    started.wait(5)
+
+    req1 = fetchpool.FetchRequest(1)
+    pool.submit(req1, 'a', lambda: calls.append('a'))
+    req1.cancel()
+
+    req2 = fetchpool.FetchRequest(1)
+    pool.submit(req2, 'b', lambda: calls.append('b'))
+
+    block.set()
+    assert req2.wait(5)
+    assert calls == ['b']
+
+    pool.stop()
+    req3 = fetchpool.FetchRequest(1)
+    pool.submit(req3, 'c', lambda: calls.append('c'))
+    assert req3.cancelled
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+#
+# test_glsh.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+from unittest import mock
+
+import numpy as np
+
+import fsleyes.gl.glsh as glsh
+
+
+def test_calculateRadii():
+
+    coefs  = np.random.random((50, 6))
+    params = np.random.random((20, 6))
+    exp    = np.dot(coefs, params.T)
+
+    radii, keep = glsh.calculateRadii(coefs, params, 0, False)
+    assert np.all(keep)
+    assert radii.dtype == np.float32
+    assert np.all(np.isclose(radii, exp, rtol=1e-5))
+
+    thres       = np.median(exp.max(axis=1))
+    radii, keep = glsh.calculateRadii(coefs, params, thres, False)
+    expkeep     = np.any(exp >= thres, axis=1)
+    assert np.all(keep == expkeep)
+    assert np.all(np.isclose(radii, exp[expkeep], rtol=1e-5))
+
+    radii, keep = glsh.calculateRadii(coefs, params, 0, True)
+    assert np.all(np.isclose(radii.min(axis=1), 0))
+    assert np.all(np.isclose(radii.max(axis=1), 0.5))
+
+
+def test_calculateRadii_blocks():
+
+    # Radii calculated in blocks should
+    # be the same as radii calculated
+    # all at once
+    coefs  = np.random.random((100, 6)) - 0.5
+    params = np.random.random((20, 6))
+    thres  = 0.1
+
+    allradii, allkeep = glsh.calculateRadii(coefs, params, thres, True)
+
+    blocks = [glsh.calculateRadii(coefs[i:i + 7], params, thres, True)
+              for i in range(0, 100, 7)]
+    radii  = np.concatenate([b[0] for b in blocks])
+    keep   = np.concatenate([b[1] for b in blocks])
+
+    assert np.all(keep == allkeep)
+    assert np.all(np.isclose(radii, allradii))
+
+
+def entry(n):
+    return (np.zeros(n, dtype=np.int32), np.zeros((n, 1), dtype=np.float32))
+
+
+def test_RadiusCache():
+
+    calculated = []
+
+    def calc(key):
+        calculated.append(key)
+        return entry(key)
+
+    cache = glsh.RadiusCache(calc)
+
+    entries, missing = cache.get([1, 2])
+    assert entries == {} and missing == [1, 2]
+
+    e1 = cache.calculate(1)
+    e2 = cache.calculate(2)
+    assert calculated == [1, 2]
+    assert len(cache) == 2
+    assert cache.size == sum(a.nbytes for a in e1 + e2)
+
+    entries, missing = cache.get([1, 2, 3])
+    assert entries == {1 : e1, 2 : e2}
+    assert missing == [3]
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.size == 0
+    assert cache.generation == 1
+
+
+def test_RadiusCache_lru():
+
+    # all entries are the same size,
+    # apart from 100, which is big
+    cache = glsh.RadiusCache(lambda k: entry(10 if k < 100 else 100))
+    size  = sum(a.nbytes for a in entry(10))
+
+    with mock.patch('fsleyes.gl.glsh.RADIUS_CACHE_SIZE', size * 3):
+        cache.calculate(10)
+        cache.calculate(11)
+        cache.calculate(12)
+        assert len(cache) == 3
+
+        # 10 is now most recently used,
+        # so 11 should be evicted
+        cache.get([10])
+        cache.calculate(13)
+        assert 10 in cache
+        assert 11 not in cache
+        assert 12 in cache
+        assert 13 in cache
+
+        # Entries larger than the cache are
+        # kept, until the next one arrives
+        cache.calculate(100)
+        assert list(cache.get([100])[0]) == [100]
+        assert len(cache) == 1
+        cache.calculate(14)
+        assert len(cache) == 1 and 14 in cache
+
+
+def test_RadiusCache_generation():
+
+    cache = glsh.RadiusCache(entry)
+    gen   = cache.generation
+    cache.clear()
+
+    # Entries from an old generation
+    # are discarded
+    cache.put(1, entry(1), gen)
+    assert 1 not in cache
+    cache.put(1, entry(1), cache.generation)
+    assert 1 in cache
+
+
+def test_RadiusCache_queue():
+
+    # idle.run executes tasks synchronously
+    # when there is no GUI, so the worker
+    # runs within the call to queue.
+    done = []
+    ctx  = {}
+
+    def calc(key):
+        # Simulate the cache being cleared, and
+        # new keys being queued, while the worker
+        # is calculating the first key
+        if key == 1:
+            ctx['cache'].clear()
+            ctx['cache'].queue([3, 4])
+        return entry(key)
+
+    cache        = glsh.RadiusCache(calc, done.append)
+    ctx['cache'] = cache
+
+    with mock.patch('fsleyes.gl.glsh.idle.run',
+                    lambda task, onError: task()):
+        # the most recently requested keys
+        # are calculated first, so 1 is
+        # calculated before 2
+        cache.queue([2, 1])
+
+    # 2 was cancelled by the clear, 1 was discarded
+    # because it was calculated for the old
+    # generation, and 3 and 4 must have been
+    # calculated by the existing worker.
+    assert done == [1, 4, 3]
+    assert 1 not in cache
+    assert 2 not in cache
+    assert 3 in cache
+    assert 4 in cache
+    assert cache.pending == []
+
+    # A new worker is started once
+    # the previous one has finished
+    with mock.patch('fsleyes.gl.glsh.idle.run',
+                    lambda task, onError: task()):
+        cache.queue([5])
+    assert 5 in cache
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+#
+# test_glslprogram.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import               contextlib
+import itertools  as it
+from unittest import mock
+
+import fsleyes.gl.shaders.glsl.program as program
+
+
+def test_preprocess():
+
+    src = 'uniform float values[{{ nvalues }}];'
+
+    assert program.preprocess(None)                   is None
+    assert program.preprocess(src, {'nvalues' : 3})  == \
+        'uniform float values[3];'
+    assert program.preprocess(src, {'nvalues' : 4})  == \
+        'uniform float values[4];'
+
+    # results are cached on source+constants
+    program._render.cache_clear()
+    program.preprocess(src, {'nvalues' : 3})
+    program.preprocess(src, {'nvalues' : 3})
+    info = program._render.cache_info()
+    assert info.hits   == 1
+    assert info.misses == 1
+
+    # unhashable constants are still supported
+    src = '{% for v in vals %}{{ v }}{% endfor %}'
+    assert program.preprocess(src, {'vals' : [1, 2, 3]}) == '123'
+
+
+VERT = """
+#version 120
+attribute vec3 vertex;
+uniform   float scale;
+void main(void) {
+  gl_Position = vec4(vertex * scale, 1);
+}
+"""
+
+FRAG = """
+#version 120
+uniform vec4 colour;
+void main(void) {
+  gl_FragColor = colour;
+}
+"""
+
+
+@contextlib.contextmanager
+def mockGL():
+    """Replaces the OpenGL module used by the program module with a mock,
+    which returns a new handle for every program that is created.
+    """
+
+    handles   = it.count(1)
+    positions = {'vertex' : 0, 'scale' : 1, 'colour' : 2, 'c' : 2}
+    gl        = mock.MagicMock()
+
+    gl.glCreateProgram.side_effect      = lambda: next(handles)
+    gl.glGetShaderiv.return_value       = gl.GL_TRUE
+    gl.glGetProgramiv.return_value      = gl.GL_TRUE
+    gl.glGetUniformLocation.side_effect = lambda p, n: positions[n]
+    gl.glGetAttribLocation.side_effect  = lambda p, n: positions[n]
+
+    with mock.patch.object(program, 'gl',             gl),    \
+         mock.patch.object(program, 'gltypes',        mock.MagicMock()), \
+         mock.patch.object(program, 'CACHE_BINARIES', False), \
+         mock.patch.object(program, '_programs',      {}),    \
+         mock.patch('fsleyes.gl.GL_VERSION',       '2.1'),    \
+         mock.patch('fsleyes.gl.GL_RENDERER',      'mock'),   \
+         mock.patch('fsleyes.gl.GL_COMPATIBILITY', '2.1'):
+        yield gl
+
+
+def test_SharedProgram():
+
+    with mockGL() as gl:
+        prog = program.SharedProgram('key', VERT, FRAG, None)
+
+        assert prog.key        == 'key'
+        assert prog.refcount   == 0
+        assert prog.owner      is None
+        assert prog.program    == 1
+        assert prog.attributes == ['vertex']
+        assert sorted(prog.uniforms) == ['colour', 'scale']
+        assert prog.types == {'vertex' : 'vec3',
+                              'scale'  : 'float',
+                              'colour' : 'vec4'}
+        assert sorted(prog.positions) == ['colour', 'scale', 'vertex']
+        assert gl.glCompileShader.call_count == 2
+        assert gl.glLinkProgram  .call_count == 1
+
+        prog.destroy()
+        gl.glDeleteProgram.assert_called_once_with(1)
+        assert prog.program is None
+
+        # safe to destroy twice
+        prog.destroy()
+        assert gl.glDeleteProgram.call_count == 1
+
+
+def test_acquireProgram_releaseProgram():
+
+    with mockGL() as gl:
+        prog1 = program.acquireProgram(VERT, FRAG)
+        prog2 = program.acquireProgram(VERT, FRAG)
+        prog3 = program.acquireProgram(VERT, FRAG.replace('colour', 'c'))
+
+        # same source -> same program
+        assert prog1 is prog2
+        assert prog1 is not prog3
+        assert prog1.refcount == 2
+        assert prog3.refcount == 1
+        assert len(program._programs) == 2
+        assert gl.glLinkProgram.call_count == 2
+
+        program.releaseProgram(prog1)
+        assert prog1.refcount == 1
+        assert prog1.program  == 1
+        assert prog1.key in program._programs
+        gl.glDeleteProgram.assert_not_called()
+
+        # deleted when refcount drops to 0
+        program.releaseProgram(prog2)
+        assert prog1.refcount == 0
+        assert prog1.program  is None
+        assert prog1.key not in program._programs
+        gl.glDeleteProgram.assert_called_once_with(1)
+
+        program.releaseProgram(prog3)
+        assert len(program._programs) == 0
+        assert gl.glDeleteProgram.call_count == 2
+
+        # a new program is created after
+        # the old one has been deleted
+        prog4 = program.acquireProgram(VERT, FRAG)
+        assert prog4 is not prog1
+        assert prog4.program  == 3
+        assert prog4.refcount == 1
+
+
+def test_GLSLShader_shared():
+
+    with mockGL() as gl:
+        shader1 = program.GLSLShader(VERT, FRAG)
+        shader2 = program.GLSLShader(VERT, FRAG)
+
+        assert shader1.program == shader2.program
+        assert gl.glLinkProgram.call_count == 1
+
+        scalePos = shader1.positions['scale']
+
+        def scales():
+            return [c[0][2] for c in gl.glUniform1fv.call_args_list
+                    if c[0][0] == scalePos]
+
+        with shader1.loaded():
+            shader1.set('scale', 1)
+        with shader2.loaded():
+            shader2.set('scale', 2)
+        assert scales() == [1, 2]
+
+        # shader1 uniforms are re-applied when it
+        # is loaded after shader2 has been used,
+        # but not when it is loaded twice in a row
+        gl.glUniform1fv.reset_mock()
+        shader1.load()
+        assert scales() == [1]
+        shader1.load()
+        assert scales() == [1]
+        shader2.load()
+        assert scales() == [1, 2]
+
+        # Program is only deleted
+        # once both shaders are destroyed
+        shader1.destroy()
+        gl.glDeleteProgram.assert_not_called()
+        shader2.destroy()
+        gl.glDeleteProgram.assert_called_once_with(1)
+        assert len(program._programs) == 0
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+#
+# test_glvolume.py - Tests for progressive 3D rendering in the GLVolume
+# class.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import types
+from unittest import mock
+
+import numpy as np
+
+import fsleyes.gl          as fslgl
+import fsleyes.gl.glvolume as glvolume
+
+
+class MockGLVolume:
+    """Stand-in for a GLVolume, with just enough state for the
+    get3DQuality and __updateProgressive methods.
+    """
+
+    get3DQuality      = glvolume.GLVolume.get3DQuality
+    updateProgressive = glvolume.GLVolume._GLVolume__updateProgressive
+
+    def __init__(self, **kwargs):
+        opts = dict(progressive=True,
+                    resolution=100,
+                    numSteps=100,
+                    numClipPlanes=0,
+                    clipMode='intersection',
+                    clipPosition=[50] * 5,
+                    clipAzimuth=[0] * 5,
+                    clipInclination=[0] * 5)
+        opts.update(kwargs)
+
+        self.opts      = types.SimpleNamespace(**opts)
+        self.name      = 'glvolume'
+        self.destroyed = False
+        self.notify    = mock.Mock()
+
+        self._GLVolume__quality    = None
+        self._GLVolume__level      = len(glvolume.PROGRESSIVE_LEVELS) - 1
+        self._GLVolume__lastView   = None
+        self._GLVolume__lastChange = 0
+
+
+class MockCanvas(fslgl.WXGLCanvasTarget):
+    def __init__(self):
+        self.mvpMatrix = np.eye(4)
+        self.size      = (100, 100)
+
+    def GetScaledSize(self):
+        return self.size
+
+
+class MockOffScreenCanvas(fslgl.OffScreenCanvasTarget):
+    def __init__(self):
+        self.mvpMatrix = np.eye(4)
+        self.size      = (100, 100)
+
+    def GetScaledSize(self):
+        return self.size
+
+
+class MockClock:
+    def __init__(self):
+        self.now = 0
+
+    def time(self):
+        return self.now
+
+
+def test_get3DQuality_not_progressive():
+    vol    = MockGLVolume(progressive=False, resolution=60, numSteps=80)
+    canvas = MockCanvas()
+
+    with mock.patch('fsleyes.gl.glvolume.idle.idle') as idle:
+        vol.updateProgressive(canvas)
+        assert vol.get3DQuality() == (60, 80)
+        vol.updateProgressive(canvas)
+        assert vol.get3DQuality() == (60, 80)
+        idle.assert_not_called()
+
+
+def test_updateProgressive():
+
+    delay  = glvolume.PROGRESSIVE_DELAY
+    vol    = MockGLVolume(resolution=80, numSteps=200)
+    canvas = MockCanvas()
+    clock  = MockClock()
+
+    def draw(now):
+        clock.now = now
+        vol.updateProgressive(canvas)
+        return vol.get3DQuality()
+
+    with mock.patch.object(glvolume, 'time', clock), \
+         mock.patch.object(glvolume, 'PROGRESSIVE_LEVELS', [0.25, 0.5, 1]), \
+         mock.patch('fsleyes.gl.glvolume.idle.idle') as idle:
+
+        # first draw - lowest quality, and a
+        # refinement scheduled after the delay
+        assert draw(0) == (20, 50)
+        assert idle.call_count == 1
+        assert idle.call_args[1]['after'] == delay
+
+        # not refined until the delay has passed
+        assert draw(delay / 2) == (20, 50)
+
+        # then stepped up one level per frame,
+        # with refinements scheduled immediately
+        idle.reset_mock()
+        assert draw(delay) == (40, 100)
+        assert idle.call_count == 1
+        assert idle.call_args[1]['after'] == 0
+
+        # final level is full quality, and no
+        # further refinements are scheduled
+        idle.reset_mock()
+        assert draw(delay + 0.01) == (80, 200)
+        assert draw(delay + 1)    == (80, 200)
+        idle.assert_not_called()
+
+        # any view change resets to level 0
+        canvas.mvpMatrix = np.diag([2, 2, 2, 1])
+        assert draw(2) == (20, 50)
+        assert idle.call_args[1]['after'] == delay
+        assert draw(2 + delay) == (40, 100)
+
+        canvas.size = (200, 100)
+        assert draw(3) == (20, 50)
+        assert draw(3 + delay) == (40, 100)
+
+        vol.opts.clipPosition = [40] * 5
+        assert draw(4) == (20, 50)
+        assert draw(4 + delay) == (40, 100)
+        assert draw(4 + delay) == (80, 200)
+
+        # Disabling progressive rendering
+        # returns to full quality
+        vol.opts.progressive = False
+        assert draw(5) == (80, 200)
+
+
+def test_updateProgressive_offscreen():
+
+    vol    = MockGLVolume(resolution=80, numSteps=200)
+    canvas = MockOffScreenCanvas()
+    clock  = MockClock()
+
+    # off-screen renders are always drawn at
+    # full quality, even when the view changes
+    with mock.patch.object(glvolume, 'time', clock), \
+         mock.patch('fsleyes.gl.glvolume.idle.idle') as idle:
+        for i in range(3):
+            clock.now        = i * 0.01
+            canvas.mvpMatrix = np.diag([i + 1, 1, 1, 1])
+            vol.updateProgressive(canvas)
+            assert vol.get3DQuality() == (80, 200)
+        idle.assert_not_called()
+
+
+def test_updateProgressive_minimum():
+    vol    = MockGLVolume(resolution=20, numSteps=20)
+    canvas = MockCanvas()
+    with mock.patch('fsleyes.gl.glvolume.idle.idle'):
+        vol.updateProgressive(canvas)
+    assert vol.get3DQuality() == (10, 10)
+
+
+def test_updateProgressive_refine():
+    vol    = MockGLVolume()
+    canvas = MockCanvas()
+
+    with mock.patch('fsleyes.gl.glvolume.idle.idle') as idle:
+        vol.updateProgressive(canvas)
+        refine = idle.call_args[0][0]
+
+    refine()
+    vol.notify.assert_called_once_with()
+
+    # no refresh after the GLVolume is destroyed
+    vol.destroyed = True
+    refine()
+    assert vol.notify.call_count == 1
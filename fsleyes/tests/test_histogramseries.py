@@ -63,6 +63,86 @@ def test_histogram():
     check(hx, hy)
 
 
+def test_BaseHistogram():
+
+    def filt(data, hrange, includeOutliers, ignoreZeros):
+        data = data[np.isfinite(data)]
+        if ignoreZeros:
+            data = data[data != 0]
+        if not includeOutliers:
+            data = data[(data >= hrange[0]) & (data < hrange[1])]
+        return data
+
+    idata = np.random.randint(-20, 100, (20, 20, 20))
+    fdata = np.random.random((20, 20, 20)) * 20 - 5
+    fdata = np.round(fdata, 2).astype(np.float32)
+    fdata[fdata < 0] = 0
+    fdata[:, :, 5]   = np.nan
+    fdata[:, :, 6]   = np.inf
+
+    for data in [idata, fdata]:
+
+        # small chunk size, to exercise merging
+        base   = hseries.BaseHistogram(data, chunkSize=999)
+        finite = data[np.isfinite(data)]
+        drange = (finite.min(), finite.max())
+
+        assert base.exact
+        assert base.min == drange[0]
+        assert base.max == drange[1]
+
+        for nbins, hrange in [(10,  drange),
+                              (8,   (0, 10)),
+                              (57,  (0.3, 8.7)),
+                              (100, drange),
+                              (3,   (1, 5))]:
+            for includeOutliers in [False, True]:
+                for ignoreZeros in [False, True]:
+                    for count in [False, True]:
+                        exp = hseries.histogram(
+                            filt(data, hrange, includeOutliers, ignoreZeros),
+                            nbins, hrange, drange, includeOutliers, count)
+                        got = base.histogram(
+                            nbins, hrange, drange, includeOutliers,
+                            ignoreZeros, count)
+                        assert np.all(got[0] == exp[0])
+                        assert np.all(got[1] == exp[1])
+                        assert got[2] == exp[2]
+
+    # Too many distinct values - a fine
+    # histogram is used, and derived
+    # histograms are approximate
+    data   = np.random.random((20, 20, 20)) * 100
+    data[data < 10] = 0
+    drange = (data.min(), data.max())
+    base   = hseries.BaseHistogram(data, nbins=1000, chunkSize=999)
+    assert not base.exact
+    assert base.min == drange[0]
+    assert base.max == drange[1]
+
+    # max error per edge is one fine bin
+    tol = 2 * data.size * 2 / 1000
+
+    for nbins, hrange in [(10,  drange),
+                          (57,  (10.3, 80.7)),
+                          (100, drange)]:
+        for includeOutliers in [False, True]:
+            for ignoreZeros in [False, True]:
+                exp = hseries.histogram(
+                    filt(data, hrange, includeOutliers, ignoreZeros),
+                    nbins, hrange, drange, includeOutliers)
+                got = base.histogram(
+                    nbins, hrange, drange, includeOutliers, ignoreZeros)
+                assert np.all(got[0] == exp[0])
+                assert np.all(np.abs(got[1] - exp[1]) <= tol)
+                if includeOutliers:
+                    assert got[2] == exp[2]
+
+    empty = hseries.BaseHistogram(np.array([np.nan, np.nan]))
+    assert empty.min == 0 and empty.max == 0
+    assert empty.histogram(10, (0, 1), (0, 1))[2] == 0
+
+
 def test_autoBin():
 
     tests = [
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+#
+# test_imagetexture.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import threading
+
+import numpy as np
+
+import fsleyes.gl.textures.imagetexture as imagetexture
+
+
+def test_VolumePrefetchRing():
+
+    ring = imagetexture.VolumePrefetchRing(3)
+    vols = [np.random.random((4, 4, 4)) for i in range(5)]
+
+    for i in range(3):
+        ring.put(((i,), None), vols[i])
+
+    assert len(ring) == 3
+    assert ring.get(((0,), None)) is vols[0]
+
+    # vol 1 is least recently used
+    ring.put(((3,), None), vols[3])
+    assert ((1,), None) not in ring
+    assert ring.get(((1,), None)) is None
+    assert sorted(ring.keys()) == [((0,), None), ((2,), None), ((3,), None)]
+
+    # prepared data is matched on
+    # data identity and settings
+    ring.setPrepared(vols[0], 'settings', 'prepared')
+    assert ring.hasPrepared(((0,), None), 'settings')
+    assert not ring.hasPrepared(((0,), None), 'other')
+    assert not ring.hasPrepared(((2,), None), 'settings')
+    assert ring.getPrepared(vols[0],       'settings') == 'prepared'
+    assert ring.getPrepared(vols[0],       'other')    is None
+    assert ring.getPrepared(vols[0].copy(), 'settings') is None
+
+    # setPrepared on data not in
+    # the ring should be ignored
+    ring.setPrepared(vols[4], 'settings', 'prepared')
+    assert ring.getPrepared(vols[4], 'settings') is None
+
+    ring.retain([((0,), None), ((3,), None)])
+    assert sorted(ring.keys()) == [((0,), None), ((3,), None)]
+
+    ring.clear()
+    assert len(ring) == 0
+
+
+class MockImage:
+    def __init__(self, shape, lock):
+        self.shape = shape
+        self.data  = np.random.random(shape)
+        self.lock  = lock
+        self.reads = []
+    def __getitem__(self, slc):
+        # data must not be read while
+        # the texture data lock is held
+        assert not self.lock.locked()
+        self.reads.append(slc[3])
+        return self.data[slc]
+
+
+class MockTaskThread:
+    def __init__(self):
+        self.tasks = []
+    def enqueue(self, func, taskName):
+        self.tasks.append(func)
+    def dequeue(self, taskName):
+        self.tasks = []
+
+
+class MockTextureBase:
+    def prepareData(self, data):
+        return data * 2
+
+
+class MockImageTexture(imagetexture.ImageTextureBase, MockTextureBase):
+    def __init__(self, image, lock, taskThread):
+        self._ImageTextureBase__image       = image
+        self._ImageTextureBase__volume      = [0]
+        self._ImageTextureBase__channel     = None
+        self._ImageTextureBase__prefetch    = 1
+        self._ImageTextureBase__ring        = \
+            imagetexture.VolumePrefetchRing(3)
+        self._ImageTextureBase__prefetchGen = 0
+        self._ImageTextureBase__prefetchKey = None
+        self.name           = 'texture'
+        self.dataLock       = lock
+        self.taskThread     = taskThread
+        self.destroyed      = False
+        self.nvals          = 1
+        self.prefilter      = None
+        self.prefilterRange = None
+        self.resolution     = None
+        self.scales         = None
+        self.normalise      = False
+        self.normaliseRange = None
+    def getTaskThread(self):
+        return self.taskThread
+    def shapeData(self, data):
+        return data
+
+
+def test_prefetchVolumes():
+
+    lock       = threading.Lock()
+    taskThread = MockTaskThread()
+    image      = MockImage((4, 4, 4, 5), lock)
+    tex        = MockImageTexture(image, lock, taskThread)
+    ring       = tex.prefetchRing
+
+    tex.prefetchVolumes()
+    assert len(taskThread.tasks) == 1
+    taskThread.tasks.pop()()
+    assert image.reads == [1]
+    assert np.all(ring.get(((1,), None)) == image.data[..., 1])
+
+    # No prefetch if the volume has not changed
+    tex.prefetchVolumes()
+    assert len(taskThread.tasks) == 0
+
+    # Already prefetched volumes are not re-read
+    tex._ImageTextureBase__volume = [2]
+    tex.prefetchVolumes()
+    assert len(taskThread.tasks) == 1
+    taskThread.tasks.pop()()
+    assert image.reads == [1, 3]
+    assert sorted(ring.keys()) == [((1,), None), ((3,), None)]
+
+    # A superseded prefetch task does nothing
+    tex._ImageTextureBase__volume = [3]
+    tex.prefetchVolumes()
+    task = taskThread.tasks.pop()
+    tex._ImageTextureBase__volume = [0]
+    tex.prefetchVolumes()
+    task()
+    assert image.reads == [1, 3]
@@ -7,14 +7,19 @@
 
 from __future__ import print_function
 
-import              collections
-import              random
-import itertools as it
-import numpy     as np
-import nibabel   as nib
-import              pytest
+import                   collections
+import                   random
+import                   tempfile
+import os.path       as op
+import itertools     as it
+import unittest.mock as mock
+import numpy         as np
+import nibabel       as nib
+import                   pytest
 
 import fsl.utils.naninfrange     as nir
+import fsl.utils.settings        as fslsettings
+import fsleyes.utils.filecache   as filecache
 import fsleyes.data.imagewrapper as imagewrap
 
 
@@ -627,6 +632,74 @@ def _test_ImageWrapper_read(niters, seed, threaded, addnans=False):
                 else:             assert     wrapper.covered
 
 
+def test_ImageWrapper_scanDataRange_threaded():
+    _test_ImageWrapper_scanDataRange(True)
+def test_ImageWrapper_scanDataRange_unthreaded():
+    _test_ImageWrapper_scanDataRange(False)
+
+def _test_ImageWrapper_scanDataRange(threaded):
+
+    data          = np.random.random((10, 10, 10, 8))
+    data[0, 0, 0] = np.nan
+    img           = nib.Nifti1Image(data, np.eye(4))
+    wrapper       = imagewrap.ImageWrapper(threaded=threaded)
+    wrapper.setImage(img)
+
+    assert not wrapper.covered
+
+    wrapper.scanDataRange(blockSize=3, percentiles=(5, 95))
+    if threaded:
+        wrapper.getTaskThread().waitUntilIdle()
+
+    finite = data[np.isfinite(data)]
+    assert wrapper.covered
+    assert wrapper.dataRange == (finite.min(), finite.max())
+
+    vlo, vhi = wrapper.percentileRange
+    assert np.isclose(vlo, np.percentile(finite, 5))
+    assert np.isclose(vhi, np.percentile(finite, 95))
+
+
+def test_ImageWrapper_loadCachedDataRange():
+
+    with tempfile.TemporaryDirectory() as td:
+
+        stgs  = fslsettings.Settings('fsleyes', cfgdir=td, writeOnExit=False)
+        cache = filecache.FileCache('datarange.json')
+        fname = op.join(td, 'image.nii.gz')
+        data  = np.random.randint(-100, 100, (10, 10, 10, 5)).astype(np.int32)
+        nib.Nifti1Image(data, np.eye(4)).to_filename(fname)
+
+        with fslsettings.use(stgs), \
+             mock.patch('fsleyes.data.imagewrapper.DATA_RANGE_CACHE', cache):
+
+            wrapper = imagewrap.ImageWrapper()
+            wrapper.setImage(nib.load(fname))
+            assert not wrapper.loadCachedDataRange(fname)
+
+            wrapper.scanDataRange(path=fname)
+            assert wrapper.covered
+            assert wrapper.dataRange == (data.min(), data.max())
+
+            # The data range should be restored
+            # from the cache, without any data
+            # being read
+            wrapper = imagewrap.ImageWrapper()
+            wrapper.setImage(nib.load(fname))
+            with mock.patch.object(wrapper, '_ImageWrapper__getData') as gd:
+                assert wrapper.loadCachedDataRange(fname)
+                gd.assert_not_called()
+            assert wrapper.covered
+            assert wrapper.dataRange == (data.min(), data.max())
+
+            # Modifying the file should
+            # invalidate the cache entry
+            nib.Nifti1Image(data * 2, np.eye(4)).to_filename(fname)
+            wrapper = imagewrap.ImageWrapper()
+            wrapper.setImage(nib.load(fname))
+            assert not wrapper.loadCachedDataRange(fname)
+
+
 def test_ImageWrapper_write_out_threaded(niters, seed):
     _test_ImageWrapper_write_out(niters, seed, True)
 def test_ImageWrapper_write_out_unthreaded(niters, seed):
@@ -6,11 +6,16 @@
 #
 
 import os.path as op
+import            gzip
+import            shutil
+import            tempfile
+import textwrap as tw
 
 import numpy as np
 
 from fsleyes.data.mif import MIFImage
 from fsl.data.image   import Image
+import fsleyes.data.mif as mif
 
 
 def test_mif_3d():
@@ -39,3 +44,98 @@ def test_mif_4d():
 
         assert np.all(np.isclose(bmimg.data, testimg.data))
         assert testimg.sameSpace(bmimg)
+
+
+def test_mif_memmap():
+    datadir = op.join(op.dirname(__file__), 'testdata')
+    bmimg   = Image(f'{datadir}/4d.nii.gz')
+
+    testimg = MIFImage(f'{datadir}/4d_time_fastest_changing.mif')
+    assert isinstance(testimg.nibImage.dataobj, np.memmap)
+    assert np.all(np.isclose(bmimg.data, testimg.data))
+
+    # copy-on-write - the file must not be modified
+    testimg[0, 0, 0, 0] = 12345
+    assert testimg[0, 0, 0, 0] == 12345
+    testimg = MIFImage(f'{datadir}/4d_time_fastest_changing.mif')
+    assert np.all(np.isclose(bmimg.data, testimg.data))
+
+    testimg = MIFImage(f'{datadir}/4d.mif', mmap=False)
+    assert not isinstance(testimg.nibImage.dataobj, np.memmap)
+    assert np.all(np.isclose(bmimg.data, testimg.data))
+
+
+def test_mif_gz():
+    datadir = op.join(op.dirname(__file__), 'testdata')
+
+    for prefix in ['3d', '4d']:
+        bmimg = Image(f'{datadir}/{prefix}.nii.gz')
+
+        with tempfile.TemporaryDirectory() as td:
+            testfile = op.join(td, f'{prefix}.mif.gz')
+            with open(f'{datadir}/{prefix}.mif', 'rb') as inf, \
+                 gzip.open(testfile, 'wb')            as outf:
+                shutil.copyfileobj(inf, outf)
+
+            testimg = MIFImage(testfile)
+            assert np.all(np.isclose(bmimg.data, testimg.data))
+            assert testimg.sameSpace(bmimg)
+
+            # small blocks, and multi-member gzip streams
+            with open(f'{datadir}/{prefix}.mif', 'rb') as f:
+                raw = f.read()
+            with open(testfile, 'wb') as f:
+                f.write(gzip.compress(raw[:1000]))
+                f.write(gzip.compress(raw[1000:]))
+
+            hdr    = mif.loadMIFHeader(testfile)
+            layout = np.abs(hdr['layout'])
+            shape  = [s for _, s in sorted(zip(layout, hdr['dim']))]
+            exp    = np.fromfile(f'{datadir}/{prefix}.mif',
+                                 dtype=hdr['datatype'],
+                                 offset=hdr['file'][1])
+            for chunkSize in [7, 100, None]:
+                data = mif.readGzipData(testfile, hdr['datatype'], shape,
+                                        hdr['file'][1], chunkSize)
+                assert np.all(data == exp)
+
+
+def test_mif_3d_layout():
+    datadir = op.join(op.dirname(__file__), 'testdata')
+    hdr     = mif.loadMIFHeader(f'{datadir}/3d.mif')
+    exp     = mif.loadMIFImage(f'{datadir}/3d.mif', hdr, mmap=False)
+
+    # 3D images stored with a non-standard
+    # layout (here, with the Z axis changing
+    # fastest) must be transposed into XYZ
+    # order, in the same way as 4D images.
+    header = tw.dedent("""
+    mrtrix image
+    dim: 17,14,14
+    vox: 2,2,2
+    layout: -1,+2,+0
+    datatype: Int16LE
+    transform: 1, 0, 0, -16
+    transform: -0, 1, 0, -32
+    transform: -0, 0, 1, 10
+    file: . {offset:04d}
+    END
+    """).strip() + '\n'
+    offset = len(header.format(offset=0))
+    header = header.format(offset=offset).encode()
+    data   = exp.transpose((2, 0, 1)).astype('<i2').tobytes(order='F')
+
+    with tempfile.TemporaryDirectory() as td:
+        testfile = op.join(td, '3d_z_fastest_changing.mif')
+        with open(testfile, 'wb') as f:
+            f.write(header)
+            f.write(data)
+        with open(f'{testfile}.gz', 'wb') as f:
+            f.write(gzip.compress(header + data))
+
+        for fname in [testfile, f'{testfile}.gz']:
+            for mmap in [True, False]:
+                hdr  = mif.loadMIFHeader(fname)
+                got  = mif.loadMIFImage(fname, hdr, mmap=mmap)
+                assert got.shape == exp.shape
+                assert np.all(got == exp)
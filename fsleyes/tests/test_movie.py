@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+#
+# test_movie.py - Test the fsleyes.movie module.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import numpy as np
+
+import PIL.Image         as Image
+import PIL.ImageSequence as ImageSequence
+
+import pytest
+
+import fsleyes.movie as movie
+from fsleyes.tests import tempdir
+
+
+def make_frames(nframes=4, shape=(20, 30)):
+    frames = []
+    for i in range(nframes):
+        frame              = np.zeros(shape + (4,), dtype=np.uint8)
+        frame[:, :, i % 3] = 50 * (i + 1)
+        frame[:5, :5, :3]  = 255
+        frame[:, :, 3]     = 255
+        frames.append(frame)
+    return frames
+
+
+def test_openMovieWriter():
+    with tempdir():
+        for fname, cls in [('movie.gif',  movie.GifWriter),
+                           ('movie.png',  movie.APNGWriter),
+                           ('movie.apng', movie.APNGWriter),
+                           ('movie.raw',  movie.RawWriter),
+                           ('movie.rgb',  movie.RawWriter)]:
+            with movie.openMovieWriter(fname) as writer:
+                assert isinstance(writer, cls)
+
+        with pytest.raises(ValueError):
+            movie.openMovieWriter('movie.avi')
+
+
+def test_GifWriter():
+    frames = make_frames()
+    with tempdir():
+        with movie.openMovieWriter('movie.gif', delay=100) as writer:
+            for frame in frames:
+                writer.write(frame)
+
+        img = Image.open('movie.gif')
+        got = [np.asarray(f.convert('RGB')) for f in
+               ImageSequence.Iterator(img)]
+
+        assert len(got) == len(frames)
+        for exp, frame in zip(frames, got):
+            assert np.all(np.abs(frame.astype(int) - exp[:, :, :3]) <= 2)
+
+
+def test_APNGWriter():
+    frames = make_frames()
+    with tempdir():
+        with movie.openMovieWriter('movie.png') as writer:
+            for frame in frames:
+                writer.write(frame)
+
+        img = Image.open('movie.png')
+        got = [np.asarray(f.convert('RGB')) for f in
+               ImageSequence.Iterator(img)]
+
+        assert img.n_frames == len(frames)
+        for exp, frame in zip(frames, got):
+            assert np.all(frame == exp[:, :, :3])
+
+
+def test_RawWriter():
+    frames = make_frames()
+    with tempdir():
+        with movie.openMovieWriter('movie.raw') as writer:
+            for frame in frames:
+                writer.write(frame)
+
+        data = np.fromfile('movie.raw', dtype=np.uint8)
+        data = data.reshape((len(frames), 20, 30, 3))
+
+        for exp, frame in zip(frames, data):
+            assert np.all(frame == exp[:, :, :3])
+
+
+def test_MovieWriter_shape():
+    frames = make_frames(1, (20, 30)) + make_frames(1, (10, 10))
+    with tempdir():
+        with movie.openMovieWriter('movie.raw') as writer:
+            writer.write(frames[0])
+            with pytest.raises(ValueError):
+                writer.write(frames[1])
+
+
+def test_MovieContext():
+    ctx    = movie.MovieContext(False)
+    frames = [3, 4, 0, 1, 2, 3, 4]
+
+    for frame in frames:
+        frame, finished = ctx.processFrame(frame)
+        if finished:
+            break
+        ctx.addFrame(frame)
+
+    assert ctx.frames == [3, 4, 0, 1, 2]
+    assert ctx.images == []
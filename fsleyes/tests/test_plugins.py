@@ -6,6 +6,7 @@
 #
 
 import sys
+import json
 
 import textwrap as tw
 
@@ -46,9 +47,14 @@ def test_listViews():
     from fsleyes_plugin_example.plugin import PluginView
 
     with mock.patch('fsleyes.plugins.SHOW_THIRD_PARTY_PLUGINS', True):
-        views = dict(plugins.listViews())
+        views    = dict(plugins.listViews())
+        viewsnol = dict(plugins.listViews(load=False))
 
-    assert views['Plugin view'] is PluginView
+    assert views['Plugin view']    is PluginView
+    assert viewsnol['Plugin view'] == 'PluginView'
+    assert 'Bad plugin view' not in views
+    assert 'Bad plugin view' not in viewsnol
+    assert plugins.lookupView('PluginView') is PluginView
 
 
 def test_listControls():
@@ -72,8 +78,10 @@ def test_listTools():
 
     with mock.patch('fsleyes.plugins.SHOW_THIRD_PARTY_PLUGINS', True):
         tools = dict(plugins.listTools())
+        indep = dict(plugins.listTools(independent=True))
 
     assert tools['Plugin tool'] is PluginTool
+    assert indep['Plugin tool'] is PluginTool
 
 
 def test_listLayouts():
@@ -275,3 +283,76 @@ def test_builtins_get_loaded():
     assert ClusterPanel       in controls
     assert CropImagePanel not in controls
     assert CropImageAction    in tools
+
+
+def test_manifest():
+
+    from fsleyes.plugins.controls.atlaspanel import AtlasPanel
+    from fsleyes.plugins.tools.cropimage     import CropImageAction
+    from fsleyes.views.orthopanel            import OrthoPanel
+    from fsleyes.views.timeseriespanel       import TimeSeriesPanel
+
+    with tempdir.tempdir() as td:
+
+        s = fslsettings.Settings('test_plugins', cfgdir=td, writeOnExit=False)
+        with fslsettings.use(s), \
+             mock.patch('fsleyes.plugins._manifest', None), \
+             mock.patch('fsleyes.plugins._metadata', {}):
+
+            plugins.initialise()
+
+            fname = op.join(td, plugins.MANIFEST_FILE)
+            assert op.exists(fname)
+            with open(fname, 'rt') as f:
+                manifest = json.loads(f.read())
+
+            modules = manifest['builtins']['modules']
+            entries = modules['fsleyes.plugins.controls.atlaspanel.atlaspanel']
+            assert manifest['version'] == plugins.MANIFEST_VERSION
+            assert [e['name'] for e in entries] == ['AtlasPanel']
+            assert [e['kind'] for e in entries] == ['control']
+
+            # Built-ins should be registered from
+            # the manifest without being imported
+            with mock.patch('fsleyes.plugins._manifest', None), \
+                 mock.patch('fsleyes.plugins._metadata', {}), \
+                 mock.patch('fsleyes.plugins.pkgutil.iter_modules') as im:
+
+                plugins.initialise()
+                im.assert_not_called()
+
+                ctrlsortho = list(plugins.listControls(OrthoPanel).values())
+                ctrlsts    = list(plugins.listControls(TimeSeriesPanel).values())
+                tools      = list(plugins.listTools().values())
+                indep      = plugins.listTools(independent=True)
+
+                assert AtlasPanel      in     ctrlsortho
+                assert AtlasPanel      not in ctrlsts
+                assert CropImageAction in     tools
+                assert CropImageAction not in indep.values()
+                assert all(t.supportedViews() is None
+                           for t in indep.values())
+                assert plugins.lookupTool('CropImageAction') is CropImageAction
+                assert plugins.pluginTitle(AtlasPanel) == \
+                    plugins.pluginTitle(plugins.lookupControl('AtlasPanel'))
+
+            # The manifest should be ignored
+            # if the built-in plugins change
+            with mock.patch('fsleyes.plugins._manifest', None), \
+                 mock.patch('fsleyes.plugins._metadata', {}), \
+                 mock.patch('fsleyes.plugins._builtInStamp',
+                            return_value='changed'):
+                plugins.initialise()
+                with open(fname, 'rt') as f:
+                    manifest = json.loads(f.read())
+                assert manifest['builtins']['stamp'] == 'changed'
+
+            # The manifest should be ignored if
+            # it was saved by a different version
+            with mock.patch('fsleyes.plugins._manifest', None), \
+                 mock.patch('fsleyes.plugins._metadata', {}), \
+                 mock.patch('fsleyes.plugins.MANIFEST_VERSION', -1), \
+                 mock.patch('fsleyes.plugins.pkgutil.iter_modules',
+                            wraps=plugins.pkgutil.iter_modules) as im:
+                plugins.initialise()
+                im.assert_called()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+#
+# test_render_batch.py - Test fsleyes render --batch.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import os.path as op
+import            shutil
+
+import pytest
+
+import numpy as np
+
+import matplotlib.image as mplimg
+
+import fsl.utils.idle    as idle
+import fsl.data.image    as fslimage
+import fsl.data.mesh     as fslmesh
+import fsleyes.render    as fslrender
+from fsleyes.tests import tempdir, compare_images
+
+
+pytestmark = pytest.mark.clitest
+
+
+datadir  = op.join(op.dirname(__file__), 'testdata')
+benchdir = op.join(op.dirname(__file__), 'testdata', 'cli_tests')
+
+
+jobs = [
+    ('-s ortho -sz 640 480 -of {} 3d.nii.gz',
+     'test_render_ortho_3d.nii.gz.png'),
+    ('-s ortho -sz 640 480 -of {} -lo horizontal 3d.nii.gz',
+     'test_render_ortho_-lo_horizontal_3d.nii.gz.png'),
+    ('-s ortho -sz 640 480 -of {} nonexistent.nii.gz',
+     None),
+]
+
+
+def test_render_batch():
+
+    with tempdir() as td:
+
+        shutil.copy(op.join(datadir, '3d.nii.gz'), td)
+
+        with open('jobs.txt', 'wt') as f:
+            f.write('# comments are ignored\n')
+            for i, (job, _) in enumerate(jobs):
+                f.write(job.format(f'out{i}.png') + '\n')
+
+        idle.idleLoop.reset()
+        idle.idleLoop.allowErrors = True
+
+        # non-zero exit status,
+        # as one of the jobs fails
+        with pytest.raises(SystemExit) as e:
+            fslrender.main(['--batch', 'jobs.txt'])
+        assert e.value.code == 1
+
+        for i, (_, benchmark) in enumerate(jobs):
+            outfile = op.join(td, f'out{i}.png')
+            if benchmark is None:
+                assert not op.exists(outfile)
+                continue
+            testimg  = mplimg.imread(outfile)
+            benchimg = mplimg.imread(op.join(benchdir, benchmark))
+            result, _ = compare_images(testimg, benchimg, 50)
+            assert result
+
+
+def test_renderJobs():
+
+    with tempdir() as td:
+
+        shutil.copy(op.join(datadir, '3d.nii.gz'), td)
+
+        jobList = [job.format(f'out{i}.png') for i, (job, _) in
+                   enumerate(jobs)]
+        results = list(fslrender.renderJobs(jobList, njobs=2))
+
+        assert len(results) == len(jobs)
+
+        for i, ((ok, msg), (_, benchmark)) in enumerate(zip(results, jobs)):
+            outfile = op.join(td, f'out{i}.png')
+            if benchmark is None:
+                assert not ok
+                continue
+            assert ok
+            assert op.realpath(msg) == op.realpath(outfile)
+            testimg  = mplimg.imread(outfile)
+            benchimg = mplimg.imread(op.join(benchdir, benchmark))
+            result, _ = compare_images(testimg, benchimg, 50)
+            assert result
+
+
+def test_OverlayCache():
+
+    with tempdir():
+        for fname in ['a', 'b', 'c']:
+            with open(fname, 'wt') as f:
+                f.write(fname)
+
+        A, B, C = [fslimage.Image(np.zeros((2, 2, 2)), name=n)
+                   for n in 'ABC']
+
+        cache = fslrender.OverlayCache(2)
+        cache.put('a', [A])
+        cache.put('b', [B])
+
+        # overlays are only returned once per job
+        assert cache.get('a') is None
+        cache.release()
+        assert cache.get('a') == [A]
+        cache.put('c', [C])
+        cache.release()
+
+        # b was least recently used
+        assert len(cache)     == 2
+        assert cache.get('b') is None
+        assert cache.get('a') == [A]
+        assert cache.get('c') == [C]
+        cache.release()
+
+        # modified files are not returned
+        with open('a', 'at') as f:
+            f.write('more')
+        assert cache.get('a') is None
+
+        cache.clear()
+        assert len(cache) == 0
+
+
+def test_OverlayCache_state():
+
+    tris  = np.array([[0, 1, 2]])
+    verts = np.random.random((3, 3))
+
+    with tempdir():
+        for fname in ['img', 'mesh']:
+            with open(fname, 'wt') as f:
+                f.write(fname)
+
+        img  = fslimage.Image(np.zeros((2, 2, 2)), name='img')
+        mesh = fslmesh.Mesh(tris, name='mesh', vertices=verts)
+        mesh.addVertexData('data', np.arange(3))
+
+        cache = fslrender.OverlayCache()
+        cache.put('img',  [img])
+        cache.put('mesh', [mesh])
+
+        # changes made by one job ...
+        img.name  = 'changed'
+        mesh.name = 'changed'
+        mesh.addVertices(verts * 2, key='other')
+        mesh.addVertexData('more', np.arange(3))
+        cache.release()
+
+        # ... are not visible in the next
+        assert cache.get('img')  == [img]
+        assert cache.get('mesh') == [mesh]
+        assert img.name  == 'img'
+        assert mesh.name == 'mesh'
+        assert np.all(mesh.vertices == verts)
+        assert list(mesh.vertexDataSets()) == ['data']
+        assert np.all(mesh.getVertexData('data').flat == np.arange(3))
+
+
+def test_render_batch_overlay_state():
+
+    # Two jobs using the same file with different per-overlay
+    # options, and a job which uses the same file twice
+    batch = [
+        '-s ortho -sz 640 480 -of out0.png 3d.nii.gz -n first -cm red',
+        '-s ortho -sz 640 480 -of out1.png 3d.nii.gz',
+        '-s ortho -sz 640 480 -of out2.png 3d.nii.gz -cm red 3d.nii.gz']
+    states = []
+
+    def hook(overlayList, displayCtx, sceneOpts, canvases):
+        states.append([(ovl,
+                        displayCtx.getDisplay(ovl).name,
+                        displayCtx.getOpts(ovl).cmap.name)
+                       for ovl in overlayList])
+
+    with tempdir() as td:
+
+        shutil.copy(op.join(datadir, '3d.nii.gz'), td)
+
+        with open('jobs.txt', 'wt') as f:
+            f.write('\n'.join(batch))
+
+        idle.idleLoop.reset()
+        fslrender.main(['--batch', 'jobs.txt'], hook)
+
+        # The second job is unaffected by the first
+        testimg   = mplimg.imread(op.join(td, 'out1.png'))
+        benchimg  = mplimg.imread(
+            op.join(benchdir, 'test_render_ortho_3d.nii.gz.png'))
+        result, _ = compare_images(testimg, benchimg, 50)
+        assert result
+
+    (ovl0, name0, cmap0), = states[0]
+    (ovl1, name1, cmap1), = states[1]
+    (ovl2, _,     cmap2), (ovl3, _, cmap3) = states[2]
+
+    # the image is loaded once, and re-used,
+    # but not twice in the same job
+    assert ovl0 is ovl1
+    assert ovl2 is not ovl3
+    assert name0 == 'first'
+    assert name1 == '3d'
+    assert cmap0 == cmap2
+    assert cmap1 == cmap3
+    assert cmap0 != cmap1
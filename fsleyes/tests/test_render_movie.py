@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+#
+# test_render_movie.py - Test fsleyes render --movie.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import os.path as op
+import            shutil
+
+import numpy as np
+import pytest
+
+import PIL.Image as Image
+
+import fsl.utils.idle    as idle
+import fsleyes.render    as fslrender
+from fsleyes.tests import tempdir
+
+
+pytestmark = pytest.mark.clitest
+
+
+datadir = op.join(op.dirname(__file__), 'testdata')
+
+
+def run_movie(*args):
+    idle.idleLoop.reset()
+    idle.idleLoop.allowErrors = True
+    fslrender.main(list(args))
+
+
+def test_render_movie_time():
+    with tempdir() as td:
+        shutil.copy(op.join(datadir, '4d.nii.gz'), td)
+
+        run_movie('-s', 'ortho', '-sz', '200', '100', '-of', 'movie.png',
+                  '--movie', '4d.nii.gz')
+
+        # one frame per volume
+        img = Image.open('movie.png')
+        assert img.n_frames == 45
+
+
+def test_render_movie_raw():
+    with tempdir() as td:
+        shutil.copy(op.join(datadir, '3d.nii.gz'), td)
+
+        run_movie('-s', 'ortho', '-sz', '200', '100', '-of', 'movie.raw',
+                  '--movie', '--movieAxis', '2', '3d.nii.gz')
+
+        data = np.fromfile('movie.raw', dtype=np.uint8)
+        assert data.size > 0
+        assert data.size % (200 * 100 * 3) == 0
+
+
+def test_render_movie_3d():
+    with tempdir() as td:
+        shutil.copy(op.join(datadir, '3d.nii.gz'), td)
+
+        run_movie('-s', '3d', '-sz', '100', '100', '-of', 'movie.gif',
+                  '--movie', '--movieAxis', '1', '3d.nii.gz')
+
+        img = Image.open('movie.gif')
+        assert img.n_frames > 1
+
+
+def test_render_movie_jobs():
+    with tempdir() as td:
+        shutil.copy(op.join(datadir, '4d.nii.gz'), td)
+
+        run_movie('-s', 'ortho', '-sz', '200', '100', '-of', 'serial.raw',
+                  '--movie', '4d.nii.gz')
+        run_movie('-s', 'ortho', '-sz', '200', '100', '-of', 'parallel.raw',
+                  '--movie', '--jobs', '2', '4d.nii.gz')
+
+        serial   = np.fromfile('serial.raw',   dtype=np.uint8)
+        parallel = np.fromfile('parallel.raw', dtype=np.uint8)
+
+        assert serial.size == 45 * 200 * 100 * 3
+        assert np.all(serial == parallel)
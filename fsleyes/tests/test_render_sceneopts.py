@@ -5,19 +5,13 @@
 # Author: Paul McCarthy <pauldmccarthy@gmail.com>
 #
 
-import os
-import os.path as op
-
 import contextlib
-import textwrap as tw
 from unittest import mock
 
 import pytest
 
 import numpy   as np
 
-from fsl.utils.tempdir import tempdir
-
 from fsleyes.tests import run_cli_tests, zero_centre, haveFSL # noqa
 
 
@@ -145,26 +139,20 @@ def test_render_sceneopts_3d():
                   scene='3d')
 
 
-# mock version of fslstats which returns
+# mock version of robustRange which returns
 # a specific robust range, for the tests
 # that use -rr
 @contextlib.contextmanager
-def mock_fslstats(dmin, dmax, *args, **kwargs):
-    with tempdir(changeto=False) as td:
-        fslstats = op.join(td, 'fslstats')
-        with open(fslstats, 'wt') as f:
-            f.write(tw.dedent(f"""
-            #!/usr/bin/env bash
-            echo "{dmin} {dmax}"
-            """).strip())
-        os.chmod(fslstats, 0o755)
-        with mock.patch('fsl.utils.run.FSL_PREFIX', td):
-            yield
+def mock_robustRange(dmin, dmax, *args, **kwargs):
+    def robustRange(image, *args, **kwargs):
+        return dmin, dmax
+    with mock.patch('fsleyes.utils.robustRange', robustRange):
+        yield
 
 
 @pytest.mark.skipif('not haveFSL()')
 def test_render_fsl_sceneopts_ortho():
-    with mock_fslstats(3000, 5000):
+    with mock_robustRange(3000, 5000):
         run_cli_tests('test_render_fsl_sceneopts_ortho',
                       fsl_cli_tests,
                       extras=extras,
@@ -173,7 +161,7 @@ def test_render_fsl_sceneopts_ortho():
 
 @pytest.mark.skipif('not haveFSL()')
 def test_render_fsl_sceneopts_lightbox():
-    with mock_fslstats(3000, 5000):
+    with mock_robustRange(3000, 5000):
         run_cli_tests('test_render_fsl_sceneopts_lightbox',
                       fsl_cli_tests,
                       extras=extras,
@@ -186,7 +174,7 @@ def test_render_fsl_sceneopts_3d():
     tests = [t for t in tests if (t != '') and (t[0] != '#')]
     tests = '\n'.join(['-dl {}'.format(t) for t in tests])
 
-    with mock_fslstats(3000, 5000):
+    with mock_robustRange(3000, 5000):
         run_cli_tests('test_render_fsl_sceneopts_3d',
                       tests,
                       extras=extras,
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+#
+# test_resources.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import time
+
+import fsleyes.gl.resources as glresources
+
+
+class Resource:
+    def __init__(self, nbytes, lastUsed, evictable=True):
+        self.__nbytes  = nbytes
+        self.lastUsed  = lastUsed
+        self.evictable = evictable
+        self.evicted   = False
+        self.destroyed = False
+    @property
+    def nbytes(self):
+        if self.evicted: return 0
+        return self.__nbytes
+    def evict(self):
+        self.evicted = True
+    def destroy(self):
+        self.destroyed = True
+
+
+def test_budget():
+
+    now  = time.time()
+    res1 = Resource(100, now - 100)
+    res2 = Resource(100, now - 50)
+    res3 = Resource(100, now - 75, evictable=False)
+    res4 = Resource(100, now)
+
+    try:
+        glresources.set('res1', res1)
+        glresources.set('res2', res2)
+        glresources.set('res3', res3)
+        glresources.set('res4', res4)
+
+        assert glresources.usage() == 400
+        assert not any(r.evicted for r in (res1, res2, res3, res4))
+
+        # least recently used evictable
+        # resources should be evicted first
+        glresources.setBudget(300)
+        assert glresources.getBudget() == 300
+        assert     res1.evicted
+        assert not res2.evicted
+        assert glresources.usage() == 300
+
+        # non-evictable and recently used
+        # resources should not be evicted
+        glresources.setBudget(50)
+        assert     res2.evicted
+        assert not res3.evicted
+        assert not res4.evicted
+        assert glresources.usage() == 200
+
+        report = glresources.report()
+        assert report['usage']  == 200
+        assert report['budget'] == 50
+        assert report['resources']['res1']['evicted']
+        assert report['resources']['res3']['nbytes'] == 100
+
+    finally:
+        glresources.setBudget(None)
+        for key in ['res1', 'res2', 'res3', 'res4']:
+            if glresources.exists(key):
+                glresources.delete(key)
+
+    assert all(r.destroyed for r in (res1, res2, res3, res4))
+    assert glresources.getBudget() is None
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+#
+# test_robustrange.py - Tests for the fsleyes.utils.robustrange module.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+from unittest import mock
+
+import numpy as np
+
+from fsl.data.image import Image
+
+import fsleyes.utils.robustrange as robustrange
+
+
+def test_calcRobustRange():
+
+    data       = np.random.normal(100, 10, 100000)
+    lo, hi     = robustrange.calcRobustRange(data)
+    plo, phi   = np.percentile(data, [2, 98])
+    dmin, dmax = data.min(), data.max()
+    binWidth   = (dmax - dmin) / robustrange.HISTOGRAM_BINS
+
+    assert abs(lo - plo) <= 2 * binWidth
+    assert abs(hi - phi) <= 2 * binWidth
+
+    # Highly skewed data - the histogram
+    # range should be refined, so that the
+    # range is not dominated by outliers
+    data       = np.concatenate((np.random.random(100000), [10000]))
+    lo, hi     = robustrange.calcRobustRange(data)
+    plo, phi   = np.percentile(data, [2, 98])
+
+    assert abs(lo - plo) < 0.05
+    assert abs(hi - phi) < 0.05
+
+    assert robustrange.calcRobustRange(np.zeros(0))  is None
+    assert robustrange.calcRobustRange(np.ones(100)) == (1, 1)
+
+
+def test_sampleImage():
+
+    data = np.random.random((20, 20, 20, 5)).astype(np.float32)
+    data[0, 0, 0, 0] = np.nan
+    img  = Image(data)
+
+    sample = robustrange.sampleImage(img)
+    assert sample.size == 20 * 20 * 20 - 1
+    assert np.all(np.isfinite(sample))
+
+    sample = robustrange.sampleImage(img, [(3,)])
+    assert np.all(np.sort(sample) == np.sort(data[..., 3].ravel()))
+
+    # Sub-sampled with a stride of 2 along
+    # each axis - 10 * 10 * 10 voxels
+    sample = robustrange.sampleImage(img, [(1,)], maxSamples=1000)
+    expect = data[::2, ::2, ::2, 1].ravel()
+    assert np.all(np.sort(sample) == np.sort(expect))
+
+    sample = robustrange.sampleImage(img, [(v,) for v in range(5)], 5000)
+    assert sample.size <= 5000
+
+
+def test_robustRange():
+
+    data = np.random.normal(100, 10, (20, 20, 20, 3))
+    data[..., 1] += 1000
+    img  = Image(data)
+
+    def rr(d):
+        return robustrange.calcRobustRange(d.ravel())
+
+    with mock.patch.object(robustrange, '_cache', robustrange._cache.copy()):
+
+        assert np.all(np.isclose(robustrange.robustRange(img),
+                                 rr(data[..., 0])))
+        assert np.all(np.isclose(robustrange.robustRange(img, volume=1),
+                                 rr(data[..., 1])))
+        assert np.all(np.isclose(robustrange.robustRange(img, False),
+                                 rr(data)))
+
+        # results are cached
+        with mock.patch.object(robustrange, 'sampleImage') as m:
+            robustrange.robustRange(img, volume=1)
+            m.assert_not_called()
+
+        # and cleared when the data changes
+        newvol      = data[..., 1] * 2
+        expect      = rr(newvol)
+        img[..., 1] = newvol
+        assert np.all(np.isclose(robustrange.robustRange(img, volume=1),
+                                 expect))
+
+        # Falls back to data range
+        img = Image(np.full((5, 5, 5), np.nan))
+        assert np.allclose(robustrange.robustRange(img), img.dataRange,
+                           equal_nan=True)
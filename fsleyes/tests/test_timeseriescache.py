@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+#
+# test_timeseriescache.py - Tests for the fsleyes.plotting.timeseriescache
+# module.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import os.path as op
+import            os
+from unittest import mock
+
+import numpy as np
+
+import fsl.utils.settings as fslsettings
+from fsl.utils.tempdir import tempdir
+from fsl.data.image    import Image
+
+import fsleyes.plotting.timeseriescache as tscache
+
+
+def test_TimeSeriesCache():
+
+    with tempdir() as td, \
+         fslsettings.use(fslsettings.Settings(cfgdir=td)), \
+         mock.patch.object(tscache, '_caches',     {}), \
+         mock.patch.object(tscache, 'BUFFER_SIZE', 5000):
+
+        data = np.random.random((10, 11, 12, 13)).astype(np.float32)
+        Image(data).save('image.nii.gz')
+
+        # Disabled by default
+        assert tscache.getCache(Image('image.nii.gz')) is None
+
+        fslsettings.write('fsleyes.plotting.timeseriescache', True)
+
+        # 3D or in-memory images are ignored
+        assert tscache.getCache(Image(data)) is None
+        assert tscache.getCache(Image(data[..., 0])) is None
+
+        img = Image('image.nii.gz')
+        tsc = tscache.getCache(img)
+
+        assert tsc is not None
+        assert tsc.ready
+        assert tsc.valid(img)
+        assert tscache.getCache(img) is tsc
+        assert op.exists(tscache.sidecarPath(tsc.identity))
+
+        for x, y, z in np.random.randint(0, 10, (20, 3)):
+            assert np.all(tsc.timeseries(x, y, z) == data[x, y, z, :])
+
+        # Sidecar should be re-created
+        # if the file is modified
+        data = data * 2
+        Image(data).save('image.nii.gz')
+        st = os.stat('image.nii.gz')
+        os.utime('image.nii.gz', ns=(st.st_atime_ns, st.st_mtime_ns + 10))
+
+        img2 = Image('image.nii.gz')
+        assert not tsc.valid(img2)
+
+        tsc2 = tscache.getCache(img2)
+        assert tsc2 is not tsc
+        assert tsc2.valid(img2)
+        assert np.all(tsc2.timeseries(1, 2, 3) == data[1, 2, 3, :])
+
+
+def test_prune():
+
+    with tempdir() as td, \
+         fslsettings.use(fslsettings.Settings(cfgdir=td)), \
+         mock.patch.object(tscache, '_caches',      {}), \
+         mock.patch.object(tscache, 'MAX_SIDECARS', 3):
+
+        fslsettings.write('fsleyes.plotting.timeseriescache', True)
+
+        data = np.random.random((5, 5, 5, 5)).astype(np.float32)
+        for i in range(5):
+            Image(data).save(f'image{i}.nii.gz')
+            tscache.getCache(Image(f'image{i}.nii.gz'))
+
+        sidecars = os.listdir(tscache.filecache.cachePath('timeseries'))
+        assert len(sidecars) == 3
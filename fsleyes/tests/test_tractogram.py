@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+#
+# test_tractogram.py - Test the Tractogram class
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+import os.path as op
+
+import numpy as np
+
+from fsleyes.data.tractogram import Tractogram, douglasPeucker
+
+
+datadir = op.join(op.dirname(__file__), 'testdata', 'tractogram')
+
+
+def test_subset():
+    tg = Tractogram(op.join(datadir, 'dipy_tracks.trk'))
+
+    for n in [0, 1, 10, tg.nstreamlines]:
+        indices = np.sort(np.random.choice(tg.nstreamlines, n, replace=False))
+        verts, offsets, lengths, vertIdxs = tg.subset(indices)
+
+        expIdxs = [np.arange(o, o + l) for o, l
+                   in zip(tg.offsets[indices], tg.lengths[indices])]
+        if n > 0: expIdxs = np.concatenate(expIdxs)
+        else:     expIdxs = np.zeros(0)
+
+        assert np.all(vertIdxs == expIdxs)
+        assert np.all(verts    == tg.vertices[expIdxs.astype(int)])
+        assert np.all(lengths  == tg.lengths[indices])
+        assert np.all(offsets  == np.cumsum(lengths) - lengths)
+
+
+def test_subsample():
+    tg = Tractogram(op.join(datadir, 'dipy_tracks.trk'))
+
+    for perVertex in [False, True]:
+        if perVertex: lim = tg.nvertices
+        else:         lim = tg.nstreamlines
+
+        prev = np.zeros(0, dtype=int)
+        for pct in [0, 10, 25, 50, 75, 100]:
+            indices = tg.subsample(pct, perVertex)
+
+            # deterministic and cached
+            assert tg.subsample(pct, perVertex) is indices
+            assert np.all(Tractogram(op.join(datadir, 'dipy_tracks.trk'))
+                          .subsample(pct, perVertex) == indices)
+
+            # sorted, and nested
+            assert np.all(np.diff(indices) > 0)
+            assert np.all(np.isin(prev, indices))
+            prev = indices
+
+        assert len(tg.subsample(0,   perVertex)) == 0
+        assert len(tg.subsample(100, perVertex)) == lim
+        assert not np.array_equal(tg.subsample(50, perVertex, seed=1),
+                                  tg.subsample(50, perVertex, seed=2))
+
+
+def test_verticesInRange():
+    tg    = Tractogram(op.join(datadir, 'spirals.trk'))
+    verts = tg.vertices
+
+    for axis in range(3):
+        lo, hi = tg.bounds[0][axis], tg.bounds[1][axis]
+        ranges = [(lo, hi), (lo - 10, hi + 10), (hi + 1, hi + 10),
+                  (lo, lo), (hi, lo)]
+        for _ in range(20):
+            ranges.append(sorted(np.random.uniform(lo, hi, 2)))
+
+        for rlo, rhi in ranges:
+            coords = verts[:, axis]
+            exp    = np.where((coords >= rlo) & (coords <= rhi))[0]
+            got    = tg.verticesInRange(axis, rlo, rhi)
+            assert np.all(np.sort(got) == exp)
+
+
+def _douglasPeucker(verts, tolerance):
+    """Simple recursive reference implementation. """
+    keep = np.zeros(len(verts), dtype=bool)
+    if len(verts) == 0:
+        return keep
+    keep[[0, -1]] = True
+    if len(verts) < 3:
+        return keep
+    a, b  = verts[0], verts[-1]
+    ab    = b - a
+    dists = []
+    for p in verts[1:-1]:
+        t = 0 if np.all(ab == 0) else np.clip(np.dot(p - a, ab) /
+                                              np.dot(ab, ab), 0, 1)
+        dists.append(np.linalg.norm(p - a - t * ab))
+    mid = np.argmax(dists) + 1
+    if dists[mid - 1] > tolerance:
+        keep[:mid + 1] |= _douglasPeucker(verts[:mid + 1], tolerance)
+        keep[mid:]     |= _douglasPeucker(verts[mid:],     tolerance)
+    return keep
+
+
+def test_douglasPeucker():
+    lengths = np.random.randint(0, 30, 100)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    verts   = np.random.normal(size=(lengths.sum(), 3))
+    verts   = np.cumsum(verts, axis=0).astype(np.float32)
+
+    for tolerance in [0, 0.5, 2, 10]:
+        exp = [_douglasPeucker(verts[o:o + l], tolerance)
+               for o, l in zip(offsets, lengths)]
+        exp = np.concatenate(exp)
+        for chunkSize in [5, 100, 1000000]:
+            got = douglasPeucker(verts, offsets, lengths, tolerance, chunkSize)
+            assert np.all(got == exp)
+
+
+def test_simplify():
+    tg = Tractogram(op.join(datadir, 'dipy_tracks.trk'))
+
+    prev = np.ones(tg.nvertices, dtype=bool)
+    for tolerance in [0.25, 1, 4]:
+        keep = tg.simplify(tolerance)
+        assert tg.simplify(tolerance) is keep
+        assert np.all(keep[tg.offsets])
+        assert np.all(keep[tg.offsets + tg.lengths - 1])
+        assert keep.sum() <= prev.sum()
+        prev = keep
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+#
+# test_volume3dopts.py - Tests for the Volume3DOpts class.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+from unittest import mock
+
+from fsleyes.displaycontext.volume3dopts import Volume3DOpts
+
+
+class MockOpts:
+    getNumSteps      = Volume3DOpts.getNumSteps
+    getNumOuterSteps = Volume3DOpts.getNumOuterSteps
+
+    def __init__(self, numSteps, numInnerSteps):
+        self.numSteps      = numSteps
+        self.numInnerSteps = numInnerSteps
+
+
+def test_getNumSteps_gl21():
+    opts = MockOpts(100, 7)
+    with mock.patch('fsleyes.gl.GL_COMPATIBILITY', '2.1'):
+        assert opts.getNumSteps()   == 100
+        assert opts.getNumSteps(25) == 25
+
+
+def test_getNumSteps_gl14():
+    opts = MockOpts(100, 7)
+    with mock.patch('fsleyes.gl.GL_COMPATIBILITY', '1.4'):
+        assert opts.getNumOuterSteps()   == 15
+        assert opts.getNumOuterSteps(25) == 4
+        assert opts.getNumOuterSteps(28) == 4
+        assert opts.getNumSteps()        == 100
+        assert opts.getNumSteps(25)      == 25
+
+    opts = MockOpts(100, 10)
+    with mock.patch('fsleyes.gl.GL_COMPATIBILITY', '1.4'):
+        assert opts.getNumOuterSteps(25) == 3
+        assert opts.getNumOuterSteps(5)  == 1
+        assert opts.getNumSteps(25)      == 25
+        assert opts.getNumSteps(5)       == 5
@@ -180,6 +180,11 @@ properties = TypeDict({
     'shown on screen. Higher values look better, but lower values will be '
     'drawn more quickly.',
 
+    'Volume3DOpts.progressive' :
+    'When active, the volume is drawn at a lower quality while it is being '
+    'rotated or clipped, and is then gradually refined to full quality once '
+    'the view stops changing.',
+
     'Volume3DOpts.numClipPlanes' :
     'Number of active clipping planes. Areas of the image which are in the '
     'intersection, union, or complement of all clipping planes will not be '
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+#
+# filecache.py - Small persistent caches keyed on file identity.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :class:`FileCache` class, a small persistent
+key-value store which is used to cache information that is expensive to
+calculate for a data file (e.g. the data range of a large image).
+
+Cache entries are identified by the :func:`fileIdentity` of a file - its
+absolute path, modification time and size. If the file is modified, any
+cached information about it is ignored.
+
+Cache files are stored in the FSLeyes settings directory (see the
+:mod:`fsl.utils.settings` module), within a sub-directory called ``cache``.
+"""
+
+
+import os.path   as op
+import              os
+import              json
+import              logging
+import              threading
+import              contextlib
+import itertools as it
+
+import fsl.utils.settings as fslsettings
+
+
+log = logging.getLogger(__name__)
+
+
+def fileIdentity(path):
+    """Returns a string which identifies the given file, comprising its
+    absolute path, modification time, and size. Returns ``None`` if the file
+    does not exist.
+    """
+    if path is None:
+        return None
+    try:
+        path = op.realpath(op.abspath(path))
+        st   = os.stat(path)
+    except OSError:
+        return None
+    return f'{path}:{st.st_mtime_ns}:{st.st_size}'
+
+
+def cachePath(*path):
+    """Returns an absolute path to the given file/directory within the FSLeyes
+    cache directory. The path is not guaranteed to exist.
+    """
+    return fslsettings.filePath(op.join('cache', *path))
+
+
+class FileCache:
+    """A ``FileCache`` is a small persistent key-value store, where each key
+    is a file path, and each value is some JSON-serialisable information about
+    that file. Entries are saved to a JSON file in the FSLeyes cache directory
+    every time they are added, unless they are added within a :meth:`batch`
+    block, in which case they are saved once when the block exits. Entries
+    for files which have since been modified are ignored. When more than
+    ``maxEntries`` files have been cached, the oldest entries are discarded.
+
+    ``FileCache`` instances may be accessed from multiple threads.
+    """
+
+
+    def __init__(self, name, maxEntries=256):
+        """Create a ``FileCache``.
+
+        :arg name:       Name of the cache file, within the FSLeyes cache
+                         directory.
+        :arg maxEntries: Maximum number of entries to store.
+        """
+        self.__name       = name
+        self.__maxEntries = maxEntries
+        self.__entries    = None
+        self.__batch      = 0
+        self.__dirty      = False
+        self.__lock       = threading.Lock()
+
+
+    def __load(self):
+        """Loads the cache file, if it has not already been loaded. """
+
+        if self.__entries is not None:
+            return
+
+        self.__entries = {}
+        fname          = op.join('cache', self.__name)
+
+        try:
+            contents = fslsettings.readFile(fname)
+            if contents is not None:
+                self.__entries = dict(json.loads(contents))
+        except Exception as e:
+            log.warning('Could not load cache file %s: %s', fname, e)
+
+
+    def __save(self):
+        """Saves the cache entries to the cache file. """
+        self.__dirty = False
+        fname        = op.join('cache', self.__name)
+        try:
+            with fslsettings.writeFile(fname) as f:
+                f.write(json.dumps(self.__entries))
+        except Exception as e:
+            log.warning('Could not save cache file %s: %s', fname, e)
+
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Context manager which may be used when adding many entries. The
+        cache file is saved once, when the outermost ``batch`` block exits,
+        rather than every time that an entry is added.
+        """
+        with self.__lock:
+            self.__batch += 1
+        try:
+            yield
+        finally:
+            with self.__lock:
+                self.__batch -= 1
+                if self.__batch == 0 and self.__dirty:
+                    self.__save()
+
+
+    def get(self, path):
+        """Returns the value stored for the given file, or ``None`` if there
+        is no value stored for it, or if the file has been modified since
+        the value was stored.
+        """
+        key = fileIdentity(path)
+        if key is None:
+            return None
+        with self.__lock:
+            self.__load()
+            return self.__entries.get(key, None)
+
+
+    def put(self, path, value):
+        """Stores the given value for the given file. """
+
+        key = fileIdentity(path)
+        if key is None:
+            return
+
+        with self.__lock:
+            self.__load()
+
+            # Re-insert so that dict
+            # order reflects entry age
+            self.__entries.pop(key, None)
+            self.__entries[key] = value
+
+            excess = len(self.__entries) - self.__maxEntries
+            if excess > 0:
+                for old in list(it.islice(self.__entries, excess)):
+                    self.__entries.pop(old)
+
+            self.__dirty = True
+            if self.__batch == 0:
+                self.__save()
@@ -7,47 +7,268 @@
 """This module provides the :func:`robustRange` function, which calculates
 the "robust range" range of an :class:`.Image`, as implemented by the
 ``fslstats -r`` option.
+
+The robust range is calculated in-process, using the same iterative
+histogram-based algorithm as ``fslstats``, on a sample of the image data
+(see :func:`sampleImage`). Results are cached for each image, and are
+cleared when the image data changes.
 """
 
-import logging
 
+import logging
+import weakref
 
-from fsl.data.image import Image
-from fsl.wrappers   import fslstats
+import numpy as np
 
 
 log = logging.getLogger(__name__)
 
 
-def robustRange(image, firstvol=True):
+MAX_SAMPLES = 2 ** 22
+"""Default maximum number of voxels which are used to estimate the robust
+range of an image. Larger images are sub-sampled with a regular stride.
+"""
+
+
+HISTOGRAM_BINS = 1000
+"""Number of histogram bins used by the robust range algorithm. """
+
+
+MAX_PASSES = 10
+"""Maximum number of histogram refinement passes used by the robust range
+algorithm.
+"""
+
+
+_cache = weakref.WeakKeyDictionary()
+"""Cache of ``{Image : {key : (min, max)}}`` mappings, used by
+:func:`robustRange`.
+"""
+
+
+def robustRange(image, firstvol=True, volume=None, maxSamples=None):
     """Return the robust range of ``image``, as a ``(min, max)`` tuple.
 
-    At the moment, this is done by calling out to ``fslstats``. If ``fslstats``
-    cannot be called, the :attr:`.Image.dataRange` is returned.
+    The robust range is calculated on a sample of the image data - see
+    :func:`sampleImage`. If the robust range cannot be calculated, the
+    :attr:`.Image.dataRange` is returned.
+
+    :arg image:      The :class:`.Image` object
 
-    :arg image:    The :class:`.Image` object
+    :arg firstvol:   If ``True`` (default), and the image has more than three
+                     dimensions, the range is calculated on the first volume
+                     only. Otherwise the range is calculated on all volumes.
 
-    :arg firstvol: If ``True`` (default), and the image has more than three
-                   dimensions, the range is calculated on the first volume only
+    :arg volume:     Index of a specific volume (either an integer or a
+                     tuple, for images with more than four dimensions) to
+                     calculate the range on. Overrides ``firstvol``.
 
-    :returns:      A tuple containing the ``(min, max)`` robust range of the
-                   image.
+    :arg maxSamples: Maximum number of voxels to use. Defaults to
+                     :data:`MAX_SAMPLES`.
+
+    :returns:        A tuple containing the ``(min, max)`` robust range of
+                     the image.
     """
 
-    sample = image
+    if maxSamples is None:
+        maxSamples = MAX_SAMPLES
 
-    if firstvol and len(image.shape) > 3:
-        sample = Image(image[..., 0], header=image.header)
+    volumes = _volumes(image, firstvol, volume)
+    key     = (tuple(volumes), maxSamples)
+    cache   = _imageCache(image)
+    rrange  = cache.get(key, None)
 
-    # pass filename if possible, otherwise
-    # fslstats will have to save the image
-    # object to disk
-    elif image.dataSource is not None:
-        sample = image.dataSource
+    if rrange is not None:
+        return rrange
 
     try:
-        return fslstats(sample).r.run()
+        data   = sampleImage(image, volumes, maxSamples)
+        rrange = calcRobustRange(data)
+        if rrange is None:
+            rrange = image.dataRange
 
     except Exception as e:
         log.warning('Could not calculate robust range on %s: %s', image, e)
         return image.dataRange
+
+    rrange     = (float(rrange[0]), float(rrange[1]))
+    cache[key] = rrange
+
+    return rrange
+
+
+def sampleImage(image, volumes=None, maxSamples=None):
+    """Returns a 1D ``numpy`` array containing a sample of the finite values
+    in ``image``. If the specified volumes contain more than ``maxSamples``
+    voxels, the data is sub-sampled with a regular stride along each spatial
+    axis. The data is read one slice at a time, so that only a small amount
+    of memory is needed, even for large images.
+
+    :arg image:      The :class:`.Image` object
+    :arg volumes:    Sequence of volume indices (tuples) to sample. Defaults
+                     to the first volume.
+    :arg maxSamples: Maximum number of voxels to sample. Defaults to
+                     :data:`MAX_SAMPLES`.
+    """
+
+    if volumes    is None: volumes    = _volumes(image, True, None)
+    if maxSamples is None: maxSamples = MAX_SAMPLES
+
+    shape = image.shape[:3]
+    nvox  = int(np.prod(shape)) * len(volumes)
+    naxes = max(1, sum(d > 1 for d in shape))
+    step  = int(np.ceil((nvox / maxSamples) ** (1 / naxes)))
+    step  = max(1, step)
+
+    samples = []
+
+    for vol in volumes:
+
+        # Small enough to read in one go
+        if step == 1:
+            samples.append(np.asarray(image[(Ellipsis,) + vol]).ravel())
+            continue
+
+        for z in range(0, shape[2], step):
+            data = np.asarray(image[(slice(None), slice(None), z) + vol])
+            data = data.reshape(shape[:2])
+            samples.append(data[::step, ::step].ravel())
+
+    data = np.concatenate(samples)
+
+    return data[np.isfinite(data)]
+
+
+def calcRobustRange(data):
+    """Calculates the robust range of the given data, using the same
+    algorithm as ``fslstats -r`` - the range between the 2nd and 98th
+    percentiles of the data is estimated from a histogram, which is
+    iteratively refined for highly skewed data.
+
+    :arg data: 1D ``numpy`` array containing finite values
+    :returns:  A ``(min, max)`` tuple, or ``None`` if ``data`` is empty.
+    """
+
+    if data.size == 0:
+        return None
+
+    data       = np.asarray(data, dtype=np.float64)
+    nbins      = HISTOGRAM_BINS
+    dmin, dmax = data.min(), data.max()
+    lo, hi     = dmin, dmax
+    bottom     = 0
+    top        = nbins - 1
+    thresh2    = 0
+    thresh98   = 0
+    passno     = 1
+
+    # Repeat with a narrower range
+    # if the data is highly skewed
+    while passno == 1 or (thresh98 - thresh2) < (hi - lo) / 10:
+
+        if passno > 1:
+            bottom = max(bottom - 1, 0)
+            top    = min(top    + 1, nbins - 1)
+            newlo  = lo + (bottom  / nbins) * (hi - lo)
+            hi     = lo + ((top + 1) / nbins) * (hi - lo)
+            lo     = newlo
+
+        # Give up, and revert to the full range
+        if passno == MAX_PASSES or lo == hi:
+            lo, hi = dmin, dmax
+
+        if lo == hi:
+            return lo, hi
+
+        # Values outside of the range
+        # are counted in the end bins
+        bins  = np.floor((data - lo) * (nbins / (hi - lo)))
+        bins  = np.clip(bins, 0, nbins - 1).astype(np.intp)
+        hist  = np.bincount(bins, minlength=nbins)
+        valid = data.size
+
+        lowest  = 0
+        highest = nbins - 1
+
+        # Ignore the end bins on the final pass
+        if passno == MAX_PASSES:
+            valid   -= hist[lowest] + hist[highest]
+            lowest  += 1
+            highest -= 1
+
+        if valid < 0:
+            thresh2 = thresh98 = lo
+            break
+
+        binWidth = (hi - lo) / nbins
+        count    = valid // 50
+
+        # Find the bins which contain the 2nd
+        # and 98th percentiles, counting in from
+        # either end of the histogram
+        if count == 0:
+            bottom = lowest  - 1
+            top    = highest + 1
+        else:
+            fwd    = np.cumsum(hist[lowest:highest + 1])
+            bwd    = np.cumsum(hist[lowest:highest + 1][::-1])
+            bottom = lowest  + np.searchsorted(fwd, count)
+            top    = highest - np.searchsorted(bwd, count)
+
+        thresh2  = lo + bottom * binWidth
+        thresh98 = lo + (top + 1) * binWidth
+
+        if passno == MAX_PASSES:
+            break
+
+        passno += 1
+
+    return thresh2, thresh98
+
+
+def _volumes(image, firstvol, volume):
+    """Used by :func:`robustRange`. Returns a list of volume index tuples
+    to calculate the robust range on.
+    """
+
+    vshape = image.shape[3:]
+
+    if len(vshape) == 0:
+        return [()]
+
+    if volume is not None:
+        if np.isscalar(volume):
+            volume = (volume,)
+        volume = tuple(int(v) for v in volume)
+        return [volume + (0,) * (len(vshape) - len(volume))]
+
+    if firstvol:
+        return [(0,) * len(vshape)]
+
+    return list(np.ndindex(*vshape))
+
+
+def _imageCache(image):
+    """Used by :func:`robustRange`. Returns a :class:`_ImageCache` which is
+    used to cache robust range calculations for ``image``.
+    """
+
+    cache = _cache.get(image, None)
+
+    if cache is None:
+        cache         = _ImageCache()
+        _cache[image] = cache
+        image.register(__name__, cache.dataChanged, topic='data')
+
+    return cache
+
+
+class _ImageCache(dict):
+    """Dictionary of ``{key : (min, max)}`` robust range calculations for a
+    single image, used by :func:`robustRange`. The cache is cleared whenever
+    the image data changes.
+    """
+
+    def dataChanged(self, *a):
+        """Called when the image data changes. Clears the cache. """
+        self.clear()
@@ -16,7 +16,7 @@ import wx
 import fsl.utils.idle         as idle
 import fsleyes_props          as props
 import fsleyes.actions        as actions
-import fsleyes.displaycontext as displayctx
+import fsleyes.movie          as movie
 from . import                    colourbarpanel
 from . import                    viewpanel
 
@@ -657,32 +657,10 @@ class CanvasPanel(viewpanel.ViewPanel):
 
     def canRunMovie(self, overlay, opts):
         """Returns ``True`` or ``False``, depending on whether movie mode
-        is possible with the given z`overlay`` and ``opts``.
+        is possible with the given z`overlay`` and ``opts``. See
+        :func:`.movie.canRunMovie`.
         """
-
-        import fsl.data.image as fslimage
-        import fsl.data.mesh  as fslmesh
-
-        axis = self.movieAxis
-
-        # 3D movies are good for all overlays
-        if axis < 3:
-            return True
-
-        # 4D Nifti images are all good
-        if isinstance(overlay, fslimage.Nifti) and \
-           len(overlay.shape) > 3              and \
-           overlay.shape[3] > 1                and \
-           isinstance(opts, displayctx.VolumeOpts):
-            return True
-
-        # Mesh surfaces with N-D
-        # vertex data are all good
-        if isinstance(overlay, fslmesh.Mesh) and \
-           opts.vertexDataLen() > 1:
-            return True
-
-        return False
+        return movie.canRunMovie(overlay, opts, self.movieAxis)
 
 
     def getMovieFrame(self, overlay, opts):
@@ -692,28 +670,10 @@ class CanvasPanel(viewpanel.ViewPanel):
         some minimum/maximum range, e.g. a voxel or volume index.
 
         This method may be overridden by sub-classes for custom behaviour
-        (e.g. the :class:`.Scene3DPanel`).
+        (e.g. the :class:`.Scene3DPanel`). See :func:`.movie.getMovieFrame`.
         """
-
-        axis = self.movieAxis
-
-        def nifti():
-            if axis < 3: return opts.getVoxel(vround=False)[axis]
-            else:        return opts.volume
-
-        def mesh():
-            if axis < 3: return other()
-            else:        return opts.vertexDataIndex
-
-        def other():
-            return self.displayCtx.location.getPos(axis)
-
-        import fsl.data.image as fslimage
-        import fsl.data.mesh  as fslmesh
-
-        if   isinstance(overlay, fslimage.Nifti): return nifti()
-        elif isinstance(overlay, fslmesh.Mesh):   return mesh()
-        else:                                     return other()
+        return movie.getMovieFrame(
+            self.displayCtx, overlay, opts, self.movieAxis)
 
 
     def doMovieUpdate(self, overlay, opts):
@@ -721,86 +681,14 @@ class CanvasPanel(viewpanel.ViewPanel):
         given ``opts`` instance to move forward one frame in the movie.
 
         This method may be overridden by sub-classes for custom behaviour
-        (e.g. the :class:`.Scene3DPanel`).
+        (e.g. the :class:`.Scene3DPanel`). See :func:`.movie.doMovieUpdate`.
 
         :returns:   A value which identifies the current movie frame. This may
                     be a volume or voxel index, or a world coordinate location
                     on one axis.
         """
-
-        axis = self.movieAxis
-
-        def nifti():
-
-            limit = overlay.shape[axis] - 1
-
-            # This method has been called off the props
-            # event queue (see __movieModeChanged).
-            # Therefore, all listeners on the opts.volume
-            # or DisplayContext.location  properties
-            # should be called immediately, in these
-            # assignments.
-            #
-            # When the movie axis == 3 (time), this means
-            # that image texture refreshes should be
-            # triggered and, after the opts.volume
-            # assignment, all affected GLObjects should
-            # return ready() == False.
-            if axis == 3:
-                if opts.volume >= limit: opts.volume  = 0
-                else:                    opts.volume += 1
-
-                frame = opts.volume
-
-            else:
-                # voxel location may not be an integer,
-                # so use mod limit when wrapping around.
-                voxel = opts.getVoxel(vround=False)
-                if voxel[axis] >= limit: voxel[axis]  = voxel[axis] % limit
-                else:                    voxel[axis] += 1
-
-                self.displayCtx.location = opts.transformCoords(
-                    voxel, 'voxel', 'display')
-
-                frame = voxel[axis]
-            return frame
-
-        def mesh():
-
-            if axis == 3:
-                limit = opts.vertexDataLen() - 1
-                val   = opts.vertexDataIndex
-
-                if val >= limit: val  = val % limit
-                else:            val += 1
-
-                opts.vertexDataIndex = val
-
-                return val
-
-            else:
-                return other()
-
-        def other():
-
-            bmin, bmax = opts.bounds.getRange(axis)
-            delta      = (bmax - bmin) / 75.0
-            pos        = self.displayCtx.location.getPos(axis)
-
-            if pos >= bmax: pos = bmin + (pos % bmax)
-            else:           pos = pos  + delta
-
-            self.displayCtx.location.setPos(axis, pos)
-            return pos
-
-        import fsl.data.image as fslimage
-        import fsl.data.mesh  as fslmesh
-
-        if   isinstance(overlay, fslimage.Nifti): frame = nifti()
-        elif isinstance(overlay, fslmesh.Mesh):   frame = mesh()
-        else:                                     frame = other()
-
-        return frame
+        return movie.doMovieUpdate(
+            self.displayCtx, overlay, opts, self.movieAxis)
 
 
     def __movieFrame(self):
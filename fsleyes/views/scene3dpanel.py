@@ -15,11 +15,11 @@ import wx
 
 import numpy as np
 
-import fsl.transform.affine                as affine
 import fsleyes.displaycontext.scene3dopts  as scene3dopts
 import fsleyes.gl.wxglscene3dcanvas        as scene3dcanvas
 import fsleyes.profiles.scene3dviewprofile as scene3dviewprofile
 import fsleyes.actions                     as actions
+import fsleyes.movie                       as movie
 from . import                                 canvaspanel
 
 
@@ -204,14 +204,8 @@ class Scene3DPanel(canvaspanel.CanvasPanel):
             rate    = float(self.movieRate)
             rateMin = self.getAttribute('movieRate', 'minval')
             rateMax = self.getAttribute('movieRate', 'maxval')
-            rate    = 0.1 + 0.9 * (rate - rateMin) / (rateMax - rateMin)
-            rate    = rate * np.pi / 10
-
-            rots                 = [0, 0, 0]
-            rots[self.movieAxis] = rate
-
-            xform = affine.axisAnglesToRotMat(*rots)
-            xform = affine.concat(xform, currot)
+            rate    = (rate - rateMin) / (rateMax - rateMin)
+            xform   = movie.rotateScene(currot, self.movieAxis, rate)
 
             canvas.opts.rotation = xform
             return np.copy(xform)